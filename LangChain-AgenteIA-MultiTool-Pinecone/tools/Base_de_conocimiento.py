@@ -6,36 +6,75 @@ Autor: Ing. Kevin Inofuente Colque - DataPath
 """
 
 import os
+from typing import List
 from dotenv import load_dotenv, find_dotenv
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.tools import tool
-from langchain_pinecone import PineconeVectorStore
+
+from recuperacion.backends import al_cambiar_version, obtener_recuperador
+from recuperacion.cache_embeddings import CacheEmbeddings
+from recuperacion.cache_resultados import CacheResultados
+from recuperacion.micro_lotes import DespachadorEmbeddings
+from recuperacion.contexto import ENSAMBLAR_CONTEXTO, ensamblar_contexto
 
 load_dotenv(find_dotenv())
 
 # ============================================
-# CONFIGURACIÓN DE PINECONE
+# CONFIGURACIÓN DE LA RECUPERACIÓN
 # ============================================
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "langchain-pinecone-asistente-de-ventas")
-
-if not PINECONE_API_KEY:
-    raise ValueError(
-        "❌ Falta variable PINECONE_API_KEY en .env"
-    )
-
-embedding_model = OpenAIEmbeddings(model="text-embedding-ada-002")
-
-# Conectar al índice existente de Pinecone
-vectorstore = PineconeVectorStore(
-    index_name=INDEX_NAME,
-    embedding=embedding_model,
+# Micro-lotes de embeddings entre conversaciones simultáneas: apagados por defecto
+# (cada worker atiende una conversación a la vez); EMBEDDINGS_LOTE_ESPERA_MS > 0 los activa
+despachador_embeddings = DespachadorEmbeddings(OpenAIEmbeddings(model="text-embedding-ada-002"))
+# Embeddings de consultas con caché LRU (+ disco opcional, CACHE_EMBEDDINGS_RUTA)
+embedding_model = CacheEmbeddings(
+    despachador_embeddings,
+    modelo="text-embedding-ada-002",
 )
+# Resultados de buscar_datapath compartidos entre conversaciones (CACHE_RESULTADOS_TTL);
+# al activarse otra versión del índice (python -m ingesta.reindexar) la caché cambia de versión
+cache_resultados = CacheResultados()
+al_cambiar_version(cache_resultados.nueva_version)
+
+# Backend (RECUPERACION_BACKEND): pinecone por defecto en este proyecto | supabase | local.
+# - pinecone: un solo cliente con pool de conexiones (PINECONE_API_KEY, PINECONE_INDEX_NAME,
+#   PINECONE_POOL_CONEXIONES), las búsquedas por lotes van en paralelo. Busca en el namespace
+#   de la versión activa: una reindexación se construye en otro namespace y no corta el servicio
+#   (VERSIONES_REVISION_SEGUNDOS, recuperacion/versiones.py)
+# - local: vectores del índice en disco (mmap), sin servicios
+#   Generar con: python -m recuperacion.snapshot --fuente pinecone
+# PINECONE_MODO_BUSQUEDA=snapshot se mantiene como equivalente de RECUPERACION_BACKEND=local
+PINECONE_MODO_BUSQUEDA = os.getenv("PINECONE_MODO_BUSQUEDA", "pinecone").strip().lower()
+BACKEND_PREDETERMINADO = "local" if PINECONE_MODO_BUSQUEDA == "snapshot" else "pinecone"
 
 
 # ============================================
 # FUNCIÓN INTERNA DE BÚSQUEDA
 # ============================================
+def _ensamblar(docs: list, top_k: int) -> list:
+    """Fusiona solapes, quita duplicados y diversifica (MMR); sin ensamblado solo recorta a top_k."""
+    if not ENSAMBLAR_CONTEXTO or not docs:
+        return docs[:top_k]
+    bloques = ensamblar_contexto(docs, top_k)
+    antes = sum(len(doc['content']) for doc in docs[:top_k])
+    despues = sum(len(doc['content']) for doc in bloques)
+    print(f"   🧩 Contexto: {len(docs)} chunks → {len(bloques)} bloques "
+          f"({despues:,} vs {antes:,} caracteres del top-{top_k})")
+    return bloques
+
+
+def _formatear_resultados(docs: list, top_k: int) -> str:
+    docs = _ensamblar(docs, top_k)
+
+    if not docs:
+        return "No encontré información relevante en la base de conocimientos."
+
+    contexto = "Información encontrada:\n\n"
+    for i, doc in enumerate(docs, 1):
+        contexto += f"[{i}] (Relevancia: {doc['similitud']:.0%})\n{doc['content']}\n\n"
+
+    return contexto
+
+
 def buscar_en_base_conocimiento_interno(query: str, top_k: int = 5) -> str:
     """
     Función interna de búsqueda RAG con Pinecone.
@@ -48,19 +87,48 @@ def buscar_en_base_conocimiento_interno(query: str, top_k: int = 5) -> str:
         str: Información encontrada formateada
     """
     try:
-        docs = vectorstore.similarity_search(query, k=top_k)
+        # Consultas idénticas (normalizadas) comparten resultado y búsqueda en curso
+        return cache_resultados.obtener(query, top_k, lambda: _buscar(query, top_k))
 
-        if not docs:
-            return "No encontré información relevante en la base de conocimientos."
+    except Exception as e:
+        return f"Error al buscar: {str(e)}"
 
-        contexto = "Información encontrada:\n\n"
-        for i, doc in enumerate(docs, 1):
-            contexto += f"[{i}]\n{doc.page_content}\n\n"
 
-        return contexto
+def _buscar(query: str, top_k: int) -> str:
+    """Búsqueda real en el backend, sin caché de resultados."""
+    # Con ensamblado se piden más candidatos: el solape y los duplicados se descartan después
+    k_candidatos = top_k * 2 if ENSAMBLAR_CONTEXTO else top_k
+
+    recuperador = obtener_recuperador(BACKEND_PREDETERMINADO)
+    docs = recuperador.buscar(embedding_model.embed_query(query), k_candidatos)
+    return _formatear_resultados(docs, top_k)
+
+
+def buscar_en_base_conocimiento_lote(consultas: List[str], top_k: int = 5) -> List[str]:
+    """
+    Varias búsquedas a la vez (ej. varias llamadas a buscar_datapath en un turno):
+    las que están en caché no se buscan; el resto va en un solo lote de
+    embeddings y las consultas al índice en paralelo.
+
+    Returns:
+        list: Un resultado formateado por consulta (mismo formato que la búsqueda individual)
+    """
+    try:
+        # Los fallos quedan registrados como búsquedas en curso: una consulta idéntica
+        # que llegue mientras tanto (individual o en otro lote) espera en vez de repetirla
+        return cache_resultados.obtener_lote(consultas, top_k, lambda pendientes: _buscar_lote(pendientes, top_k))
 
     except Exception as e:
-        return f"Error al buscar: {str(e)}"
+        return [f"Error al buscar: {str(e)}"] * len(consultas)
+
+
+def _buscar_lote(consultas: List[str], top_k: int) -> List[str]:
+    """Búsquedas reales en el backend: un lote de embeddings y las consultas en paralelo."""
+    k_candidatos = top_k * 2 if ENSAMBLAR_CONTEXTO else top_k
+
+    recuperador = obtener_recuperador(BACKEND_PREDETERMINADO)
+    vectores = embedding_model.embed_queries(consultas)
+    return [_formatear_resultados(docs, top_k) for docs in recuperador.buscar_lote(vectores, k_candidatos)]
 
 
 # ============================================
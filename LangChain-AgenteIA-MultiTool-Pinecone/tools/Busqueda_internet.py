@@ -61,23 +61,32 @@ def buscar_internet(consulta: str) -> str:
         if not resultados:
             return "No encontré información relevante en internet."
         
+        # langchain-tavily devuelve {"query": ..., "results": [...]}
+        if isinstance(resultados, dict) and "results" in resultados:
+            resultados = resultados["results"]
+        
         # Formatear resultados
         respuesta = "Información encontrada en internet:\n\n"
         
         # Manejar diferentes formatos de respuesta
         if isinstance(resultados, list):
             for i, resultado in enumerate(resultados, 1):
+                score = None
                 if isinstance(resultado, dict):
                     titulo = resultado.get("title", "Sin título")
                     contenido = resultado.get("content", "")
                     url = resultado.get("url", "")
+                    score = resultado.get("score")
                 else:
                     titulo = f"Resultado {i}"
                     contenido = str(resultado)
                     url = ""
                 
-                respuesta += f"[{i}] {titulo}\n"
-                respuesta += f"{contenido[:500]}...\n" if len(contenido) > 500 else f"{contenido}\n"
+                # Sin corte fijo: el agente reparte el presupuesto de tokens del turno
+                # entre todas las tools según la relevancia (recuperacion/presupuesto.py)
+                relevancia = f" (Relevancia: {score:.0%})" if isinstance(score, (int, float)) else ""
+                respuesta += f"[{i}] {titulo}{relevancia}\n"
+                respuesta += f"{contenido}\n"
                 if url:
                     respuesta += f"Fuente: {url}\n"
                 respuesta += "\n"
@@ -11,7 +11,6 @@ import os
 import sys
 import uuid
 from datetime import datetime
-from urllib.parse import quote_plus
 from zoneinfo import ZoneInfo
 
 from dotenv import load_dotenv, find_dotenv
@@ -23,32 +22,43 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from langchain.chat_models import init_chat_model
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
-from langchain_postgres import PostgresChatMessageHistory
-import psycopg
 
 # Importar tools desde la carpeta tools/
-from tools.Base_de_conocimiento import buscar_datapath
+from tools.Base_de_conocimiento import (
+    buscar_datapath,
+    cache_resultados,
+    despachador_embeddings,
+    embedding_model,
+)
 from tools.Busqueda_internet import buscar_internet
 from tools.Hora_y_fecha import obtener_fecha_hora
 
+# Backends de histórico (postgres / postgres_zstd / sqlite)
+from historial import (
+    HISTORIAL_BACKEND,
+    SQLITE_HISTORIAL_PATH,
+    crear_tablas_historial,
+    obtener_backend,
+    obtener_historial,
+)
+from historial.memoria_semantica import MEMORIA_SEMANTICA, MemoriaSemantica
+from recuperacion.presupuesto import PRESUPUESTO_TOKENS_TURNO, asignar_presupuesto
+
 # ============================================
-# 1. CONFIGURACIÓN DE BASE DE DATOS (Histórico)
+# 1. CONFIGURACIÓN DEL HISTÓRICO
 # ============================================
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = os.getenv("DB_PORT", "5432")
-DB_NAME = os.getenv("DB_NAME", "postgres")
-
-if not all([DB_USER, DB_PASSWORD, DB_HOST]):
-    raise ValueError(
-        "❌ Faltan variables de base de datos en .env\n"
-        "Requeridas: DB_USER, DB_PASSWORD, DB_HOST"
-    )
-
-DATABASE_URL = f"postgresql://{DB_USER}:{quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# HISTORIAL_BACKEND: postgres (default), postgres_zstd o sqlite (local, sin servicios)
+# Los backends postgres requieren DB_USER, DB_PASSWORD, DB_HOST en .env
+backend_historial = obtener_backend()
 
-print(f"🔌 Conectando como: {DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
+if HISTORIAL_BACKEND == "sqlite":
+    print(f"🔌 Historial local: {SQLITE_HISTORIAL_PATH}")
+else:
+    DB_USER = os.getenv("DB_USER")
+    DB_HOST = os.getenv("DB_HOST")
+    DB_PORT = os.getenv("DB_PORT", "5432")
+    DB_NAME = os.getenv("DB_NAME", "postgres")
+    print(f"🔌 Conectando como: {DB_USER}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
 
 # ============================================
 # 2. LISTA DE TOOLS DISPONIBLES
@@ -113,9 +123,7 @@ EJEMPLOS:
 # ============================================
 def crear_tabla_historial():
     try:
-        sync_connection = psycopg.connect(DATABASE_URL)
-        PostgresChatMessageHistory.create_tables(sync_connection, "chat_history")
-        sync_connection.close()
+        crear_tablas_historial()
     except Exception as e:
         print(f"⚠️ Nota sobre tabla: {e}")
 
@@ -124,13 +132,16 @@ crear_tabla_historial()
 # ============================================
 # 6. HISTÓRICO DE CONVERSACIÓN
 # ============================================
-def get_session_history(session_id: str) -> PostgresChatMessageHistory:
-    sync_connection = psycopg.connect(DATABASE_URL)
-    return PostgresChatMessageHistory(
-        "chat_history",
-        session_id,
-        sync_connection=sync_connection
-    )
+def get_session_history(session_id: str):
+    # Backend según HISTORIAL_BACKEND (por defecto PostgresChatMessageHistory)
+    return obtener_historial(session_id)
+
+
+# Memoria semántica (MEMORIA_SEMANTICA=1): últimos turnos + turnos antiguos relevantes
+memoria_semantica = (
+    MemoriaSemantica(backend_historial.almacen_turnos(), embedding_model)
+    if MEMORIA_SEMANTICA else None
+)
 
 # ============================================
 # 7. FUNCIÓN DE CHAT CON AGENTE + TOOLS
@@ -142,7 +153,10 @@ def chat_con_agente(mensaje_usuario: str, session_id: str) -> str:
     """
     # Obtener historial
     history = get_session_history(session_id)
-    mensajes_previos = history.messages
+    historial_completo = history.messages
+    mensajes_previos = historial_completo
+    if memoria_semantica:
+        mensajes_previos = memoria_semantica.seleccionar(session_id, historial_completo, mensaje_usuario)
     
     # Construir mensajes para el modelo (inyectamos fecha/hora actual en cada turno)
     system_content = (
@@ -183,6 +197,11 @@ def chat_con_agente(mensaje_usuario: str, session_id: str) -> str:
                     })
                     break
         
+        # Presupuesto de tokens del turno repartido entre todas las tools por relevancia
+        recortados = asignar_presupuesto([tr["result"] for tr in tool_results], PRESUPUESTO_TOKENS_TURNO)
+        for tr, recortado in zip(tool_results, recortados):
+            tr["result"] = recortado
+        
         # Agregar respuesta del modelo con tool calls y resultados
         messages.append(response)
         for tr in tool_results:
@@ -201,6 +220,8 @@ def chat_con_agente(mensaje_usuario: str, session_id: str) -> str:
     # Guardar en historial
     history.add_user_message(mensaje_usuario)
     history.add_ai_message(respuesta_final)
+    if memoria_semantica:
+        memoria_semantica.registrar_turno(session_id, historial_completo, mensaje_usuario, respuesta_final)
     
     return respuesta_final
 
@@ -215,7 +236,9 @@ def main():
     print("🔧 Tools disponibles:")
     for t in tools:
         print(f"   - {t.name}")
-    print("💾 Historial: PostgreSQL")
+    print(f"💾 Historial: {backend_historial.descripcion}")
+    if memoria_semantica:
+        print("🧠 Memoria semántica: últimos turnos + turnos antiguos relevantes")
     
     # Menú de sesión
     print("\nOpciones de sesión:")
@@ -245,6 +268,11 @@ def main():
         if usuario.lower() in ['salir', 'exit', 'quit']:
             print(f"\n💾 Tu sesión está guardada.")
             print(f"   UUID: {session_id}")
+            if memoria_semantica:
+                print(f"🧠 {memoria_semantica.resumen()}")
+            print(f"⚡ {embedding_model.resumen()}")
+            print(f"⚡ {cache_resultados.resumen()}")
+            print(f"⚡ {despachador_embeddings.resumen()}")
             print("👋 ¡Hasta luego!")
             break
         
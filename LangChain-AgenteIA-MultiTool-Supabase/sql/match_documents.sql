@@ -0,0 +1,37 @@
+-- ============================================
+-- Búsqueda por similitud en PostgreSQL (pgvector)
+-- Tabla: documents_langchain_asistente_de_ventas
+-- Ejecutar una vez en el SQL Editor de Supabase.
+--
+-- Autor: Ing. Kevin Inofuente Colque - DataPath
+-- ============================================
+
+create extension if not exists vector;
+
+-- Índice HNSW por distancia coseno: la búsqueda no recorre toda la tabla
+create index if not exists documents_langchain_asistente_de_ventas_embedding_idx
+    on documents_langchain_asistente_de_ventas
+    using hnsw (embedding vector_cosine_ops);
+
+-- Índice GIN para los filtros por metadata (metadata @> filter)
+create index if not exists documents_langchain_asistente_de_ventas_metadata_idx
+    on documents_langchain_asistente_de_ventas
+    using gin (metadata jsonb_path_ops);
+
+-- Devuelve solo el contenido y la similitud (1 - distancia coseno) de los top_k chunks
+create or replace function match_documents_asistente_de_ventas (
+    query_embedding vector(1536),
+    match_count int default 5,
+    filter jsonb default '{}'
+)
+returns table (content text, similarity float)
+language sql stable
+as $$
+    select
+        d.content,
+        1 - (d.embedding <=> query_embedding) as similarity
+    from documents_langchain_asistente_de_ventas d
+    where d.metadata @> filter
+    order by d.embedding <=> query_embedding
+    limit match_count;
+$$;
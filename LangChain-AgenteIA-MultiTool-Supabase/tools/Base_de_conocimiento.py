@@ -6,13 +6,29 @@ Autor: Ing. Kevin Inofuente Colque - DataPath
 """
 
 import os
+import heapq
 import json
+import threading
+import time
 import numpy as np
 from dotenv import load_dotenv, find_dotenv
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.tools import tool
 from supabase import create_client
 
+from recuperacion.ann import IndiceIVF
+from recuperacion.backends import (
+    Recuperador, al_cambiar_version, nombre_backend, obtener_recuperador, registrar_backend,
+)
+from recuperacion.matriz import MatrizEmbeddings
+from recuperacion.cache_embeddings import CacheEmbeddings
+from recuperacion.cache_resultados import CacheResultados
+from recuperacion.micro_lotes import DespachadorEmbeddings
+from recuperacion.contexto import ENSAMBLAR_CONTEXTO, ensamblar_contexto
+from recuperacion.lexico import IndiceBM25, confianza_lexica, fusion_rrf
+from recuperacion.snapshot import SnapshotEmbeddings, leer_supabase, leer_supabase_lotes
+from recuperacion.versiones import VersionActiva, leer_activa_supabase
+
 load_dotenv(find_dotenv())
 
 # ============================================
@@ -21,18 +37,90 @@ load_dotenv(find_dotenv())
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 
-if not all([SUPABASE_URL, SUPABASE_KEY]):
+# Backend de recuperación (RECUPERACION_BACKEND): supabase por defecto en este proyecto.
+# Supabase solo es obligatorio si se busca en él o si el índice léxico se sincroniza
+# desde la tabla (BUSQUEDA_LEXICA); con el backend local el agente corre sin servicios.
+USA_SUPABASE = nombre_backend("supabase") == "supabase" or bool(os.getenv("BUSQUEDA_LEXICA", "").strip())
+
+if USA_SUPABASE and not all([SUPABASE_URL, SUPABASE_KEY]):
     raise ValueError(
         "❌ Faltan variables de Supabase en .env\n"
         "Requeridas: SUPABASE_URL, SUPABASE_SERVICE_KEY"
     )
 
-supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
-embedding_model = OpenAIEmbeddings(model='text-embedding-ada-002')
+# Un solo cliente por proceso: su sesión HTTP (keep-alive) se reutiliza en cada página
+supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY) if USA_SUPABASE else None
+# Micro-lotes de embeddings entre conversaciones simultáneas: apagados por defecto
+# (cada worker atiende una conversación a la vez); EMBEDDINGS_LOTE_ESPERA_MS > 0 los activa
+despachador_embeddings = DespachadorEmbeddings(OpenAIEmbeddings(model='text-embedding-ada-002'))
+# Embeddings de consultas con caché LRU (+ disco opcional, CACHE_EMBEDDINGS_RUTA)
+embedding_model = CacheEmbeddings(
+    despachador_embeddings,
+    modelo='text-embedding-ada-002',
+)
+# Resultados de buscar_datapath compartidos entre conversaciones (CACHE_RESULTADOS_TTL);
+# la versión sube cuando el refresco detecta cambios en la tabla, cuando se activa otra
+# versión de la tabla (abajo) o cuando el backend activo cambia de versión: con
+# RECUPERACION_BACKEND=pinecone, al pasar a otro namespace (python -m ingesta.reindexar)
+cache_resultados = CacheResultados()
+al_cambiar_version(cache_resultados.nueva_version)
 
 # Nombre de la tabla de documentos
 TABLA_DOCUMENTOS = "documents_langchain_asistente_de_ventas"
 
+# Modo de búsqueda del backend supabase:
+# - rpc: similitud calculada en PostgreSQL con pgvector (sql/match_documents.sql)
+# - matriz: embeddings cargados una vez en memoria (float32), refresco incremental
+# - ivf: índice aproximado en memoria (recuperacion/ann.py) para bases grandes, ver ANN_*
+# - snapshot: embeddings en disco compartidos por todos los workers (mmap), ver SNAPSHOT_DIR
+# - python: trae toda la tabla y calcula la similitud aquí (modo original)
+SUPABASE_MODO_BUSQUEDA = os.getenv("SUPABASE_MODO_BUSQUEDA", "rpc").strip().lower()
+FUNCION_BUSQUEDA = "match_documents_asistente_de_ventas"
+
+# Modo matriz: cada cuántos segundos se sincroniza con la tabla
+SUPABASE_REFRESCO_SEGUNDOS = int(os.getenv("SUPABASE_REFRESCO_SEGUNDOS", "300"))
+LOTE_REFRESCO = 200
+LOTE_PAGINA = 500           # Filas por página al recorrer la tabla (keyset por id)
+LOTE_PAGINA_IDS = 1000      # Solo ids: páginas más grandes (máximo de la API)
+
+matriz_documentos = MatrizEmbeddings()
+_ultimo_refresco = None
+_lock_refresco = threading.Lock()
+
+# Modo ivf: se sincroniza igual que la matriz; ANN_RUTA guarda el índice entrenado
+# (ruta.npz + ruta.json, con la versión de la tabla) para no re-entrenar en cada
+# arranque. Ajustar ANN_SONDAS para cambiar recall por latencia.
+ANN_RUTA = os.getenv("ANN_RUTA", "")
+if SUPABASE_MODO_BUSQUEDA == "ivf" and ANN_RUTA and os.path.exists(ANN_RUTA + ".npz"):
+    matriz_documentos = IndiceIVF.cargar(ANN_RUTA)
+elif SUPABASE_MODO_BUSQUEDA == "ivf":
+    matriz_documentos = IndiceIVF()
+
+# Búsqueda léxica BM25 sobre los mismos chunks (nombres de cursos, precios):
+# - (vacío): solo vectores
+# - rrf: BM25 + vectores fusionados con Reciprocal Rank Fusion
+# - auto: como rrf, pero si BM25 es concluyente no se calcula el embedding
+BUSQUEDA_LEXICA = os.getenv("BUSQUEDA_LEXICA", "").strip().lower()
+
+indice_lexico = IndiceBM25()
+_ultimo_refresco_lexico = None
+_lock_lexico = threading.Lock()
+
+# Modo snapshot: carpeta generada con `python -m recuperacion.snapshot --fuente supabase`
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+_snapshot = None
+
+# Reindexación blue/green (python -m recuperacion.carga_supabase --nueva-version): la tabla
+# de documentos es una vista sobre la versión activa. El puntero se revisa en segundo plano
+# (VERSIONES_REVISION_SEGUNDOS); al cambiar, la caché de resultados cambia de versión y la
+# matriz / el índice BM25 se reconstruyen aparte mientras se sigue buscando en los actuales.
+version_documentos = VersionActiva(lambda: leer_activa_supabase(supabase_client, TABLA_DOCUMENTOS)) \
+    if supabase_client is not None else None
+# El índice IVF cargado de ANN_RUTA trae la versión con la que se construyó: solo se
+# reconstruye al arrancar si la versión activa es otra
+_version_matriz = matriz_documentos.version if isinstance(matriz_documentos, IndiceIVF) else None
+_version_lexico = None
+
 
 # ============================================
 # FUNCIONES INTERNAS
@@ -44,62 +132,316 @@ def calcular_similitud_coseno(vec1, vec2):
     return 1 - np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
 
 
-def buscar_en_base_conocimiento_interno(query: str, top_k: int = 5) -> str:
+def _buscar_rpc(query_embedding: list, top_k: int, filtro: dict = None) -> list:
+    """
+    Búsqueda en PostgreSQL: pgvector ordena por distancia con su índice HNSW
+    y solo viajan por la red los top_k contenidos con su similitud.
+    """
+    result = supabase_client.rpc(FUNCION_BUSQUEDA, {
+        "query_embedding": query_embedding,
+        "match_count": top_k,
+        "filter": filtro or {},
+    }).execute()
+
+    return [
+        {'content': doc.get('content', ''), 'similitud': doc['similarity']}
+        for doc in (result.data or [])
+    ]
+
+
+def _buscar_python(query_embedding: list, top_k: int, filtro: dict = None) -> list:
+    """
+    Búsqueda original: recorre todos los documentos y calcula la similitud en Python.
+    Las filas llegan por páginas y solo se conservan los top_k mejores (heap),
+    así la memoria no crece con el tamaño de la tabla.
+    """
+    # metadata solo viaja si hay filtro
+    columnas = 'id, content, metadata, embedding' if filtro else 'id, content, embedding'
+    mejores = []                # heap de (similitud, id, contenido), el peor arriba
+    for doc in leer_supabase(supabase_client, TABLA_DOCUMENTOS, LOTE_PAGINA, columnas):
+        if filtro and any(doc['metadata'].get(k) != v for k, v in filtro.items()):
+            continue
+        if doc.get('embedding'):
+            doc_embedding = [float(x) for x in doc['embedding']]
+            similitud = 1 - calcular_similitud_coseno(query_embedding, doc_embedding)
+
+            candidato = (similitud, doc['id'], doc.get('content') or '')
+            if len(mejores) < top_k:
+                heapq.heappush(mejores, candidato)
+            elif top_k > 0:
+                heapq.heappushpop(mejores, candidato)
+
+    # Ordenar por similitud
+    return [
+        {'content': contenido, 'similitud': similitud}
+        for similitud, _, contenido in sorted(mejores, reverse=True)
+    ]
+
+
+def _parsear_embedding(embedding) -> list:
+    """pgvector llega por la API como texto '[0.1, ...]'."""
+    if isinstance(embedding, str):
+        return json.loads(embedding)
+    return embedding
+
+
+def _version_actual():
+    return version_documentos.version if version_documentos is not None else None
+
+
+def _agregar_a_matriz(docs: list, destino=None) -> None:
+    (destino if destino is not None else matriz_documentos).upsert(
+        [doc['id'] for doc in docs],
+        [doc.get('content') or '' for doc in docs],
+        [_parsear_embedding(doc['embedding']) for doc in docs],
+        [doc.get('metadata') or {} for doc in docs],
+    )
+
+
+def _cargar_matriz_completa(destino) -> list:
+    """
+    Recorre la tabla por páginas y cada página va directo a la matriz
+    (nunca está la tabla completa en memoria). Retorna los ids cargados.
+    """
+    cargados = []
+    for docs in leer_supabase_lotes(supabase_client, TABLA_DOCUMENTOS, LOTE_PAGINA):
+        docs = [doc for doc in docs if doc.get('embedding')]
+        _agregar_a_matriz(docs, destino)
+        cargados += [doc['id'] for doc in docs]
+    return cargados
+
+
+def refrescar_matriz(forzar: bool = False) -> None:
+    """
+    Sincroniza la matriz en memoria (o el índice IVF) con la tabla de documentos.
+    Solo descarga los embeddings de ids nuevos y quita los eliminados; si se
+    activó otra versión de la tabla, la reconstruye completa.
+    """
+    global _ultimo_refresco, _version_matriz, matriz_documentos
+    version = _version_actual()
+    cambio_version = len(matriz_documentos) > 0 and version != _version_matriz
+    if not forzar and not cambio_version and _ultimo_refresco is not None \
+            and time.monotonic() - _ultimo_refresco < SUPABASE_REFRESCO_SEGUNDOS:
+        return
+    # Si otro hilo ya está refrescando, se sigue buscando con la matriz actual
+    if not _lock_refresco.acquire(blocking=_ultimo_refresco is None):
+        return
+
+    try:
+        nuevos, eliminados = [], set()
+        if cambio_version:
+            # Otra versión (los ids de tablas distintas no se comparan): se carga en una
+            # estructura nueva y se reemplaza al terminar, ya entrenada si es IVF
+            nueva = IndiceIVF() if isinstance(matriz_documentos, IndiceIVF) else MatrizEmbeddings()
+            nuevos = _cargar_matriz_completa(nueva)
+            if isinstance(nueva, IndiceIVF) and nuevos:
+                nueva.entrenar()
+            eliminados = set(matriz_documentos.ids)
+            matriz_documentos = nueva
+        elif len(matriz_documentos) == 0:
+            # Carga inicial
+            nuevos = _cargar_matriz_completa(matriz_documentos)
+        else:
+            ids_tabla = {doc['id'] for doc in leer_supabase(
+                supabase_client, TABLA_DOCUMENTOS, LOTE_PAGINA_IDS, columnas='id')}
+            ids_matriz = set(matriz_documentos.ids)
+
+            eliminados = ids_matriz - ids_tabla
+            nuevos = list(ids_tabla - ids_matriz)
+            matriz_documentos.eliminar(eliminados)
+
+            for i in range(0, len(nuevos), LOTE_REFRESCO):
+                result = (
+                    supabase_client.table(TABLA_DOCUMENTOS)
+                    .select('id, content, metadata, embedding')
+                    .in_('id', nuevos[i:i + LOTE_REFRESCO])
+                    .execute()
+                )
+                _agregar_a_matriz([doc for doc in result.data or [] if doc.get('embedding')])
+
+        if isinstance(matriz_documentos, IndiceIVF) and (nuevos or eliminados):
+            # Primera carga: entrenar centroides; luego las inserciones son incrementales
+            if not matriz_documentos.entrenado:
+                matriz_documentos.entrenar()
+            matriz_documentos.version = version
+            if ANN_RUTA:
+                matriz_documentos.guardar(ANN_RUTA)
+
+        if nuevos or eliminados:
+            cache_resultados.nueva_version()
+            print(f"   🔄 Matriz de embeddings: +{len(nuevos)} / -{len(eliminados)} "
+                  f"(total {len(matriz_documentos)})")
+        _version_matriz = version
+        _ultimo_refresco = time.monotonic()
+    finally:
+        _lock_refresco.release()
+
+
+def refrescar_lexico(forzar: bool = False) -> None:
+    """Sincroniza el índice BM25 con la tabla (solo id y content, por páginas)."""
+    global _ultimo_refresco_lexico, _version_lexico, indice_lexico
+    version = _version_actual()
+    cambio_version = len(indice_lexico) > 0 and version != _version_lexico
+    if not forzar and not cambio_version and _ultimo_refresco_lexico is not None \
+            and time.monotonic() - _ultimo_refresco_lexico < SUPABASE_REFRESCO_SEGUNDOS:
+        return
+    if not _lock_lexico.acquire(blocking=_ultimo_refresco_lexico is None):
+        return
+
+    try:
+        if len(indice_lexico) == 0 or cambio_version:
+            # Otra versión: índice nuevo, se reemplaza al terminar
+            destino = IndiceBM25() if cambio_version else indice_lexico
+            for docs in leer_supabase_lotes(supabase_client, TABLA_DOCUMENTOS, LOTE_PAGINA, 'id, content'):
+                destino.agregar([doc['id'] for doc in docs], [doc.get('content') or '' for doc in docs])
+            if cambio_version:
+                indice_lexico = destino
+                cache_resultados.nueva_version()
+        else:
+            ids_tabla = {doc['id'] for doc in leer_supabase(
+                supabase_client, TABLA_DOCUMENTOS, LOTE_PAGINA_IDS, columnas='id')}
+            ids_indice = set(indice_lexico.ids)
+            eliminados = ids_indice - ids_tabla
+            indice_lexico.eliminar(eliminados)
+
+            nuevos = list(ids_tabla - ids_indice)
+            if nuevos or eliminados:
+                cache_resultados.nueva_version()
+            for i in range(0, len(nuevos), LOTE_REFRESCO):
+                result = (
+                    supabase_client.table(TABLA_DOCUMENTOS)
+                    .select('id, content')
+                    .in_('id', nuevos[i:i + LOTE_REFRESCO])
+                    .execute()
+                )
+                docs = result.data or []
+                indice_lexico.agregar([doc['id'] for doc in docs], [doc.get('content') or '' for doc in docs])
+        _version_lexico = version
+        _ultimo_refresco_lexico = time.monotonic()
+    finally:
+        _lock_lexico.release()
+
+
+def _buscar_matriz(query_embedding: list, top_k: int, filtro: dict = None) -> list:
+    """Búsqueda en memoria: matriz exacta o índice IVF aproximado (mismo refresco)."""
+    refrescar_matriz()
+    return matriz_documentos.buscar(query_embedding, top_k, filtro)
+
+
+def _buscar_snapshot(query_embedding: list, top_k: int, filtro: dict = None) -> list:
+    """Búsqueda sobre el snapshot mmap (se abre en el primer uso, sin descargar vectores)."""
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = SnapshotEmbeddings(SNAPSHOT_DIR)
+    return _snapshot.buscar(query_embedding, top_k, filtro)
+
+
+class RecuperadorSupabaseModos(Recuperador):
+    """Backend "supabase" de este proyecto: todos los modos de SUPABASE_MODO_BUSQUEDA."""
+
+    descripcion = f"Supabase ({SUPABASE_MODO_BUSQUEDA})"
+
+    def buscar(self, query_embedding, top_k=5, filtro=None):
+        if SUPABASE_MODO_BUSQUEDA in ("matriz", "ivf"):
+            return _buscar_matriz(query_embedding, top_k, filtro)
+        if SUPABASE_MODO_BUSQUEDA == "snapshot":
+            return _buscar_snapshot(query_embedding, top_k, filtro)
+        if SUPABASE_MODO_BUSQUEDA == "python":
+            return _buscar_python(query_embedding, top_k, filtro)
+        return _buscar_rpc(query_embedding, top_k, filtro)
+
+
+registrar_backend("supabase", RecuperadorSupabaseModos)
+
+
+def _al_cambiar_version(version: str) -> None:
+    """Corre en el hilo de VersionActiva: las búsquedas no esperan la reconstrucción."""
+    cache_resultados.nueva_version(version)
+    if len(matriz_documentos) > 0:
+        refrescar_matriz(forzar=True)
+    if len(indice_lexico) > 0:
+        refrescar_lexico(forzar=True)
+
+
+if version_documentos is not None:
+    version_documentos.suscribir(_al_cambiar_version)
+
+
+def buscar_en_base_conocimiento_interno(query: str, top_k: int = 5, filtro: dict = None) -> str:
     """
     Función interna de búsqueda RAG.
     
     Args:
         query: Consulta de búsqueda
         top_k: Número de documentos a retornar
+        filtro: Filtro opcional por metadata (ej. {"source": "SOBRE DATAPATH.pdf"})
     
     Returns:
         str: Información encontrada formateada
     """
     try:
-        # Generar embedding de la consulta
-        query_embedding = embedding_model.embed_query(query)
-        
-        # Obtener documentos de Supabase
-        result = supabase_client.table(TABLA_DOCUMENTOS).select('*').execute()
-        
-        if not result.data:
-            return "No hay documentos en la base de conocimientos."
-        
-        # Calcular similitud para cada documento
-        documentos_con_score = []
-        for doc in result.data:
-            if doc.get('embedding'):
-                doc_embedding = doc['embedding']
-                if isinstance(doc_embedding, str):
-                    doc_embedding = json.loads(doc_embedding)
-                
-                doc_embedding = [float(x) for x in doc_embedding]
-                score = calcular_similitud_coseno(query_embedding, doc_embedding)
-                
-                documentos_con_score.append({
-                    'content': doc.get('content', ''),
-                    'score': score
-                })
-        
-        # Ordenar por similitud
-        documentos_con_score.sort(key=lambda x: x['score'])
-        top_docs = documentos_con_score[:top_k]
-        
-        if not top_docs:
-            return "No encontré información relevante."
-        
-        # Formatear resultados
-        contexto = "Información encontrada:\n\n"
-        for i, doc in enumerate(top_docs, 1):
-            similitud = 1 - doc['score']
-            contexto += f"[{i}] (Relevancia: {similitud:.0%})\n{doc['content']}\n\n"
-        
-        return contexto
+        # Consultas idénticas (normalizadas) comparten resultado y búsqueda en curso
+        return cache_resultados.obtener(query, top_k, lambda: _buscar(query, top_k, filtro), filtro)
         
     except Exception as e:
         return f"Error al buscar: {str(e)}"
 
 
+def _buscar(query: str, top_k: int, filtro: dict = None) -> str:
+    """Búsqueda real (léxica y/o vectorial) sin caché de resultados."""
+    if version_documentos is not None:
+        version_documentos.actual()
+
+    # Con ensamblado se piden más candidatos: el solape y los duplicados se descartan después
+    k_candidatos = top_k * 2 if ENSAMBLAR_CONTEXTO else top_k
+
+    # BM25 (sin filtro por metadata: el índice léxico solo guarda el texto)
+    docs_lexicos = []
+    if BUSQUEDA_LEXICA and not filtro:
+        refrescar_lexico()
+        docs_lexicos = indice_lexico.buscar(query, k_candidatos)
+        if BUSQUEDA_LEXICA == "auto" and confianza_lexica(docs_lexicos):
+            print("   🔤 Coincidencia léxica exacta: sin embedding")
+            return _formatear_resultados(_ensamblar(docs_lexicos, top_k))
+
+    # Generar embedding de la consulta
+    query_embedding = embedding_model.embed_query(query)
+    
+    # Backend elegido con RECUPERACION_BACKEND (supabase / pinecone / local)
+    top_docs = obtener_recuperador("supabase").buscar(query_embedding, k_candidatos, filtro)
+
+    if docs_lexicos:
+        top_docs = fusion_rrf([top_docs, docs_lexicos], k_candidatos)
+    
+    return _formatear_resultados(_ensamblar(top_docs, top_k))
+
+
+def _ensamblar(docs: list, top_k: int) -> list:
+    """Fusiona solapes, quita duplicados y diversifica (MMR); sin ensamblado solo recorta a top_k."""
+    if not ENSAMBLAR_CONTEXTO or not docs:
+        return docs[:top_k]
+    bloques = ensamblar_contexto(docs, top_k)
+    antes = sum(len(doc['content']) for doc in docs[:top_k])
+    despues = sum(len(doc['content']) for doc in bloques)
+    print(f"   🧩 Contexto: {len(docs)} chunks → {len(bloques)} bloques "
+          f"({despues:,} vs {antes:,} caracteres del top-{top_k})")
+    return bloques
+
+
+def _formatear_resultados(top_docs: list) -> str:
+    """Formato del contexto para el agente (la similitud solo existe en resultados vectoriales)."""
+    if not top_docs:
+        return "No encontré información relevante."
+    
+    # Formatear resultados
+    contexto = "Información encontrada:\n\n"
+    for i, doc in enumerate(top_docs, 1):
+        relevancia = f"Relevancia: {doc['similitud']:.0%}" if 'similitud' in doc else "Coincidencia léxica"
+        contexto += f"[{i}] ({relevancia})\n{doc['content']}\n\n"
+    
+    return contexto
+
+
 # ============================================
 # TOOL EXPORTABLE
 # ============================================
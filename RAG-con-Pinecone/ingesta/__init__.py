@@ -0,0 +1,23 @@
+"""
+Módulo de Ingesta (carga de documentos a Pinecone)
+Herramientas para que reindexar la base de conocimientos cueste en
+proporción a lo que cambió.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+from ingesta.carga_masiva import MotorCarga
+from ingesta.directorio import sincronizar_directorio
+from ingesta.incremental import id_chunk, prefijo_documento, sincronizar
+from ingesta.reindexar import reindexar
+from ingesta.streaming import sincronizar_streaming
+
+__all__ = [
+    "MotorCarga",
+    "id_chunk",
+    "prefijo_documento",
+    "reindexar",
+    "sincronizar",
+    "sincronizar_directorio",
+    "sincronizar_streaming",
+]
@@ -0,0 +1,277 @@
+"""
+Carga Masiva (embeddings + upsert en paralelo, con límites de la cuenta)
+PineconeVectorStore.from_documents embebía y subía lote por lote, en serie,
+y la carga se caía con el primer 429 (rate limit). El motor de carga:
+
+- Lotes configurables para la API de embeddings y para el upsert
+- Pool acotado de hilos: varios lotes embebiéndose/subiéndose a la vez,
+  con un máximo de lotes en memoria
+- Token bucket: respeta las peticiones por minuto (RPM) y los tokens por
+  minuto (TPM) de la cuenta de OpenAI antes de enviar cada lote
+- Reintentos con backoff exponencial + jitter para errores transitorios
+  (429, 5xx, timeouts); los errores permanentes se propagan
+- Reporte de throughput: chunks/s, tokens/s, reintentos y tiempo en espera
+
+Variables en .env:
+- INGESTA_LOTE_EMBEDDINGS=100   Textos por petición de embeddings
+- INGESTA_LOTE_UPSERT=100       Vectores por upsert
+- INGESTA_HILOS=4               Lotes procesándose a la vez
+- EMBEDDINGS_RPM=3000           Peticiones por minuto de la cuenta (0 = sin límite)
+- EMBEDDINGS_TPM=1000000        Tokens por minuto de la cuenta (0 = sin límite)
+- INGESTA_REINTENTOS=5          Reintentos por petición
+- INGESTA_ALMACEN_EMBEDDINGS=.almacen_embeddings
+                                Almacén en disco de embeddings ya pagados (vacío = sin almacén)
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Sequence, Tuple
+
+from recuperacion.almacen_embeddings import AlmacenEmbeddings, EmbeddingsEnDisco
+from utilidades.tokens import contar_tokens
+
+INGESTA_LOTE_EMBEDDINGS = int(os.getenv("INGESTA_LOTE_EMBEDDINGS", "100"))
+INGESTA_LOTE_UPSERT = int(os.getenv("INGESTA_LOTE_UPSERT", "100"))
+INGESTA_HILOS = int(os.getenv("INGESTA_HILOS", "4"))
+EMBEDDINGS_RPM = float(os.getenv("EMBEDDINGS_RPM", "3000"))
+EMBEDDINGS_TPM = float(os.getenv("EMBEDDINGS_TPM", "1000000"))
+INGESTA_REINTENTOS = int(os.getenv("INGESTA_REINTENTOS", "5"))
+INGESTA_ALMACEN_EMBEDDINGS = os.getenv("INGESTA_ALMACEN_EMBEDDINGS", ".almacen_embeddings")
+
+ESTADOS_TRANSITORIOS = {408, 409, 429, 500, 502, 503, 504}
+NOMBRES_TRANSITORIOS = ("RateLimit", "Timeout", "Connection", "ServiceUnavailable", "InternalServer")
+
+
+# ============================================
+# LÍMITES Y REINTENTOS
+# ============================================
+class CuboTokens:
+    """
+    Token bucket: se recarga a ritmo constante (por_minuto / 60 por segundo)
+    y consumir() espera hasta que haya saldo.
+
+    Args:
+        por_minuto: Capacidad por minuto (0 = sin límite)
+    """
+
+    def __init__(self, por_minuto: float):
+        self.capacidad = por_minuto
+        self.tasa = por_minuto / 60
+        self.disponible = por_minuto
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consumir(self, cantidad: float = 1) -> float:
+        """Descuenta la cantidad (esperando si hace falta) y retorna los segundos esperados."""
+        if self.capacidad <= 0:
+            return 0.0
+        cantidad = min(cantidad, self.capacidad)
+        esperado = 0.0
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self.disponible = min(self.capacidad, self.disponible + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self.disponible >= cantidad:
+                    self.disponible -= cantidad
+                    return esperado
+                falta = (cantidad - self.disponible) / self.tasa
+            time.sleep(falta)
+            esperado += falta
+
+
+def es_transitorio(error: Exception) -> bool:
+    """429, 5xx, timeouts y errores de conexión se reintentan; el resto no."""
+    respuesta = getattr(error, "response", None)
+    for estado in (getattr(error, "status_code", None), getattr(error, "status", None),
+                   getattr(respuesta, "status_code", None)):
+        if isinstance(estado, int):
+            return estado in ESTADOS_TRANSITORIOS
+    return any(nombre in type(error).__name__ for nombre in NOMBRES_TRANSITORIOS)
+
+
+def con_reintentos(funcion: Callable, reintentos: int = INGESTA_REINTENTOS, espera_base: float = 1.0,
+                   espera_maxima: float = 60.0, al_reintentar: Callable[[Exception, float], None] = None):
+    """
+    Ejecuta funcion() reintentando los errores transitorios con backoff exponencial.
+
+    Args:
+        funcion: Función sin argumentos
+        reintentos: Reintentos después del primer intento
+        espera_base: Espera del primer reintento (se duplica en cada uno)
+        espera_maxima: Tope de la espera
+        al_reintentar: Callback (error, segundos) antes de cada espera
+    """
+    for intento in range(reintentos + 1):
+        try:
+            return funcion()
+        except Exception as e:
+            if intento == reintentos or not es_transitorio(e):
+                raise
+            # Jitter: los hilos que fallaron juntos no reintentan juntos
+            espera = min(espera_maxima, espera_base * 2 ** intento) * random.uniform(0.5, 1.0)
+            if al_reintentar:
+                al_reintentar(e, espera)
+            time.sleep(espera)
+
+
+def con_almacen(embeddings, modelo: str, directorio: str = INGESTA_ALMACEN_EMBEDDINGS):
+    """
+    Envuelve el modelo con el almacén de embeddings en disco: re-ingestar
+    chunks idénticos (otro namespace, índice recreado) no vuelve a llamar a la API.
+    """
+    if not directorio:
+        return embeddings
+    return EmbeddingsEnDisco(embeddings, AlmacenEmbeddings(directorio, modelo))
+
+
+def _en_lotes(elementos: Sequence, tamano: int) -> Iterable[Sequence]:
+    for i in range(0, len(elementos), tamano):
+        yield elementos[i:i + tamano]
+
+
+# ============================================
+# MOTOR DE CARGA
+# ============================================
+class MotorCarga:
+    """
+    Embebe y sube chunks a Pinecone en paralelo respetando los límites de la cuenta.
+
+    Args:
+        index: pinecone.Index
+        embeddings: Modelo de embeddings (embed_documents)
+        namespace: Namespace del índice
+        text_key: Clave de metadata con el texto del chunk
+        lote_embeddings: Textos por petición de embeddings
+        lote_upsert: Vectores por upsert
+        hilos: Lotes procesándose a la vez
+        rpm: Peticiones de embeddings por minuto (0 = sin límite)
+        tpm: Tokens de embeddings por minuto (0 = sin límite)
+        reintentos: Reintentos por petición (embeddings o upsert)
+    """
+
+    def __init__(self, index, embeddings, namespace: str = "", text_key: str = "text",
+                 lote_embeddings: int = INGESTA_LOTE_EMBEDDINGS, lote_upsert: int = INGESTA_LOTE_UPSERT,
+                 hilos: int = INGESTA_HILOS, rpm: float = EMBEDDINGS_RPM, tpm: float = EMBEDDINGS_TPM,
+                 reintentos: int = INGESTA_REINTENTOS):
+        self.index = index
+        self.embeddings = embeddings
+        self.namespace = namespace
+        self.text_key = text_key
+        self.lote_embeddings = max(1, lote_embeddings)
+        self.lote_upsert = max(1, lote_upsert)
+        self.hilos = max(1, hilos)
+        self.reintentos = reintentos
+        self._rpm = CuboTokens(rpm)
+        self._tpm = CuboTokens(tpm)
+        self._lock = threading.Lock()
+
+        self.estadisticas = {
+            "chunks": 0,
+            "tokens": 0,
+            "peticiones_embeddings": 0,
+            "chunks_desde_almacen": 0,      # Ya embebidos antes (sin llamada a la API)
+            "upserts": 0,
+            "reintentos": 0,
+            "segundos_espera_limite": 0.0,   # Tiempo frenado por RPM/TPM
+            "segundos": 0.0,
+        }
+
+    def _sumar(self, **valores) -> None:
+        with self._lock:
+            for clave, valor in valores.items():
+                self.estadisticas[clave] += valor
+
+    def _al_reintentar(self, error: Exception, espera: float) -> None:
+        self._sumar(reintentos=1)
+        print(f"   ⚠️  {type(error).__name__}: reintento en {espera:.1f} s")
+
+    def _metadata(self, chunk) -> dict:
+        """Metadata del chunk + el texto (PineconeVectorStore lo lee de text_key)."""
+        metadata = {k: v for k, v in (chunk.metadata or {}).items() if v is not None}
+        metadata[self.text_key] = chunk.page_content
+        return metadata
+
+    def _procesar_lote(self, lote: Sequence[Tuple[str, object]],
+                       al_completar: Callable[[Sequence[Tuple[str, object]]], None] = None) -> None:
+        """Un lote: esperar turno (RPM/TPM) → embeddings → upserts."""
+        textos = [chunk.page_content for _, chunk in lote]
+        # Con almacén en disco solo los textos faltantes cuentan para RPM/TPM
+        faltantes = getattr(self.embeddings, "textos_faltantes", None)
+        por_enviar = faltantes(textos) if faltantes else textos
+        tokens = sum(contar_tokens(texto) for texto in por_enviar)
+        espera = self._rpm.consumir(1) + self._tpm.consumir(tokens) if por_enviar else 0.0
+
+        vectores = con_reintentos(lambda: self.embeddings.embed_documents(textos),
+                                  self.reintentos, al_reintentar=self._al_reintentar)
+        registros = [
+            {"id": id_, "values": vector, "metadata": self._metadata(chunk)}
+            for (id_, chunk), vector in zip(lote, vectores)
+        ]
+        for sublote in _en_lotes(registros, self.lote_upsert):
+            con_reintentos(lambda: self.index.upsert(vectors=list(sublote), namespace=self.namespace),
+                           self.reintentos, al_reintentar=self._al_reintentar)
+            self._sumar(upserts=1)
+
+        self._sumar(chunks=len(lote), tokens=tokens, peticiones_embeddings=1 if por_enviar else 0,
+                    chunks_desde_almacen=len(textos) - len(por_enviar), segundos_espera_limite=espera)
+        if al_completar:
+            al_completar(lote)
+
+    def cargar(self, registros: Iterable[Tuple[str, object]],
+               al_completar: Callable[[Sequence[Tuple[str, object]]], None] = None) -> dict:
+        """
+        Embebe y sube los chunks.
+
+        Args:
+            registros: Pares (id, chunk); puede ser un generador (solo se
+                       mantienen en memoria ~2 lotes por hilo)
+            al_completar: Callback con cada lote ya subido (los lotes terminan en cualquier orden)
+
+        Returns:
+            dict: Estadísticas acumuladas del motor
+        """
+        inicio = time.perf_counter()
+        en_vuelo = threading.BoundedSemaphore(self.hilos * 2)
+        errores: List[Exception] = []
+
+        def terminar(futuro):
+            en_vuelo.release()
+            if futuro.exception() is not None:
+                errores.append(futuro.exception())
+
+        with ThreadPoolExecutor(self.hilos, thread_name_prefix="carga-masiva") as ejecutor:
+            lote = []
+            for registro in registros:
+                lote.append(registro)
+                if len(lote) == self.lote_embeddings:
+                    en_vuelo.acquire()
+                    if errores:
+                        en_vuelo.release()
+                        break
+                    ejecutor.submit(self._procesar_lote, lote, al_completar).add_done_callback(terminar)
+                    lote = []
+            if lote and not errores:
+                en_vuelo.acquire()
+                ejecutor.submit(self._procesar_lote, lote, al_completar).add_done_callback(terminar)
+
+        self._sumar(segundos=time.perf_counter() - inicio)
+        if errores:
+            raise errores[0]
+        return dict(self.estadisticas)
+
+    def reporte(self) -> str:
+        e = self.estadisticas
+        segundos = max(e["segundos"], 1e-9)
+        return (
+            f"{e['chunks']:,} chunks en {e['segundos']:.1f} s | "
+            f"{e['chunks'] / segundos:,.1f} chunks/s | {e['tokens'] / segundos:,.0f} tokens/s | "
+            f"{e['peticiones_embeddings']} peticiones de embeddings "
+            f"({e['chunks_desde_almacen']:,} chunks desde el almacén), {e['upserts']} upserts | "
+            f"{e['reintentos']} reintentos | {e['segundos_espera_limite']:.1f} s frenado por RPM/TPM"
+        )
@@ -0,0 +1,266 @@
+"""
+Carga Masiva de un Directorio (parseo de PDFs en un pool de procesos)
+El script básico indexa un solo archivo. Con muchos documentos, leer y partir
+PDFs (CPU) pasa a ser la etapa más lenta, y en un solo proceso usa un núcleo:
+
+- Entrada: un directorio (PDFs recursivos) o un manifiesto (.txt con una ruta
+  por línea, o .json con una lista de rutas)
+- Cada PDF se lee, se parte y se le calculan los ids en un proceso del pool
+  (INGESTA_PROCESOS, por defecto todos los núcleos)
+- Los chunks llevan metadata de origen: source (ruta relativa), documento, page
+- A medida que cada documento termina, sus chunks nuevos pasan al motor de
+  carga (embeddings + upsert en paralelo); el pool sigue parseando mientras tanto
+- Mismos ids por hash de contenido que la ingesta incremental: una nueva
+  ejecución solo embebe lo que cambió y retoma lo que quedó sin subir
+
+Variables en .env:
+- INGESTA_PROCESOS=0            Procesos para parsear (0 = núcleos de la máquina)
+
+Uso:
+    python -m ingesta.directorio Base_de_Conocimientos/
+    python -m ingesta.directorio manifiesto.txt --procesos 8 --eliminar-ausentes
+    python -m ingesta.directorio Base_de_Conocimientos/ --solo-parsear --procesos 1
+    python -m ingesta.directorio Base_de_Conocimientos/ --limpiar-legado   (una vez, al migrar)
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, Optional, Set, Tuple
+
+from ingesta.carga_masiva import MotorCarga, con_almacen
+from ingesta.incremental import SEPARADOR_ID, eliminar_ids, id_chunk, ids_indexados, prefijo_documento
+from recuperacion.versiones import leer_activo_pinecone
+
+INGESTA_PROCESOS = int(os.getenv("INGESTA_PROCESOS", "0"))
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 200
+EXTENSIONES = (".pdf",)
+
+
+def listar_documentos(origen: str) -> Tuple[str, List[str]]:
+    """
+    Rutas de los documentos a cargar.
+
+    Args:
+        origen: Directorio (se busca recursivamente) o manifiesto .txt / .json
+
+    Returns:
+        tuple: (directorio base para rutas relativas, rutas ordenadas)
+    """
+    if os.path.isdir(origen):
+        rutas = [
+            os.path.join(carpeta, nombre)
+            for carpeta, _, nombres in os.walk(origen)
+            for nombre in nombres if nombre.lower().endswith(EXTENSIONES)
+        ]
+        return origen, sorted(rutas)
+
+    base = os.path.dirname(os.path.abspath(origen))
+    with open(origen, encoding="utf-8") as f:
+        if origen.lower().endswith(".json"):
+            contenido = json.load(f)
+            rutas = contenido["documentos"] if isinstance(contenido, dict) else contenido
+        else:
+            rutas = [linea.strip() for linea in f if linea.strip() and not linea.lstrip().startswith("#")]
+    # Rutas del manifiesto relativas a su propia carpeta
+    return base, [ruta if os.path.isabs(ruta) else os.path.join(base, ruta) for ruta in rutas]
+
+
+def prefijo_relativo(ruta: str, base: str) -> str:
+    """Prefijo de ids desde la ruta relativa (dos PDFs con el mismo nombre en carpetas distintas no chocan)."""
+    relativa = os.path.relpath(ruta, base)
+    return prefijo_documento(relativa.replace(os.sep, "-"))
+
+
+def parsear_documento(ruta: str, base: str, chunk_size: int = CHUNK_SIZE,
+                      chunk_overlap: int = CHUNK_OVERLAP) -> dict:
+    """
+    Lee y parte un PDF (se ejecuta en un proceso del pool; retorna datos simples).
+
+    Returns:
+        dict: {'ruta', 'prefijo', 'paginas', 'segundos', 'chunks': [(id, texto, metadata), ...]}
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    inicio = time.perf_counter()
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    relativa = os.path.relpath(ruta, base)
+    prefijo = prefijo_relativo(ruta, base)
+
+    chunks, paginas = [], 0
+    for pagina in PyPDFLoader(ruta).lazy_load():
+        paginas += 1
+        for chunk in splitter.split_documents([pagina]):
+            metadata = {k: v for k, v in chunk.metadata.items() if v is not None}
+            metadata.update(source=relativa, documento=os.path.basename(ruta))
+            chunks.append((id_chunk(prefijo, chunk.page_content), chunk.page_content, metadata))
+
+    return {
+        "ruta": ruta,
+        "prefijo": prefijo,
+        "paginas": paginas,
+        "segundos": time.perf_counter() - inicio,
+        "chunks": chunks,
+    }
+
+
+def parsear_en_pool(rutas: List[str], base: str, procesos: int = INGESTA_PROCESOS,
+                    chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> Iterator[dict]:
+    """
+    Parsea los documentos en un pool de procesos y los entrega a medida que
+    terminan (máximo 2 documentos en espera por proceso, la memoria no crece
+    con el tamaño del directorio). Si un documento falla se entrega
+    {'ruta', 'prefijo', 'error'}.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    pendientes = iter(rutas)
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        en_vuelo = {}                           # futuro -> ruta
+        while True:
+            for ruta in pendientes:
+                en_vuelo[pool.submit(parsear_documento, ruta, base, chunk_size, chunk_overlap)] = ruta
+                if len(en_vuelo) >= procesos * 2:
+                    break
+            if not en_vuelo:
+                return
+            listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                ruta = en_vuelo.pop(futuro)
+                try:
+                    yield futuro.result()
+                except Exception as e:
+                    # Un PDF dañado no detiene la carga del resto
+                    yield {"ruta": ruta, "prefijo": prefijo_relativo(ruta, base), "error": str(e)}
+
+
+def sincronizar_directorio(index, motor: Optional[MotorCarga], origen: str,
+                           procesos: int = INGESTA_PROCESOS, namespace: str = "",
+                           limpiar_legado: bool = False, eliminar_ausentes: bool = False,
+                           chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> dict:
+    """
+    Sincroniza todos los documentos de un directorio o manifiesto con el índice.
+
+    Args:
+        index: pinecone.Index (None con motor None = solo parsear, para medir)
+        motor: Motor de carga (embeddings + upsert)
+        origen: Directorio o manifiesto
+        procesos: Procesos para parsear (0 = núcleos de la máquina)
+        namespace: Namespace del índice
+        limpiar_legado: Eliminar los ids sin prefijo (cargas antiguas con ids aleatorios).
+            Solo para migrar una vez: borra todo id sin "#" del namespace, aunque sea de otra carga
+        eliminar_ausentes: Eliminar del índice los documentos que ya no están en el origen
+        chunk_size, chunk_overlap: Configuración del splitter
+
+    Returns:
+        dict: Estadísticas (documentos, fallidos, paginas, chunks, nuevos, eliminados,
+              legado, indexados, segundos_parseo, segundos); indexados = chunks distintos
+              del origen, los que quedan en el namespace si no hubo fallidos
+    """
+    from langchain_core.documents import Document
+
+    inicio = time.perf_counter()
+    base, rutas = listar_documentos(origen)
+    existentes = ids_indexados(index, "", namespace) if index is not None else set()
+    legado = {id_ for id_ in existentes if SEPARADOR_ID not in id_} if limpiar_legado else set()
+
+    prefijos: Set[str] = set()
+    fallidos: Set[str] = set()
+    vistos: Set[str] = set()
+    estadisticas = {"documentos": 0, "paginas": 0, "chunks": 0, "nuevos": 0, "segundos_parseo": 0.0}
+
+    def registros():
+        for documento in parsear_en_pool(rutas, base, procesos, chunk_size, chunk_overlap):
+            if "error" in documento:
+                fallidos.add(documento["prefijo"])
+                print(f"   ❌ {os.path.relpath(documento['ruta'], base)}: {documento['error']}")
+                continue
+            prefijos.add(documento["prefijo"])
+            estadisticas["documentos"] += 1
+            estadisticas["paginas"] += documento["paginas"]
+            estadisticas["chunks"] += len(documento["chunks"])
+            estadisticas["segundos_parseo"] += documento["segundos"]
+            print(f"   📄 {os.path.relpath(documento['ruta'], base)}: {documento['paginas']} páginas, "
+                  f"{len(documento['chunks'])} chunks ({documento['segundos']:.1f} s)")
+            for id_, texto, metadata in documento["chunks"]:
+                if id_ in vistos:
+                    continue
+                vistos.add(id_)
+                if id_ not in existentes:
+                    estadisticas["nuevos"] += 1
+                    yield id_, Document(page_content=texto, metadata=metadata)
+
+    if motor is None:
+        for _ in registros():
+            pass
+    else:
+        motor.cargar(registros())
+
+    # Se elimina después de subir: ningún documento queda vacío en el índice.
+    # Los chunks de documentos que fallaron al parsear se conservan.
+    eliminados = set()
+    for id_ in existentes - vistos:
+        prefijo = id_.split(SEPARADOR_ID, 1)[0]
+        if SEPARADOR_ID in id_ and prefijo not in fallidos and (prefijo in prefijos or eliminar_ausentes):
+            eliminados.add(id_)
+    if index is not None:
+        eliminar_ids(index, eliminados | legado, namespace)
+
+    return {
+        **estadisticas,
+        "fallidos": len(fallidos),
+        "eliminados": len(eliminados),
+        "legado": len(legado),
+        "indexados": len(vistos),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Carga masiva de un directorio o manifiesto de PDFs a Pinecone")
+    parser.add_argument("origen", help="Directorio con PDFs o manifiesto (.txt / .json)")
+    parser.add_argument("--procesos", type=int, default=INGESTA_PROCESOS, help="0 = núcleos de la máquina")
+    parser.add_argument("--namespace", default=None,
+                        help="Namespace destino (por defecto el de la versión activa, ver ingesta/reindexar.py)")
+    parser.add_argument("--eliminar-ausentes", action="store_true",
+                        help="Eliminar del índice los documentos que ya no están en el origen")
+    parser.add_argument("--limpiar-legado", action="store_true",
+                        help="Eliminar los ids sin prefijo de cargas antiguas (una sola vez, al migrar)")
+    parser.add_argument("--solo-parsear", action="store_true",
+                        help="Solo leer y partir (sin embeddings ni Pinecone), para medir el parseo")
+    args = parser.parse_args()
+
+    index = motor = None
+    if not args.solo_parsear:
+        from langchain_openai import OpenAIEmbeddings
+        from pinecone import Pinecone
+
+        index_name = os.getenv("PINECONE_INDEX_NAME", "langchain-pinecone-asistente-de-ventas")
+        index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(index_name)
+        if args.namespace is None:
+            args.namespace = leer_activo_pinecone(index) or ""
+        embeddings = con_almacen(OpenAIEmbeddings(model="text-embedding-ada-002"), "text-embedding-ada-002")
+        motor = MotorCarga(index, embeddings, args.namespace)
+
+    resumen = sincronizar_directorio(index, motor, args.origen, args.procesos, args.namespace or "",
+                                     limpiar_legado=args.limpiar_legado,
+                                     eliminar_ausentes=args.eliminar_ausentes)
+
+    print("=" * 70)
+    print(f"✓ {resumen['documentos']} documentos ({resumen['fallidos']} con error) | {resumen['paginas']} páginas | {resumen['chunks']} chunks "
+          f"| ⏱ {resumen['segundos']:.1f} s")
+    print(f"   🧮 Parseo: {resumen['paginas'] / max(resumen['segundos'], 1e-9):,.1f} páginas/s "
+          f"({resumen['segundos_parseo']:.1f} s de CPU en {args.procesos or os.cpu_count()} procesos)")
+    if motor is not None:
+        print(f"   ➕ Nuevos o modificados: {resumen['nuevos']} | ➖ Eliminados: {resumen['eliminados']} "
+              f"| ids antiguos sin prefijo: {resumen['legado']}")
+        print(f"   🚀 {motor.reporte()}")
@@ -0,0 +1,128 @@
+"""
+Ingesta Incremental (ids estables por hash de contenido)
+Antes cada ejecución vaciaba el índice (delete_all) y volvía a embeber todos
+los chunks aunque solo hubiera cambiado una página del PDF. Ahora:
+
+- Cada chunk tiene un id estable: "<documento>#<sha256 del texto>"
+- Se listan los ids que el índice ya tiene para ese documento
+- Solo se embeben y suben los chunks nuevos o modificados
+- Solo se eliminan los chunks que ya no están en el documento
+
+Un chunk modificado cambia de hash: su id nuevo se sube y el viejo se elimina.
+El tiempo de reindexado y el gasto en embeddings dependen del tamaño del cambio,
+no del corpus.
+
+Requiere un índice serverless de Pinecone (Index.list por prefijo).
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import hashlib
+import os
+import re
+import time
+import unicodedata
+from typing import Dict, Iterable, Sequence, Set
+
+from ingesta.carga_masiva import MotorCarga
+
+SEPARADOR_ID = "#"
+LOTE_ELIMINAR = 1000        # Máximo de ids por delete en Pinecone
+
+
+def prefijo_documento(ruta: str) -> str:
+    """'Base_de_Conocimientos/SOBRE DATAPATH.pdf' → 'SOBRE-DATAPATH.pdf' (ids ASCII)."""
+    nombre = unicodedata.normalize("NFKD", os.path.basename(ruta))
+    nombre = "".join(c for c in nombre if not unicodedata.combining(c))
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", nombre).strip("-")
+
+
+def hash_contenido(texto: str) -> str:
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()[:32]
+
+
+def id_chunk(prefijo: str, texto: str) -> str:
+    return f"{prefijo}{SEPARADOR_ID}{hash_contenido(texto)}"
+
+
+def ids_indexados(index, prefijo: str = "", namespace: str = "") -> Set[str]:
+    """Ids del índice que empiezan con el prefijo (paginado, sin traer vectores)."""
+    ids = set()
+    for pagina in index.list(prefix=prefijo, namespace=namespace):
+        ids.update(pagina)
+    return ids
+
+
+def planificar(chunks: Sequence, prefijo: str, ids_existentes: Set[str]):
+    """
+    Compara los chunks del documento con lo que ya está indexado.
+
+    Args:
+        chunks: Documents de LangChain (page_content + metadata)
+        prefijo: Prefijo del documento (prefijo_documento)
+        ids_existentes: Ids del índice con ese prefijo
+
+    Returns:
+        tuple: (chunks a subir {id: chunk}, ids a eliminar, chunks sin cambios)
+    """
+    actuales: Dict[str, object] = {}
+    for chunk in chunks:
+        # Chunks con el mismo texto dentro del documento se indexan una sola vez
+        actuales.setdefault(id_chunk(prefijo, chunk.page_content), chunk)
+
+    nuevos = {id_: chunk for id_, chunk in actuales.items() if id_ not in ids_existentes}
+    eliminados = ids_existentes - actuales.keys()
+    return nuevos, eliminados, len(actuales) - len(nuevos)
+
+
+def _en_lotes(elementos: Sequence, tamano: int) -> Iterable[Sequence]:
+    for i in range(0, len(elementos), tamano):
+        yield elementos[i:i + tamano]
+
+
+def eliminar_ids(index, ids: Set[str], namespace: str = "") -> None:
+    for lote in _en_lotes(sorted(ids), LOTE_ELIMINAR):
+        index.delete(ids=list(lote), namespace=namespace)
+
+
+def sincronizar(index, embeddings, chunks: Sequence, ruta: str, namespace: str = "",
+                text_key: str = "text", limpiar_legado: bool = False, motor: MotorCarga = None) -> dict:
+    """
+    Deja el índice igual a los chunks del documento con el mínimo de trabajo.
+
+    Args:
+        index: pinecone.Index
+        embeddings: Modelo de embeddings (embed_documents)
+        chunks: Chunks del documento
+        ruta: Ruta del documento (define el prefijo de sus ids)
+        namespace: Namespace del índice
+        text_key: Clave de metadata con el texto del chunk
+        limpiar_legado: Eliminar los ids sin prefijo (cargas antiguas con ids aleatorios).
+            Solo para migrar una vez: borra todo id sin "#" del namespace, aunque sea de otra carga
+        motor: Motor de carga para embeber y subir (None = uno con la configuración del .env)
+
+    Returns:
+        dict: Estadísticas (nuevos, eliminados, legado, sin_cambios, segundos)
+    """
+    inicio = time.perf_counter()
+    prefijo = prefijo_documento(ruta)
+    existentes = ids_indexados(index, "" if limpiar_legado else prefijo + SEPARADOR_ID, namespace)
+
+    legado = {id_ for id_ in existentes if SEPARADOR_ID not in id_} if limpiar_legado else set()
+    del_documento = {id_ for id_ in existentes if id_.startswith(prefijo + SEPARADOR_ID)}
+    nuevos, eliminados, sin_cambios = planificar(chunks, prefijo, del_documento)
+
+    # Embeddings + upsert en paralelo, con límites de la cuenta y reintentos
+    motor = motor or MotorCarga(index, embeddings, namespace, text_key)
+    motor.cargar(nuevos.items())
+
+    # Se elimina después de subir: el documento nunca queda vacío en el índice
+    eliminar_ids(index, eliminados | legado, namespace)
+
+    return {
+        "nuevos": len(nuevos),
+        "eliminados": len(eliminados),
+        "legado": len(legado),
+        "sin_cambios": sin_cambios,
+        "segundos": time.perf_counter() - inicio,
+    }
@@ -0,0 +1,121 @@
+"""
+Reindexación Blue/Green en Pinecone (sin cortar buscar_datapath)
+Una recarga completa del índice (cambio de chunking, de modelo de embeddings
+o de toda la base de conocimientos) ya no se hace sobre el namespace que
+leen las tools:
+
+- Se construye una versión en un namespace nuevo (v20261018103000) con la
+  carga masiva del directorio (ingesta/directorio.py); los embeddings ya
+  calculados salen del almacén en disco y no se vuelven a pagar
+- Si algún documento falló al parsear, la versión no se activa
+- Se espera a que Pinecone refleje todos los vectores y se valida el conteo
+  (igual a los chunks cargados y no menor que VERSIONES_MINIMO_RELATIVO de la
+  versión activa)
+- Se mueve el puntero (recuperacion/versiones.py, paquete compartido): las
+  tools pasan a la versión nueva en su siguiente revisión, sin reiniciar y
+  sin un instante vacío
+- Se eliminan los namespaces de versiones antiguas (VERSIONES_A_CONSERVAR)
+
+Si la carga se interrumpe, retomar con --version: los ids por hash de
+contenido evitan volver a subir lo que ya está en ese namespace.
+
+Uso:
+    python -m ingesta.reindexar Base_de_Conocimientos/
+    python -m ingesta.reindexar Base_de_Conocimientos/ --version v20261018103000
+    python -m recuperacion.versiones pinecone activar v20261017090000      (volver atrás)
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import os
+import time
+from typing import Optional
+
+from ingesta.carga_masiva import MotorCarga, con_almacen
+from ingesta.directorio import INGESTA_PROCESOS, sincronizar_directorio
+from recuperacion.versiones import (
+    PATRON_VERSION, VERSIONES_A_CONSERVAR, VERSIONES_MINIMO_RELATIVO,
+    activar_pinecone, limpiar_pinecone, nueva_version,
+)
+
+
+def reindexar(index, embeddings, origen: str, version: Optional[str] = None,
+              procesos: int = INGESTA_PROCESOS, minimo_relativo: float = VERSIONES_MINIMO_RELATIVO,
+              conservar: int = VERSIONES_A_CONSERVAR, forzar: bool = False) -> dict:
+    """
+    Construye una versión completa del índice a un lado y la activa.
+
+    Args:
+        index: pinecone.Index
+        embeddings: Modelo de embeddings (idealmente con almacén, ver con_almacen)
+        origen: Directorio o manifiesto de PDFs
+        version: Namespace de la versión (None = una nueva; uno existente = retomar)
+        procesos: Procesos para parsear (0 = núcleos de la máquina)
+        minimo_relativo: Fracción mínima del conteo de la versión activa
+        conservar: Versiones que se conservan al limpiar (incluida la activa)
+        forzar: Activar aunque haya documentos fallidos o el conteo no valide
+
+    Returns:
+        dict: Estadísticas de la carga + version, anterior, vectores, eliminadas, segundos
+    """
+    inicio = time.perf_counter()
+    version = version or nueva_version()
+    if not PATRON_VERSION.match(version):
+        raise ValueError(f"❌ Versión inválida: {version} (formato v20261018103000)")
+
+    print(f"🏗  Construyendo la versión {version} desde '{origen}'")
+    motor = MotorCarga(index, embeddings, namespace=version)
+    # Namespace solo de esta versión: se quita lo que ya no está en el origen
+    resumen = sincronizar_directorio(index, motor, origen, procesos, namespace=version,
+                                     limpiar_legado=False, eliminar_ausentes=True)
+    print(f"   🚀 {motor.reporte()}")
+
+    if resumen["fallidos"] and not forzar:
+        raise ValueError(
+            f"❌ {resumen['fallidos']} documentos fallaron al parsear: la versión {version} no se activa "
+            f"(corregirlos y retomar con --version {version}, o usar --forzar)"
+        )
+
+    activacion = activar_pinecone(index, version, esperados=resumen["indexados"],
+                                  minimo_relativo=minimo_relativo, forzar=forzar)
+    eliminadas = limpiar_pinecone(index, conservar)
+    return {
+        **resumen,
+        **activacion,
+        "eliminadas": eliminadas,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Reindexación blue/green: versión nueva en otro namespace y cambio atómico")
+    parser.add_argument("origen", help="Directorio con PDFs o manifiesto (.txt / .json)")
+    parser.add_argument("--version", help="Retomar una versión que quedó a medias (ej. v20261018103000)")
+    parser.add_argument("--procesos", type=int, default=INGESTA_PROCESOS, help="0 = núcleos de la máquina")
+    parser.add_argument("--conservar", type=int, default=VERSIONES_A_CONSERVAR,
+                        help="Versiones que se conservan (incluida la activa)")
+    parser.add_argument("--forzar", action="store_true", help="Activar aunque la validación falle")
+    args = parser.parse_args()
+
+    from langchain_openai import OpenAIEmbeddings
+    from pinecone import Pinecone
+
+    index_name = os.getenv("PINECONE_INDEX_NAME", "langchain-pinecone-asistente-de-ventas")
+    index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(index_name)
+    embeddings = con_almacen(OpenAIEmbeddings(model="text-embedding-ada-002"), "text-embedding-ada-002")
+
+    resumen = reindexar(index, embeddings, args.origen, args.version, args.procesos,
+                        conservar=args.conservar, forzar=args.forzar)
+
+    print("=" * 70)
+    print(f"✓ Versión activa: {resumen['version']} ({resumen['vectores']:,} vectores) | "
+          f"anterior: {resumen['anterior'] or '(namespace predeterminado)'} | ⏱ {resumen['segundos']:.1f} s")
+    print(f"   📄 {resumen['documentos']} documentos | {resumen['paginas']} páginas | "
+          f"{resumen['nuevos']} chunks subidos en esta ejecución")
+    if resumen["eliminadas"]:
+        print(f"   🗑  Versiones eliminadas: {', '.join(ns or '(predeterminado)' for ns in resumen['eliminadas'])}")
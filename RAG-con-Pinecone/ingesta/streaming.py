@@ -0,0 +1,262 @@
+"""
+Ingesta en Streaming (páginas → chunks → embeddings → upsert) con checkpoints
+Antes se cargaba el PDF completo (load), se partía completo y recién después
+se embebía todo: la memoria crecía con el documento y un fallo a mitad de la
+carga perdía todo el avance. Ahora las etapas se solapan:
+
+- Un hilo lee el PDF página por página (lazy_load) y parte cada página en chunks
+- Los chunks nuevos pasan por una cola acotada (INGESTA_COLA) al motor de
+  carga, que embebe y sube en paralelo (ingesta/carga_masiva.py)
+- En memoria solo hay una página, la cola y los lotes en vuelo; lo único que
+  crece con el documento son los ids (~60 bytes por chunk) para calcular qué eliminar
+
+Checkpoint (INGESTA_CHECKPOINT_DIR/<documento>.json + .ids):
+- Guarda la última página cuyos chunks ya están TODOS en el índice (los lotes
+  terminan en desorden; la marca solo avanza sobre páginas completas) y los
+  ids de esas páginas
+- Si la carga se interrumpe, la siguiente ejecución salta esas páginas sin
+  partirlas ni embeberlas; los chunks de páginas posteriores que alcanzaron a
+  subirse se detectan por su id (hash de contenido) y tampoco se repiten
+- Si el archivo cambió (otra huella sha256), el checkpoint se descarta
+- Al terminar bien, el checkpoint se borra
+
+Variables en .env:
+- INGESTA_COLA=256                  Chunks en espera entre el lector y el motor de carga
+- INGESTA_CHECKPOINT_DIR=.checkpoints
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from typing import Iterable, List, Optional, Set
+
+from ingesta.carga_masiva import MotorCarga
+from ingesta.incremental import SEPARADOR_ID, eliminar_ids, id_chunk, ids_indexados, prefijo_documento
+
+INGESTA_COLA = int(os.getenv("INGESTA_COLA", "256"))
+INGESTA_CHECKPOINT_DIR = os.getenv("INGESTA_CHECKPOINT_DIR", ".checkpoints")
+
+_FIN = object()
+
+
+def huella_archivo(ruta: str) -> str:
+    """sha256 del archivo leído por bloques (no se carga completo en memoria)."""
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()[:32]
+
+
+# ============================================
+# CHECKPOINT
+# ============================================
+class Checkpoint:
+    """
+    Avance de la ingesta de un documento: última página completa + sus ids.
+    Los ids se agregan a un archivo de texto (una línea por id) y el estado
+    se reescribe de forma atómica.
+
+    Args:
+        directorio: Carpeta de checkpoints (None = solo en memoria, sin reanudar)
+        ruta: Ruta del documento
+        huella: Huella del documento (si no coincide, se empieza de cero)
+    """
+
+    def __init__(self, directorio: Optional[str], ruta: str, huella: str = ""):
+        self.huella = huella
+        self.pagina = -1
+        self.ids: Set[str] = set()
+        self.ruta_estado = self.ruta_ids = None
+        if directorio is None:
+            return
+
+        os.makedirs(directorio, exist_ok=True)
+        base = os.path.join(directorio, prefijo_documento(ruta))
+        self.ruta_estado = base + ".json"
+        self.ruta_ids = base + ".ids"
+
+        if os.path.exists(self.ruta_estado):
+            with open(self.ruta_estado, encoding="utf-8") as f:
+                estado = json.load(f)
+            if estado.get("huella") == huella and os.path.exists(self.ruta_ids):
+                self.pagina = estado["pagina"]
+                with open(self.ruta_ids, encoding="utf-8") as f:
+                    self.ids = {linea.strip() for linea in f if linea.strip()}
+            else:
+                self.borrar()
+
+    @property
+    def reanudado(self) -> bool:
+        return self.pagina >= 0
+
+    def confirmar(self, pagina: int, ids: Iterable[str]) -> None:
+        """Marca la página como completa (sus chunks ya están en el índice)."""
+        self.pagina = pagina
+        if self.ruta_estado is None:
+            return
+        ids = [id_ for id_ in ids if id_ not in self.ids]
+        if ids:
+            with open(self.ruta_ids, "a", encoding="utf-8") as f:
+                f.write("".join(id_ + "\n" for id_ in ids))
+                f.flush()
+                os.fsync(f.fileno())
+            self.ids.update(ids)
+        temporal = self.ruta_estado + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"huella": self.huella, "pagina": pagina, "actualizado": time.time()}, f)
+        os.replace(temporal, self.ruta_estado)
+
+    def borrar(self) -> None:
+        for ruta in (self.ruta_estado, self.ruta_ids):
+            if ruta and os.path.exists(ruta):
+                os.remove(ruta)
+
+
+class _Seguimiento:
+    """
+    Chunks pendientes por página: la marca del checkpoint avanza cuando todas
+    las páginas anteriores terminaron de leerse y sus chunks de subirse.
+    """
+
+    def __init__(self, checkpoint: Checkpoint):
+        self.checkpoint = checkpoint
+        self._pendientes = {}           # página -> chunks aún no subidos
+        self._ids = {}                  # página -> ids de la página (para el checkpoint)
+        self._pagina_de = {}            # id en vuelo -> página
+        self._lock = threading.Lock()
+
+    def registrar(self, pagina: int, ids: List[str], nuevos: List[str]) -> None:
+        with self._lock:
+            self._ids[pagina] = ids
+            self._pendientes[pagina] = len(nuevos)
+            for id_ in nuevos:
+                self._pagina_de[id_] = pagina
+            self._avanzar()
+
+    def completar(self, lote) -> None:
+        with self._lock:
+            for id_, _ in lote:
+                self._pendientes[self._pagina_de.pop(id_)] -= 1
+            self._avanzar()
+
+    def _avanzar(self) -> None:
+        siguiente = self.checkpoint.pagina + 1
+        while self._pendientes.get(siguiente) == 0:
+            self.checkpoint.confirmar(siguiente, self._ids.pop(siguiente))
+            del self._pendientes[siguiente]
+            siguiente += 1
+
+
+# ============================================
+# PIPELINE
+# ============================================
+def sincronizar_streaming(index, motor: MotorCarga, ruta: str, paginas: Iterable, splitter,
+                          namespace: str = "", limpiar_legado: bool = False,
+                          directorio_checkpoint: Optional[str] = INGESTA_CHECKPOINT_DIR,
+                          tamano_cola: int = INGESTA_COLA) -> dict:
+    """
+    Sincroniza un documento con el índice en streaming (mismo resultado que
+    ingesta.incremental.sincronizar, sin tener el documento en memoria).
+
+    Args:
+        index: pinecone.Index
+        motor: Motor de carga (embeddings + upsert)
+        ruta: Ruta del documento (prefijo de los ids y huella del checkpoint)
+        paginas: Iterable de Documents por página (ej. PyPDFLoader(ruta).lazy_load())
+        splitter: Text splitter de LangChain (split_documents)
+        namespace: Namespace del índice
+        limpiar_legado: Eliminar los ids sin prefijo (cargas antiguas con ids aleatorios).
+            Solo para migrar una vez: borra todo id sin "#" del namespace, aunque sea de otra carga
+        directorio_checkpoint: Carpeta de checkpoints (None = sin checkpoint)
+        tamano_cola: Chunks en espera entre el lector y el motor
+
+    Returns:
+        dict: Estadísticas (paginas, saltadas, nuevos, eliminados, legado, sin_cambios, segundos)
+    """
+    inicio = time.perf_counter()
+    prefijo = prefijo_documento(ruta)
+    existentes = ids_indexados(index, "" if limpiar_legado else prefijo + SEPARADOR_ID, namespace)
+    legado = {id_ for id_ in existentes if SEPARADOR_ID not in id_} if limpiar_legado else set()
+    del_documento = {id_ for id_ in existentes if id_.startswith(prefijo + SEPARADOR_ID)}
+    del existentes
+
+    huella = huella_archivo(ruta) if directorio_checkpoint else ""
+    checkpoint = Checkpoint(directorio_checkpoint, ruta, huella)
+    if checkpoint.reanudado:
+        print(f"   ⏯  Reanudando '{ruta}' desde la página {checkpoint.pagina + 2} "
+              f"({len(checkpoint.ids)} chunks ya confirmados)")
+
+    seguimiento = _Seguimiento(checkpoint)
+    vistos: Set[str] = set(checkpoint.ids)
+    cola = queue.Queue(maxsize=max(1, tamano_cola))
+    detener = threading.Event()
+    estadisticas = {"paginas": 0, "saltadas": 0, "nuevos": 0}
+
+    def poner(elemento) -> bool:
+        """put que no se queda bloqueado si el motor ya se detuvo por un error."""
+        while not detener.is_set():
+            try:
+                cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def leer():
+        try:
+            for pagina, documento in enumerate(paginas):
+                estadisticas["paginas"] += 1
+                if pagina <= checkpoint.pagina:
+                    estadisticas["saltadas"] += 1
+                    continue
+                ids, nuevos = [], []
+                for chunk in splitter.split_documents([documento]):
+                    id_ = id_chunk(prefijo, chunk.page_content)
+                    ids.append(id_)
+                    if id_ not in vistos and id_ not in del_documento:
+                        nuevos.append((id_, chunk))
+                    vistos.add(id_)
+                seguimiento.registrar(pagina, ids, [id_ for id_, _ in nuevos])
+                estadisticas["nuevos"] += len(nuevos)
+                for registro in nuevos:
+                    if not poner(registro):
+                        return
+            poner(_FIN)
+        except BaseException as e:
+            poner(e)
+
+    def registros():
+        while True:
+            elemento = cola.get()
+            if elemento is _FIN:
+                return
+            if isinstance(elemento, BaseException):
+                raise elemento
+            yield elemento
+
+    lector = threading.Thread(target=leer, name="ingesta-lector", daemon=True)
+    lector.start()
+    try:
+        motor.cargar(registros(), al_completar=seguimiento.completar)
+    finally:
+        detener.set()
+        lector.join()
+
+    # Se elimina después de subir: el documento nunca queda vacío en el índice
+    eliminados = del_documento - vistos
+    eliminar_ids(index, eliminados | legado, namespace)
+    checkpoint.borrar()
+
+    return {
+        **estadisticas,
+        "eliminados": len(eliminados),
+        "legado": len(legado),
+        "sin_cambios": len(vistos) - estadisticas["nuevos"],
+        "segundos": time.perf_counter() - inicio,
+    }
@@ -1,4 +1,5 @@
 import os
+import sys
 
 # Paso 1: Elección de la Técnica de DocumentLoader
 from langchain_community.document_loaders import PyPDFLoader
@@ -13,43 +14,58 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # Importaciones para trabajar con Pinecone
-from langchain_pinecone import PineconeVectorStore
 from pinecone import Pinecone
 
+# Carga masiva: embeddings + upsert en paralelo respetando RPM/TPM (INGESTA_*, EMBEDDINGS_RPM/TPM)
+from ingesta.carga_masiva import MotorCarga, con_almacen
+# Ingesta incremental en streaming: ids por hash de contenido (solo se sube lo que cambió),
+# página → chunks → embeddings → upsert solapados y checkpoint para reanudar
+from ingesta.streaming import sincronizar_streaming
+# Versiones del índice: se sincroniza el namespace que están leyendo las tools
+from recuperacion.versiones import leer_activo_pinecone
+
 
 if __name__ == '__main__':
     #=================================== Paso 1: Document Loader =======================================
+    # lazy_load: las páginas se leen a medida que el pipeline las consume (no el PDF completo)
     path = "Base_de_Conocimientos/SOBRE DATAPATH.pdf"
     loader = PyPDFLoader(path)
-    documentos = loader.load()
+    paginas = loader.lazy_load()
 
     #======================================= Paso 2: Chunking ===========================================
+    # Cada página se parte al leerse (split_documents ya partía página por página)
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=500,
         chunk_overlap=200,
     )
-    chunks = text_splitter.split_documents(documents=documentos)
 
     #========== Paso 3: Embeddings - Cargamos el Modelo de Embeddings para convertir los Chunks ==========
-    embedding_model = OpenAIEmbeddings(model='text-embedding-ada-002')
+    # Con almacén en disco (INGESTA_ALMACEN_EMBEDDINGS): los chunks ya embebidos no se vuelven a pagar
+    embedding_model = con_almacen(OpenAIEmbeddings(model='text-embedding-ada-002'), 'text-embedding-ada-002')
 
     #======================= Paso 4: VectorStore - Llevamos los Embeddings a Pinecone ====================
     pinecone_api_key = os.getenv("PINECONE_API_KEY")
     index_name = os.getenv("PINECONE_INDEX_NAME", "langchain-pinecone-asistente-de-ventas")
 
-    # Limpiar índice antes de cargar nuevos vectores
-    try:
-        pc = Pinecone(api_key=pinecone_api_key)
-        index = pc.Index(index_name)
-        index.delete(delete_all=True)
-        print(f"✓ Índice {index_name} limpiado (delete_all=True).")
-    except Exception as e:
-        print(f"⚠️  No se pudo limpiar el índice (puede que no exista o esté vacío): {e}")
-
-    vectorstore = PineconeVectorStore.from_documents(
-        documents=chunks,
-        embedding=embedding_model,
-        index_name=index_name,
-    )
+    # Sin delete_all: se comparan los ids del índice con los chunks actuales y solo
+    # se embeben/suben los nuevos o modificados y se eliminan los que ya no existen.
+    # Los ids sin prefijo de documento (cargas anteriores con ids aleatorios) solo se eliminan
+    # con --limpiar-legado: una sola vez al migrar, porque borra todo id sin prefijo del namespace.
+    # Si la carga se interrumpe, volver a ejecutar reanuda desde el checkpoint (INGESTA_CHECKPOINT_DIR).
+    # Para cargar un directorio o manifiesto de PDFs: python -m ingesta.directorio Base_de_Conocimientos/
+    # Para una recarga completa sin cortar el servicio (versión nueva + cambio atómico):
+    #   python -m ingesta.reindexar Base_de_Conocimientos/
+    pc = Pinecone(api_key=pinecone_api_key)
+    index = pc.Index(index_name)
+    namespace = leer_activo_pinecone(index) or ""
+    motor = MotorCarga(index, embedding_model, namespace)
+    resumen = sincronizar_streaming(index, motor, path, paginas, text_splitter, namespace,
+                                    limpiar_legado="--limpiar-legado" in sys.argv)
 
-    print(f"✓ Documentos indexados correctamente en Pinecone (índice: {index_name})")
+    print(f"✓ {resumen['paginas']} páginas de '{path}' sincronizadas con Pinecone (índice: {index_name})")
+    if resumen['saltadas']:
+        print(f"   ⏯  Páginas ya confirmadas en una ejecución anterior: {resumen['saltadas']}")
+    print(f"   ➕ Nuevos o modificados: {resumen['nuevos']} (embebidos)")
+    print(f"   ➖ Eliminados: {resumen['eliminados']} | ids antiguos sin prefijo: {resumen['legado']}")
+    print(f"   ✔ Sin cambios: {resumen['sin_cambios']} | ⏱ {resumen['segundos']:.1f} s")
+    print(f"   🚀 {motor.reporte()}")
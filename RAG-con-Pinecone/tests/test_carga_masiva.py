@@ -0,0 +1,122 @@
+"""
+Tests de ingesta.carga_masiva: token bucket y reintentos con un reloj falso
+(sin esperas reales) y el motor de carga contra IndiceLocal.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+from ingesta import carga_masiva
+from ingesta.carga_masiva import CuboTokens, MotorCarga, con_reintentos, es_transitorio
+from recuperacion.local import EmbeddingsLocales, IndiceLocal
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """time.monotonic/sleep de carga_masiva sobre un reloj que solo avanza al dormir."""
+    ahora = SimpleNamespace(t=0.0, esperas=[])
+
+    def dormir(segundos):
+        ahora.esperas.append(segundos)
+        ahora.t += segundos
+
+    monkeypatch.setattr(carga_masiva, "time", SimpleNamespace(monotonic=lambda: ahora.t, sleep=dormir,
+                                                              perf_counter=lambda: ahora.t))
+    monkeypatch.setattr(carga_masiva.random, "uniform", lambda a, b: b)
+    return ahora
+
+
+class ErrorHTTP(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class RateLimitError(Exception):
+    pass
+
+
+def test_cubo_respeta_la_tasa(reloj):
+    cubo = CuboTokens(60)               # 1 por segundo, ráfaga de 60
+    assert sum(cubo.consumir() for _ in range(60)) == 0.0
+    assert cubo.consumir() == pytest.approx(1.0)
+    assert cubo.consumir(5) == pytest.approx(5.0)
+    reloj.t += 10
+    assert cubo.consumir(10) == 0.0
+    assert reloj.t == pytest.approx(16.0)
+
+
+def test_cubo_cantidad_mayor_que_la_capacidad_y_sin_limite(reloj):
+    cubo = CuboTokens(30)
+    assert cubo.consumir(1000) == 0.0           # Se recorta a la capacidad: no se bloquea para siempre
+    assert cubo.consumir(30) == pytest.approx(60.0)
+    assert CuboTokens(0).consumir(10 ** 9) == 0.0
+    assert reloj.esperas == [pytest.approx(60.0)]
+
+
+def test_errores_transitorios():
+    assert es_transitorio(ErrorHTTP(429)) and es_transitorio(ErrorHTTP(503))
+    assert not es_transitorio(ErrorHTTP(400))
+    assert es_transitorio(RateLimitError()) and es_transitorio(TimeoutError())
+    assert not es_transitorio(ValueError("dimensión incorrecta"))
+
+
+def test_reintenta_con_backoff_exponencial(reloj):
+    intentos, avisos = [], []
+
+    def funcion():
+        intentos.append(1)
+        if len(intentos) < 4:
+            raise ErrorHTTP(429)
+        return "ok"
+
+    assert con_reintentos(funcion, reintentos=5, espera_base=1.0,
+                          al_reintentar=lambda e, s: avisos.append(s)) == "ok"
+    assert reloj.esperas == [1.0, 2.0, 4.0] and avisos == reloj.esperas
+
+
+def test_tope_de_espera_y_agotar_reintentos(reloj):
+    with pytest.raises(ErrorHTTP):
+        con_reintentos(lambda: (_ for _ in ()).throw(ErrorHTTP(503)), reintentos=4,
+                       espera_base=10.0, espera_maxima=25.0)
+    assert reloj.esperas == [10.0, 20.0, 25.0, 25.0]
+
+
+def test_error_permanente_no_se_reintenta(reloj):
+    intentos = []
+
+    def funcion():
+        intentos.append(1)
+        raise ErrorHTTP(400)
+
+    with pytest.raises(ErrorHTTP):
+        con_reintentos(funcion, reintentos=5)
+    assert len(intentos) == 1 and reloj.esperas == []
+
+
+def test_motor_sube_todo_en_lotes():
+    indice, embeddings = IndiceLocal(8), EmbeddingsLocales(8)
+    motor = MotorCarga(indice, embeddings, "ns", lote_embeddings=3, lote_upsert=2, hilos=2, rpm=0, tpm=0)
+    completados = []
+    registros = ((f"doc#{i}", Document(page_content=f"chunk {i}", metadata={"page": i})) for i in range(10))
+
+    estadisticas = motor.cargar(registros, al_completar=lambda lote: completados.extend(id_ for id_, _ in lote))
+    assert estadisticas["chunks"] == 10 and estadisticas["peticiones_embeddings"] == 4
+    assert estadisticas["upserts"] == 7             # 3 lotes de 3 (2 upserts c/u) + 1 lote de 1
+    assert sorted(completados) == sorted(f"doc#{i}" for i in range(10))
+    assert indice.describe_index_stats().namespaces["ns"].vector_count == 10
+    assert indice.fetch(["doc#4"], namespace="ns").vectors["doc#4"].metadata == {"page": 4, "text": "chunk 4"}
+
+
+def test_motor_propaga_error_permanente():
+    class EmbeddingsRotos(EmbeddingsLocales):
+        def embed_documents(self, textos):
+            raise ValueError("modelo inexistente")
+
+    motor = MotorCarga(IndiceLocal(8), EmbeddingsRotos(8), lote_embeddings=2, rpm=0, tpm=0)
+    with pytest.raises(ValueError):
+        motor.cargar((f"doc#{i}", Document(page_content=str(i))) for i in range(6))
@@ -0,0 +1,108 @@
+"""
+Tests de ingesta.directorio: listado por directorio o manifiesto, prefijos
+por ruta relativa y la comparación con el índice (documentos modificados,
+ausentes y fallidos), con el parseo simulado y IndiceLocal.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import json
+import os
+
+import pytest
+
+from ingesta import directorio
+from ingesta.carga_masiva import MotorCarga
+from ingesta.directorio import listar_documentos, prefijo_relativo, sincronizar_directorio
+from ingesta.incremental import id_chunk, ids_indexados
+from recuperacion.local import EmbeddingsLocales, IndiceLocal
+
+
+def _escribir(base, relativa, textos):
+    """Un "PDF" de prueba: la lista de chunks en JSON (el parseo se simula)."""
+    ruta = os.path.join(base, relativa)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(textos, f)
+    return ruta
+
+
+def _parsear_en_pool(rutas, base, procesos=0, chunk_size=0, chunk_overlap=0):
+    """Mismo contrato que parsear_en_pool, en el proceso actual."""
+    for ruta in rutas:
+        prefijo = prefijo_relativo(ruta, base)
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                textos = json.load(f)
+        except ValueError as e:
+            yield {"ruta": ruta, "prefijo": prefijo, "error": str(e)}
+            continue
+        relativa = os.path.relpath(ruta, base)
+        yield {"ruta": ruta, "prefijo": prefijo, "paginas": 1, "segundos": 0.0,
+               "chunks": [(id_chunk(prefijo, t), t, {"source": relativa, "page": 0}) for t in textos]}
+
+
+@pytest.fixture
+def origen(tmp_path, monkeypatch):
+    monkeypatch.setattr(directorio, "parsear_en_pool", _parsear_en_pool)
+    base = str(tmp_path / "docs")
+    _escribir(base, "programas/temario.pdf", ["SQL desde cero.", "Python para datos."])
+    _escribir(base, "docentes/temario.pdf", ["Docentes con experiencia en la industria."])
+    _escribir(base, "precios.pdf", ["S/ 1,500 al contado.", "Cuotas sin intereses."])
+    return base
+
+
+def _sincronizar(indice, base, **kwargs):
+    motor = MotorCarga(indice, EmbeddingsLocales(8), lote_embeddings=2, rpm=0, tpm=0)
+    return sincronizar_directorio(indice, motor, base, procesos=1, **kwargs)
+
+
+def test_listar_directorio_y_manifiestos(origen, tmp_path):
+    base, rutas = listar_documentos(origen)
+    assert base == origen
+    assert [os.path.relpath(r, origen) for r in rutas] == [
+        os.path.join("docentes", "temario.pdf"), "precios.pdf", os.path.join("programas", "temario.pdf")]
+
+    txt = tmp_path / "docs" / "manifiesto.txt"
+    txt.write_text("# comentario\nprecios.pdf\n\nprogramas/temario.pdf\n", encoding="utf-8")
+    assert listar_documentos(str(txt))[1] == [os.path.join(origen, "precios.pdf"),
+                                              os.path.join(origen, "programas/temario.pdf")]
+    manifiesto = tmp_path / "docs" / "manifiesto.json"
+    manifiesto.write_text(json.dumps({"documentos": ["precios.pdf"]}), encoding="utf-8")
+    assert listar_documentos(str(manifiesto))[1] == [os.path.join(origen, "precios.pdf")]
+
+
+def test_mismo_nombre_en_carpetas_distintas(origen):
+    assert prefijo_relativo(os.path.join(origen, "programas", "temario.pdf"), origen) == "programas-temario.pdf"
+    assert prefijo_relativo(os.path.join(origen, "docentes", "temario.pdf"), origen) == "docentes-temario.pdf"
+
+
+def test_solo_se_sube_lo_que_cambio(origen):
+    indice = IndiceLocal(8)
+    resumen = _sincronizar(indice, origen)
+    assert (resumen["documentos"], resumen["nuevos"], resumen["indexados"]) == (3, 5, 5)
+
+    _escribir(origen, "precios.pdf", ["S/ 1,500 al contado.", "Hasta 12 cuotas sin intereses."])
+    resumen = _sincronizar(indice, origen)
+    assert (resumen["nuevos"], resumen["eliminados"]) == (1, 1)
+    assert ids_indexados(indice, "precios.pdf#") == {id_chunk("precios.pdf", "S/ 1,500 al contado."),
+                                                     id_chunk("precios.pdf", "Hasta 12 cuotas sin intereses.")}
+
+
+def test_ausentes_y_fallidos(origen):
+    indice = IndiceLocal(8)
+    _sincronizar(indice, origen)
+    os.remove(os.path.join(origen, "docentes", "temario.pdf"))
+    with open(os.path.join(origen, "precios.pdf"), "w", encoding="utf-8") as f:
+        f.write("PDF dañado")
+
+    # Sin --eliminar-ausentes el documento borrado se conserva; el que falló, siempre
+    resumen = _sincronizar(indice, origen)
+    assert (resumen["fallidos"], resumen["eliminados"]) == (1, 0)
+    assert len(ids_indexados(indice, "docentes-temario.pdf#")) == 1
+    assert len(ids_indexados(indice, "precios.pdf#")) == 2
+
+    resumen = _sincronizar(indice, origen, eliminar_ausentes=True)
+    assert resumen["eliminados"] == 1
+    assert not ids_indexados(indice, "docentes-temario.pdf#")
+    assert len(ids_indexados(indice, "precios.pdf#")) == 2
@@ -0,0 +1,70 @@
+"""
+Tests de ingesta.incremental: ids estables por hash de contenido y
+sincronización que solo sube lo nuevo y elimina lo que ya no está
+(con IndiceLocal y EmbeddingsLocales, sin Pinecone ni OpenAI).
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+from langchain_core.documents import Document
+
+from ingesta.carga_masiva import MotorCarga
+from ingesta.incremental import id_chunk, ids_indexados, planificar, prefijo_documento, sincronizar
+from recuperacion.local import EmbeddingsLocales, IndiceLocal
+
+RUTA = "Base_de_Conocimientos/SOBRE DATAPATH.pdf"
+TEXTOS = [f"Sección {i}: el Diplomado incluye el módulo {i} con proyectos reales." for i in range(6)]
+
+
+def _chunks(textos):
+    return [Document(page_content=t, metadata={"page": i}) for i, t in enumerate(textos)]
+
+
+def _sincronizar(indice, embeddings, textos, ruta=RUTA):
+    motor = MotorCarga(indice, embeddings, rpm=0, tpm=0, lote_embeddings=2)
+    return sincronizar(indice, embeddings, _chunks(textos), ruta, motor=motor)
+
+
+def test_ids_estables_por_contenido():
+    prefijo = prefijo_documento(RUTA)
+    assert prefijo == "SOBRE-DATAPATH.pdf"
+    assert prefijo_documento("Año académico/Información básica.pdf") == "Informacion-basica.pdf"
+    assert id_chunk(prefijo, TEXTOS[0]) == id_chunk(prefijo, TEXTOS[0])
+    assert id_chunk(prefijo, TEXTOS[0]) != id_chunk(prefijo, TEXTOS[1])
+    assert id_chunk(prefijo, TEXTOS[0]).startswith("SOBRE-DATAPATH.pdf#")
+
+
+def test_planificar():
+    prefijo = prefijo_documento(RUTA)
+    existentes = {id_chunk(prefijo, t) for t in TEXTOS[:4]}
+    nuevos, eliminados, sin_cambios = planificar(_chunks(TEXTOS[2:] + [TEXTOS[2]]), prefijo, existentes)
+    assert set(nuevos) == {id_chunk(prefijo, t) for t in TEXTOS[4:]}
+    assert eliminados == {id_chunk(prefijo, t) for t in TEXTOS[:2]}
+    assert sin_cambios == 2
+
+
+def test_sincronizar_solo_sube_lo_que_cambio():
+    indice, embeddings = IndiceLocal(16), EmbeddingsLocales(16)
+    assert _sincronizar(indice, embeddings, TEXTOS)["nuevos"] == 6
+    llamadas = embeddings.llamadas
+
+    # Misma entrada: nada que embeber ni eliminar
+    resumen = _sincronizar(indice, embeddings, TEXTOS)
+    assert (resumen["nuevos"], resumen["eliminados"], resumen["sin_cambios"]) == (0, 0, 6)
+    assert embeddings.llamadas == llamadas
+
+    # Un chunk modificado: se sube el nuevo id y se elimina el viejo
+    modificados = TEXTOS[:5] + ["Sección 5: ahora con certificado internacional."]
+    resumen = _sincronizar(indice, embeddings, modificados)
+    assert (resumen["nuevos"], resumen["eliminados"], resumen["sin_cambios"]) == (1, 1, 5)
+    prefijo = prefijo_documento(RUTA)
+    assert ids_indexados(indice, prefijo) == {id_chunk(prefijo, t) for t in modificados}
+
+
+def test_otros_documentos_no_se_tocan():
+    indice, embeddings = IndiceLocal(16), EmbeddingsLocales(16)
+    _sincronizar(indice, embeddings, ["Temario del curso de SQL."], ruta="Base_de_Conocimientos/SQL.pdf")
+    _sincronizar(indice, embeddings, TEXTOS)
+    _sincronizar(indice, embeddings, TEXTOS[:1])
+    assert len(ids_indexados(indice, "SQL.pdf#")) == 1
+    assert len(ids_indexados(indice, "SOBRE-DATAPATH.pdf#")) == 1
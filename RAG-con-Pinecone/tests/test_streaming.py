@@ -0,0 +1,109 @@
+"""
+Tests de ingesta.streaming: reanudar desde el checkpoint tras una carga
+interrumpida, descartarlo si el archivo cambió, y los ids sin prefijo que
+solo se eliminan con limpiar_legado.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import json
+import os
+
+import pytest
+from langchain_core.documents import Document
+
+from ingesta.carga_masiva import MotorCarga
+from ingesta.incremental import ids_indexados
+from ingesta.streaming import sincronizar_streaming
+from recuperacion.local import EmbeddingsLocales, IndiceLocal
+
+PAGINAS = [[f"Página {p}, oración {o} del temario." for o in range(3)] for p in range(6)]
+
+
+class SplitterPorOracion:
+    """Un chunk por oración (lo que importa es que sea determinista)."""
+
+    def split_documents(self, documentos):
+        return [Document(page_content=oracion, metadata=d.metadata)
+                for d in documentos for oracion in d.page_content.split("\n")]
+
+
+class IndiceQueSeCae(IndiceLocal):
+    """Falla (error permanente) después de cierto número de upserts."""
+
+    def __init__(self, dimension, upserts_antes_de_fallar=None):
+        super().__init__(dimension)
+        self.restantes = upserts_antes_de_fallar
+
+    def upsert(self, vectors, namespace="", **kwargs):
+        if self.restantes is not None:
+            if self.restantes == 0:
+                raise ValueError("conexión perdida a mitad de la carga")
+            self.restantes -= 1
+        return super().upsert(vectors, namespace, **kwargs)
+
+
+def _documento(tmp_path, paginas=PAGINAS):
+    ruta = tmp_path / "temario.pdf"
+    ruta.write_text(json.dumps(paginas), encoding="utf-8")
+    return str(ruta)
+
+
+def _paginas(paginas=PAGINAS):
+    return (Document(page_content="\n".join(p), metadata={"page": i}) for i, p in enumerate(paginas))
+
+
+def _sincronizar(indice, embeddings, ruta, checkpoints, paginas=PAGINAS, **kwargs):
+    motor = MotorCarga(indice, embeddings, lote_embeddings=3, hilos=1, rpm=0, tpm=0)
+    return sincronizar_streaming(indice, motor, ruta, _paginas(paginas), SplitterPorOracion(),
+                                 directorio_checkpoint=checkpoints, **kwargs)
+
+
+def test_reanuda_desde_el_checkpoint(tmp_path):
+    ruta, checkpoints = _documento(tmp_path), str(tmp_path / "checkpoints")
+    indice, embeddings = IndiceQueSeCae(8, upserts_antes_de_fallar=3), EmbeddingsLocales(8)
+
+    with pytest.raises(ValueError):
+        _sincronizar(indice, embeddings, ruta, checkpoints)
+    with open(os.path.join(checkpoints, "temario.pdf.json"), encoding="utf-8") as f:
+        pagina = json.load(f)["pagina"]
+    assert 0 <= pagina < len(PAGINAS) - 1
+    subidos = len(ids_indexados(indice))
+
+    indice.restantes = None
+    embebidos = embeddings.textos_embebidos
+    resumen = _sincronizar(indice, embeddings, ruta, checkpoints)
+    assert resumen["saltadas"] == pagina + 1
+    # Solo se embebe lo que no llegó a subirse
+    assert embeddings.textos_embebidos - embebidos == 18 - subidos
+    assert len(ids_indexados(indice)) == 18 and resumen["eliminados"] == 0
+    # Terminó bien: el checkpoint se borra
+    assert os.listdir(checkpoints) == []
+
+
+def test_checkpoint_de_otro_archivo_se_descarta(tmp_path):
+    ruta, checkpoints = _documento(tmp_path), str(tmp_path / "checkpoints")
+    indice = IndiceQueSeCae(8, upserts_antes_de_fallar=3)
+    with pytest.raises(ValueError):
+        _sincronizar(indice, EmbeddingsLocales(8), ruta, checkpoints)
+
+    # El PDF cambió: otra huella, se empieza de cero y desaparecen las páginas viejas
+    nuevas = [[f"Edición 2027, página {p}, oración {o}." for o in range(3)] for p in range(4)]
+    _documento(tmp_path, nuevas)
+    indice.restantes = None
+    resumen = _sincronizar(indice, EmbeddingsLocales(8), ruta, checkpoints, paginas=nuevas)
+    assert resumen["saltadas"] == 0 and resumen["nuevos"] == 12
+    assert len(ids_indexados(indice)) == 12
+
+
+def test_ids_sin_prefijo_solo_con_limpiar_legado(tmp_path):
+    ruta = _documento(tmp_path)
+    indice, embeddings = IndiceLocal(8), EmbeddingsLocales(8)
+    indice.upsert([{"id": "3f2a-aleatorio", "values": [1.0] * 8, "metadata": {"text": "carga antigua"}}])
+
+    resumen = _sincronizar(indice, embeddings, ruta, None)
+    assert resumen["legado"] == 0 and "3f2a-aleatorio" in ids_indexados(indice)
+
+    resumen = _sincronizar(indice, embeddings, ruta, None, limpiar_legado=True)
+    assert resumen["legado"] == 1 and "3f2a-aleatorio" not in ids_indexados(indice)
+    assert len(ids_indexados(indice)) == 18
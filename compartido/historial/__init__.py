@@ -0,0 +1,185 @@
+"""
+Módulo de Histórico de Conversación
+Backends intercambiables para guardar el historial de los agentes.
+
+Backends (variable HISTORIAL_BACKEND en .env):
+- postgres: PostgresChatMessageHistory, mensajes en JSONB (por defecto)
+- postgres_zstd: mensajes comprimidos con zstd + diccionario entrenado
+- sqlite: archivo SQLite local en modo WAL (sin servicios externos)
+
+Todos devuelven un BaseChatMessageHistory (messages, add_user_message,
+add_ai_message, clear), así que el agente no cambia según el backend.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import os
+from urllib.parse import quote_plus
+
+from dotenv import load_dotenv, find_dotenv
+
+load_dotenv(find_dotenv())
+
+HISTORIAL_BACKEND = os.getenv("HISTORIAL_BACKEND", "postgres").strip().lower()
+SQLITE_HISTORIAL_PATH = os.getenv("SQLITE_HISTORIAL_PATH", "chat_history.sqlite3")
+
+TABLA_HISTORIAL = "chat_history"
+TABLA_HISTORIAL_COMPRIMIDO = "chat_history_zstd"
+
+
+def obtener_database_url() -> str:
+    """Construye la URL de PostgreSQL a partir de las variables DB_* del .env."""
+    db_user = os.getenv("DB_USER")
+    db_password = os.getenv("DB_PASSWORD")
+    db_host = os.getenv("DB_HOST")
+    db_port = os.getenv("DB_PORT", "5432")
+    db_name = os.getenv("DB_NAME", "postgres")
+
+    if not all([db_user, db_password, db_host]):
+        raise ValueError(
+            "❌ Faltan variables de base de datos en .env\n"
+            "Requeridas: DB_USER, DB_PASSWORD, DB_HOST\n"
+            "(o usa HISTORIAL_BACKEND=sqlite para un historial local)"
+        )
+
+    return f"postgresql://{db_user}:{quote_plus(db_password)}@{db_host}:{db_port}/{db_name}"
+
+
+# ============================================
+# INTERFAZ DE BACKENDS
+# ============================================
+class BackendHistorial:
+    """
+    Interfaz de un backend de histórico.
+    Para agregar uno nuevo: heredar, implementar los métodos y registrarlo
+    con registrar_backend("nombre", Clase).
+    """
+
+    descripcion = ""
+
+    def crear_tablas(self) -> None:
+        """Crea las tablas necesarias (si no existen)."""
+        raise NotImplementedError
+
+    def obtener(self, session_id: str):
+        """Devuelve el BaseChatMessageHistory de una sesión."""
+        raise NotImplementedError
+
+    def almacen_turnos(self):
+        """Almacén de vectores de turnos para la memoria semántica (mismo backend)."""
+        raise NotImplementedError
+
+
+class BackendPostgres(BackendHistorial):
+    descripcion = "PostgreSQL (JSONB)"
+
+    def __init__(self):
+        self.database_url = obtener_database_url()
+
+    def crear_tablas(self) -> None:
+        import psycopg
+        from langchain_postgres import PostgresChatMessageHistory
+
+        with psycopg.connect(self.database_url) as sync_connection:
+            PostgresChatMessageHistory.create_tables(sync_connection, TABLA_HISTORIAL)
+
+    def obtener(self, session_id: str):
+        import psycopg
+        from langchain_postgres import PostgresChatMessageHistory
+
+        sync_connection = psycopg.connect(self.database_url)
+        return PostgresChatMessageHistory(
+            TABLA_HISTORIAL,
+            session_id,
+            sync_connection=sync_connection
+        )
+
+    def almacen_turnos(self):
+        from historial.memoria_semantica import AlmacenTurnosPostgres
+        return AlmacenTurnosPostgres(self.database_url)
+
+
+class BackendPostgresComprimido(BackendPostgres):
+    descripcion = "PostgreSQL (zstd)"
+
+    def crear_tablas(self) -> None:
+        import psycopg
+        from historial.comprimido import PostgresChatMessageHistoryComprimido
+
+        with psycopg.connect(self.database_url) as sync_connection:
+            PostgresChatMessageHistoryComprimido.create_tables(sync_connection, TABLA_HISTORIAL_COMPRIMIDO)
+
+    def obtener(self, session_id: str):
+        import psycopg
+        from historial.comprimido import PostgresChatMessageHistoryComprimido
+
+        sync_connection = psycopg.connect(self.database_url)
+        return PostgresChatMessageHistoryComprimido(
+            TABLA_HISTORIAL_COMPRIMIDO,
+            session_id,
+            sync_connection=sync_connection
+        )
+
+
+class BackendSQLite(BackendHistorial):
+    descripcion = "SQLite (WAL)"
+
+    def __init__(self, ruta: str = None):
+        self.ruta = ruta or SQLITE_HISTORIAL_PATH
+
+    def crear_tablas(self) -> None:
+        from historial.sqlite import SQLiteChatMessageHistory
+        SQLiteChatMessageHistory.create_tables(self.ruta, TABLA_HISTORIAL)
+
+    def obtener(self, session_id: str):
+        from historial.sqlite import SQLiteChatMessageHistory
+        return SQLiteChatMessageHistory(TABLA_HISTORIAL, session_id, ruta=self.ruta)
+
+    def almacen_turnos(self):
+        from historial.memoria_semantica import AlmacenTurnosSQLite
+        return AlmacenTurnosSQLite(self.ruta)
+
+
+BACKENDS = {
+    "postgres": BackendPostgres,
+    "postgres_zstd": BackendPostgresComprimido,
+    "sqlite": BackendSQLite,
+}
+
+_backend_activo = None
+
+
+def registrar_backend(nombre: str, clase) -> None:
+    """Registra un backend adicional seleccionable con HISTORIAL_BACKEND."""
+    BACKENDS[nombre] = clase
+
+
+def obtener_backend() -> BackendHistorial:
+    """Instancia (una sola vez) el backend indicado por HISTORIAL_BACKEND."""
+    global _backend_activo
+    if _backend_activo is None:
+        if HISTORIAL_BACKEND not in BACKENDS:
+            raise ValueError(
+                f"❌ HISTORIAL_BACKEND inválido: '{HISTORIAL_BACKEND}'\n"
+                f"Opciones: {', '.join(BACKENDS)}"
+            )
+        _backend_activo = BACKENDS[HISTORIAL_BACKEND]()
+    return _backend_activo
+
+
+def crear_tablas_historial() -> None:
+    """Crea la tabla del backend configurado (si no existe)."""
+    obtener_backend().crear_tablas()
+
+
+def obtener_historial(session_id: str):
+    """
+    Devuelve el historial de una sesión con el backend configurado.
+
+    Args:
+        session_id: UUID de la sesión
+
+    Returns:
+        BaseChatMessageHistory: Historial con messages, add_user_message, add_ai_message
+    """
+    return obtener_backend().obtener(session_id)
@@ -0,0 +1,197 @@
+"""
+Benchmark del Histórico de Conversación
+Compara la tabla JSONB (chat_history) con la tabla comprimida (chat_history_zstd):
+- Latencia de lectura del historial completo por sesión (p50 / p95)
+- Bytes transferidos por la red al leer cada sesión
+- Tamaño total de cada tabla en disco (incluye TOAST e índices)
+
+Con --backend sqlite mide el backend local sobre un archivo temporal con
+conversaciones sintéticas (no necesita PostgreSQL ni variables DB_*).
+
+Con --memoria mide la reducción de tokens de la memoria semántica frente a
+reenviar el historial completo (usa OpenAIEmbeddings, requiere OPENAI_API_KEY).
+
+Uso:
+    python -m historial.benchmark --sesiones 50
+    python -m historial.benchmark --backend sqlite
+    python -m historial.benchmark --memoria --turnos 30
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from historial import obtener_database_url, TABLA_HISTORIAL, TABLA_HISTORIAL_COMPRIMIDO
+
+
+def _percentil(valores: list, p: float) -> float:
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def _tamano_tabla(conexion, tabla: str) -> int:
+    with conexion.cursor() as cur:
+        cur.execute("SELECT pg_total_relation_size(%s)", (tabla,))
+        return cur.fetchone()[0]
+
+
+def _bytes_sesion(conexion, tabla: str, columna: str, session_id) -> int:
+    """Bytes que viajan por la red al leer la sesión (tamaño de la columna leída)."""
+    with conexion.cursor() as cur:
+        cur.execute(
+            f"SELECT COALESCE(SUM(octet_length({columna})), 0) FROM {tabla} WHERE session_id = %s",
+            (session_id,),
+        )
+        return cur.fetchone()[0]
+
+
+def ejecutar_benchmark(num_sesiones: int = 50, repeticiones: int = 5) -> None:
+    import psycopg
+    from langchain_postgres import PostgresChatMessageHistory
+    from historial.comprimido import PostgresChatMessageHistoryComprimido
+
+    conexion = psycopg.connect(obtener_database_url())
+
+    # Sesiones presentes en ambas tablas (ya migradas)
+    with conexion.cursor() as cur:
+        cur.execute(
+            f"SELECT DISTINCT h.session_id FROM {TABLA_HISTORIAL} h "
+            f"JOIN {TABLA_HISTORIAL_COMPRIMIDO} z ON z.session_id = h.session_id LIMIT %s",
+            (num_sesiones,),
+        )
+        sesiones = [fila[0] for fila in cur.fetchall()]
+
+    if not sesiones:
+        print("⚠️ No hay sesiones migradas. Ejecuta: python -m historial.comprimido migrar")
+        return
+
+    variantes = {
+        "JSONB (chat_history)": (
+            lambda s: PostgresChatMessageHistory(TABLA_HISTORIAL, str(s), sync_connection=conexion),
+            TABLA_HISTORIAL, "message::text",
+        ),
+        "zstd (chat_history_zstd)": (
+            lambda s: PostgresChatMessageHistoryComprimido(TABLA_HISTORIAL_COMPRIMIDO, str(s), sync_connection=conexion),
+            TABLA_HISTORIAL_COMPRIMIDO, "payload",
+        ),
+    }
+
+    print("=" * 70)
+    print(f"📊 Benchmark de histórico ({len(sesiones)} sesiones, {repeticiones} lecturas c/u)")
+    print("=" * 70)
+
+    for nombre, (crear_historial, tabla, columna) in variantes.items():
+        latencias = []
+        for session_id in sesiones:
+            historial = crear_historial(session_id)
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                historial.messages
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+        bytes_total = sum(_bytes_sesion(conexion, tabla, columna, s) for s in sesiones)
+        tamano = _tamano_tabla(conexion, tabla)
+
+        print(f"\n{nombre}")
+        print(f"   ⏱️  Lectura p50: {statistics.median(latencias):.2f} ms | p95: {_percentil(latencias, 0.95):.2f} ms")
+        print(f"   📦 Bytes transferidos (promedio por sesión): {bytes_total / len(sesiones):,.0f}")
+        print(f"   💾 Tamaño de la tabla: {tamano / 1024 / 1024:.2f} MB")
+
+    conexion.close()
+
+
+def ejecutar_benchmark_sqlite(num_sesiones: int = 50, repeticiones: int = 5,
+                              turnos_por_sesion: int = 10) -> None:
+    """Latencia de escritura y lectura del backend SQLite con conversaciones sintéticas."""
+    import uuid
+    from historial.sqlite import SQLiteChatMessageHistory
+
+    respuesta = (
+        "¡Claro! En DATAPATH tenemos programas de Data Engineering, Data Science e IA "
+        "con clases en vivo, proyectos reales y certificación. ¿Te cuento sobre horarios y precios?"
+    )
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "benchmark.sqlite3")
+        SQLiteChatMessageHistory.create_tables(ruta, TABLA_HISTORIAL)
+
+        escrituras, lecturas = [], []
+        for _ in range(num_sesiones):
+            historial = SQLiteChatMessageHistory(TABLA_HISTORIAL, str(uuid.uuid4()), ruta=ruta)
+            for i in range(turnos_por_sesion):
+                inicio = time.perf_counter()
+                historial.add_user_message(f"Pregunta {i}: ¿qué cursos tienen?")
+                historial.add_ai_message(respuesta)
+                escrituras.append((time.perf_counter() - inicio) * 1000)
+            for _ in range(repeticiones):
+                inicio = time.perf_counter()
+                historial.messages
+                lecturas.append((time.perf_counter() - inicio) * 1000)
+
+        print("=" * 70)
+        print(f"📊 Benchmark SQLite ({num_sesiones} sesiones x {turnos_por_sesion} turnos)")
+        print("=" * 70)
+        print(f"   ✍️  Escritura por turno p50: {statistics.median(escrituras):.3f} ms | "
+              f"p95: {_percentil(escrituras, 0.95):.3f} ms")
+        print(f"   ⏱️  Lectura de sesión p50: {statistics.median(lecturas):.3f} ms | "
+              f"p95: {_percentil(lecturas, 0.95):.3f} ms")
+        print(f"   💾 Tamaño del archivo: {os.path.getsize(ruta) / 1024:.1f} KB")
+
+
+def ejecutar_benchmark_memoria(turnos: int = 30) -> None:
+    """Tokens de historial enviados por turno: memoria semántica vs historial completo."""
+    import uuid
+    from langchain_core.messages import AIMessage, HumanMessage
+    from langchain_openai import OpenAIEmbeddings
+    from historial.memoria_semantica import AlmacenTurnosSQLite, MemoriaSemantica
+
+    temas = [
+        ("¿Cuánto cuesta el Diplomado en Data Engineering?",
+         "El Diplomado en Data Engineering tiene un precio de S/ 1,500 con opción de pago en cuotas."),
+        ("¿Qué horarios tienen los cursos de IA?",
+         "Los cursos de IA se dictan martes y jueves de 7 a 10 pm, en vivo por Zoom, con grabaciones."),
+        ("¿Quiénes son los docentes?",
+         "Nuestros docentes son profesionales de la industria con experiencia en AWS, Azure y GCP."),
+        ("¿Entregan certificado?",
+         "Sí, al aprobar el proyecto final recibes un certificado digital verificable de DATAPATH."),
+    ]
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "benchmark.sqlite3")
+        memoria = MemoriaSemantica(AlmacenTurnosSQLite(ruta), OpenAIEmbeddings(model="text-embedding-ada-002"))
+        session_id = str(uuid.uuid4())
+
+        historial = []
+        for i in range(turnos):
+            pregunta, respuesta = temas[i % len(temas)]
+            pregunta = f"{pregunta} (consulta {i})"
+            memoria.seleccionar(session_id, historial, pregunta)
+            memoria.registrar_turno(session_id, historial, pregunta, respuesta)
+            historial += [HumanMessage(content=pregunta), AIMessage(content=respuesta)]
+
+        print("=" * 70)
+        print(f"📊 Memoria semántica ({turnos} turnos, {memoria.turnos_recientes} recientes + top-{memoria.top_k})")
+        print("=" * 70)
+        print(f"   🧠 {memoria.resumen()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del histórico de conversación")
+    parser.add_argument("--backend", choices=["postgres", "sqlite"], default="postgres",
+                        help="postgres: JSONB vs zstd | sqlite: backend local")
+    parser.add_argument("--sesiones", type=int, default=50, help="Número de sesiones a leer")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Lecturas por sesión")
+    parser.add_argument("--memoria", action="store_true", help="Mide la reducción de tokens de la memoria semántica")
+    parser.add_argument("--turnos", type=int, default=30, help="Turnos simulados para --memoria")
+    args = parser.parse_args()
+
+    if args.memoria:
+        ejecutar_benchmark_memoria(args.turnos)
+    elif args.backend == "sqlite":
+        ejecutar_benchmark_sqlite(args.sesiones, args.repeticiones)
+    else:
+        ejecutar_benchmark(args.sesiones, args.repeticiones)
@@ -0,0 +1,412 @@
+"""
+Histórico Comprimido (PostgreSQL + zstd con diccionario entrenado)
+Guarda cada mensaje del historial comprimido y lo descomprime al leer.
+
+- Tabla chat_history_zstd: payload BYTEA en lugar de JSONB
+- Diccionario zstd entrenado con conversaciones reales (tabla chat_history_diccionarios)
+- Migración por lotes desde la tabla chat_history existente (reanudable)
+- Si zstandard no está instalado, usa zlib (stdlib) con diccionario precargado
+- Con pocas muestras para entrenar zstd, el diccionario nuevo es zlib precargado
+- El codec activo se cachea por proceso (por dict_id): el id del diccionario
+  activo se revisa cada HISTORIAL_CODEC_REVISION_SEGUNDOS, no en cada turno
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import json
+import os
+import threading
+import time
+import zlib
+from typing import List, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+try:
+    import zstandard
+except ImportError:
+    # Fallback a zlib si zstandard no está instalado
+    zstandard = None
+
+# ============================================
+# CONFIGURACIÓN
+# ============================================
+TABLA_DICCIONARIOS = "chat_history_diccionarios"
+
+NIVEL_COMPRESION = 9
+TAMANO_DICCIONARIO = 16 * 1024      # zstd: 16 KB suele bastar para mensajes cortos
+MAX_DICCIONARIO_ZLIB = 32 * 1024    # zlib: ventana máxima de 32 KB
+
+# zstd.train_dictionary falla con pocas muestras o muy cortas: debajo de esto se usa zlib
+MIN_MUESTRAS_ZSTD = 100
+MIN_BYTES_MUESTRAS_ZSTD = 4 * TAMANO_DICCIONARIO
+
+# Cada cuánto se vuelve a consultar qué diccionario está activo (0 = en cada historial)
+CODEC_REVISION_SEGUNDOS = float(os.getenv("HISTORIAL_CODEC_REVISION_SEGUNDOS", "60"))
+
+# Primer byte del payload: indica cómo se comprimió el mensaje
+CODEC_NINGUNO = 0
+CODEC_ZSTD = 1
+CODEC_ZLIB = 2
+
+# Diccionarios ya cargados desde la base de datos: {dict_id: (algoritmo, bytes)}
+_diccionarios: dict = {}
+
+# Codecs ya construidos por dict_id (None = sin diccionario) y el activo con su última revisión
+_codecs: dict = {}
+_activo = {"dict_id": None, "revisado": None}
+_lock_codec = threading.Lock()
+
+
+# ============================================
+# CODEC: COMPRIMIR / DESCOMPRIMIR MENSAJES
+# ============================================
+class CodecMensajes:
+    """
+    Comprime y descomprime mensajes serializados con message_to_dict.
+
+    Usa zstd si está disponible; si no, zlib con diccionario precargado (zdict).
+    El payload lleva un byte de cabecera con el codec para poder leer
+    mensajes escritos por cualquiera de los dos.
+    """
+
+    def __init__(self, dict_id: Optional[int] = None, diccionario: Optional[bytes] = None,
+                 algoritmo: Optional[str] = None):
+        self.dict_id = dict_id
+        self.diccionario = diccionario
+        self.algoritmo = algoritmo or ("zstd" if zstandard else "zlib")
+
+        if self.algoritmo == "zstd" and zstandard is None:
+            raise ImportError(
+                "❌ El diccionario activo es zstd pero falta el paquete zstandard\n"
+                "Instala con: pip install zstandard"
+            )
+
+        self._compresor = None
+        if self.algoritmo == "zstd":
+            dict_data = zstandard.ZstdCompressionDict(diccionario) if diccionario else None
+            self._compresor = zstandard.ZstdCompressor(level=NIVEL_COMPRESION, dict_data=dict_data)
+
+    def comprimir(self, mensaje: dict) -> bytes:
+        """Serializa un mensaje (dict) a JSON compacto y lo comprime."""
+        datos = json.dumps(mensaje, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if self.algoritmo == "zstd":
+            return bytes([CODEC_ZSTD]) + self._compresor.compress(datos)
+        compresor = zlib.compressobj(
+            NIVEL_COMPRESION, zlib.DEFLATED, -15, zdict=self.diccionario or b""
+        )
+        return bytes([CODEC_ZLIB]) + compresor.compress(datos) + compresor.flush()
+
+    @staticmethod
+    def descomprimir(payload: bytes, diccionario: Optional[bytes] = None) -> dict:
+        """Descomprime un payload (con su diccionario) y devuelve el mensaje como dict."""
+        payload = bytes(payload)
+        codec, cuerpo = payload[0], payload[1:]
+
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ImportError("❌ Mensaje comprimido con zstd: instala zstandard")
+            dict_data = zstandard.ZstdCompressionDict(diccionario) if diccionario else None
+            datos = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(cuerpo)
+        elif codec == CODEC_ZLIB:
+            descompresor = zlib.decompressobj(-15, zdict=diccionario or b"")
+            datos = descompresor.decompress(cuerpo) + descompresor.flush()
+        else:
+            datos = cuerpo
+
+        return json.loads(datos.decode("utf-8"))
+
+
+# ============================================
+# DICCIONARIOS (entrenamiento y carga)
+# ============================================
+def crear_tablas(conexion, tabla: str) -> None:
+    """Crea la tabla de mensajes comprimidos y la de diccionarios (si no existen)."""
+    with conexion.cursor() as cur:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {TABLA_DICCIONARIOS} (
+                id SERIAL PRIMARY KEY,
+                algoritmo TEXT NOT NULL,
+                diccionario BYTEA NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {tabla} (
+                id BIGSERIAL PRIMARY KEY,
+                session_id UUID NOT NULL,
+                dict_id INTEGER REFERENCES {TABLA_DICCIONARIOS} (id),
+                payload BYTEA NOT NULL,
+                origen_id BIGINT UNIQUE,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            )
+        """)
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{tabla}_session_id ON {tabla} (session_id)")
+        # Sin compresión TOAST: el payload ya viene comprimido
+        cur.execute(f"ALTER TABLE {tabla} ALTER COLUMN payload SET STORAGE EXTERNAL")
+    conexion.commit()
+
+
+def _cargar_diccionario(conexion, dict_id: int) -> tuple:
+    """Devuelve (algoritmo, bytes) de un diccionario, usando la caché del proceso."""
+    if dict_id not in _diccionarios:
+        with conexion.cursor() as cur:
+            cur.execute(
+                f"SELECT algoritmo, diccionario FROM {TABLA_DICCIONARIOS} WHERE id = %s",
+                (dict_id,),
+            )
+            fila = cur.fetchone()
+        if not fila:
+            raise ValueError(f"❌ No existe el diccionario de compresión {dict_id}")
+        _diccionarios[dict_id] = (fila[0], bytes(fila[1]))
+    return _diccionarios[dict_id]
+
+
+def _id_diccionario_activo(conexion) -> Optional[int]:
+    """Id del diccionario más reciente que este proceso puede usar (None si no hay)."""
+    algoritmos = ["zstd", "zlib"] if zstandard else ["zlib"]
+    with conexion.cursor() as cur:
+        cur.execute(
+            f"SELECT id FROM {TABLA_DICCIONARIOS} WHERE algoritmo = ANY(%s) ORDER BY id DESC LIMIT 1",
+            (algoritmos,),
+        )
+        fila = cur.fetchone()
+    return fila[0] if fila else None
+
+
+def codec_activo(conexion, max_antiguedad: float = CODEC_REVISION_SEGUNDOS) -> CodecMensajes:
+    """
+    Codec con el diccionario más reciente (o sin diccionario si aún no se entrenó).
+
+    El codec se construye una vez por dict_id y se reutiliza en el proceso; la
+    consulta del id activo se repite solo cuando la última tiene más de
+    max_antiguedad segundos, así que un turno normal no hace ningún viaje a la base.
+
+    Args:
+        conexion: Conexión psycopg
+        max_antiguedad: Segundos que se confía en el id activo cacheado (0 = revisar siempre)
+
+    Returns:
+        CodecMensajes: Codec del diccionario activo
+    """
+    with _lock_codec:
+        revisado = _activo["revisado"]
+        if revisado is not None and time.monotonic() - revisado < max_antiguedad:
+            return _codecs[_activo["dict_id"]]
+
+    dict_id = _id_diccionario_activo(conexion)
+    codec = _codecs.get(dict_id)
+    if codec is None:
+        if dict_id is None:
+            codec = CodecMensajes()
+        else:
+            algoritmo, diccionario = _cargar_diccionario(conexion, dict_id)
+            codec = CodecMensajes(dict_id=dict_id, diccionario=diccionario, algoritmo=algoritmo)
+
+    with _lock_codec:
+        codec = _codecs.setdefault(dict_id, codec)
+        _activo.update(dict_id=dict_id, revisado=time.monotonic())
+    return codec
+
+
+def _invalidar_codec_activo() -> None:
+    """La próxima llamada a codec_activo vuelve a consultar el id activo."""
+    with _lock_codec:
+        _activo["revisado"] = None
+
+
+def _diccionario_zlib(muestras: Sequence[bytes]) -> bytes:
+    """
+    Construye un diccionario para zlib concatenando mensajes de muestra.
+    zlib busca coincidencias hacia atrás, así que lo más reciente va al final.
+    """
+    diccionario = b""
+    for muestra in muestras:
+        if len(diccionario) + len(muestra) > MAX_DICCIONARIO_ZLIB:
+            break
+        diccionario = muestra + diccionario
+    return diccionario
+
+
+def entrenar_diccionario(conexion, tabla_origen: str = "chat_history",
+                         max_muestras: int = 5000) -> int:
+    """
+    Entrena un diccionario de compresión con mensajes reales y lo guarda.
+
+    Args:
+        conexion: Conexión psycopg
+        tabla_origen: Tabla con mensajes en JSONB (formato PostgresChatMessageHistory)
+        max_muestras: Número máximo de mensajes recientes a usar como muestra
+
+    Returns:
+        int: ID del nuevo diccionario
+    """
+    with conexion.cursor() as cur:
+        cur.execute(
+            f"SELECT message::text FROM {tabla_origen} ORDER BY id DESC LIMIT %s",
+            (max_muestras,),
+        )
+        # Misma serialización compacta que usa CodecMensajes.comprimir
+        muestras = [
+            json.dumps(json.loads(fila[0]), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            for fila in cur.fetchall()
+        ]
+
+    if not muestras:
+        raise ValueError(f"❌ No hay mensajes en {tabla_origen} para entrenar el diccionario")
+
+    algoritmo, diccionario = "zlib", None
+    if zstandard:
+        total_bytes = sum(len(m) for m in muestras)
+        if len(muestras) < MIN_MUESTRAS_ZSTD or total_bytes < MIN_BYTES_MUESTRAS_ZSTD:
+            print(f"⚠️  Solo {len(muestras)} mensajes ({total_bytes / 1024:.1f} KB): no alcanzan para "
+                  f"entrenar zstd (mínimo {MIN_MUESTRAS_ZSTD} y {MIN_BYTES_MUESTRAS_ZSTD // 1024} KB), "
+                  f"se usa un diccionario zlib precargado")
+        else:
+            try:
+                diccionario = zstandard.train_dictionary(TAMANO_DICCIONARIO, muestras).as_bytes()
+                algoritmo = "zstd"
+            except zstandard.ZstdError as e:
+                print(f"⚠️  zstd no pudo entrenar el diccionario ({e}): se usa un diccionario zlib precargado")
+    if diccionario is None:
+        diccionario = _diccionario_zlib(muestras)
+
+    with conexion.cursor() as cur:
+        cur.execute(
+            f"INSERT INTO {TABLA_DICCIONARIOS} (algoritmo, diccionario) VALUES (%s, %s) RETURNING id",
+            (algoritmo, diccionario),
+        )
+        dict_id = cur.fetchone()[0]
+    conexion.commit()
+    _invalidar_codec_activo()
+
+    print(f"✓ Diccionario {algoritmo} #{dict_id} entrenado con {len(muestras)} mensajes "
+          f"({len(diccionario) / 1024:.1f} KB)")
+    return dict_id
+
+
+# ============================================
+# MIGRACIÓN DESDE chat_history
+# ============================================
+def migrar_desde_tabla(conexion, tabla_origen: str = "chat_history",
+                       tabla_destino: str = "chat_history_zstd", lote: int = 1000) -> int:
+    """
+    Copia los mensajes de la tabla JSONB a la tabla comprimida, por lotes.
+
+    Es reanudable: cada fila guarda su origen_id y se continúa desde el último
+    migrado. La tabla original no se modifica (se puede borrar al validar).
+
+    Returns:
+        int: Número de mensajes migrados en esta ejecución
+    """
+    crear_tablas(conexion, tabla_destino)
+    codec = codec_activo(conexion, max_antiguedad=0)
+
+    with conexion.cursor() as cur:
+        cur.execute(f"SELECT COALESCE(MAX(origen_id), 0) FROM {tabla_destino}")
+        ultimo_id = cur.fetchone()[0]
+
+    migrados = 0
+    while True:
+        with conexion.cursor() as cur:
+            cur.execute(
+                f"SELECT id, session_id, message, created_at FROM {tabla_origen} "
+                f"WHERE id > %s ORDER BY id LIMIT %s",
+                (ultimo_id, lote),
+            )
+            filas = cur.fetchall()
+            if not filas:
+                break
+
+            cur.executemany(
+                f"INSERT INTO {tabla_destino} (session_id, dict_id, payload, origen_id, created_at) "
+                f"VALUES (%s, %s, %s, %s, %s) ON CONFLICT (origen_id) DO NOTHING",
+                [
+                    (session_id, codec.dict_id, codec.comprimir(mensaje), origen_id, creado)
+                    for origen_id, session_id, mensaje, creado in filas
+                ],
+            )
+        conexion.commit()
+
+        ultimo_id = filas[-1][0]
+        migrados += len(filas)
+        print(f"   ↪ {migrados} mensajes migrados (hasta id {ultimo_id})")
+
+    print(f"✓ Migración completa: {migrados} mensajes {tabla_origen} → {tabla_destino}")
+    return migrados
+
+
+# ============================================
+# HISTORIAL COMPATIBLE CON PostgresChatMessageHistory
+# ============================================
+class PostgresChatMessageHistoryComprimido(BaseChatMessageHistory):
+    """
+    Historial de chat en PostgreSQL con mensajes comprimidos.
+    Misma interfaz que PostgresChatMessageHistory (messages, add_messages, clear).
+    """
+
+    def __init__(self, table_name: str, session_id: str, *, sync_connection):
+        self._tabla = table_name
+        self._session_id = session_id
+        self._conexion = sync_connection
+        self._codec = codec_activo(sync_connection)
+
+    @staticmethod
+    def create_tables(connection, table_name: str) -> None:
+        crear_tablas(connection, table_name)
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        with self._conexion.cursor() as cur:
+            cur.execute(
+                f"SELECT dict_id, payload FROM {self._tabla} WHERE session_id = %s ORDER BY id",
+                (self._session_id,),
+            )
+            filas = cur.fetchall()
+
+        mensajes = []
+        for dict_id, payload in filas:
+            diccionario = _cargar_diccionario(self._conexion, dict_id)[1] if dict_id else None
+            mensajes.append(CodecMensajes.descomprimir(payload, diccionario))
+        return messages_from_dict(mensajes)
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        filas = [
+            (self._session_id, self._codec.dict_id, self._codec.comprimir(message_to_dict(m)))
+            for m in messages
+        ]
+        with self._conexion.cursor() as cur:
+            cur.executemany(
+                f"INSERT INTO {self._tabla} (session_id, dict_id, payload) VALUES (%s, %s, %s)",
+                filas,
+            )
+        self._conexion.commit()
+
+    def clear(self) -> None:
+        with self._conexion.cursor() as cur:
+            cur.execute(f"DELETE FROM {self._tabla} WHERE session_id = %s", (self._session_id,))
+        self._conexion.commit()
+
+
+# ============================================
+# CLI: python -m historial.comprimido entrenar|migrar
+# ============================================
+if __name__ == "__main__":
+    import argparse
+    import psycopg
+    from historial import obtener_database_url, TABLA_HISTORIAL, TABLA_HISTORIAL_COMPRIMIDO
+
+    parser = argparse.ArgumentParser(description="Histórico comprimido con zstd")
+    parser.add_argument("accion", choices=["entrenar", "migrar"],
+                        help="entrenar: nuevo diccionario | migrar: copiar chat_history a la tabla comprimida")
+    parser.add_argument("--lote", type=int, default=1000, help="Mensajes por lote al migrar")
+    parser.add_argument("--muestras", type=int, default=5000, help="Mensajes usados para entrenar")
+    args = parser.parse_args()
+
+    with psycopg.connect(obtener_database_url()) as conexion:
+        crear_tablas(conexion, TABLA_HISTORIAL_COMPRIMIDO)
+        if args.accion == "entrenar":
+            entrenar_diccionario(conexion, TABLA_HISTORIAL, max_muestras=args.muestras)
+        else:
+            migrar_desde_tabla(conexion, TABLA_HISTORIAL, TABLA_HISTORIAL_COMPRIMIDO, lote=args.lote)
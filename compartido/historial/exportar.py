@@ -0,0 +1,311 @@
+"""
+Exportación Masiva del Histórico a Parquet / Arrow
+Lee la tabla de historial por lotes de ids (keyset, memoria constante), cada lote
+en su propia transacción corta, y escribe archivos columnares particionados por fecha:
+
+    salida/fecha=2026-01-15/part-000000001234.parquet
+
+- Incremental: guarda una marca de agua (último id exportado) en _watermark.json
+- Margen de seguridad: solo se exportan filas con más de EXPORT_MARGEN_SEGUNDOS de
+  antigüedad, para que la marca de agua no salte ids de transacciones aún sin confirmar
+- No afecta al webhook ni al VACUUM: conexión propia, transacciones READ ONLY cortas
+  (una por lote, sin snapshot abierto durante toda la exportación), statement_timeout,
+  pausa opcional entre lotes y posibilidad de leer desde una réplica (EXPORT_DATABASE_URL)
+
+Uso:
+    python -m historial.exportar --salida exportaciones/
+    python -m historial.exportar --salida exportaciones/ --formato arrow --pausa-ms 50
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from historial import obtener_database_url, TABLA_HISTORIAL, TABLA_HISTORIAL_COMPRIMIDO
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Réplica de solo lectura opcional para no cargar la base principal
+EXPORT_DATABASE_URL = os.getenv("EXPORT_DATABASE_URL")
+
+# Antigüedad mínima de una fila para exportarla (segundos). Los ids se asignan al
+# insertar pero se ven al confirmar: sin margen, un id menor confirmado tarde
+# quedaría por debajo de la marca de agua y no se exportaría nunca
+EXPORT_MARGEN_SEGUNDOS = float(os.getenv("EXPORT_MARGEN_SEGUNDOS", "30"))
+
+ARCHIVO_WATERMARK = "_watermark.json"
+MAX_ARCHIVOS_ABIERTOS = 4   # Particiones (fechas) abiertas a la vez
+
+ESQUEMA = None
+if pa is not None:
+    ESQUEMA = pa.schema([
+        ("id", pa.int64()),
+        ("session_id", pa.string()),
+        ("tipo", pa.string()),
+        ("contenido", pa.string()),
+        ("mensaje", pa.string()),
+        ("created_at", pa.timestamp("us", tz="UTC")),
+    ])
+
+
+# ============================================
+# MARCA DE AGUA (exportación incremental)
+# ============================================
+def leer_watermark(salida: str, tabla: str) -> int:
+    """Último id exportado de la tabla (0 si nunca se exportó)."""
+    ruta = os.path.join(salida, ARCHIVO_WATERMARK)
+    if not os.path.exists(ruta):
+        return 0
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f).get(tabla, {}).get("ultimo_id", 0)
+
+
+def guardar_watermark(salida: str, tabla: str, ultimo_id: int) -> None:
+    """Guarda la marca de agua de forma atómica (escribe y renombra)."""
+    ruta = os.path.join(salida, ARCHIVO_WATERMARK)
+    marcas = {}
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            marcas = json.load(f)
+    marcas[tabla] = {"ultimo_id": ultimo_id, "actualizado": datetime.now(timezone.utc).isoformat()}
+
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(marcas, f, indent=2)
+    os.replace(temporal, ruta)
+
+
+# ============================================
+# ESCRITORES POR PARTICIÓN (fecha)
+# ============================================
+class EscritorParticionado:
+    """
+    Mantiene un escritor abierto por fecha y escribe cada lote como row group.
+    Como los ids crecen con el tiempo, casi siempre hay una sola fecha abierta;
+    si se superan MAX_ARCHIVOS_ABIERTOS se cierra la más antigua.
+    """
+
+    def __init__(self, salida: str, formato: str, desde_id: int):
+        self.salida = salida
+        self.formato = formato
+        self.desde_id = desde_id
+        self._escritores = {}
+        self.archivos = []
+
+    def _escritor(self, fecha: str):
+        if fecha not in self._escritores:
+            if len(self._escritores) >= MAX_ARCHIVOS_ABIERTOS:
+                mas_antigua = next(iter(self._escritores))
+                self._escritores.pop(mas_antigua).close()
+
+            carpeta = os.path.join(self.salida, f"fecha={fecha}")
+            os.makedirs(carpeta, exist_ok=True)
+            extension = "parquet" if self.formato == "parquet" else "arrow"
+            # Si la fecha se reabre en la misma corrida, se usa un sufijo distinto
+            sufijo = sum(1 for a in self.archivos if a.startswith(carpeta))
+            nombre = f"part-{self.desde_id:012d}" + (f"-{sufijo}" if sufijo else "") + f".{extension}"
+            ruta = os.path.join(carpeta, nombre)
+
+            if self.formato == "parquet":
+                escritor = pq.ParquetWriter(ruta, ESQUEMA, compression="zstd")
+            else:
+                escritor = pa.ipc.new_file(ruta, ESQUEMA)
+            self._escritores[fecha] = escritor
+            self.archivos.append(ruta)
+        return self._escritores[fecha]
+
+    def escribir(self, filas: list) -> None:
+        """filas: [(id, session_id, tipo, contenido, mensaje, created_at), ...]"""
+        por_fecha = {}
+        for fila in filas:
+            fecha = fila[5].astimezone(timezone.utc).strftime("%Y-%m-%d")
+            por_fecha.setdefault(fecha, []).append(fila)
+
+        for fecha, grupo in por_fecha.items():
+            columnas = list(zip(*grupo))
+            tabla = pa.Table.from_arrays(
+                [pa.array(columna, type=campo.type) for columna, campo in zip(columnas, ESQUEMA)],
+                schema=ESQUEMA,
+            )
+            self._escritor(fecha).write_table(tabla)
+
+    def cerrar(self) -> None:
+        for escritor in self._escritores.values():
+            escritor.close()
+        self._escritores.clear()
+
+
+# ============================================
+# EXPORTACIÓN
+# ============================================
+def _fila(id_, session_id, mensaje: dict, creado) -> tuple:
+    """Fila de salida a partir de un mensaje en formato message_to_dict."""
+    contenido = mensaje.get("data", {}).get("content")
+    return (id_, str(session_id), mensaje.get("type"), contenido,
+            json.dumps(mensaje, ensure_ascii=False), creado)
+
+
+def _consulta_y_decodificador(tabla: str, database_url: str):
+    """Consulta a ejecutar y función que convierte cada fila leída en fila de salida."""
+    if tabla == TABLA_HISTORIAL_COMPRIMIDO:
+        import psycopg
+        from historial.comprimido import CodecMensajes, _cargar_diccionario
+
+        # Conexión aparte (autocommit) para los diccionarios, fuera de las transacciones de lectura
+        conexion_diccionarios = psycopg.connect(database_url, autocommit=True)
+
+        def decodificar(fila):
+            id_, session_id, dict_id, payload, creado = fila
+            diccionario = _cargar_diccionario(conexion_diccionarios, dict_id)[1] if dict_id else None
+            return _fila(id_, session_id, CodecMensajes.descomprimir(payload, diccionario), creado)
+
+        consulta = (f"SELECT id, session_id, dict_id, payload, created_at FROM {tabla} "
+                    f"WHERE id > %s AND id <= %s ORDER BY id LIMIT %s")
+    else:
+        def decodificar(fila):
+            return _fila(*fila)
+
+        consulta = (f"SELECT id, session_id, message, created_at FROM {tabla} "
+                    f"WHERE id > %s AND id <= %s ORDER BY id LIMIT %s")
+    return consulta, decodificar
+
+
+def calcular_tope(conexion, tabla: str, margen_segundos: float = EXPORT_MARGEN_SEGUNDOS) -> int:
+    """
+    Último id que se puede exportar sin riesgo de saltar filas.
+
+    Un INSERT toma su id al ejecutarse pero la fila se ve al confirmar: mientras
+    una transacción lenta no confirma su id 100, el 101 ya puede estar visible.
+    Si la marca de agua pasara a 101, el 100 no se exportaría nunca. Por eso el
+    tope es el mayor id de las filas con más de margen_segundos de antigüedad.
+
+    Args:
+        conexion: Conexión psycopg (autocommit)
+        tabla: Tabla de historial
+        margen_segundos: Antigüedad mínima de las filas a exportar
+
+    Returns:
+        int: Mayor id exportable (0 si no hay filas con esa antigüedad)
+    """
+    with conexion.transaction(), conexion.cursor() as cur:
+        cur.execute("SET TRANSACTION READ ONLY")
+        cur.execute(
+            f"SELECT max(id) FROM {tabla} WHERE created_at < now() - make_interval(secs => %s)",
+            (margen_segundos,),
+        )
+        fila = cur.fetchone()
+    return (fila[0] if fila else None) or 0
+
+
+def leer_lotes(conexion, consulta: str, desde_id: int, hasta_id: int, lote: int):
+    """
+    Lee las filas con id en (desde_id, hasta_id] por keyset, un lote por transacción.
+
+    Cada lote es una transacción READ ONLY corta: no queda un snapshot abierto
+    durante toda la exportación reteniendo el VACUUM de la tabla.
+
+    Args:
+        conexion: Conexión psycopg (autocommit)
+        consulta: SELECT con parámetros (id >, id <=, LIMIT), ordenado por id
+        desde_id: Marca de agua (último id ya exportado)
+        hasta_id: Tope de calcular_tope
+        lote: Filas por lote
+
+    Yields:
+        list: Filas del lote, la primera columna es el id
+    """
+    ultimo_id = desde_id
+    while ultimo_id < hasta_id:
+        with conexion.transaction(), conexion.cursor() as cur:
+            # Solo lectura y con límite de tiempo por sentencia: nunca bloquea al webhook
+            cur.execute("SET TRANSACTION READ ONLY")
+            cur.execute("SET LOCAL statement_timeout = '60s'")
+            cur.execute("SET LOCAL work_mem = '4MB'")
+            cur.execute(consulta, (ultimo_id, hasta_id, lote))
+            filas = cur.fetchall()
+        if not filas:
+            break
+        yield filas
+        ultimo_id = filas[-1][0]
+
+
+def exportar(salida: str, tabla: str = TABLA_HISTORIAL, formato: str = "parquet",
+             lote: int = 5000, pausa_ms: int = 0, completo: bool = False,
+             margen_segundos: float = EXPORT_MARGEN_SEGUNDOS) -> int:
+    """
+    Exporta los mensajes nuevos de la tabla de historial a archivos columnares.
+
+    Args:
+        salida: Carpeta de destino
+        tabla: chat_history o chat_history_zstd
+        formato: parquet o arrow (Arrow IPC)
+        lote: Filas por lote (memoria usada ≈ un lote)
+        pausa_ms: Pausa entre lotes para ceder recursos a la base de datos
+        completo: Ignora la marca de agua y exporta todo
+        margen_segundos: Antigüedad mínima de las filas exportadas (ver calcular_tope)
+
+    Returns:
+        int: Número de mensajes exportados
+    """
+    if pa is None:
+        raise ImportError("❌ Falta pyarrow para exportar. Instala con: pip install pyarrow")
+
+    import psycopg
+
+    os.makedirs(salida, exist_ok=True)
+    desde_id = 0 if completo else leer_watermark(salida, tabla)
+    database_url = EXPORT_DATABASE_URL or obtener_database_url()
+
+    consulta, decodificar = _consulta_y_decodificador(tabla, database_url)
+    conexion = psycopg.connect(database_url, autocommit=True, application_name="exportar_historial")
+    escritor = EscritorParticionado(salida, formato, desde_id + 1)
+    exportados, ultimo_id = 0, desde_id
+
+    try:
+        hasta_id = calcular_tope(conexion, tabla, margen_segundos)
+        print(f"📤 Exportando {tabla} con id en ({desde_id}, {hasta_id}] "
+              f"({formato}, lotes de {lote}, margen {margen_segundos:g} s)")
+
+        for filas in leer_lotes(conexion, consulta, desde_id, hasta_id, lote):
+            escritor.escribir([decodificar(f) for f in filas])
+            exportados += len(filas)
+            ultimo_id = filas[-1][0]
+            print(f"   ↪ {exportados} mensajes (hasta id {ultimo_id})")
+            if pausa_ms:
+                time.sleep(pausa_ms / 1000)
+    finally:
+        escritor.cerrar()
+        conexion.close()
+
+    # La marca de agua solo avanza si todos los archivos se cerraron bien
+    if exportados:
+        guardar_watermark(salida, tabla, ultimo_id)
+
+    print(f"✓ {exportados} mensajes exportados en {len(escritor.archivos)} archivo(s)")
+    return exportados
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta el histórico a Parquet/Arrow particionado por fecha")
+    parser.add_argument("--salida", required=True, help="Carpeta de destino")
+    parser.add_argument("--tabla", default=TABLA_HISTORIAL,
+                        choices=[TABLA_HISTORIAL, TABLA_HISTORIAL_COMPRIMIDO])
+    parser.add_argument("--formato", default="parquet", choices=["parquet", "arrow"])
+    parser.add_argument("--lote", type=int, default=5000, help="Filas por lote")
+    parser.add_argument("--pausa-ms", type=int, default=0, help="Pausa entre lotes (ms)")
+    parser.add_argument("--completo", action="store_true", help="Ignora la marca de agua")
+    parser.add_argument("--margen-segundos", type=float, default=EXPORT_MARGEN_SEGUNDOS,
+                        help="Antigüedad mínima de las filas a exportar")
+    args = parser.parse_args()
+
+    exportar(args.salida, args.tabla, args.formato, args.lote, args.pausa_ms, args.completo,
+             args.margen_segundos)
@@ -0,0 +1,263 @@
+"""
+Memoria Semántica de Largo Plazo
+En lugar de reenviar todo el historial en cada turno, se envían:
+- Los últimos N turnos (contexto inmediato)
+- Los top-k turnos anteriores más parecidos al mensaje actual
+
+Los embeddings de los turnos (usuario + DataBot) se guardan en una tabla aparte,
+chat_history_vectores, en el mismo backend que el historial. Se calculan solo
+cuando la sesión supera MEMORIA_TURNOS_RECIENTES turnos: una conversación corta
+no llama nunca a la API de embeddings.
+
+Variables en .env:
+- MEMORIA_SEMANTICA=1             Activa la memoria semántica (por defecto desactivada)
+- MEMORIA_TURNOS_RECIENTES=3      Turnos recientes que siempre se incluyen
+- MEMORIA_TOP_K=3                 Turnos antiguos relevantes a recuperar
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import os
+import threading
+from typing import List, Sequence
+
+import numpy as np
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from utilidades.tokens import contar_tokens
+
+MEMORIA_SEMANTICA = os.getenv("MEMORIA_SEMANTICA", "0").strip().lower() in ("1", "true", "si", "sí")
+MEMORIA_TURNOS_RECIENTES = int(os.getenv("MEMORIA_TURNOS_RECIENTES", "3"))
+MEMORIA_TOP_K = int(os.getenv("MEMORIA_TOP_K", "3"))
+
+TABLA_VECTORES = "chat_history_vectores"
+
+
+def _normalizar(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norma = np.linalg.norm(vector)
+    return vector / norma if norma > 0 else vector
+
+
+def agrupar_turnos(mensajes: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Agrupa el historial en turnos: cada HumanMessage abre un turno nuevo."""
+    turnos = []
+    for msg in mensajes:
+        if isinstance(msg, HumanMessage) or not turnos:
+            turnos.append([msg])
+        else:
+            turnos[-1].append(msg)
+    return turnos
+
+
+def texto_turno(turno: Sequence[BaseMessage]) -> str:
+    """Texto que se convierte en embedding para un turno."""
+    partes = []
+    for msg in turno:
+        if isinstance(msg, HumanMessage):
+            partes.append(f"Usuario: {msg.content}")
+        elif isinstance(msg, AIMessage):
+            partes.append(f"DataBot: {msg.content}")
+    return "\n".join(partes)
+
+
+# ============================================
+# ALMACENES DE VECTORES (tabla chat_history_vectores)
+# ============================================
+class AlmacenTurnosSQLite:
+    """
+    Vectores de turnos en el mismo archivo SQLite del historial.
+    Cada operación usa la conexión del hilo que la llama (conectar es por hilo):
+    la instancia se comparte entre los hilos que atienden conversaciones.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+
+    def _conexion(self):
+        from historial.sqlite import conectar
+        return conectar(self.ruta)
+
+    def crear_tablas(self) -> None:
+        conexion = self._conexion()
+        with conexion:
+            conexion.execute(f"""
+                CREATE TABLE IF NOT EXISTS {TABLA_VECTORES} (
+                    session_id TEXT NOT NULL,
+                    turno INTEGER NOT NULL,
+                    embedding BLOB NOT NULL,
+                    PRIMARY KEY (session_id, turno)
+                )
+            """)
+
+    def guardar(self, session_id: str, filas: Sequence[tuple]) -> None:
+        """filas: [(turno, vector_float32_normalizado), ...]"""
+        conexion = self._conexion()
+        with conexion:
+            conexion.executemany(
+                f"INSERT OR IGNORE INTO {TABLA_VECTORES} (session_id, turno, embedding) VALUES (?, ?, ?)",
+                [(str(session_id), turno, vector.tobytes()) for turno, vector in filas],
+            )
+
+    def cargar(self, session_id: str) -> dict:
+        filas = self._conexion().execute(
+            f"SELECT turno, embedding FROM {TABLA_VECTORES} WHERE session_id = ?",
+            (str(session_id),),
+        ).fetchall()
+        return {turno: np.frombuffer(blob, dtype=np.float32) for turno, blob in filas}
+
+
+class AlmacenTurnosPostgres:
+    """
+    Vectores de turnos en PostgreSQL, en la misma base que chat_history.
+    Una conexión psycopg no admite consultas simultáneas desde varios hilos:
+    cada operación toma el lock de la instancia.
+    """
+
+    def __init__(self, database_url: str):
+        import psycopg
+        self._conexion = psycopg.connect(database_url, autocommit=True)
+        self._lock = threading.Lock()
+
+    def crear_tablas(self) -> None:
+        with self._lock, self._conexion.cursor() as cur:
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {TABLA_VECTORES} (
+                    session_id UUID NOT NULL,
+                    turno INTEGER NOT NULL,
+                    embedding BYTEA NOT NULL,
+                    PRIMARY KEY (session_id, turno)
+                )
+            """)
+
+    def guardar(self, session_id: str, filas: Sequence[tuple]) -> None:
+        with self._lock, self._conexion.cursor() as cur:
+            cur.executemany(
+                f"INSERT INTO {TABLA_VECTORES} (session_id, turno, embedding) VALUES (%s, %s, %s) "
+                f"ON CONFLICT (session_id, turno) DO NOTHING",
+                [(session_id, turno, vector.tobytes()) for turno, vector in filas],
+            )
+
+    def cargar(self, session_id: str) -> dict:
+        with self._lock, self._conexion.cursor() as cur:
+            cur.execute(
+                f"SELECT turno, embedding FROM {TABLA_VECTORES} WHERE session_id = %s",
+                (session_id,),
+            )
+            return {turno: np.frombuffer(blob, dtype=np.float32) for turno, blob in cur.fetchall()}
+
+
+# ============================================
+# MEMORIA SEMÁNTICA
+# ============================================
+class MemoriaSemantica:
+    """
+    Selecciona qué parte del historial se envía al modelo en cada turno.
+
+    Args:
+        almacen: Almacén de vectores (AlmacenTurnosSQLite / AlmacenTurnosPostgres)
+        embeddings: Modelo de embeddings de LangChain (ej. OpenAIEmbeddings)
+        turnos_recientes: Turnos finales que siempre se incluyen
+        top_k: Turnos antiguos más relevantes a recuperar
+    """
+
+    def __init__(self, almacen, embeddings, turnos_recientes: int = MEMORIA_TURNOS_RECIENTES,
+                 top_k: int = MEMORIA_TOP_K):
+        self.almacen = almacen
+        self.embeddings = embeddings
+        self.turnos_recientes = turnos_recientes
+        self.top_k = top_k
+        self.estadisticas = {"turnos": 0, "tokens_historial_completo": 0, "tokens_enviados": 0}
+        self.almacen.crear_tablas()
+
+    def _vectores_turnos(self, session_id: str, turnos: Sequence[Sequence[BaseMessage]]) -> dict:
+        """Vectores de los turnos indicados; los que falten se calculan en un solo lote."""
+        vectores = self.almacen.cargar(session_id)
+        faltantes = [i for i in range(len(turnos)) if i not in vectores]
+        if faltantes:
+            nuevos = self.embeddings.embed_documents([texto_turno(turnos[i]) for i in faltantes])
+            filas = [(i, _normalizar(v)) for i, v in zip(faltantes, nuevos)]
+            self.almacen.guardar(session_id, filas)
+            vectores.update(dict(filas))
+        return vectores
+
+    def seleccionar(self, session_id: str, mensajes: Sequence[BaseMessage],
+                    mensaje_usuario: str) -> List[BaseMessage]:
+        """
+        Devuelve los mensajes del historial a enviar: turnos relevantes + recientes.
+
+        Args:
+            session_id: UUID de la sesión
+            mensajes: Historial completo (history.messages)
+            mensaje_usuario: Mensaje actual, usado como consulta semántica
+
+        Returns:
+            list: Mensajes seleccionados, en orden cronológico
+        """
+        turnos = agrupar_turnos(mensajes)
+        antiguos = turnos[:-self.turnos_recientes] if self.turnos_recientes else turnos
+
+        if len(antiguos) <= self.top_k:
+            # Historial corto: se envía completo, sin llamar a embeddings
+            seleccion = list(mensajes)
+        elif self.top_k <= 0:
+            seleccion = [msg for turno in turnos[len(antiguos):] for msg in turno]
+        else:
+            vectores = self._vectores_turnos(session_id, antiguos)
+            consulta = _normalizar(self.embeddings.embed_query(mensaje_usuario))
+            matriz = np.stack([vectores[i] for i in range(len(antiguos))])
+            scores = matriz @ consulta
+            relevantes = sorted(np.argpartition(-scores, self.top_k - 1)[:self.top_k])
+
+            seleccion = []
+            for i in relevantes:
+                seleccion.extend(antiguos[i])
+            for turno in turnos[len(antiguos):]:
+                seleccion.extend(turno)
+
+        self._registrar_ahorro(mensajes, seleccion)
+        return seleccion
+
+    def registrar_turno(self, session_id: str, mensajes_previos: Sequence[BaseMessage],
+                        mensaje_usuario: str, respuesta: str) -> None:
+        """
+        Guarda el embedding del turno recién completado, solo si hace falta.
+
+        Mientras la sesión no supere turnos_recientes, seleccionar envía todo el
+        historial y nunca busca por similitud: no se llama a embeddings. Al
+        superarla se embeben en un solo lote este turno y los anteriores que
+        aún no tengan vector.
+
+        Args:
+            session_id: UUID de la sesión
+            mensajes_previos: Historial completo ANTES de este turno
+            mensaje_usuario: Mensaje del usuario en este turno
+            respuesta: Respuesta final de DataBot
+        """
+        turnos = agrupar_turnos(mensajes_previos)
+        turnos.append([HumanMessage(content=mensaje_usuario), AIMessage(content=respuesta)])
+        if len(turnos) <= self.turnos_recientes:
+            return
+        self._vectores_turnos(session_id, turnos)
+
+    def _registrar_ahorro(self, completo: Sequence[BaseMessage], enviado: Sequence[BaseMessage]) -> None:
+        tokens_completo = sum(contar_tokens(str(m.content)) for m in completo)
+        tokens_enviado = sum(contar_tokens(str(m.content)) for m in enviado)
+        self.estadisticas["turnos"] += 1
+        self.estadisticas["tokens_historial_completo"] += tokens_completo
+        self.estadisticas["tokens_enviados"] += tokens_enviado
+
+        if tokens_completo:
+            reduccion = 1 - tokens_enviado / tokens_completo
+            print(f"   🧠 Memoria: {len(enviado)}/{len(completo)} mensajes, "
+                  f"{tokens_enviado:,} de {tokens_completo:,} tokens de historial (-{reduccion:.0%})")
+
+    def resumen(self) -> str:
+        """Reducción acumulada de tokens frente a reenviar el historial completo."""
+        completo = self.estadisticas["tokens_historial_completo"]
+        enviado = self.estadisticas["tokens_enviados"]
+        reduccion = 1 - enviado / completo if completo else 0.0
+        return (
+            f"Turnos: {self.estadisticas['turnos']} | "
+            f"Tokens de historial: {enviado:,} enviados vs {completo:,} completos (-{reduccion:.0%})"
+        )
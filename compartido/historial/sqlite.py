@@ -0,0 +1,92 @@
+"""
+Histórico en SQLite (modo WAL)
+Backend local para despliegues de un solo nodo, pruebas y benchmarks:
+sin PostgreSQL, sin red, lecturas de historial en menos de un milisegundo.
+
+- Misma interfaz que PostgresChatMessageHistory
+- Mismo formato de mensaje (message_to_dict en JSON)
+- Una conexión por hilo, reutilizada entre turnos
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import json
+import sqlite3
+import threading
+from typing import List, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+# Conexiones abiertas por hilo: {ruta: sqlite3.Connection}
+_local = threading.local()
+
+
+def conectar(ruta: str) -> sqlite3.Connection:
+    """
+    Devuelve la conexión SQLite del hilo actual para la ruta indicada.
+    La primera vez activa WAL: lectores y escritor no se bloquean entre sí.
+    """
+    conexiones = getattr(_local, "conexiones", None)
+    if conexiones is None:
+        conexiones = _local.conexiones = {}
+
+    if ruta not in conexiones:
+        conexion = sqlite3.connect(ruta, timeout=5.0)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")   # Seguro con WAL, evita fsync por commit
+        conexion.execute("PRAGMA busy_timeout=5000")
+        conexiones[ruta] = conexion
+    return conexiones[ruta]
+
+
+class SQLiteChatMessageHistory(BaseChatMessageHistory):
+    """
+    Historial de chat en un archivo SQLite.
+    Misma interfaz que PostgresChatMessageHistory (messages, add_messages, clear).
+    """
+
+    def __init__(self, table_name: str, session_id: str, *, ruta: str):
+        self._tabla = table_name
+        self._session_id = str(session_id)
+        self._conexion = conectar(ruta)
+
+    @staticmethod
+    def create_tables(ruta: str, table_name: str) -> None:
+        conexion = conectar(ruta)
+        with conexion:
+            conexion.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table_name} (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+                )
+            """)
+            conexion.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_session_id ON {table_name} (session_id, id)"
+            )
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        filas = self._conexion.execute(
+            f"SELECT message FROM {self._tabla} WHERE session_id = ? ORDER BY id",
+            (self._session_id,),
+        ).fetchall()
+        return messages_from_dict([json.loads(fila[0]) for fila in filas])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        with self._conexion:
+            self._conexion.executemany(
+                f"INSERT INTO {self._tabla} (session_id, message) VALUES (?, ?)",
+                [
+                    (self._session_id, json.dumps(message_to_dict(m), ensure_ascii=False))
+                    for m in messages
+                ],
+            )
+
+    def clear(self) -> None:
+        with self._conexion:
+            self._conexion.execute(
+                f"DELETE FROM {self._tabla} WHERE session_id = ?", (self._session_id,)
+            )
@@ -0,0 +1,19 @@
+"""
+Módulo de Recuperación (RAG)
+Estructuras en memoria para buscar en la base de conocimientos sin depender
+de la red en cada consulta.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+from recuperacion.ann import IndiceIVF
+from recuperacion.cuantizacion import IndiceCuantizado
+from recuperacion.lexico import IndiceBM25
+from recuperacion.matriz import MatrizEmbeddings
+
+__all__ = [
+    "IndiceBM25",
+    "IndiceCuantizado",
+    "IndiceIVF",
+    "MatrizEmbeddings",
+]
@@ -0,0 +1,197 @@
+"""
+Almacén de Embeddings en Disco (direccionado por contenido)
+Cada re-ejecución de la ingesta volvía a pagar los embeddings de chunks
+idénticos. El almacén guarda cada vector una sola vez, con clave
+(modelo, sha256 del texto):
+
+- <directorio>/<modelo>/vectores.f32   float32 crudos, una fila por texto (se lee con mmap)
+- <directorio>/<modelo>/claves.bin     16 bytes de sha256 por fila (mismo orden)
+- <directorio>/<modelo>/meta.json      modelo y dimensión
+
+Solo se agrega al final: primero el vector, luego la clave. Si el proceso se
+corta a mitad de una escritura, al abrir se descarta la fila incompleta.
+Un solo proceso escritor a la vez (la ingesta); lectores sin límite.
+
+EmbeddingsEnDisco envuelve un modelo de LangChain: embed_documents solo envía
+a la API los textos que no están en el almacén. Re-ingestar un corpus sin
+cambios hace cero llamadas a la API.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+BYTES_CLAVE = 16
+
+
+def clave_texto(texto: str) -> bytes:
+    """Clave de contenido: primeros 16 bytes del sha256 del texto."""
+    return hashlib.sha256(texto.encode("utf-8")).digest()[:BYTES_CLAVE]
+
+
+class AlmacenEmbeddings:
+    """
+    Vectores float32 en disco indexados por clave de contenido.
+
+    Args:
+        directorio: Carpeta raíz del almacén
+        modelo: Modelo de embeddings (cada modelo tiene su subcarpeta)
+    """
+
+    def __init__(self, directorio: str, modelo: str):
+        self.modelo = modelo
+        self.carpeta = os.path.join(directorio, re.sub(r"[^A-Za-z0-9._-]+", "_", modelo))
+        os.makedirs(self.carpeta, exist_ok=True)
+        self.ruta_vectores = os.path.join(self.carpeta, "vectores.f32")
+        self.ruta_claves = os.path.join(self.carpeta, "claves.bin")
+        self.ruta_meta = os.path.join(self.carpeta, "meta.json")
+        self._lock = threading.Lock()
+        self._filas: Dict[bytes, int] = {}
+        self._mapa = None
+        self.dimension = None
+
+        if os.path.exists(self.ruta_meta):
+            with open(self.ruta_meta, encoding="utf-8") as f:
+                self.dimension = json.load(f)["dimension"]
+            self._abrir()
+
+    def _abrir(self) -> None:
+        """Carga las claves y recorta filas incompletas de una escritura interrumpida."""
+        bytes_fila = self.dimension * 4
+        filas_vectores = os.path.getsize(self.ruta_vectores) // bytes_fila if os.path.exists(self.ruta_vectores) else 0
+        claves = np.fromfile(self.ruta_claves, dtype=np.uint8) if os.path.exists(self.ruta_claves) else np.empty(0, np.uint8)
+        filas = min(filas_vectores, len(claves) // BYTES_CLAVE)
+
+        if os.path.exists(self.ruta_vectores) and os.path.getsize(self.ruta_vectores) != filas * bytes_fila:
+            os.truncate(self.ruta_vectores, filas * bytes_fila)
+        if len(claves) != filas * BYTES_CLAVE:
+            os.truncate(self.ruta_claves, filas * BYTES_CLAVE)
+
+        claves = claves[:filas * BYTES_CLAVE].reshape(filas, BYTES_CLAVE)
+        self._filas = {fila.tobytes(): i for i, fila in enumerate(claves)}
+
+    def __len__(self) -> int:
+        return len(self._filas)
+
+    def __contains__(self, clave: bytes) -> bool:
+        return clave in self._filas
+
+    def _vectores(self) -> np.ndarray:
+        """mmap de solo lectura; se vuelve a mapear cuando el archivo creció."""
+        filas = len(self._filas)
+        if self._mapa is None or self._mapa.shape[0] < filas:
+            self._mapa = np.memmap(self.ruta_vectores, dtype=np.float32, mode="r",
+                                   shape=(filas, self.dimension)) if filas else None
+        return self._mapa
+
+    def obtener(self, claves: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        """Vector de cada clave (None si no está)."""
+        with self._lock:
+            filas = [self._filas.get(clave) for clave in claves]
+            if all(fila is None for fila in filas):
+                return [None] * len(claves)
+            vectores = self._vectores()
+            return [np.array(vectores[fila]) if fila is not None else None for fila in filas]
+
+    def guardar(self, claves: Sequence[bytes], vectores: Sequence[Sequence[float]]) -> None:
+        """Agrega los vectores cuyas claves aún no están en el almacén."""
+        with self._lock:
+            nuevas, filas = [], []
+            for clave, vector in zip(claves, vectores):
+                if clave not in self._filas and clave not in nuevas:
+                    nuevas.append(clave)
+                    filas.append(vector)
+            if not nuevas:
+                return
+
+            matriz = np.asarray(filas, dtype=np.float32)
+            if self.dimension is None:
+                self.dimension = matriz.shape[1]
+                with open(self.ruta_meta, "w", encoding="utf-8") as f:
+                    json.dump({"modelo": self.modelo, "dimension": self.dimension}, f)
+            elif matriz.shape[1] != self.dimension:
+                raise ValueError(f"❌ Dimensión {matriz.shape[1]} distinta a la del almacén ({self.dimension})")
+
+            # Primero los vectores y después las claves: una clave nunca apunta a una fila incompleta
+            with open(self.ruta_vectores, "ab") as f:
+                f.write(matriz.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.ruta_claves, "ab") as f:
+                f.write(b"".join(nuevas))
+                f.flush()
+                os.fsync(f.fileno())
+
+            inicio = len(self._filas)
+            for i, clave in enumerate(nuevas):
+                self._filas[clave] = inicio + i
+
+    @property
+    def bytes_en_disco(self) -> int:
+        return sum(os.path.getsize(r) for r in (self.ruta_vectores, self.ruta_claves) if os.path.exists(r))
+
+
+class EmbeddingsEnDisco(Embeddings):
+    """
+    Modelo de embeddings con almacén en disco: solo los textos que no están
+    en el almacén van a la API (una petición para todos los faltantes).
+
+    Args:
+        embeddings: Modelo de embeddings (ej. OpenAIEmbeddings)
+        almacen: AlmacenEmbeddings del mismo modelo
+    """
+
+    def __init__(self, embeddings, almacen: AlmacenEmbeddings):
+        self.embeddings = embeddings
+        self.almacen = almacen
+        self._lock = threading.Lock()
+        self.estadisticas = {"aciertos": 0, "fallos": 0, "llamadas_api": 0}
+
+    def textos_faltantes(self, textos: Sequence[str]) -> List[str]:
+        """Textos que sí irían a la API (para descontar solo esos del rate limit)."""
+        return [texto for texto in dict.fromkeys(textos) if clave_texto(texto) not in self.almacen]
+
+    def embed_documents(self, textos: List[str]) -> List[List[float]]:
+        claves = [clave_texto(texto) for texto in textos]
+        guardados = self.almacen.obtener(claves)
+        faltantes = {}                          # clave -> texto (sin repetidos)
+        for clave, texto, vector in zip(claves, textos, guardados):
+            if vector is None:
+                faltantes.setdefault(clave, texto)
+
+        nuevos = {}
+        if faltantes:
+            vectores = self.embeddings.embed_documents(list(faltantes.values()))
+            self.almacen.guardar(list(faltantes), vectores)
+            nuevos = dict(zip(faltantes, vectores))
+
+        with self._lock:
+            self.estadisticas["aciertos"] += len(textos) - sum(v is None for v in guardados)
+            self.estadisticas["fallos"] += len(faltantes)
+            self.estadisticas["llamadas_api"] += 1 if faltantes else 0
+        return [
+            vector.tolist() if vector is not None else list(nuevos[clave])
+            for clave, vector in zip(claves, guardados)
+        ]
+
+    def embed_query(self, texto: str) -> List[float]:
+        return self.embed_documents([texto])[0]
+
+    def resumen(self) -> str:
+        e = self.estadisticas
+        total = e["aciertos"] + e["fallos"]
+        if total == 0:
+            return "Almacén de embeddings: sin textos"
+        return (
+            f"Almacén de embeddings: {e['aciertos']}/{total} textos desde disco ({e['aciertos'] / total:.0%}) | "
+            f"{e['llamadas_api']} llamadas a la API | {len(self.almacen):,} vectores "
+            f"({self.almacen.bytes_en_disco / 1024 ** 2:.1f} MB)"
+        )
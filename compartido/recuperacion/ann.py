@@ -0,0 +1,254 @@
+"""
+Índice Aproximado (ANN) tipo IVF en NumPy
+Para bases de conocimiento grandes (catálogo completo de cursos) el escaneo
+exacto deja de escalar. IVF = Inverted File:
+
+1. k-means esférico agrupa los vectores en n_listas centroides
+2. Cada vector se guarda en la lista de su centroide más cercano
+3. Una consulta solo revisa las n_sondas listas más cercanas
+
+- n_listas: más listas = listas más cortas (≈ sqrt(n) es un buen inicio)
+- n_sondas: más sondas = mayor recall y mayor latencia (n_sondas = n_listas es exacto)
+
+Cada lista es una MatrizEmbeddings, así que insertar / eliminar es incremental.
+Mientras el índice no está entrenado los vectores quedan en una lista "pendiente"
+que se busca de forma exacta.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import json
+import os
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from recuperacion.matriz import MatrizEmbeddings, normalizar, seleccionar_top_k
+
+ANN_LISTAS = int(os.getenv("ANN_LISTAS", "0"))          # 0 = automático (≈ sqrt(n))
+ANN_SONDAS = int(os.getenv("ANN_SONDAS", "8"))
+
+SIN_LISTA = -1
+
+
+def kmeans_esferico(vectores: np.ndarray, k: int, iteraciones: int = 20,
+                    semilla: int = 42) -> np.ndarray:
+    """
+    k-means sobre vectores normalizados usando similitud coseno.
+
+    Returns:
+        np.ndarray: Centroides (k, d) normalizados
+    """
+    rng = np.random.default_rng(semilla)
+    centroides = vectores[rng.choice(len(vectores), size=k, replace=False)].copy()
+
+    for _ in range(iteraciones):
+        asignacion = np.argmax(vectores @ centroides.T, axis=1)
+        nuevos = np.zeros_like(centroides)
+        np.add.at(nuevos, asignacion, vectores)
+        conteo = np.bincount(asignacion, minlength=k)
+
+        # Listas vacías: se reinician con un vector al azar
+        vacias = np.where(conteo == 0)[0]
+        if len(vacias):
+            nuevos[vacias] = vectores[rng.choice(len(vectores), size=len(vacias), replace=False)]
+
+        nuevos = normalizar(nuevos)
+        if np.allclose(nuevos, centroides, atol=1e-5):
+            break
+        centroides = nuevos
+
+    return centroides.astype(np.float32)
+
+
+class IndiceIVF:
+    """
+    Índice IVF con la misma interfaz que MatrizEmbeddings (ids, upsert, eliminar, buscar).
+
+    Args:
+        n_listas: Número de listas / centroides (0 = automático al entrenar)
+        n_sondas: Listas que se revisan por consulta
+    """
+
+    def __init__(self, n_listas: int = ANN_LISTAS, n_sondas: int = ANN_SONDAS):
+        self.n_listas = n_listas
+        self.n_sondas = n_sondas
+        self.centroides: Optional[np.ndarray] = None
+        self.listas: List[MatrizEmbeddings] = []
+        self.pendientes = MatrizEmbeddings()
+        self._lista_de_id = {}                  # id -> índice de lista (SIN_LISTA = pendiente)
+        self._lock = threading.RLock()
+        # Versión de la tabla de origen (recuperacion/versiones.py); se guarda con el índice
+        self.version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._lista_de_id)
+
+    @property
+    def ids(self) -> List:
+        return list(self._lista_de_id)
+
+    @property
+    def entrenado(self) -> bool:
+        return self.centroides is not None
+
+    # ============================================
+    # CONSTRUCCIÓN
+    # ============================================
+    def entrenar(self, max_muestras_por_lista: int = 256) -> None:
+        """
+        Entrena los centroides con todos los vectores actuales y los redistribuye.
+        Llamar después de la carga inicial (o para rebalancear tras muchas inserciones).
+        """
+        with self._lock:
+            ids, contenidos, metadatos, matrices = [], [], [], []
+            for matriz in self.listas + [self.pendientes]:
+                ids += matriz.ids
+                contenidos += matriz.contenidos
+                metadatos += matriz.metadatos
+                if len(matriz):
+                    matrices.append(matriz.matriz)
+            if not ids:
+                return
+
+            vectores = np.concatenate(matrices)
+            n_listas = self.n_listas or max(1, int(np.sqrt(len(ids))))
+            n_listas = min(n_listas, len(ids))
+
+            rng = np.random.default_rng(0)
+            muestra = vectores
+            if len(vectores) > n_listas * max_muestras_por_lista:
+                muestra = vectores[rng.choice(len(vectores), n_listas * max_muestras_por_lista, replace=False)]
+
+            self.centroides = kmeans_esferico(muestra, n_listas)
+            self.listas = [MatrizEmbeddings(vectores.shape[1]) for _ in range(n_listas)]
+            self.pendientes = MatrizEmbeddings()
+            self._lista_de_id = {}
+            self._insertar(ids, contenidos, vectores, metadatos)
+            print(f"   🧭 Índice IVF entrenado: {len(ids)} vectores en {n_listas} listas")
+
+    def _insertar(self, ids, contenidos, vectores, metadatos) -> None:
+        asignacion = np.argmax(vectores @ self.centroides.T, axis=1)
+        for lista in np.unique(asignacion):
+            filas = np.where(asignacion == lista)[0]
+            self.listas[lista].upsert(
+                [ids[i] for i in filas],
+                [contenidos[i] for i in filas],
+                vectores[filas],
+                [metadatos[i] for i in filas],
+            )
+            for i in filas:
+                self._lista_de_id[ids[i]] = int(lista)
+
+    def upsert(self, ids: Sequence, contenidos: Sequence[str], vectores,
+               metadatos: Optional[Sequence[dict]] = None) -> None:
+        """Inserta o reemplaza vectores en la lista de su centroide más cercano."""
+        if len(ids) == 0:
+            return
+        vectores = normalizar(vectores)
+        metadatos = list(metadatos or [{}] * len(ids))
+
+        with self._lock:
+            # Un id actualizado puede cambiar de lista: se elimina primero
+            self.eliminar([id_ for id_ in ids if id_ in self._lista_de_id])
+
+            if not self.entrenado:
+                self.pendientes.upsert(ids, contenidos, vectores, metadatos)
+                for id_ in ids:
+                    self._lista_de_id[id_] = SIN_LISTA
+            else:
+                self._insertar(list(ids), list(contenidos), vectores, metadatos)
+
+    def eliminar(self, ids: Sequence) -> None:
+        with self._lock:
+            for id_ in ids:
+                lista = self._lista_de_id.pop(id_, None)
+                if lista is None:
+                    continue
+                destino = self.pendientes if lista == SIN_LISTA else self.listas[lista]
+                destino.eliminar([id_])
+
+    # ============================================
+    # BÚSQUEDA
+    # ============================================
+    def buscar(self, query_vector, top_k: int = 5, filtro: Optional[dict] = None,
+               n_sondas: Optional[int] = None) -> List[dict]:
+        """
+        Top-k aproximado: revisa solo las n_sondas listas más cercanas (+ pendientes).
+
+        Returns:
+            list: [{'id', 'content', 'similitud'}, ...] de mayor a menor similitud
+        """
+        consulta = normalizar(query_vector)
+        n_sondas = n_sondas or self.n_sondas
+
+        with self._lock:
+            candidatos = self.pendientes.buscar(consulta, top_k, filtro)
+            if self.entrenado:
+                sondas = seleccionar_top_k(self.centroides @ consulta, n_sondas)
+                for lista in sondas:
+                    candidatos += self.listas[lista].buscar(consulta, top_k, filtro)
+
+        candidatos.sort(key=lambda doc: doc['similitud'], reverse=True)
+        return candidatos[:top_k]
+
+    # ============================================
+    # PERSISTENCIA
+    # ============================================
+    def guardar(self, ruta: str) -> None:
+        """
+        Guarda el índice en ruta.npz (centroides + vectores) y ruta.json (ids, textos
+        y la versión de la tabla de origen). Escritura atómica: archivos temporales + os.replace.
+        """
+        with self._lock:
+            matrices = [self.pendientes] + self.listas
+            tamanos = np.array([len(m) for m in matrices], dtype=np.int64)
+            dimension = next((m.dimension for m in matrices if m.dimension), 0)
+            vectores = np.concatenate(
+                [m.matriz for m in matrices if len(m)] or [np.empty((0, dimension), dtype=np.float32)]
+            )
+            datos = {
+                "n_listas": len(self.listas),
+                "n_sondas": self.n_sondas,
+                "version": self.version,
+                "ids": [id_ for m in matrices for id_ in m.ids],
+                "contenidos": [c for m in matrices for c in m.contenidos],
+                "metadatos": [md for m in matrices for md in m.metadatos],
+            }
+            centroides = self.centroides if self.entrenado else np.empty((0, dimension), dtype=np.float32)
+
+        with open(ruta + ".tmp.npz", "wb") as f:
+            np.savez(f, centroides=centroides, vectores=vectores, tamanos=tamanos)
+        with open(ruta + ".tmp.json", "w", encoding="utf-8") as f:
+            json.dump(datos, f, ensure_ascii=False)
+        os.replace(ruta + ".tmp.npz", ruta + ".npz")
+        os.replace(ruta + ".tmp.json", ruta + ".json")
+
+    @classmethod
+    def cargar(cls, ruta: str) -> "IndiceIVF":
+        """Carga un índice guardado con guardar()."""
+        arrays = np.load(ruta + ".npz")
+        with open(ruta + ".json", encoding="utf-8") as f:
+            datos = json.load(f)
+
+        indice = cls(n_listas=datos["n_listas"], n_sondas=datos["n_sondas"])
+        indice.version = datos.get("version")
+        if len(arrays["centroides"]):
+            indice.centroides = arrays["centroides"]
+            dimension = indice.centroides.shape[1]
+            indice.listas = [MatrizEmbeddings(dimension) for _ in range(datos["n_listas"])]
+
+        inicio = 0
+        for posicion, tamano in enumerate(arrays["tamanos"]):
+            fin = inicio + int(tamano)
+            if tamano:
+                lista = SIN_LISTA if posicion == 0 else posicion - 1
+                destino = indice.pendientes if lista == SIN_LISTA else indice.listas[lista]
+                ids = datos["ids"][inicio:fin]
+                destino.upsert(ids, datos["contenidos"][inicio:fin],
+                               arrays["vectores"][inicio:fin], datos["metadatos"][inicio:fin])
+                for id_ in ids:
+                    indice._lista_de_id[id_] = lista
+            inicio = fin
+        return indice
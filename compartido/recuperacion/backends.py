@@ -0,0 +1,211 @@
+"""
+Backends de Recuperación (interfaz única para buscar_datapath)
+Las tools de Pinecone y de Supabase buscan a través del mismo recuperador;
+el backend se elige con una variable de entorno y el resto del agente
+(ensamblado de contexto, presupuesto de tokens, benchmarks) no cambia:
+
+- pinecone: índice de Pinecone (cliente con pool de conexiones); busca en el
+  namespace de la versión activa (reindexación blue/green, recuperacion/versiones.py)
+- supabase: pgvector vía RPC (sql/match_documents.sql); la tool de Supabase
+  registra su versión con todos los modos de SUPABASE_MODO_BUSQUEDA
+- local: NumPy sobre el snapshot mmap (sin servicios: edge / pruebas / benchmarks)
+
+Variables en .env:
+- RECUPERACION_BACKEND=         pinecone | supabase | local (vacío = el del proyecto)
+
+Uso (latencia de búsqueda de un backend):
+    python -m recuperacion.backends --backend local --repeticiones 200
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import os
+from typing import List, Optional, Sequence
+
+from recuperacion.multiconsulta import POOL_CONEXIONES, BuscadorMulticonsulta
+from recuperacion.versiones import VersionActiva, leer_activo_pinecone
+
+RECUPERACION_BACKEND = os.getenv("RECUPERACION_BACKEND", "").strip().lower()
+PINECONE_POOL_CONEXIONES = int(os.getenv("PINECONE_POOL_CONEXIONES", str(POOL_CONEXIONES)))
+FUNCION_BUSQUEDA_SUPABASE = "match_documents_asistente_de_ventas"
+
+
+# ============================================
+# INTERFAZ DE BACKENDS
+# ============================================
+class Recuperador:
+    """
+    Interfaz de un backend de recuperación.
+    Para agregar uno nuevo: heredar, implementar buscar y registrarlo
+    con registrar_backend("nombre", Clase).
+    """
+
+    descripcion = ""
+
+    def buscar(self, query_embedding: List[float], top_k: int = 5,
+               filtro: Optional[dict] = None) -> List[dict]:
+        """Top-k chunks: [{'content', 'similitud', ...}, ...] de mayor a menor similitud."""
+        raise NotImplementedError
+
+    def buscar_lote(self, vectores: Sequence[List[float]], top_k: int = 5,
+                    filtro: Optional[dict] = None) -> List[List[dict]]:
+        """Varias consultas (por defecto una tras otra; los backends remotos las paralelizan)."""
+        return [self.buscar(vector, top_k, filtro) for vector in vectores]
+
+
+class RecuperadorPinecone(Recuperador):
+    """
+    Backend Pinecone. Sin namespace fijo sigue al puntero de versiones: al
+    activarse una versión nueva las búsquedas pasan a su namespace sin reiniciar.
+    """
+
+    descripcion = "Pinecone"
+
+    def __init__(self, indice=None, namespace: Optional[str] = None, text_key: str = "text"):
+        if indice is None:
+            from pinecone import Pinecone
+
+            api_key = os.getenv("PINECONE_API_KEY")
+            if not api_key:
+                raise ValueError("❌ Falta variable PINECONE_API_KEY en .env")
+            nombre = os.getenv("PINECONE_INDEX_NAME", "langchain-pinecone-asistente-de-ventas")
+            indice = Pinecone(api_key=api_key).Index(nombre, pool_threads=PINECONE_POOL_CONEXIONES)
+        self.indice = indice
+        self.version = None
+        if namespace is None:
+            self.version = VersionActiva(lambda: leer_activo_pinecone(indice))
+            namespace = self.version.version or ""
+        self._buscador = BuscadorMulticonsulta(indice, None, namespace, text_key, PINECONE_POOL_CONEXIONES)
+        if self.version is not None:
+            self.version.suscribir(self._cambiar_namespace)
+
+    def _cambiar_namespace(self, version: Optional[str]) -> None:
+        self._buscador.namespace = version or ""
+        notificar_version(version or "")
+
+    def buscar(self, query_embedding, top_k=5, filtro=None):
+        if self.version is not None:
+            self.version.actual()
+        return self._buscador.consultar(query_embedding, top_k, filtro)
+
+    def buscar_lote(self, vectores, top_k=5, filtro=None):
+        if self.version is not None:
+            self.version.actual()
+        return self._buscador.buscar_vectores(vectores, top_k, filtro)
+
+
+class RecuperadorSupabase(Recuperador):
+    descripcion = "Supabase (pgvector RPC)"
+
+    def __init__(self, cliente=None, funcion: str = FUNCION_BUSQUEDA_SUPABASE):
+        if cliente is None:
+            from supabase import create_client
+
+            url, key = os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY")
+            if not all([url, key]):
+                raise ValueError(
+                    "❌ Faltan variables de Supabase en .env\n"
+                    "Requeridas: SUPABASE_URL, SUPABASE_SERVICE_KEY"
+                )
+            cliente = create_client(url, key)
+        self.cliente = cliente
+        self.funcion = funcion
+
+    def buscar(self, query_embedding, top_k=5, filtro=None):
+        result = self.cliente.rpc(self.funcion, {
+            "query_embedding": query_embedding,
+            "match_count": top_k,
+            "filter": filtro or {},
+        }).execute()
+        return [
+            {'content': doc.get('content', ''), 'similitud': doc['similarity']}
+            for doc in (result.data or [])
+        ]
+
+
+class RecuperadorLocal(Recuperador):
+    descripcion = "Local (NumPy + snapshot mmap)"
+
+    def __init__(self, directorio: str = None):
+        from recuperacion.snapshot import SnapshotEmbeddings
+        self.snapshot = SnapshotEmbeddings(directorio or os.getenv("SNAPSHOT_DIR", "snapshots"))
+
+    def buscar(self, query_embedding, top_k=5, filtro=None):
+        return self.snapshot.buscar(query_embedding, top_k, filtro)
+
+
+BACKENDS = {
+    "pinecone": RecuperadorPinecone,
+    "supabase": RecuperadorSupabase,
+    "local": RecuperadorLocal,
+}
+
+_recuperadores = {}
+_suscriptores_version = []
+
+
+def registrar_backend(nombre: str, clase) -> None:
+    """Registra (o reemplaza) un backend seleccionable con RECUPERACION_BACKEND."""
+    BACKENDS[nombre] = clase
+    _recuperadores.pop(nombre, None)
+
+
+def al_cambiar_version(callback) -> None:
+    """
+    Registra una función que recibe la versión nueva cuando un backend pasa a
+    otra versión del índice (ej. cache_resultados.nueva_version).
+    """
+    _suscriptores_version.append(callback)
+
+
+def notificar_version(version: str) -> None:
+    for callback in list(_suscriptores_version):
+        callback(version)
+
+
+def nombre_backend(predeterminado: str) -> str:
+    """Backend que se usará: RECUPERACION_BACKEND o el predeterminado del proyecto."""
+    return RECUPERACION_BACKEND or predeterminado
+
+
+def obtener_recuperador(predeterminado: str = "local") -> Recuperador:
+    """Instancia (una sola vez por nombre) el backend indicado por RECUPERACION_BACKEND."""
+    nombre = nombre_backend(predeterminado)
+    if nombre not in BACKENDS:
+        raise ValueError(
+            f"❌ RECUPERACION_BACKEND inválido: '{nombre}'\n"
+            f"Opciones: {', '.join(BACKENDS)}"
+        )
+    if nombre not in _recuperadores:
+        _recuperadores[nombre] = BACKENDS[nombre]()
+        print(f"🔎 Recuperación: {_recuperadores[nombre].descripcion}")
+    return _recuperadores[nombre]
+
+
+if __name__ == "__main__":
+    import numpy as np
+    from dotenv import load_dotenv, find_dotenv
+
+    from recuperacion.benchmark import _medir, _reportar
+
+    load_dotenv(find_dotenv())
+
+    parser = argparse.ArgumentParser(description="Latencia de búsqueda de un backend de recuperación")
+    parser.add_argument("--backend", choices=list(BACKENDS), default=RECUPERACION_BACKEND or "local")
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    recuperador = BACKENDS[args.backend]()
+    consultas = np.random.default_rng(42).standard_normal((16, args.dimension)).astype(np.float32).tolist()
+    contador = iter(range(10 ** 9))
+
+    print("=" * 70)
+    print(f"📊 Backend {recuperador.descripcion} (top-{args.top_k})")
+    print("=" * 70)
+    _reportar("buscar", _medir(
+        lambda: recuperador.buscar(consultas[next(contador) % len(consultas)], args.top_k), args.repeticiones))
+    _reportar("buscar_lote (16 consultas)", _medir(
+        lambda: recuperador.buscar_lote(consultas, args.top_k), max(3, args.repeticiones // 16)))
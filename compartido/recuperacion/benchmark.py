@@ -0,0 +1,215 @@
+"""
+Benchmark de Recuperación
+Mide el costo de rankear una consulta con embeddings sintéticos (sin red):
+
+- loop: el método original (json.loads + lista de floats + coseno fila por fila + sort)
+- matriz: MatrizEmbeddings (producto matriz-vector + argpartition)
+- ann: IndiceIVF, recall@k contra la búsqueda exacta y latencia por n_sondas
+- cuantizacion: int8 / binario (+ PCA) con re-ranking exacto, recall@k y memoria
+- lexico: construcción y latencia de consulta del índice BM25
+
+Uso:
+    python -m recuperacion.benchmark --documentos 2000 --dimension 1536
+    python -m recuperacion.benchmark --ann --documentos 100000 --sondas 1 4 8 16
+    python -m recuperacion.benchmark --cuantizacion --documentos 50000
+    python -m recuperacion.benchmark --lexico --documentos 50000
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from recuperacion.ann import IndiceIVF
+from recuperacion.cuantizacion import IndiceCuantizado
+from recuperacion.lexico import IndiceBM25
+from recuperacion.matriz import MatrizEmbeddings, normalizar, seleccionar_top_k
+
+
+def _medir(funcion, repeticiones: int) -> list:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def _reportar(nombre: str, tiempos: list) -> None:
+    tiempos = sorted(tiempos)
+    p95 = tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))]
+    print(f"   {nombre:<28} p50: {statistics.median(tiempos):9.3f} ms | p95: {p95:9.3f} ms")
+
+
+def datos_sinteticos(num_documentos: int, dimension: int, semilla: int = 42):
+    """Embeddings aleatorios + consultas cercanas a documentos existentes."""
+    rng = np.random.default_rng(semilla)
+    vectores = rng.standard_normal((num_documentos, dimension)).astype(np.float32)
+    consultas = vectores[rng.integers(0, num_documentos, 20)] \
+        + 0.3 * rng.standard_normal((20, dimension)).astype(np.float32)
+    return vectores, consultas
+
+
+def datos_agrupados(num_documentos: int, dimension: int, num_temas: int = 64, semilla: int = 42):
+    """Embeddings agrupados por tema (como chunks reales de varios cursos) + consultas."""
+    rng = np.random.default_rng(semilla)
+    temas = rng.standard_normal((num_temas, dimension)).astype(np.float32)
+    vectores = temas[rng.integers(0, num_temas, num_documentos)] \
+        + 0.6 * rng.standard_normal((num_documentos, dimension)).astype(np.float32)
+    consultas = vectores[rng.integers(0, num_documentos, 100)] \
+        + 0.3 * rng.standard_normal((100, dimension)).astype(np.float32)
+    return vectores, consultas
+
+
+def benchmark_ranking(num_documentos: int, dimension: int, top_k: int, repeticiones: int) -> None:
+    vectores, consultas = datos_sinteticos(num_documentos, dimension)
+    ids = list(range(num_documentos))
+    contenidos = [f"chunk {i}" for i in ids]
+
+    # Filas tal como llegan de Supabase (embedding como texto)
+    filas = [{'id': i, 'content': contenidos[i], 'embedding': json.dumps(vectores[i].tolist())}
+             for i in ids]
+    query = consultas[0].tolist()
+
+    def ranking_loop():
+        documentos = []
+        for doc in filas:
+            embedding = [float(x) for x in json.loads(doc['embedding'])]
+            a, b = np.array(query), np.array(embedding)
+            score = 1 - np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
+            documentos.append({'content': doc['content'], 'score': score})
+        documentos.sort(key=lambda x: x['score'])
+        return documentos[:top_k]
+
+    inicio = time.perf_counter()
+    matriz = MatrizEmbeddings()
+    matriz.upsert(ids, contenidos, vectores)
+    carga_ms = (time.perf_counter() - inicio) * 1000
+
+    print("=" * 70)
+    print(f"📊 Ranking de una consulta ({num_documentos} docs x {dimension} dims, top-{top_k})")
+    print("=" * 70)
+    _reportar("loop (original)", _medir(ranking_loop, max(3, repeticiones // 20)))
+    _reportar("matriz float32", _medir(lambda: matriz.buscar(query, top_k), repeticiones))
+    print(f"   Carga inicial de la matriz: {carga_ms:.1f} ms "
+          f"({matriz.matriz.nbytes / 1024 / 1024:.1f} MB)")
+
+
+def benchmark_ann(num_documentos: int, dimension: int, top_k: int, repeticiones: int,
+                  n_listas: int, sondas: list) -> None:
+    vectores, consultas = datos_agrupados(num_documentos, dimension)
+    ids = list(range(num_documentos))
+    contenidos = [f"chunk {i}" for i in ids]
+
+    exacta = MatrizEmbeddings()
+    exacta.upsert(ids, contenidos, vectores)
+
+    inicio = time.perf_counter()
+    indice = IndiceIVF(n_listas=n_listas)
+    indice.upsert(ids, contenidos, vectores)
+    indice.entrenar()
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+
+    verdad = [{doc['id'] for doc in exacta.buscar(q, top_k)} for q in consultas]
+
+    print("=" * 70)
+    print(f"📊 ANN (IVF, {len(indice.listas)} listas) vs exacta "
+          f"({num_documentos} docs x {dimension} dims, top-{top_k})")
+    print("=" * 70)
+    print(f"   Construcción del índice: {construccion_ms:,.0f} ms")
+    _reportar("exacta (matriz)", _medir(lambda: exacta.buscar(consultas[0], top_k), repeticiones))
+
+    for n_sondas in sondas:
+        aciertos = sum(
+            len(verdad[i] & {doc['id'] for doc in indice.buscar(q, top_k, n_sondas=n_sondas)})
+            for i, q in enumerate(consultas)
+        )
+        recall = aciertos / (len(consultas) * top_k)
+        tiempos = _medir(lambda: indice.buscar(consultas[0], top_k, n_sondas=n_sondas), repeticiones)
+        _reportar(f"ivf sondas={n_sondas} (recall {recall:.3f})", tiempos)
+
+
+def benchmark_cuantizacion(num_documentos: int, dimension: int, top_k: int, repeticiones: int,
+                           candidatos: list) -> None:
+    vectores, consultas = datos_agrupados(num_documentos, dimension)
+    exacta = MatrizEmbeddings()
+    exacta.upsert(list(range(num_documentos)), [""] * num_documentos, vectores)
+    matriz = exacta.matriz
+    verdad = [set(seleccionar_top_k(matriz @ normalizar(q), top_k)) for q in consultas]
+
+    print("=" * 70)
+    print(f"📊 Cuantización + re-ranking exacto ({num_documentos} docs x {dimension} dims, top-{top_k})")
+    print("=" * 70)
+    print(f"   float32 (exacta): {matriz.nbytes / 1024 / 1024:.1f} MB")
+    _reportar("float32 (exacta)", _medir(lambda: exacta.buscar(consultas[0], top_k), repeticiones))
+
+    for modo, reducida in [("int8", 0), ("binario", 0), ("int8", dimension // 4)]:
+        inicio = time.perf_counter()
+        indice = IndiceCuantizado(matriz, modo, reducida)
+        construccion_ms = (time.perf_counter() - inicio) * 1000
+        nombre = modo + (f" pca={reducida}" if reducida else "")
+        print(f"   {nombre}: {indice.memoria_bytes / 1024 / 1024:.1f} MB "
+              f"({matriz.nbytes / indice.memoria_bytes:.1f}x menos) | construcción: {construccion_ms:,.0f} ms")
+
+        for n_candidatos in candidatos:
+            indice.candidatos = n_candidatos
+            aciertos = sum(len(verdad[i] & set(indice.buscar(q, top_k)[0])) for i, q in enumerate(consultas))
+            recall = aciertos / (len(consultas) * top_k)
+            _reportar(f"  {n_candidatos} cand. (recall {recall:.3f})",
+                      _medir(lambda: indice.buscar(consultas[0], top_k), repeticiones))
+
+
+def benchmark_lexico(num_documentos: int, top_k: int, repeticiones: int,
+                     palabras_por_chunk: int = 80, vocabulario: int = 20000) -> None:
+    """Chunks sintéticos con frecuencias tipo Zipf (pocas palabras muy comunes, muchas raras)."""
+    rng = np.random.default_rng(42)
+    palabras = [f"palabra{i}" for i in range(vocabulario)]
+    frecuencias = 1.0 / np.arange(1, vocabulario + 1)
+    frecuencias /= frecuencias.sum()
+    tokens = rng.choice(vocabulario, size=(num_documentos, palabras_por_chunk), p=frecuencias)
+    contenidos = [" ".join(palabras[t] for t in fila) for fila in tokens]
+    consultas = [" ".join(palabras[t] for t in rng.choice(fila, 3)) for fila in tokens[:50]]
+
+    inicio = time.perf_counter()
+    indice = IndiceBM25()
+    indice.agregar(list(range(num_documentos)), contenidos)
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+
+    print("=" * 70)
+    print(f"📊 BM25 ({num_documentos} chunks x {palabras_por_chunk} palabras, top-{top_k})")
+    print("=" * 70)
+    print(f"   Construcción del índice: {construccion_ms:,.0f} ms")
+    contador = iter(range(10 ** 9))
+    _reportar("consulta (3 términos)",
+              _medir(lambda: indice.buscar(consultas[next(contador) % len(consultas)], top_k), repeticiones))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de recuperación en memoria")
+    parser.add_argument("--documentos", type=int, default=2000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--ann", action="store_true", help="Compara IndiceIVF contra la búsqueda exacta")
+    parser.add_argument("--listas", type=int, default=0, help="Listas del IVF (0 = sqrt(n))")
+    parser.add_argument("--sondas", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--cuantizacion", action="store_true", help="int8 / binario + re-ranking exacto")
+    parser.add_argument("--lexico", action="store_true", help="Índice BM25: construcción y consulta")
+    parser.add_argument("--candidatos", type=int, nargs="+", default=[50, 200, 500],
+                        help="Candidatos que pasan al re-ranking exacto")
+    args = parser.parse_args()
+
+    if args.lexico:
+        benchmark_lexico(args.documentos, args.top_k, args.repeticiones)
+    elif args.cuantizacion:
+        benchmark_cuantizacion(args.documentos, args.dimension, args.top_k, args.repeticiones,
+                               args.candidatos)
+    elif args.ann:
+        benchmark_ann(args.documentos, args.dimension, args.top_k, args.repeticiones,
+                      args.listas, args.sondas)
+    else:
+        benchmark_ranking(args.documentos, args.dimension, args.top_k, args.repeticiones)
@@ -0,0 +1,199 @@
+"""
+Caché de Embeddings de Consultas
+Los clientes repiten las mismas preguntas y el agente suele reformularlas igual:
+no hace falta llamar a la API de embeddings cada vez.
+
+- Normaliza la consulta (minúsculas, sin tildes, espacios colapsados)
+- Nivel 1: LRU en memoria del proceso
+- Nivel 2 (opcional): SQLite en disco, clave = (modelo, sha256 del texto normalizado),
+  o el almacén mmap de recuperacion/almacen_embeddings.py (CACHE_EMBEDDINGS_ALMACEN)
+- Estadísticas: tasa de aciertos y latencia de embeddings ahorrada
+
+Variables en .env:
+- CACHE_EMBEDDINGS_TAMANO=1024      Entradas en memoria (0 desactiva la caché)
+- CACHE_EMBEDDINGS_RUTA=            Archivo SQLite del nivel en disco (vacío = solo memoria)
+- CACHE_EMBEDDINGS_ALMACEN=         Carpeta del almacén mmap (tiene prioridad sobre el SQLite)
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from recuperacion.almacen_embeddings import BYTES_CLAVE, AlmacenEmbeddings
+
+CACHE_EMBEDDINGS_TAMANO = int(os.getenv("CACHE_EMBEDDINGS_TAMANO", "1024"))
+CACHE_EMBEDDINGS_RUTA = os.getenv("CACHE_EMBEDDINGS_RUTA", "")
+CACHE_EMBEDDINGS_ALMACEN = os.getenv("CACHE_EMBEDDINGS_ALMACEN", "")
+
+
+def normalizar_consulta(texto: str) -> str:
+    """'¿Cuánto CUESTA  el curso?' → 'cuanto cuesta el curso'"""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[¿?¡!.,;:]+", " ", texto)
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+class CacheEmbeddings(Embeddings):
+    """
+    Envuelve un modelo de embeddings de LangChain y cachea embed_query.
+    embed_documents se delega sin caché (lo usa la ingesta, no las consultas).
+
+    Args:
+        embeddings: Modelo de embeddings (ej. OpenAIEmbeddings)
+        modelo: Nombre del modelo, parte de la clave en disco
+        tamano: Máximo de entradas en memoria
+        ruta_disco: Archivo SQLite para el nivel persistente (None = solo memoria)
+        almacen: Carpeta del almacén mmap para el nivel persistente (en lugar del SQLite)
+    """
+
+    def __init__(self, embeddings, modelo: str, tamano: int = CACHE_EMBEDDINGS_TAMANO,
+                 ruta_disco: Optional[str] = CACHE_EMBEDDINGS_RUTA or None,
+                 almacen: Optional[str] = CACHE_EMBEDDINGS_ALMACEN or None):
+        self.embeddings = embeddings
+        self.modelo = modelo
+        self.tamano = tamano
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self._disco = None
+        self._almacen = AlmacenEmbeddings(almacen, modelo) if almacen else None
+        if ruta_disco and self._almacen is None:
+            self._disco = sqlite3.connect(ruta_disco, check_same_thread=False)
+            self._disco.execute("PRAGMA journal_mode=WAL")
+            self._disco.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings_consultas ("
+                "modelo TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (modelo, hash))"
+            )
+            self._disco.commit()
+
+        self.estadisticas = {
+            "aciertos_memoria": 0,
+            "aciertos_disco": 0,
+            "fallos": 0,
+            "ms_api": 0.0,          # Tiempo total gastado en la API
+        }
+
+    def _clave(self, texto: str) -> str:
+        return hashlib.sha256(normalizar_consulta(texto).encode("utf-8")).hexdigest()
+
+    def embed_query(self, texto: str) -> List[float]:
+        clave = self._clave(texto)
+
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                self.estadisticas["aciertos_memoria"] += 1
+                return self._memoria[clave]
+
+        vector = self._leer_disco(clave)
+        if vector is not None:
+            self.estadisticas["aciertos_disco"] += 1
+        else:
+            inicio = time.perf_counter()
+            vector = self.embeddings.embed_query(texto)
+            self.estadisticas["ms_api"] += (time.perf_counter() - inicio) * 1000
+            self.estadisticas["fallos"] += 1
+            self._escribir_disco(clave, vector)
+
+        self._guardar_memoria(clave, vector)
+        return vector
+
+    def embed_queries(self, textos: List[str]) -> List[List[float]]:
+        """
+        Varias consultas a la vez: las que no están en caché van en UNA sola
+        petición (embed_documents) en lugar de una llamada por consulta.
+        """
+        claves = [self._clave(texto) for texto in textos]
+        vectores = [None] * len(textos)
+        faltantes = {}                          # clave -> posiciones (consultas repetidas)
+
+        for i, clave in enumerate(claves):
+            with self._lock:
+                if clave in self._memoria:
+                    self._memoria.move_to_end(clave)
+                    self.estadisticas["aciertos_memoria"] += 1
+                    vectores[i] = self._memoria[clave]
+                    continue
+            vector = self._leer_disco(clave)
+            if vector is not None:
+                self.estadisticas["aciertos_disco"] += 1
+                vectores[i] = vector
+                self._guardar_memoria(clave, vector)
+            else:
+                faltantes.setdefault(clave, []).append(i)
+
+        if faltantes:
+            inicio = time.perf_counter()
+            nuevos = self.embeddings.embed_documents([textos[pos[0]] for pos in faltantes.values()])
+            self.estadisticas["ms_api"] += (time.perf_counter() - inicio) * 1000
+            self.estadisticas["fallos"] += len(faltantes)
+            for (clave, posiciones), vector in zip(faltantes.items(), nuevos):
+                self._escribir_disco(clave, vector)
+                self._guardar_memoria(clave, vector)
+                for i in posiciones:
+                    vectores[i] = vector
+        return vectores
+
+    def embed_documents(self, textos: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(textos)
+
+    def _guardar_memoria(self, clave: str, vector: List[float]) -> None:
+        if self.tamano <= 0:
+            return
+        with self._lock:
+            self._memoria[clave] = vector
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.tamano:
+                self._memoria.popitem(last=False)
+
+    def _leer_disco(self, clave: str) -> Optional[List[float]]:
+        if self._almacen is not None:
+            vector = self._almacen.obtener([bytes.fromhex(clave)[:BYTES_CLAVE]])[0]
+            return vector.tolist() if vector is not None else None
+        if self._disco is None:
+            return None
+        with self._lock:
+            fila = self._disco.execute(
+                "SELECT vector FROM embeddings_consultas WHERE modelo = ? AND hash = ?",
+                (self.modelo, clave),
+            ).fetchone()
+        return np.frombuffer(fila[0], dtype=np.float32).tolist() if fila else None
+
+    def _escribir_disco(self, clave: str, vector: List[float]) -> None:
+        if self._almacen is not None:
+            self._almacen.guardar([bytes.fromhex(clave)[:BYTES_CLAVE]], [vector])
+            return
+        if self._disco is None:
+            return
+        with self._lock:
+            self._disco.execute(
+                "INSERT OR REPLACE INTO embeddings_consultas (modelo, hash, vector) VALUES (?, ?, ?)",
+                (self.modelo, clave, np.asarray(vector, dtype=np.float32).tobytes()),
+            )
+            self._disco.commit()
+
+    def resumen(self) -> str:
+        """Tasa de aciertos y latencia de embeddings ahorrada (estimada con la media de la API)."""
+        e = self.estadisticas
+        aciertos = e["aciertos_memoria"] + e["aciertos_disco"]
+        total = aciertos + e["fallos"]
+        if total == 0:
+            return "Caché de embeddings: sin consultas"
+        ms_por_llamada = e["ms_api"] / e["fallos"] if e["fallos"] else 0.0
+        return (
+            f"Caché de embeddings: {aciertos}/{total} aciertos ({aciertos / total:.0%}; "
+            f"memoria {e['aciertos_memoria']}, disco {e['aciertos_disco']}) | "
+            f"~{aciertos * ms_por_llamada:,.0f} ms de API ahorrados"
+        )
@@ -0,0 +1,283 @@
+"""
+Caché de Resultados de Búsqueda (TTL + singleflight)
+Varias conversaciones a la vez suelen hacer la misma pregunta ("¿cuánto cuesta
+el programa?"): cada una pagaba su embedding y su consulta al índice.
+
+- Clave: (versión del índice, consulta normalizada, top_k, filtro)
+- TTL: un resultado se sirve como máximo CACHE_RESULTADOS_TTL segundos
+- Tamaño acotado: LRU, se expulsa la entrada menos usada
+- Versión: al reindexar se sube la versión (nueva_version) y las entradas
+  anteriores dejan de servirse, incluidas las búsquedas que estaban en curso
+- Singleflight: si llegan consultas idénticas mientras la primera está en curso,
+  esperan su resultado en lugar de repetir la búsqueda (también por lotes:
+  obtener_lote registra sus fallos como búsquedas en curso)
+- Estadísticas: aciertos, fallos, coalescidas y expiradas
+
+Variables en .env:
+- CACHE_RESULTADOS_TTL=300          Segundos de vida (0 desactiva la caché)
+- CACHE_RESULTADOS_TAMANO=512       Máximo de entradas
+- INDICE_VERSION=                   Versión inicial del índice (ej. fecha de la última ingesta)
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence
+
+from recuperacion.cache_embeddings import normalizar_consulta
+
+CACHE_RESULTADOS_TTL = float(os.getenv("CACHE_RESULTADOS_TTL", "300"))
+CACHE_RESULTADOS_TAMANO = int(os.getenv("CACHE_RESULTADOS_TAMANO", "512"))
+INDICE_VERSION = os.getenv("INDICE_VERSION", "")
+
+
+class _Vuelo:
+    """
+    Búsqueda en curso: las consultas idénticas esperan su evento. Guarda la
+    versión con la que empezó para que, si se reindexa mientras tanto, quien
+    esperaba no se quede con un resultado del índice anterior.
+    """
+
+    def __init__(self, version: str):
+        self.version = version
+        self.evento = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class CacheResultados:
+    """
+    Caché de resultados de búsqueda en memoria del proceso.
+
+    Args:
+        ttl: Segundos que un resultado es válido (0 desactiva la caché)
+        tamano: Máximo de entradas (LRU)
+        version: Versión inicial del índice
+    """
+
+    def __init__(self, ttl: float = CACHE_RESULTADOS_TTL, tamano: int = CACHE_RESULTADOS_TAMANO,
+                 version: str = INDICE_VERSION):
+        self.ttl = ttl
+        self.tamano = tamano
+        self.version = version
+        self._revision = 0
+        self._entradas = OrderedDict()          # clave -> (vence, resultado)
+        self._en_vuelo = {}                     # clave -> _Vuelo
+        self._lock = threading.Lock()
+
+        self.estadisticas = {
+            "aciertos": 0,
+            "fallos": 0,
+            "coalescidas": 0,       # Esperaron a una búsqueda idéntica en curso
+            "expiradas": 0,
+        }
+
+    @property
+    def activa(self) -> bool:
+        return self.ttl > 0 and self.tamano > 0
+
+    def _clave(self, consulta: str, top_k: int, filtro: Optional[dict]) -> tuple:
+        filtro = json.dumps(filtro, sort_keys=True, default=str) if filtro else ""
+        return (self.version, normalizar_consulta(consulta), top_k, filtro)
+
+    def nueva_version(self, version: Optional[str] = None) -> str:
+        """
+        Marca el índice como reindexado: los resultados guardados y los que
+        están en curso con la versión anterior ya no se sirven.
+
+        Args:
+            version: Nueva versión (None = la actual con un contador incrementado)
+
+        Returns:
+            str: Versión vigente
+        """
+        with self._lock:
+            if version is None:
+                self._revision += 1
+                version = f"{INDICE_VERSION}#{self._revision}"
+            self.version = version
+            self._entradas.clear()
+        return version
+
+    def _leer(self, clave: tuple):
+        """Resultado vigente para la clave o None (con el lock tomado)."""
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        if entrada[0] <= time.monotonic():
+            del self._entradas[clave]
+            self.estadisticas["expiradas"] += 1
+            return None
+        self._entradas.move_to_end(clave)
+        self.estadisticas["aciertos"] += 1
+        return entrada[1]
+
+    def _escribir(self, clave: tuple, resultado) -> None:
+        """Guarda el resultado si la versión no cambió mientras se calculaba (con el lock tomado)."""
+        if clave[0] != self.version:
+            return
+        self._entradas[clave] = (time.monotonic() + self.ttl, resultado)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.tamano:
+            self._entradas.popitem(last=False)
+
+    def obtener(self, consulta: str, top_k: int, calcular: Callable[[], object],
+                filtro: Optional[dict] = None):
+        """
+        Resultado de la búsqueda desde la caché, o calculado una sola vez
+        aunque lleguen varias consultas idénticas a la vez.
+
+        Args:
+            consulta: Texto de la consulta
+            top_k: Número de documentos pedidos
+            calcular: Función sin argumentos que hace la búsqueda real
+            filtro: Filtro por metadata (parte de la clave)
+
+        Returns:
+            El resultado de calcular() (los errores no se guardan y se
+            propagan a todas las consultas que esperaban)
+        """
+        if not self.activa:
+            return calcular()
+
+        with self._lock:
+            clave = self._clave(consulta, top_k, filtro)
+            resultado = self._leer(clave)
+            if resultado is not None:
+                return resultado
+            vuelo = self._en_vuelo.get(clave)
+            propio = vuelo is None
+            if propio:
+                vuelo = self._en_vuelo[clave] = _Vuelo(self.version)
+                self.estadisticas["fallos"] += 1
+            else:
+                self.estadisticas["coalescidas"] += 1
+
+        if not propio:
+            return self._esperar(vuelo, lambda: self.obtener(consulta, top_k, calcular, filtro))
+
+        try:
+            vuelo.resultado = calcular()
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            self._terminar({clave: vuelo})
+        return vuelo.resultado
+
+    def obtener_lote(self, consultas: Sequence[str], top_k: int,
+                     calcular_lote: Callable[[List[str]], list], filtro: Optional[dict] = None) -> list:
+        """
+        Como obtener() para varias consultas: las que están en caché o en curso
+        no se buscan, el resto se calcula en una sola llamada y queda registrado
+        como búsqueda en curso para las consultas idénticas que lleguen mientras tanto.
+
+        Args:
+            consultas: Textos de las consultas
+            top_k: Número de documentos pedidos
+            calcular_lote: Función que recibe las consultas pendientes y devuelve
+                un resultado por cada una, en el mismo orden
+            filtro: Filtro por metadata (parte de la clave)
+
+        Returns:
+            list: Un resultado por consulta
+        """
+        if not self.activa:
+            return list(calcular_lote(list(consultas)))
+
+        resultados = [None] * len(consultas)
+        propios = OrderedDict()                 # clave -> (_Vuelo, índices)
+        ajenos = []                             # (índice, _Vuelo de otra consulta)
+        with self._lock:
+            for i, consulta in enumerate(consultas):
+                clave = self._clave(consulta, top_k, filtro)
+                resultado = self._leer(clave)
+                if resultado is not None:
+                    resultados[i] = resultado
+                elif clave in propios:
+                    propios[clave][1].append(i)
+                    self.estadisticas["coalescidas"] += 1
+                elif clave in self._en_vuelo:
+                    ajenos.append((i, self._en_vuelo[clave]))
+                    self.estadisticas["coalescidas"] += 1
+                else:
+                    propios[clave] = (_Vuelo(self.version), [i])
+                    self._en_vuelo[clave] = propios[clave][0]
+                    self.estadisticas["fallos"] += 1
+
+        if propios:
+            vuelos = {clave: vuelo for clave, (vuelo, _) in propios.items()}
+            try:
+                calculados = list(calcular_lote([consultas[indices[0]] for _, indices in propios.values()]))
+                if len(calculados) != len(propios):
+                    raise RuntimeError(f"calcular_lote devolvió {len(calculados)} resultados "
+                                       f"para {len(propios)} consultas")
+                for (vuelo, indices), resultado in zip(propios.values(), calculados):
+                    vuelo.resultado = resultado
+                    for i in indices:
+                        resultados[i] = resultado
+            except BaseException as e:
+                for vuelo in vuelos.values():
+                    vuelo.error = e
+                raise
+            finally:
+                self._terminar(vuelos)
+
+        for i, vuelo in ajenos:
+            consulta = consultas[i]
+            resultados[i] = self._esperar(
+                vuelo, lambda: self.obtener(consulta, top_k, lambda: calcular_lote([consulta])[0], filtro))
+        return resultados
+
+    def _esperar(self, vuelo: _Vuelo, recalcular: Callable[[], object]):
+        """Resultado de una búsqueda en curso; si se reindexó mientras tanto, se vuelve a pedir."""
+        vuelo.evento.wait()
+        if vuelo.version != self.version:
+            return recalcular()
+        if vuelo.error is not None:
+            raise vuelo.error
+        return vuelo.resultado
+
+    def _terminar(self, vuelos: dict) -> None:
+        """Guarda los resultados de las búsquedas propias y despierta a quienes esperaban."""
+        with self._lock:
+            for clave, vuelo in vuelos.items():
+                self._en_vuelo.pop(clave, None)
+                if vuelo.error is None:
+                    self._escribir(clave, vuelo.resultado)
+        for vuelo in vuelos.values():
+            vuelo.evento.set()
+
+    def buscar(self, consulta: str, top_k: int, filtro: Optional[dict] = None):
+        """Resultado guardado o None (para búsquedas por lotes que calculan los fallos juntos)."""
+        if not self.activa:
+            return None
+        with self._lock:
+            resultado = self._leer(self._clave(consulta, top_k, filtro))
+            if resultado is None:
+                self.estadisticas["fallos"] += 1
+            return resultado
+
+    def guardar(self, consulta: str, top_k: int, resultado, filtro: Optional[dict] = None) -> None:
+        if not self.activa:
+            return
+        with self._lock:
+            self._escribir(self._clave(consulta, top_k, filtro), resultado)
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def resumen(self) -> str:
+        e = self.estadisticas
+        total = e["aciertos"] + e["fallos"] + e["coalescidas"]
+        if total == 0:
+            return "Caché de resultados: sin búsquedas"
+        return (
+            f"Caché de resultados: {e['aciertos']}/{total} aciertos ({e['aciertos'] / total:.0%}) | "
+            f"{e['coalescidas']} coalescidas | {e['fallos']} búsquedas reales | "
+            f"{e['expiradas']} expiradas | versión '{self.version}'"
+        )
@@ -0,0 +1,468 @@
+"""
+Carga Masiva a la Tabla de Documentos de Supabase (COPY binario)
+Insertar los chunks uno por uno (un INSERT por fila, con el embedding como
+texto JSON '[0.0123, ...]') hace que cargar la base de conocimientos sea lento:
+una ida y vuelta por fila, 1536 números que PostgreSQL vuelve a parsear desde
+texto y, con los índices creados, cada fila actualiza el HNSW y el GIN.
+
+- Modo "copy": COPY ... FROM STDIN (FORMAT BINARY) en una sola transacción.
+  El embedding va en el formato binario nativo de pgvector (dimensión +
+  float32 big-endian, ~6 KB por fila en vez de ~30 KB de texto) y la metadata
+  como jsonb binario
+- Modo "lotes": INSERT de muchas filas por sentencia (LOTE_INSERT), el vector
+  como arreglo float8 binario (sin texto JSON), en una sola transacción
+- Todo ocurre en una transacción: si algo falla, la tabla queda como estaba
+- --nueva-version: recarga sin cortar el servicio (recuperacion/versiones.py).
+  Se carga una tabla nueva que nadie lee, se valida el conteo y recién entonces
+  la vista de documentos pasa a apuntarle; las versiones antiguas se eliminan
+- Índices: solo con --nueva-version se eliminan los de sql/match_documents.sql
+  (HNSW y GIN) antes de cargar y se construyen una sola vez al final, con
+  maintenance_work_mem alto: esa tabla todavía no la lee nadie. Se buscan en
+  el catálogo por tabla, método y columna (no por nombre)
+- Sin --nueva-version la carga va sobre la tabla activa: los índices se
+  conservan y solo se usa COPY (un DROP INDEX bloquearía las lecturas y dejaría
+  las búsquedas sin índice hasta terminar de reconstruirlo)
+
+Variables en .env:
+- DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME    Conexión directa a PostgreSQL
+- CARGA_LOTE_INSERT=500                 Filas por INSERT en el modo "lotes"
+- CARGA_MAINTENANCE_WORK_MEM=512MB      Memoria para construir los índices
+
+Uso:
+    python -m recuperacion.carga_supabase --pdf Base_de_Conocimientos/ --nueva-version
+    python -m recuperacion.carga_supabase --pdf Base_de_Conocimientos/ --reemplazar
+    python -m recuperacion.carga_supabase --snapshot snapshots/ --modo lotes
+    python -m recuperacion.carga_supabase --benchmark 5000
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import json
+import os
+import struct
+import time
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+TABLA_DOCUMENTOS = "documents_langchain_asistente_de_ventas"
+CARGA_LOTE_INSERT = int(os.getenv("CARGA_LOTE_INSERT", "500"))
+CARGA_MAINTENANCE_WORK_MEM = os.getenv("CARGA_MAINTENANCE_WORK_MEM", "512MB")
+MODOS = ("copy", "lotes")
+
+# Mismos índices que sql/match_documents.sql: {sufijo del nombre: (método, columna, operadores)}
+INDICES = {
+    "embedding_idx": ("hnsw", "embedding", "vector_cosine_ops"),
+    "metadata_idx": ("gin", "metadata", "jsonb_path_ops"),
+}
+
+# Formato binario de COPY: firma, flags (int32) y largo de la extensión (int32)
+CABECERA_COPY = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+FIN_COPY = struct.pack(">h", -1)
+TAMANO_BLOQUE_COPY = 1 << 20            # bytes por write() al servidor
+
+Fila = Tuple[str, dict, Sequence[float]]
+
+
+# ============================================
+# CODIFICACIÓN BINARIA (COPY)
+# ============================================
+def limpiar_texto(texto: str) -> str:
+    """PostgreSQL no acepta el carácter NUL en text ni jsonb (algunos PDFs lo traen)."""
+    return texto.replace("\x00", "")
+
+
+def metadata_json(metadata: dict) -> str:
+    """Metadata en JSON sin NUL (json.dumps lo escribiría como \\u0000, que jsonb rechaza)."""
+    def limpiar(valor):
+        if isinstance(valor, str):
+            return limpiar_texto(valor)
+        if isinstance(valor, dict):
+            return {limpiar_texto(str(k)): limpiar(v) for k, v in valor.items()}
+        if isinstance(valor, (list, tuple)):
+            return [limpiar(v) for v in valor]
+        return valor
+    return json.dumps(limpiar(metadata or {}), ensure_ascii=False, default=str)
+
+
+def vector_binario(vector: Sequence[float]) -> bytes:
+    """Vector en el formato de vector_recv de pgvector: int16 dimensión, int16 sin uso, float32 big-endian."""
+    valores = np.asarray(vector, dtype=">f4")
+    return struct.pack(">HH", valores.shape[0], 0) + valores.tobytes()
+
+
+def fila_copy(contenido: str, metadata: dict, vector: Sequence[float]) -> bytes:
+    """
+    Una fila de COPY binario con las columnas (content, metadata, embedding).
+
+    Returns:
+        bytes: Número de campos (int16) y cada campo como largo (int32) + datos
+    """
+    texto = limpiar_texto(contenido).encode("utf-8")
+    # jsonb binario: byte de versión (1) + JSON en texto
+    jsonb = b"\x01" + metadata_json(metadata).encode("utf-8")
+    embedding = vector_binario(vector)
+    return b"".join((
+        struct.pack(">hi", 3, len(texto)), texto,
+        struct.pack(">i", len(jsonb)), jsonb,
+        struct.pack(">i", len(embedding)), embedding,
+    ))
+
+
+def bloques_copy(filas: Iterable[Fila], estadisticas: dict) -> Iterator[bytes]:
+    """Flujo COPY binario completo (cabecera, filas, fin) en bloques de ~1 MB."""
+    bloque = bytearray(CABECERA_COPY)
+    for contenido, metadata, vector in filas:
+        bloque += fila_copy(contenido, metadata, vector)
+        estadisticas["filas"] += 1
+        if len(bloque) >= TAMANO_BLOQUE_COPY:
+            estadisticas["bytes"] += len(bloque)
+            yield bytes(bloque)
+            bloque.clear()
+    bloque += FIN_COPY
+    estadisticas["bytes"] += len(bloque)
+    yield bytes(bloque)
+
+
+def _en_lotes(filas: Iterable[Fila], tamano: int) -> Iterator[List[Fila]]:
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# ============================================
+# ÍNDICES
+# ============================================
+def nombre_indice(tabla: str, sufijo: str) -> str:
+    """
+    Nombre del índice. PostgreSQL recorta los identificadores a 63 bytes; con
+    tablas versionadas (<tabla>_v20261018103000) se recorta aquí para que el
+    nombre creado sea el mismo que queda en el catálogo, sin avisos.
+    """
+    return f"{tabla}_{sufijo}"[:63]
+
+
+def indices_existentes(cursor, tabla: str = TABLA_DOCUMENTOS) -> Dict[str, List[str]]:
+    """
+    Índices de la tabla que cumplen cada definición de INDICES, con el nombre que tengan.
+
+    Returns:
+        dict: {sufijo: [nombres de índices]} (lista vacía si la tabla no lo tiene)
+    """
+    cursor.execute("""
+        select am.amname, a.attname, i.relname
+        from pg_index x
+        join pg_class i on i.oid = x.indexrelid
+        join pg_am am on am.oid = i.relam
+        join pg_attribute a on a.attrelid = x.indrelid and a.attnum = x.indkey[0]
+        where x.indrelid = to_regclass(quote_ident(%s)) and x.indnatts = 1 and not x.indisprimary
+    """, (tabla,))
+    encontrados = {sufijo: [] for sufijo in INDICES}
+    for metodo, columna, nombre in cursor.fetchall():
+        for sufijo, (metodo_indice, columna_indice, _) in INDICES.items():
+            if (metodo, columna) == (metodo_indice, columna_indice):
+                encontrados[sufijo].append(nombre)
+    return encontrados
+
+
+def eliminar_indices(cursor, tabla: str = TABLA_DOCUMENTOS) -> None:
+    """Elimina solo los índices HNSW/GIN de esta tabla, sea cual sea su nombre."""
+    from psycopg import sql
+
+    for nombres in indices_existentes(cursor, tabla).values():
+        for nombre in nombres:
+            cursor.execute(sql.SQL("drop index if exists {}").format(sql.Identifier(nombre)))
+
+
+def crear_indices(cursor, tabla: str = TABLA_DOCUMENTOS,
+                  maintenance_work_mem: str = CARGA_MAINTENANCE_WORK_MEM) -> None:
+    """Construye de una vez los índices que le falten a la tabla ya cargada (nombre_indice)."""
+    from psycopg import sql
+
+    existentes = indices_existentes(cursor, tabla)
+    cursor.execute("select set_config('maintenance_work_mem', %s, true)", (maintenance_work_mem,))
+    for sufijo, (metodo, columna, operadores) in INDICES.items():
+        if existentes[sufijo]:
+            continue
+        cursor.execute(sql.SQL("create index {} on {} using {} ({} {})").format(
+            sql.Identifier(nombre_indice(tabla, sufijo)), sql.Identifier(tabla),
+            sql.SQL(metodo), sql.Identifier(columna), sql.SQL(operadores)))
+
+
+# ============================================
+# CARGA
+# ============================================
+def _cargar_copy(cursor, tabla: str, filas: Iterable[Fila], estadisticas: dict) -> None:
+    from psycopg import sql
+
+    consulta = sql.SQL("copy {} (content, metadata, embedding) from stdin (format binary)").format(
+        sql.Identifier(tabla))
+    with cursor.copy(consulta) as copy:
+        for bloque in bloques_copy(filas, estadisticas):
+            copy.write(bloque)
+
+
+def _cargar_lotes(cursor, tabla: str, filas: Iterable[Fila], estadisticas: dict, lote: int) -> None:
+    from psycopg import sql
+
+    # %b: el arreglo de floats viaja en binario (float8[]) y se convierte a vector en el servidor
+    fila_sql = sql.SQL("(%s, %s::jsonb, (%b::float8[])::vector)")
+    for grupo in _en_lotes(filas, lote):
+        consulta = sql.SQL("insert into {} (content, metadata, embedding) values {}").format(
+            sql.Identifier(tabla), sql.SQL(", ").join([fila_sql] * len(grupo)))
+        parametros = []
+        for contenido, metadata, vector in grupo:
+            parametros += [limpiar_texto(contenido),
+                           metadata_json(metadata),
+                           np.asarray(vector, dtype=np.float64).tolist()]
+        cursor.execute(consulta, parametros)
+        estadisticas["filas"] += len(grupo)
+
+
+def cargar_documentos(conexion, filas: Iterable[Fila], tabla: str = TABLA_DOCUMENTOS,
+                      modo: str = "copy", reemplazar: bool = False, reconstruir_indices: bool = False,
+                      lote: int = CARGA_LOTE_INSERT) -> dict:
+    """
+    Carga chunks con sus embeddings en una sola transacción.
+
+    Args:
+        conexion: psycopg.Connection (se recomienda autocommit=True; la carga abre su transacción)
+        filas: Iterable de (content, metadata, embedding); se consume en streaming
+        tabla: Tabla con columnas content text, metadata jsonb, embedding vector(d)
+        modo: "copy" (COPY binario) o "lotes" (INSERT multi-fila)
+        reemplazar: Vaciar la tabla antes de cargar (TRUNCATE en la misma transacción)
+        reconstruir_indices: Eliminar los índices antes y construirlos al final (solo
+            para tablas que nadie está leyendo, ej. una versión nueva)
+        lote: Filas por INSERT en el modo "lotes"
+
+    Returns:
+        dict: Estadísticas (filas, bytes, segundos_carga, segundos_indices, segundos)
+    """
+    from psycopg import sql
+
+    if modo not in MODOS:
+        raise ValueError(f"❌ Modo de carga desconocido: {modo} (opciones: {', '.join(MODOS)})")
+
+    inicio = time.perf_counter()
+    estadisticas = {"filas": 0, "bytes": 0, "segundos_carga": 0.0, "segundos_indices": 0.0}
+
+    with conexion.transaction(), conexion.cursor() as cursor:
+        # La construcción del HNSW puede superar el statement_timeout del rol
+        cursor.execute("select set_config('statement_timeout', '0', true)")
+        if reemplazar:
+            cursor.execute(sql.SQL("truncate {}").format(sql.Identifier(tabla)))
+        if reconstruir_indices:
+            eliminar_indices(cursor, tabla)
+
+        inicio_carga = time.perf_counter()
+        if modo == "copy":
+            _cargar_copy(cursor, tabla, filas, estadisticas)
+        else:
+            _cargar_lotes(cursor, tabla, filas, estadisticas, lote)
+        estadisticas["segundos_carga"] = time.perf_counter() - inicio_carga
+
+        if reconstruir_indices:
+            inicio_indices = time.perf_counter()
+            crear_indices(cursor, tabla)
+            estadisticas["segundos_indices"] = time.perf_counter() - inicio_indices
+
+    # Estadísticas del planificador al día (fuera de la transacción)
+    if conexion.autocommit:
+        conexion.execute(sql.SQL("analyze {}").format(sql.Identifier(tabla)))
+
+    estadisticas["segundos"] = time.perf_counter() - inicio
+    return estadisticas
+
+
+# ============================================
+# FUENTES DE FILAS
+# ============================================
+def filas_desde_snapshot(directorio: str) -> Iterator[Fila]:
+    """Filas de un snapshot publicado (recuperacion/snapshot.py), ej. generado desde Pinecone."""
+    from recuperacion.snapshot import SnapshotEmbeddings
+
+    snapshot = SnapshotEmbeddings(directorio, cuantizacion="")
+    datos = snapshot._datos
+    for fila in range(len(snapshot)):
+        yield snapshot.contenido(fila), datos["metadatos"][fila], datos["matriz"][fila]
+
+
+def filas_desde_pdfs(origen: str, embeddings, lote: int = 100, chunk_size: int = 500,
+                     chunk_overlap: int = 200) -> Iterator[Fila]:
+    """
+    Lee los PDFs página por página, los parte y embebe los chunks por lotes.
+
+    Args:
+        origen: Un PDF o un directorio (se busca recursivamente)
+        embeddings: Modelo de embeddings de LangChain (embed_documents)
+        lote: Chunks por llamada a embed_documents
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    if os.path.isdir(origen):
+        rutas = sorted(
+            os.path.join(carpeta, nombre)
+            for carpeta, _, nombres in os.walk(origen)
+            for nombre in nombres if nombre.lower().endswith(".pdf")
+        )
+    else:
+        rutas = [origen]
+
+    def chunks():
+        for ruta in rutas:
+            for pagina in PyPDFLoader(ruta).lazy_load():
+                yield from splitter.split_documents([pagina])
+
+    for grupo in _en_lotes(chunks(), lote):
+        vectores = embeddings.embed_documents([chunk.page_content for chunk in grupo])
+        for chunk, vector in zip(grupo, vectores):
+            yield chunk.page_content, chunk.metadata, vector
+
+
+# ============================================
+# BENCHMARK: fila por fila vs lotes vs COPY
+# ============================================
+def _insertar_por_fila(conexion, tabla: str, filas: Iterable[Fila]) -> int:
+    """Referencia: un INSERT y un commit por fila, con el vector como texto JSON."""
+    from psycopg import sql
+
+    consulta = sql.SQL("insert into {} (content, metadata, embedding) values (%s, %s::jsonb, %s::vector)").format(
+        sql.Identifier(tabla))
+    total = 0
+    for contenido, metadata, vector in filas:
+        with conexion.transaction():
+            conexion.execute(consulta, (limpiar_texto(contenido), metadata_json(metadata),
+                                        json.dumps(np.asarray(vector).tolist())))
+        total += 1
+    return total
+
+
+def filas_sinteticas(n: int, dimension: int = 1536, semilla: int = 0) -> List[Fila]:
+    rng = np.random.default_rng(semilla)
+    vectores = rng.standard_normal((n, dimension)).astype(np.float32)
+    vectores /= np.linalg.norm(vectores, axis=1, keepdims=True)
+    texto = "Producto de prueba con descripción, precio y stock disponible. " * 8
+    return [(f"{i}: {texto}", {"source": f"doc-{i % 50}.pdf", "page": i % 300}, vectores[i])
+            for i in range(n)]
+
+
+def benchmark(conexion, n: int, dimension: int = 1536, tabla: str = "carga_benchmark") -> None:
+    """Carga las mismas filas sintéticas en una tabla de prueba con cada método."""
+    from psycopg import sql
+
+    filas = filas_sinteticas(n, dimension)
+    identificador = sql.Identifier(tabla)
+    bytes_texto = sum(len(json.dumps(np.asarray(v).tolist())) for _, _, v in filas[:100]) / min(n, 100)
+    bytes_binario = len(vector_binario(filas[0][2]))
+
+    print("=" * 70)
+    print(f"📦 Carga de {n:,} filas (dimensión {dimension}) en la tabla de prueba '{tabla}'")
+    print(f"   Embedding por fila: ~{bytes_texto / 1024:.1f} KB como texto JSON | "
+          f"{bytes_binario / 1024:.1f} KB en binario pgvector")
+    print("=" * 70)
+
+    resultados = {}
+    for metodo in ("fila", "lotes", "copy"):
+        conexion.execute(sql.SQL("drop table if exists {}").format(identificador))
+        conexion.execute(sql.SQL(
+            "create table {} (id bigserial primary key, content text, metadata jsonb, embedding vector({}))"
+        ).format(identificador, sql.Literal(dimension)))
+
+        inicio = time.perf_counter()
+        if metodo == "fila":
+            # Como se cargaba antes: con los índices ya creados, se actualizan en cada INSERT
+            with conexion.transaction(), conexion.cursor() as cursor:
+                crear_indices(cursor, tabla)
+            _insertar_por_fila(conexion, tabla, filas)
+            detalle = ""
+        else:
+            estadisticas = cargar_documentos(conexion, filas, tabla, modo=metodo, reconstruir_indices=True)
+            detalle = (f" (carga {estadisticas['segundos_carga']:.1f} s + "
+                       f"índices {estadisticas['segundos_indices']:.1f} s)")
+        resultados[metodo] = time.perf_counter() - inicio
+        print(f"   {metodo:6s} {resultados[metodo]:8.2f} s | {n / resultados[metodo]:9,.0f} filas/s | "
+              f"{resultados['fila'] / resultados[metodo]:5.1f}x{detalle}")
+
+    conexion.execute(sql.SQL("drop table if exists {}").format(identificador))
+
+
+if __name__ == "__main__":
+    import psycopg
+    from dotenv import load_dotenv, find_dotenv
+    from psycopg import sql
+    from historial import obtener_database_url
+
+    load_dotenv(find_dotenv())
+
+    parser = argparse.ArgumentParser(description="Carga masiva a la tabla de documentos (COPY binario)")
+    fuente = parser.add_mutually_exclusive_group(required=True)
+    fuente.add_argument("--pdf", help="PDF o directorio de PDFs a partir, embeber y cargar")
+    fuente.add_argument("--snapshot", help="Directorio de snapshots (recuperacion/snapshot.py)")
+    fuente.add_argument("--benchmark", type=int, metavar="N",
+                        help="Comparar fila por fila vs lotes vs COPY con N filas sintéticas")
+    parser.add_argument("--tabla", default=TABLA_DOCUMENTOS)
+    parser.add_argument("--modo", choices=MODOS, default="copy")
+    parser.add_argument("--reemplazar", action="store_true", help="Vaciar la tabla antes de cargar")
+    parser.add_argument("--nueva-version", action="store_true",
+                        help="Cargar en una versión nueva y activarla al validar el conteo (sin cortar el servicio)")
+    parser.add_argument("--forzar", action="store_true", help="Con --nueva-version: activar aunque el conteo no valide")
+    parser.add_argument("--dimension", type=int, default=1536,
+                        help="Dimensión de los vectores (benchmark y tabla de una versión nueva)")
+    parser.add_argument("--almacen", default=os.getenv("INGESTA_ALMACEN_EMBEDDINGS", ".almacen_embeddings"),
+                        help="Almacén de embeddings en disco para --pdf (vacío = sin almacén)")
+    args = parser.parse_args()
+
+    with psycopg.connect(obtener_database_url(), autocommit=True) as conexion:
+        if args.benchmark:
+            benchmark(conexion, args.benchmark, args.dimension)
+        else:
+            if args.pdf:
+                from langchain_openai import OpenAIEmbeddings
+                from recuperacion.almacen_embeddings import AlmacenEmbeddings, EmbeddingsEnDisco
+
+                modelo = "text-embedding-ada-002"
+                embeddings = OpenAIEmbeddings(model=modelo)
+                if args.almacen:
+                    embeddings = EmbeddingsEnDisco(embeddings, AlmacenEmbeddings(args.almacen, modelo))
+                filas = filas_desde_pdfs(args.pdf, embeddings)
+            else:
+                filas = filas_desde_snapshot(args.snapshot)
+
+            from recuperacion.versiones import (
+                activar_supabase, crear_version_supabase, limpiar_supabase, nueva_version, tabla_activa_supabase,
+            )
+
+            if args.nueva_version:
+                version = nueva_version()
+                destino = crear_version_supabase(conexion, args.tabla, version, args.dimension)
+            else:
+                # Con versiones la tabla de documentos es una vista: se carga en la tabla activa
+                destino = tabla_activa_supabase(conexion, args.tabla)
+
+            try:
+                resumen = cargar_documentos(conexion, filas, destino, args.modo,
+                                            args.reemplazar and not args.nueva_version,
+                                            reconstruir_indices=args.nueva_version)
+            except Exception:
+                if args.nueva_version:
+                    # La versión a medias nunca se activó: se descarta
+                    conexion.execute(sql.SQL("drop table if exists {}").format(sql.Identifier(destino)))
+                raise
+
+            print("=" * 70)
+            print(f"✓ {resumen['filas']:,} filas en '{destino}' ({args.modo}) | ⏱ {resumen['segundos']:.1f} s")
+            print(f"   📥 Carga: {resumen['segundos_carga']:.1f} s "
+                  f"({resumen['filas'] / max(resumen['segundos_carga'], 1e-9):,.0f} filas/s)")
+            if args.nueva_version:
+                print(f"   🗂  Índices HNSW + GIN: {resumen['segundos_indices']:.1f} s")
+            if args.nueva_version:
+                activar_supabase(conexion, args.tabla, version, esperados=resumen['filas'], forzar=args.forzar)
+                limpiar_supabase(conexion, args.tabla)
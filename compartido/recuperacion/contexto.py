@@ -0,0 +1,134 @@
+"""
+Ensamblado del Contexto Recuperado
+La ingesta corta con chunk_size=500 y chunk_overlap=200: los top-5 chunks suelen
+repetir el 40% del texto y el LLM recibe lo mismo varias veces. Después de la
+búsqueda y antes de formatear el resultado de la tool:
+
+1. k adaptativo: se corta donde la similitud cae bruscamente
+2. Casi-duplicados: se descartan chunks con Jaccard de shingles >= umbral
+3. Fusión: chunks contiguos que se solapan se unen en un solo texto
+4. MMR: se eligen chunks relevantes y distintos entre sí
+
+Variables en .env:
+- ENSAMBLAR_CONTEXTO=1          0 desactiva la etapa (resultado tal como llega)
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import os
+from typing import List, Optional
+
+from recuperacion.lexico import tokenizar
+
+ENSAMBLAR_CONTEXTO = os.getenv("ENSAMBLAR_CONTEXTO", "1") == "1"
+
+SOLAPE_MINIMO = 40              # Caracteres mínimos de solape para unir dos chunks
+UMBRAL_DUPLICADO = 0.8          # Jaccard de shingles para considerar casi-duplicado
+LAMBDA_MMR = 0.7                # 1 = solo relevancia, 0 = solo diversidad
+CAIDA_MAXIMA = 0.05             # Caída de similitud entre vecinos que corta el top-k
+MARGEN_MAXIMO = 0.10            # Similitud mínima = mejor similitud - margen
+
+
+def _shingles(texto: str, n: int = 5) -> set:
+    tokens = tokenizar(texto)
+    if len(tokens) < n:
+        return {tuple(tokens)}
+    return {tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def unir_solapados(a: str, b: str, minimo: int = SOLAPE_MINIMO) -> Optional[str]:
+    """
+    Une dos chunks si el final de uno es el inicio del otro (o uno contiene al otro).
+
+    Returns:
+        str | None: Texto unido, o None si no se solapan
+    """
+    if b in a:
+        return a
+    if a in b:
+        return b
+    for primero, segundo in ((a, b), (b, a)):
+        sonda = segundo[:minimo]
+        if len(sonda) < minimo:
+            continue
+        inicio = primero.find(sonda)
+        while inicio != -1:
+            if segundo.startswith(primero[inicio:]):
+                return primero + segundo[len(primero) - inicio:]
+            inicio = primero.find(sonda, inicio + 1)
+    return None
+
+
+def k_adaptativo(docs: List[dict], caida: float = CAIDA_MAXIMA, margen: float = MARGEN_MAXIMO) -> List[dict]:
+    """Corta la lista (ordenada por similitud) en el primer salto grande o bajo el margen."""
+    if not docs or any('similitud' not in doc for doc in docs):
+        return docs
+    resultado = [docs[0]]
+    for anterior, doc in zip(docs, docs[1:]):
+        if anterior['similitud'] - doc['similitud'] > caida \
+                or docs[0]['similitud'] - doc['similitud'] > margen:
+            break
+        resultado.append(doc)
+    return resultado
+
+
+def ensamblar_contexto(docs: List[dict], top_k: int = 5, lambda_mmr: float = LAMBDA_MMR) -> List[dict]:
+    """
+    Reduce la redundancia de los chunks recuperados.
+
+    Args:
+        docs: [{'content', 'similitud'?...}, ...] de mayor a menor relevancia
+        top_k: Máximo de bloques en el resultado
+        lambda_mmr: Peso de la relevancia frente a la diversidad en MMR
+
+    Returns:
+        list: Bloques de contexto (cada uno con 'content' y la mejor 'similitud' de sus chunks)
+    """
+    docs = k_adaptativo(docs)
+
+    # 1) Casi-duplicados: se conserva el más relevante (aparece primero)
+    candidatos = []
+    for doc in docs:
+        shingles = _shingles(doc['content'])
+        if all(_jaccard(shingles, c['_shingles']) < UMBRAL_DUPLICADO for c in candidatos):
+            candidatos.append({**doc, '_shingles': shingles, '_rank': len(candidatos)})
+
+    # 2) Fusión de chunks contiguos / solapados hasta que no quede ninguno por unir
+    unido = True
+    while unido:
+        unido = False
+        for i in range(len(candidatos)):
+            for j in range(i + 1, len(candidatos)):
+                texto = unir_solapados(candidatos[i]['content'], candidatos[j]['content'])
+                if texto is None:
+                    continue
+                fusion = dict(candidatos[i])
+                fusion['content'] = texto
+                fusion['_shingles'] = _shingles(texto)
+                if 'similitud' in candidatos[j]:
+                    fusion['similitud'] = max(fusion.get('similitud', 0.0), candidatos[j]['similitud'])
+                candidatos[i] = fusion
+                del candidatos[j]
+                unido = True
+                break
+            if unido:
+                break
+
+    # 3) MMR: relevancia (similitud o posición original) vs. parecido con lo ya elegido
+    def relevancia(doc: dict) -> float:
+        return doc['similitud'] if 'similitud' in doc else 1.0 / (1 + doc['_rank'])
+
+    seleccionados = []
+    while candidatos and len(seleccionados) < top_k:
+        mejor = max(candidatos, key=lambda doc: lambda_mmr * relevancia(doc) - (1 - lambda_mmr) * max(
+            (_jaccard(doc['_shingles'], s['_shingles']) for s in seleccionados), default=0.0))
+        seleccionados.append(mejor)
+        candidatos.remove(mejor)
+
+    return [{k: v for k, v in doc.items() if not k.startswith('_')} for doc in seleccionados]
@@ -0,0 +1,145 @@
+"""
+Embeddings Cuantizados + Re-ranking Exacto
+Un vector de ada-002 son 1536 floats (6 KB en float32). Para la primera etapa
+de la búsqueda basta una versión comprimida:
+
+- int8: un byte por dimensión con escala por dimensión (4x menos memoria)
+- binario: un bit por dimensión (signo del vector centrado, 32x menos memoria),
+  comparado con distancia de Hamming
+- dimension_reducida (opcional): proyección PCA antes de cuantizar
+
+Los candidatos de la primera etapa se re-rankean con los vectores float32
+originales. Con el snapshot mmap esos vectores viven en disco: solo se leen
+las filas candidatas y en memoria residente quedan únicamente los códigos.
+
+Variables en .env:
+- CUANTIZACION=                 int8 | binario (vacío = búsqueda exacta)
+- CUANTIZACION_DIMENSION=0      Dimensiones tras PCA (0 = sin reducción)
+- CUANTIZACION_CANDIDATOS=200   Candidatos que pasan al re-ranking exacto
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+from recuperacion.matriz import normalizar, seleccionar_top_k
+
+CUANTIZACION = os.getenv("CUANTIZACION", "").strip().lower()
+CUANTIZACION_DIMENSION = int(os.getenv("CUANTIZACION_DIMENSION", "0"))
+CUANTIZACION_CANDIDATOS = int(os.getenv("CUANTIZACION_CANDIDATOS", "200"))
+
+MODOS = ("int8", "binario")
+FILAS_POR_BLOQUE = 1024         # int8 -> float32 por bloques que caben en caché
+MUESTRA_PCA = 10000
+
+# Bits en 1 de cada byte (para numpy sin np.bitwise_count)
+_BITS_POR_BYTE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def contar_bits(bytes_: np.ndarray) -> np.ndarray:
+    """Popcount por fila de una matriz uint8 (n, b)."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bytes_).sum(axis=1, dtype=np.int32)
+    return _BITS_POR_BYTE[bytes_].sum(axis=1, dtype=np.int32)
+
+
+class IndiceCuantizado:
+    """
+    Primera etapa comprimida sobre una matriz float32 normalizada (array o memmap).
+
+    Args:
+        vectores: Matriz (n, d) pre-normalizada; se conserva como referencia para el re-ranking
+        modo: "int8" o "binario"
+        dimension_reducida: Dimensiones tras PCA (0 = sin reducción)
+        candidatos: Candidatos de la primera etapa que se re-rankean en float32
+    """
+
+    def __init__(self, vectores, modo: str = "int8", dimension_reducida: int = 0,
+                 candidatos: int = CUANTIZACION_CANDIDATOS):
+        if modo not in MODOS:
+            raise ValueError(f"❌ Cuantización desconocida: '{modo}'. Opciones: {', '.join(MODOS)}")
+        self.vectores = vectores
+        self.modo = modo
+        self.candidatos = candidatos
+
+        n, d = vectores.shape
+        muestra = np.asarray(vectores[:: max(1, n // MUESTRA_PCA)], dtype=np.float32)
+        self.centro = muestra.mean(axis=0)
+        self.proyeccion = None
+        if dimension_reducida and dimension_reducida < d:
+            _, _, vt = np.linalg.svd(muestra - self.centro, full_matrices=False)
+            self.proyeccion = np.ascontiguousarray(vt[:dimension_reducida].T)
+
+        # Por bloques: nunca hay una copia float32 completa en memoria (vectores puede ser un mmap)
+        bloques = range(0, n, FILAS_POR_BLOQUE)
+        if modo == "int8":
+            maximo = np.zeros(self.proyeccion.shape[1] if self.proyeccion is not None else d, dtype=np.float32)
+            for i in bloques:
+                maximo = np.maximum(maximo, np.abs(self._transformar(vectores[i:i + FILAS_POR_BLOQUE])).max(axis=0))
+            self.escala = np.where(maximo > 0, maximo / 127.0, 1.0).astype(np.float32)
+            codigos = [np.round(self._transformar(vectores[i:i + FILAS_POR_BLOQUE]) / self.escala).astype(np.int8)
+                       for i in bloques]
+        else:
+            self.escala = None
+            codigos = [np.packbits(self._transformar(vectores[i:i + FILAS_POR_BLOQUE]) > 0, axis=1)
+                       for i in bloques]
+        self.codigos = np.concatenate(codigos)
+
+    def _transformar(self, vectores) -> np.ndarray:
+        """Centra y proyecta (PCA) antes de cuantizar. int8 sin PCA no centra: conserva el coseno."""
+        vectores = np.asarray(vectores, dtype=np.float32)
+        if self.proyeccion is not None:
+            return (vectores - self.centro) @ self.proyeccion
+        if self.modo == "binario":
+            return vectores - self.centro
+        return vectores
+
+    @property
+    def memoria_bytes(self) -> int:
+        """Memoria de la primera etapa (códigos + proyección), sin los float32 del re-ranking."""
+        extra = self.proyeccion.nbytes if self.proyeccion is not None else 0
+        return int(self.codigos.nbytes + extra)
+
+    def puntuar(self, consulta: np.ndarray) -> np.ndarray:
+        """Scores aproximados (mayor = más similar) de todas las filas."""
+        q = self._transformar(consulta[np.newaxis, :])[0]
+        if self.modo == "binario":
+            bits = np.packbits(q > 0)
+            return -contar_bits(np.bitwise_xor(self.codigos, bits)).astype(np.float32)
+
+        q = q * self.escala
+        scores = np.empty(len(self.codigos), dtype=np.float32)
+        for i in range(0, len(self.codigos), FILAS_POR_BLOQUE):
+            scores[i:i + FILAS_POR_BLOQUE] = self.codigos[i:i + FILAS_POR_BLOQUE].astype(np.float32) @ q
+        return scores
+
+    def buscar(self, query_vector, top_k: int = 5,
+               excluir: Optional[list] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Primera etapa cuantizada + re-ranking exacto de los candidatos.
+
+        Args:
+            query_vector: Embedding de la consulta (sin normalizar)
+            top_k: Número de filas a retornar
+            excluir: Filas que no deben aparecer (ej. no cumplen el filtro)
+
+        Returns:
+            tuple: (filas, similitudes coseno exactas) de mayor a menor
+        """
+        consulta = normalizar(query_vector)
+        aproximados = self.puntuar(consulta)
+        if excluir:
+            aproximados[excluir] = -np.inf
+
+        candidatos = seleccionar_top_k(aproximados, max(self.candidatos, top_k))
+        candidatos = np.sort(candidatos[np.isfinite(aproximados[candidatos])])
+        if len(candidatos) == 0:
+            return candidatos, np.empty(0, dtype=np.float32)
+
+        # Lectura ordenada de las filas candidatas (con memmap: acceso secuencial al disco)
+        exactos = np.asarray(self.vectores[candidatos], dtype=np.float32) @ consulta
+        orden = seleccionar_top_k(exactos, top_k)
+        return candidatos[orden], exactos[orden]
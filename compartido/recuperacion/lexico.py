@@ -0,0 +1,194 @@
+"""
+Índice Léxico BM25 + Fusión RRF
+Los embeddings entienden el sentido pero fallan con nombres exactos y precios
+("Diplomado en Data Engineering", "S/ 1,500"). Un índice invertido BM25 sobre
+los mismos chunks cubre esos casos y no necesita llamar a la API:
+
+- tokenizar: minúsculas, sin tildes, números sin separadores ("1,500" -> "1500")
+- IndiceBM25: índice invertido incremental (agregar / eliminar por id)
+- fusion_rrf: Reciprocal Rank Fusion de varias listas de resultados
+- confianza_lexica: decide si el resultado léxico basta (sin embedding)
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from recuperacion.matriz import seleccionar_top_k
+
+RRF_K = 60
+
+STOPWORDS = {
+    "a", "al", "algo", "como", "con", "cual", "cuales", "cuando", "de", "del", "donde",
+    "el", "ella", "en", "es", "esta", "este", "hay", "la", "las", "le", "lo", "los",
+    "me", "mi", "mas", "muy", "no", "o", "para", "pero", "por", "que", "quien", "se",
+    "si", "sin", "sobre", "su", "sus", "te", "tiene", "tienen", "un", "una", "unos",
+    "y", "ya", "yo", "cuanto", "cuesta", "quiero", "saber", "informacion",
+}
+
+_PATRON_TOKEN = re.compile(r"\d+(?:[.,]\d+)*|[a-zñ]+")
+
+
+def tokenizar(texto: str) -> List[str]:
+    """'¿Cuánto cuesta el Diplomado? S/ 1,500' -> ['diplomado', 's', '1500']"""
+    texto = (texto or "").lower()
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto)
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+    tokens = []
+    for token in _PATRON_TOKEN.findall(texto):
+        if token[0].isdigit():
+            tokens.append(re.sub(r"[.,]", "", token))
+        elif token not in STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+class IndiceBM25:
+    """
+    Índice invertido BM25 en memoria.
+
+    Args:
+        k1: Saturación de la frecuencia del término
+        b: Normalización por longitud del documento
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._id_slot: List = []                # id de cada slot (None = libre)
+        self.contenidos: List[str] = []
+        self._longitudes: List[int] = []
+        self._terminos: List[Counter] = []
+        self._posicion = {}                     # id -> slot
+        self._libres: List[int] = []            # slots de documentos eliminados
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_tokens = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._posicion)
+
+    @property
+    def ids(self) -> List:
+        return list(self._posicion)
+
+    # ============================================
+    # ACTUALIZACIÓN
+    # ============================================
+    def agregar(self, ids: Sequence, contenidos: Sequence[str]) -> None:
+        """Inserta o reemplaza documentos por id."""
+        with self._lock:
+            for id_, contenido in zip(ids, contenidos):
+                if id_ in self._posicion:
+                    self._quitar(id_)
+                terminos = Counter(tokenizar(contenido))
+                if self._libres:
+                    slot = self._libres.pop()
+                    self._id_slot[slot], self.contenidos[slot] = id_, contenido
+                    self._longitudes[slot], self._terminos[slot] = sum(terminos.values()), terminos
+                else:
+                    slot = len(self._id_slot)
+                    self._id_slot.append(id_)
+                    self.contenidos.append(contenido)
+                    self._longitudes.append(sum(terminos.values()))
+                    self._terminos.append(terminos)
+                self._posicion[id_] = slot
+                self._total_tokens += self._longitudes[slot]
+                for termino, frecuencia in terminos.items():
+                    self._postings.setdefault(termino, {})[slot] = frecuencia
+
+    def eliminar(self, ids: Sequence) -> None:
+        with self._lock:
+            for id_ in ids:
+                if id_ in self._posicion:
+                    self._quitar(id_)
+
+    def _quitar(self, id_) -> None:
+        slot = self._posicion.pop(id_)
+        for termino in self._terminos[slot]:
+            posting = self._postings[termino]
+            del posting[slot]
+            if not posting:
+                del self._postings[termino]
+        self._total_tokens -= self._longitudes[slot]
+        self._id_slot[slot], self.contenidos[slot] = None, ""
+        self._longitudes[slot], self._terminos[slot] = 0, Counter()
+        self._libres.append(slot)
+
+    # ============================================
+    # BÚSQUEDA
+    # ============================================
+    def buscar(self, consulta: str, top_k: int = 5) -> List[dict]:
+        """
+        Top-k documentos por BM25.
+
+        Returns:
+            list: [{'id', 'content', 'bm25', 'cobertura'}, ...] de mayor a menor score.
+            cobertura = fracción de términos de la consulta presentes en el documento
+        """
+        terminos = list(dict.fromkeys(tokenizar(consulta)))
+        with self._lock:
+            n = len(self._posicion)
+            if n == 0 or not terminos:
+                return []
+
+            longitudes = np.asarray(self._longitudes, dtype=np.float32)
+            promedio = self._total_tokens / n
+            norma = self.k1 * (1 - self.b + self.b * longitudes / max(promedio, 1e-9))
+            scores = np.zeros(len(self._id_slot), dtype=np.float32)
+            coincidencias = np.zeros(len(self._id_slot), dtype=np.int32)
+
+            for termino in terminos:
+                posting = self._postings.get(termino)
+                if not posting:
+                    continue
+                slots = np.fromiter(posting.keys(), dtype=np.int64, count=len(posting))
+                tf = np.fromiter(posting.values(), dtype=np.float32, count=len(posting))
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                scores[slots] += idf * tf * (self.k1 + 1) / (tf + norma[slots])
+                coincidencias[slots] += 1
+
+            return [
+                {'id': self._id_slot[i], 'content': self.contenidos[i], 'bm25': float(scores[i]),
+                 'cobertura': float(coincidencias[i]) / len(terminos)}
+                for i in seleccionar_top_k(scores, top_k) if scores[i] > 0
+            ]
+
+
+def confianza_lexica(resultados: List[dict], margen: float = 1.5) -> bool:
+    """
+    El resultado léxico basta si el mejor documento contiene TODOS los términos
+    de la consulta y supera al segundo por un margen claro.
+    """
+    if not resultados or resultados[0]['cobertura'] < 1.0:
+        return False
+    if len(resultados) == 1:
+        return True
+    return resultados[0]['bm25'] >= margen * resultados[1]['bm25']
+
+
+def fusion_rrf(listas: Sequence[List[dict]], top_k: int = 5, k: int = RRF_K) -> List[dict]:
+    """
+    Reciprocal Rank Fusion: score = sum(1 / (k + rank)) en cada lista.
+    Los documentos se identifican por su contenido (el modo rpc no devuelve ids).
+    El primer dict visto de cada documento se conserva (con su 'similitud' si la tiene).
+    """
+    scores, documentos = {}, {}
+    for lista in listas:
+        for rank, doc in enumerate(lista, 1):
+            clave = doc['content']
+            scores[clave] = scores.get(clave, 0.0) + 1.0 / (k + rank)
+            documentos.setdefault(clave, doc)
+            if 'similitud' not in documentos[clave] and 'similitud' in doc:
+                documentos[clave] = doc
+
+    mejores = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [{**documentos[clave], 'rrf': scores[clave]} for clave in mejores]
@@ -0,0 +1,154 @@
+"""
+Dobles Locales para Pruebas y Benchmarks
+Permiten ejecutar la recuperación sin Pinecone ni OpenAI:
+
+- IndiceLocal: índice en proceso con la misma API que pinecone.Index
+  (upsert, query, fetch, list, delete, describe_index_stats) sobre MatrizEmbeddings,
+  con latencia de red simulada opcional
+- EmbeddingsLocales: modelo de embeddings determinista (mismo texto = mismo vector)
+  que cuenta las llamadas y simula la latencia de una petición a la API
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import hashlib
+import threading
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from recuperacion.matriz import MatrizEmbeddings
+
+
+class IndiceLocal:
+    """
+    Índice vectorial en proceso compatible con la API de pinecone.Index.
+
+    Args:
+        dimension: Dimensión de los vectores
+        latencia_ms: Latencia simulada de cada llamada (como un viaje de red)
+    """
+
+    def __init__(self, dimension: int = 1536, latencia_ms: float = 0.0):
+        self.dimension = dimension
+        self.latencia_ms = latencia_ms
+        self._namespaces: Dict[str, MatrizEmbeddings] = {}
+        self._valores: Dict[str, Dict[str, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _esperar(self) -> None:
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000)
+
+    def _namespace(self, namespace: str) -> MatrizEmbeddings:
+        with self._lock:
+            if namespace not in self._namespaces:
+                self._namespaces[namespace] = MatrizEmbeddings(self.dimension)
+                self._valores[namespace] = {}
+            return self._namespaces[namespace]
+
+    def upsert(self, vectors, namespace: str = "", **kwargs) -> dict:
+        """vectors: tuplas (id, valores[, metadata]) o dicts {'id', 'values', 'metadata'}."""
+        self._esperar()
+        ids, valores, metadatos = [], [], []
+        for vector in vectors:
+            if isinstance(vector, dict):
+                id_, values, metadata = vector["id"], vector["values"], vector.get("metadata") or {}
+            else:
+                id_, values, metadata = vector[0], vector[1], (vector[2] if len(vector) > 2 else {})
+            ids.append(id_)
+            valores.append(values)
+            metadatos.append(dict(metadata))
+        if ids:
+            self._namespace(namespace).upsert(ids, [m.get("text", "") for m in metadatos], valores, metadatos)
+            self._valores[namespace].update(zip(ids, (list(v) for v in valores)))
+        return {"upserted_count": len(ids)}
+
+    def query(self, vector, top_k: int = 5, namespace: str = "", filter: Optional[dict] = None,
+              include_metadata: bool = False, include_values: bool = False, **kwargs):
+        self._esperar()
+        matriz = self._namespace(namespace)
+        posiciones = {id_: i for i, id_ in enumerate(matriz.ids)}
+        matches = []
+        for doc in matriz.buscar(vector, top_k, filter):
+            i = posiciones[doc['id']]
+            matches.append(SimpleNamespace(
+                id=doc['id'],
+                score=doc['similitud'],
+                metadata=dict(matriz.metadatos[i]) if include_metadata else None,
+                values=self._valores[namespace][doc['id']] if include_values else [],
+            ))
+        return SimpleNamespace(matches=matches, namespace=namespace)
+
+    def fetch(self, ids: List[str], namespace: str = "", **kwargs):
+        self._esperar()
+        matriz = self._namespace(namespace)
+        posiciones = {id_: i for i, id_ in enumerate(matriz.ids)}
+        vectores = {
+            id_: SimpleNamespace(id=id_, values=self._valores[namespace][id_],
+                                 metadata=dict(matriz.metadatos[posiciones[id_]]))
+            for id_ in ids if id_ in posiciones
+        }
+        return SimpleNamespace(vectors=vectores, namespace=namespace)
+
+    def list(self, prefix: str = "", namespace: str = "", limit: int = 100, **kwargs):
+        """Genera listas de ids (paginadas como Index.list de Pinecone serverless)."""
+        ids = sorted(id_ for id_ in self._namespace(namespace).ids if str(id_).startswith(prefix))
+        for i in range(0, len(ids), limit):
+            self._esperar()
+            yield ids[i:i + limit]
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False,
+               namespace: str = "", **kwargs) -> dict:
+        self._esperar()
+        matriz = self._namespace(namespace)
+        if delete_all:
+            ids = list(matriz.ids)
+        matriz.eliminar(ids or [])
+        for id_ in ids or []:
+            self._valores[namespace].pop(id_, None)
+        return {}
+
+    def describe_index_stats(self, **kwargs):
+        self._esperar()
+        namespaces = {nombre: SimpleNamespace(vector_count=len(m)) for nombre, m in self._namespaces.items()}
+        return SimpleNamespace(
+            dimension=self.dimension,
+            namespaces=namespaces,
+            total_vector_count=sum(len(m) for m in self._namespaces.values()),
+        )
+
+
+class EmbeddingsLocales(Embeddings):
+    """
+    Embeddings deterministas derivados del sha256 del texto (sin red).
+
+    Args:
+        dimension: Dimensión de los vectores
+        latencia_ms: Latencia simulada por llamada a la "API" (una por lote)
+    """
+
+    def __init__(self, dimension: int = 1536, latencia_ms: float = 0.0):
+        self.dimension = dimension
+        self.latencia_ms = latencia_ms
+        self.llamadas = 0
+        self.textos_embebidos = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, texto: str) -> List[float]:
+        semilla = int.from_bytes(hashlib.sha256(texto.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(semilla).standard_normal(self.dimension).astype(np.float32).tolist()
+
+    def embed_documents(self, textos: List[str]) -> List[List[float]]:
+        with self._lock:
+            self.llamadas += 1
+            self.textos_embebidos += len(textos)
+        if self.latencia_ms:
+            time.sleep(self.latencia_ms / 1000)
+        return [self._vector(texto) for texto in textos]
+
+    def embed_query(self, texto: str) -> List[float]:
+        return self.embed_documents([texto])[0]
@@ -0,0 +1,172 @@
+"""
+Matriz de Embeddings en Memoria
+Todos los embeddings de la base de conocimientos en una sola matriz float32
+contigua y pre-normalizada:
+
+- Una consulta = un producto matriz-vector (similitud coseno = producto punto)
+- Top-k con selección parcial (np.argpartition), sin ordenar todo
+- Actualización incremental por id (upsert / eliminar) sin reconstruir la matriz
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import threading
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def normalizar(vectores) -> np.ndarray:
+    """Convierte a float32 y normaliza cada fila (o el vector) a norma 1."""
+    vectores = np.asarray(vectores, dtype=np.float32)
+    normas = np.linalg.norm(vectores, axis=-1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return vectores / normas
+
+
+def seleccionar_top_k(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Índices de los top_k scores (de mayor a menor) con selección parcial."""
+    n = scores.shape[0]
+    k = min(top_k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidatos = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidatos = np.arange(n)
+    return candidatos[np.argsort(-scores[candidatos])]
+
+
+def mascara_filtro(metadatos: Sequence[dict], filtro: dict) -> List[int]:
+    """Filas cuya metadata NO cumple el filtro (igualdad de claves)."""
+    return [
+        i for i, metadata in enumerate(metadatos)
+        if any((metadata or {}).get(k) != v for k, v in filtro.items())
+    ]
+
+
+class MatrizEmbeddings:
+    """
+    Índice exacto en memoria: ids, contenidos, metadata y una matriz (n, d).
+
+    La matriz vive en un buffer con capacidad extra (crece al doble), así que
+    agregar filas no copia toda la matriz en cada actualización.
+    """
+
+    def __init__(self, dimension: Optional[int] = None):
+        self.dimension = dimension
+        self.ids: List = []
+        self.contenidos: List[str] = []
+        self.metadatos: List[dict] = []
+        self._posicion = {}                     # id -> fila
+        self._buffer = np.empty((0, dimension or 0), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def matriz(self) -> np.ndarray:
+        """Vista (n, d) de las filas ocupadas del buffer."""
+        return self._buffer[:len(self.ids)]
+
+    def _reservar(self, filas_nuevas: int) -> None:
+        necesarias = len(self.ids) + filas_nuevas
+        if necesarias <= self._buffer.shape[0]:
+            return
+        capacidad = max(necesarias, 2 * self._buffer.shape[0], 64)
+        buffer = np.empty((capacidad, self.dimension), dtype=np.float32)
+        buffer[:len(self.ids)] = self.matriz
+        self._buffer = buffer
+
+    # ============================================
+    # ACTUALIZACIÓN
+    # ============================================
+    def upsert(self, ids: Sequence, contenidos: Sequence[str], vectores,
+               metadatos: Optional[Sequence[dict]] = None) -> None:
+        """
+        Inserta o reemplaza documentos por id.
+
+        Args:
+            ids: Identificadores de los documentos
+            contenidos: Texto de cada documento
+            vectores: Embeddings (lista de listas o array (n, d)), sin normalizar
+            metadatos: Metadata opcional de cada documento
+        """
+        if len(ids) == 0:
+            return
+        vectores = normalizar(vectores)
+        metadatos = metadatos or [{}] * len(ids)
+
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vectores.shape[1]
+                self._buffer = np.empty((0, self.dimension), dtype=np.float32)
+
+            nuevos = sum(1 for id_ in ids if id_ not in self._posicion)
+            self._reservar(nuevos)
+
+            for id_, contenido, vector, metadata in zip(ids, contenidos, vectores, metadatos):
+                fila = self._posicion.get(id_)
+                if fila is None:
+                    fila = len(self.ids)
+                    self._posicion[id_] = fila
+                    self.ids.append(id_)
+                    self.contenidos.append(contenido)
+                    self.metadatos.append(metadata or {})
+                else:
+                    self.contenidos[fila] = contenido
+                    self.metadatos[fila] = metadata or {}
+                self._buffer[fila] = vector
+
+    def eliminar(self, ids: Sequence) -> None:
+        """Elimina documentos por id (mueve la última fila al hueco: O(d) por id)."""
+        with self._lock:
+            for id_ in ids:
+                fila = self._posicion.pop(id_, None)
+                if fila is None:
+                    continue
+                ultima = len(self.ids) - 1
+                if fila != ultima:
+                    id_ultimo = self.ids[ultima]
+                    self._buffer[fila] = self._buffer[ultima]
+                    self.ids[fila] = id_ultimo
+                    self.contenidos[fila] = self.contenidos[ultima]
+                    self.metadatos[fila] = self.metadatos[ultima]
+                    self._posicion[id_ultimo] = fila
+                self.ids.pop()
+                self.contenidos.pop()
+                self.metadatos.pop()
+
+    # ============================================
+    # BÚSQUEDA
+    # ============================================
+    def buscar(self, query_vector, top_k: int = 5, filtro: Optional[dict] = None) -> List[dict]:
+        """
+        Top-k documentos más similares a la consulta.
+
+        Args:
+            query_vector: Embedding de la consulta (sin normalizar)
+            top_k: Número de documentos a retornar
+            filtro: Filtro opcional por metadata (igualdad de claves)
+
+        Returns:
+            list: [{'id', 'content', 'similitud'}, ...] de mayor a menor similitud
+        """
+        consulta = normalizar(query_vector)
+
+        with self._lock:
+            n = len(self.ids)
+            if n == 0 or top_k <= 0:
+                return []
+
+            scores = self.matriz @ consulta
+
+            if filtro:
+                scores[mascara_filtro(self.metadatos, filtro)] = -np.inf
+
+            candidatos = seleccionar_top_k(scores, top_k)
+            return [
+                {'id': self.ids[i], 'content': self.contenidos[i], 'similitud': float(scores[i])}
+                for i in candidatos if np.isfinite(scores[i])
+            ]
@@ -0,0 +1,210 @@
+"""
+Micro-lotes de Embeddings entre Conversaciones
+Con muchas conversaciones a la vez, cada embed_query era su propia petición
+HTTP a la API de embeddings. El despachador junta las consultas que llegan
+durante unos milisegundos y las envía como UN embed_documents:
+
+- Espera como máximo EMBEDDINGS_LOTE_ESPERA_MS desde la primera consulta del lote
+- Un lote sale antes si llega a EMBEDDINGS_LOTE_MAXIMO consultas
+- Textos repetidos dentro del lote se embeben una sola vez
+- Varios lotes pueden estar en vuelo a la vez (EMBEDDINGS_LOTE_CONCURRENCIA)
+- Cada conversación recibe solo su vector (o el error del lote); si el lote no
+  responde en EMBEDDINGS_LOTE_TIMEOUT segundos, la consulta falla en vez de colgarse
+
+Menos peticiones = más throughput y menos presión sobre el rate limit, pero
+solo si de verdad hay consultas simultáneas en el mismo proceso. Un worker de
+uvicorn atiende chat_con_agente de a una conversación: ahí cada consulta solo
+sumaría la espera. Por eso viene apagado; activarlo en procesos que sirven
+muchas conversaciones en hilos a la vez (medir antes con el benchmark, que
+usa una API simulada).
+
+Variables en .env:
+- EMBEDDINGS_LOTE_ESPERA_MS=0       Espera máxima para llenar un lote (0 = desactivado, por defecto)
+- EMBEDDINGS_LOTE_MAXIMO=64         Consultas por lote
+- EMBEDDINGS_LOTE_CONCURRENCIA=4    Lotes en vuelo a la vez
+- EMBEDDINGS_LOTE_TIMEOUT=60        Segundos máximos esperando el vector de un lote
+
+Uso (benchmark con embeddings locales, latencia simulada):
+    python -m recuperacion.micro_lotes --hilos 64 --latencia-ms 80
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+EMBEDDINGS_LOTE_ESPERA_MS = float(os.getenv("EMBEDDINGS_LOTE_ESPERA_MS", "0"))
+EMBEDDINGS_LOTE_MAXIMO = int(os.getenv("EMBEDDINGS_LOTE_MAXIMO", "64"))
+EMBEDDINGS_LOTE_CONCURRENCIA = int(os.getenv("EMBEDDINGS_LOTE_CONCURRENCIA", "4"))
+EMBEDDINGS_LOTE_TIMEOUT = float(os.getenv("EMBEDDINGS_LOTE_TIMEOUT", "60"))
+
+
+class DespachadorEmbeddings(Embeddings):
+    """
+    Envuelve un modelo de embeddings y agrupa las embed_query concurrentes.
+    embed_documents se delega directo (ya es un lote).
+
+    Args:
+        embeddings: Modelo de embeddings (ej. OpenAIEmbeddings)
+        espera_ms: Espera máxima para llenar un lote (0 = una petición por consulta, sin hilo colector)
+        tamano_lote: Máximo de consultas por lote
+        max_concurrencia: Lotes enviados a la API a la vez
+        timeout: Segundos máximos que una consulta espera el resultado de su lote
+    """
+
+    def __init__(self, embeddings, espera_ms: float = EMBEDDINGS_LOTE_ESPERA_MS,
+                 tamano_lote: int = EMBEDDINGS_LOTE_MAXIMO,
+                 max_concurrencia: int = EMBEDDINGS_LOTE_CONCURRENCIA,
+                 timeout: float = EMBEDDINGS_LOTE_TIMEOUT):
+        self.embeddings = embeddings
+        self.espera_ms = espera_ms
+        self.tamano_lote = max(1, tamano_lote)
+        self.max_concurrencia = max(1, max_concurrencia)
+        self.timeout = timeout
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._ejecutor = None
+        self._lock = threading.Lock()
+
+        self.estadisticas = {
+            "consultas": 0,
+            "lotes": 0,
+            "textos_enviados": 0,   # Tras quitar repetidos dentro de cada lote
+        }
+
+    def _iniciar(self) -> None:
+        """El hilo colector arranca con la primera consulta."""
+        with self._lock:
+            if self._hilo is None:
+                self._ejecutor = ThreadPoolExecutor(self.max_concurrencia,
+                                                    thread_name_prefix="embeddings-lote")
+                self._hilo = threading.Thread(target=self._recolectar, name="embeddings-colector",
+                                              daemon=True)
+                self._hilo.start()
+
+    def _recolectar(self) -> None:
+        while True:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + self.espera_ms / 1000
+            while len(lote) < self.tamano_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._cola.get(timeout=restante))
+                except queue.Empty:
+                    break
+            self._ejecutor.submit(self._despachar, lote)
+
+    def _despachar(self, lote: list) -> None:
+        """Una petición para todo el lote; el resultado se reparte a cada consulta."""
+        try:
+            unicos = list(dict.fromkeys(texto for texto, _ in lote))
+            vectores = list(self.embeddings.embed_documents(unicos))
+            if len(vectores) != len(unicos):
+                raise ValueError(f"embed_documents devolvió {len(vectores)} vectores para {len(unicos)} textos")
+            vectores = dict(zip(unicos, vectores))
+
+            with self._lock:
+                self.estadisticas["lotes"] += 1
+                self.estadisticas["textos_enviados"] += len(unicos)
+            for texto, futuro in lote:
+                futuro.set_result(vectores[texto])
+        except BaseException as e:
+            # Ninguna consulta del lote se queda esperando un vector que no llegará
+            for _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+
+    def embed_query(self, texto: str) -> List[float]:
+        with self._lock:
+            self.estadisticas["consultas"] += 1
+        if self.espera_ms <= 0:
+            with self._lock:
+                self.estadisticas["lotes"] += 1
+                self.estadisticas["textos_enviados"] += 1
+            return self.embeddings.embed_query(texto)
+
+        self._iniciar()
+        futuro = Future()
+        self._cola.put((texto, futuro))
+        return futuro.result(timeout=self.timeout)
+
+    def embed_documents(self, textos: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(textos)
+
+    def resumen(self) -> str:
+        e = self.estadisticas
+        if e["consultas"] == 0:
+            return "Micro-lotes de embeddings: sin consultas"
+        return (
+            f"Micro-lotes de embeddings: {e['consultas']} consultas en {e['lotes']} peticiones "
+            f"({e['consultas'] / max(e['lotes'], 1):.1f} por petición, "
+            f"{e['textos_enviados']} textos enviados)"
+        )
+
+
+if __name__ == "__main__":
+    from recuperacion.local import EmbeddingsLocales
+
+    parser = argparse.ArgumentParser(description="embed_query concurrentes: directo vs micro-lotes")
+    parser.add_argument("--hilos", type=int, default=64, help="Conversaciones simultáneas")
+    parser.add_argument("--consultas", type=int, default=4, help="Consultas por conversación")
+    parser.add_argument("--latencia-ms", type=float, default=80.0, help="Latencia simulada por petición")
+    parser.add_argument("--conexiones", type=int, default=4,
+                        help="Peticiones simultáneas que acepta la API simulada (rate limit)")
+    parser.add_argument("--espera-ms", type=float, default=EMBEDDINGS_LOTE_ESPERA_MS or 5.0)
+    parser.add_argument("--lote", type=int, default=EMBEDDINGS_LOTE_MAXIMO)
+    args = parser.parse_args()
+
+    def ejecutar(modelo) -> float:
+        def conversacion(n):
+            for i in range(args.consultas):
+                vector = modelo.embed_query(f"conversación {n} pregunta {i % 2}")
+                assert vector == referencia.embed_query(f"conversación {n} pregunta {i % 2}")
+
+        hilos = [threading.Thread(target=conversacion, args=(n,)) for n in range(args.hilos)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return time.perf_counter() - inicio
+
+    class APILimitada(EmbeddingsLocales):
+        """Como la API real: solo N peticiones a la vez, el resto espera turno."""
+
+        def __init__(self):
+            super().__init__(64, latencia_ms=args.latencia_ms)
+            self._conexiones = threading.Semaphore(args.conexiones)
+
+        def embed_documents(self, textos):
+            with self._conexiones:
+                return super().embed_documents(textos)
+
+    referencia = EmbeddingsLocales(64)
+    directo = APILimitada()
+    segundos_directo = ejecutar(directo)
+
+    api = APILimitada()
+    despachador = DespachadorEmbeddings(api, espera_ms=args.espera_ms, tamano_lote=args.lote)
+    segundos_lotes = ejecutar(despachador)
+
+    total = args.hilos * args.consultas
+    print("=" * 70)
+    print(f"📊 {args.hilos} conversaciones x {args.consultas} consultas "
+          f"(API: {args.latencia_ms:.0f} ms por petición, {args.conexiones} simultáneas)")
+    print("=" * 70)
+    print(f"   Directo:      {directo.llamadas:5d} peticiones | {total / segundos_directo:8.1f} consultas/s")
+    print(f"   Micro-lotes:  {api.llamadas:5d} peticiones | {total / segundos_lotes:8.1f} consultas/s "
+          f"(espera {args.espera_ms:.0f} ms, lote ≤ {args.lote})")
+    print(f"   ⚡ {despachador.resumen()}")
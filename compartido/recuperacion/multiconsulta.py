@@ -0,0 +1,168 @@
+"""
+Recuperación Asíncrona por Lotes (varias consultas a la vez)
+Cuando el agente llama buscar_datapath varias veces en un turno (o se expande
+una consulta en variantes), cada búsqueda hacía su propio embedding y su
+propia consulta al índice, una detrás de otra:
+
+- Embeddings: UNA petición para todas las consultas (embed_queries / embed_documents)
+- Índice: las consultas viajan en paralelo sobre el mismo cliente, limitadas
+  al tamaño del pool de conexiones (asyncio + semáforo en abuscar_*, un
+  ThreadPoolExecutor propio en buscar_*)
+
+Las versiones síncronas no crean un event loop: las tools se llaman desde
+chat_con_agente dentro del loop de uvicorn (webhook de Chatwoot), donde
+asyncio.run falla.
+
+Funciona con pinecone.Index o con recuperacion.local.IndiceLocal.
+
+Uso (benchmark sin red, latencias simuladas):
+    python -m recuperacion.multiconsulta --consultas 8 --latencia-ms 40
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence
+
+POOL_CONEXIONES = 8
+
+
+class BuscadorMulticonsulta:
+    """
+    Args:
+        indice: pinecone.Index (creado con pool_threads) o IndiceLocal
+        embeddings: Modelo de embeddings (CacheEmbeddings usa su embed_queries);
+                    None si solo se usan buscar_vectores / consultar
+        namespace: Namespace del índice
+        text_key: Clave de metadata con el texto del chunk (PineconeVectorStore usa "text")
+        max_concurrencia: Consultas simultáneas al índice (≤ conexiones del pool)
+    """
+
+    def __init__(self, indice, embeddings, namespace: str = "", text_key: str = "text",
+                 max_concurrencia: int = POOL_CONEXIONES):
+        self.indice = indice
+        self.embeddings = embeddings
+        self.namespace = namespace
+        self.text_key = text_key
+        self.max_concurrencia = max_concurrencia
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock_pool = threading.Lock()
+
+    def _ejecutor(self) -> ThreadPoolExecutor:
+        # Un pool por buscador, compartido por todas las llamadas síncronas:
+        # el total de consultas en vuelo nunca pasa de max_concurrencia
+        if self._pool is None:
+            with self._lock_pool:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_concurrencia,
+                                                    thread_name_prefix="multiconsulta")
+        return self._pool
+
+    def _embeber(self, consultas: List[str]) -> List[List[float]]:
+        embed_queries = getattr(self.embeddings, "embed_queries", None)
+        if embed_queries is not None:
+            return embed_queries(consultas)
+        return self.embeddings.embed_documents(consultas)
+
+    def consultar(self, vector: List[float], top_k: int = 5, filtro: Optional[dict] = None) -> List[dict]:
+        """Una consulta al índice con un embedding ya calculado."""
+        respuesta = self.indice.query(vector=vector, top_k=top_k, namespace=self.namespace,
+                                      filter=filtro, include_metadata=True)
+        resultados = []
+        for match in respuesta.matches:
+            metadata = dict(match.metadata or {})
+            resultados.append({
+                'id': match.id,
+                'content': metadata.pop(self.text_key, ""),
+                'similitud': match.score,
+                'metadata': metadata,
+            })
+        return resultados
+
+    async def abuscar_lote(self, consultas: Sequence[str], top_k: int = 5,
+                           filtro: Optional[dict] = None) -> List[List[dict]]:
+        """
+        Busca varias consultas: un solo lote de embeddings + consultas concurrentes.
+
+        Returns:
+            list: Una lista de resultados [{'id', 'content', 'similitud', 'metadata'}] por consulta
+        """
+        consultas = list(consultas)
+        if not consultas:
+            return []
+        vectores = await asyncio.to_thread(self._embeber, consultas)
+        return await self.abuscar_vectores(vectores, top_k, filtro)
+
+    async def abuscar_vectores(self, vectores: Sequence[List[float]], top_k: int = 5,
+                               filtro: Optional[dict] = None) -> List[List[dict]]:
+        """Consultas concurrentes al índice con embeddings ya calculados."""
+        semaforo = asyncio.Semaphore(self.max_concurrencia)
+
+        async def consultar(vector):
+            async with semaforo:
+                return await asyncio.to_thread(self.consultar, vector, top_k, filtro)
+
+        return list(await asyncio.gather(*(consultar(vector) for vector in vectores)))
+
+    def buscar_lote(self, consultas: Sequence[str], top_k: int = 5,
+                    filtro: Optional[dict] = None) -> List[List[dict]]:
+        """
+        Versión síncrona de abuscar_lote (para las tools). Se puede llamar desde
+        dentro de un event loop en marcha: las consultas van a hilos, no a asyncio.
+
+        Returns:
+            list: Una lista de resultados [{'id', 'content', 'similitud', 'metadata'}] por consulta
+        """
+        consultas = list(consultas)
+        if not consultas:
+            return []
+        return self.buscar_vectores(self._embeber(consultas), top_k, filtro)
+
+    def buscar_vectores(self, vectores: Sequence[List[float]], top_k: int = 5,
+                        filtro: Optional[dict] = None) -> List[List[dict]]:
+        """Versión síncrona de abuscar_vectores: consultas en el pool de hilos, en orden."""
+        vectores = list(vectores)
+        if len(vectores) <= 1:
+            return [self.consultar(vector, top_k, filtro) for vector in vectores]
+        futuros = [self._ejecutor().submit(self.consultar, vector, top_k, filtro) for vector in vectores]
+        return [futuro.result() for futuro in futuros]
+
+
+if __name__ == "__main__":
+    from recuperacion.local import EmbeddingsLocales, IndiceLocal
+
+    parser = argparse.ArgumentParser(description="Secuencial vs lote en paralelo (índice local)")
+    parser.add_argument("--consultas", type=int, default=8)
+    parser.add_argument("--documentos", type=int, default=2000)
+    parser.add_argument("--dimension", type=int, default=1536)
+    parser.add_argument("--latencia-ms", type=float, default=40.0, help="Latencia simulada por llamada")
+    args = parser.parse_args()
+
+    embeddings = EmbeddingsLocales(args.dimension, latencia_ms=args.latencia_ms)
+    indice = IndiceLocal(args.dimension, latencia_ms=args.latencia_ms)
+    textos = [f"chunk {i} sobre los programas de DATAPATH" for i in range(args.documentos)]
+    indice.upsert([
+        (f"doc-{i}", vector, {"text": texto})
+        for i, (texto, vector) in enumerate(zip(textos, EmbeddingsLocales(args.dimension).embed_documents(textos)))
+    ])
+    consultas = [f"consulta {i} sobre cursos" for i in range(args.consultas)]
+    buscador = BuscadorMulticonsulta(indice, embeddings)
+
+    inicio = time.perf_counter()
+    secuencial = [buscador.consultar(embeddings.embed_query(c), 5, None) for c in consultas]
+    secuencial_ms = (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    lote = buscador.buscar_lote(consultas, 5)
+    lote_ms = (time.perf_counter() - inicio) * 1000
+
+    iguales = all([d['id'] for d in a] == [d['id'] for d in b] for a, b in zip(secuencial, lote))
+    print("=" * 70)
+    print(f"📊 {args.consultas} consultas (latencia simulada {args.latencia_ms:.0f} ms por llamada)")
+    print("=" * 70)
+    print(f"   Secuencial:       {secuencial_ms:8.1f} ms")
+    print(f"   Lote en paralelo: {lote_ms:8.1f} ms ({secuencial_ms / lote_ms:.1f}x) | mismos resultados: {iguales}")
@@ -0,0 +1,157 @@
+"""
+Presupuesto de Tokens por Turno para los Resultados de las Tools
+Cada tool decidía por su cuenta cuánto texto devolver (Tavily cortado a 500
+caracteres, 5 chunks completos de la base de conocimientos) y nada limitaba el
+total cuando el agente usa varias tools en el mismo turno.
+
+- Cada resultado se divide en bloques "[i] ..." con su relevancia
+  ("Relevancia: 83%" si la tool la informa; si no, decae con la posición)
+- El presupuesto del turno se reparte entre TODOS los bloques en proporción a su
+  relevancia (lo que un bloque corto no usa pasa a los demás)
+- Cada bloque se recorta en límites de oración. Un bloque solo se conserva si
+  su parte le alcanza para el título, las fuentes y un mínimo de cuerpo; si no,
+  se descarta el menos relevante y se vuelve a repartir
+
+Así el prompt de la segunda llamada al LLM tiene un tamaño acotado y predecible.
+
+Variables en .env:
+- PRESUPUESTO_TOKENS_TURNO=1500     Tokens para todos los resultados del turno (0 = sin límite)
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import os
+import re
+from typing import List
+
+from utilidades.tokens import contar_tokens
+
+PRESUPUESTO_TOKENS_TURNO = int(os.getenv("PRESUPUESTO_TOKENS_TURNO", "1500"))
+MINIMO_TOKENS_BLOQUE = 30       # Un bloque con menos tokens asignados se descarta
+MINIMO_TOKENS_CUERPO = 15       # Cuerpo mínimo de un bloque recortado, además de título y fuentes
+SEPARADOR_TOKENS = 3            # Saltos de línea entre título, cuerpo, fuentes y bloques
+DECAIMIENTO_POSICION = 0.9      # Relevancia por posición cuando la tool no la informa
+
+_INICIO_BLOQUE = re.compile(r"^\[\d+\]")
+_RELEVANCIA = re.compile(r"Relevancia: (\d+)%")
+_FIN_ORACION = re.compile(r"(?<=[.!?…])\s+")
+
+
+def recortar_oraciones(texto: str, max_tokens: int) -> str:
+    """Recorta el texto a max_tokens sin cortar oraciones (salvo que la primera ya no quepa)."""
+    if contar_tokens(texto) <= max_tokens:
+        return texto
+    resultado = ""
+    for oracion in _FIN_ORACION.split(texto):
+        candidato = f"{resultado} {oracion}" if resultado else oracion
+        if contar_tokens(candidato) > max_tokens:
+            break
+        resultado = candidato
+    if resultado:
+        return resultado
+    # La primera oración no cabe: se corta por palabras
+    palabras = texto.split()
+    while palabras and contar_tokens(" ".join(palabras) + "…") > max_tokens:
+        palabras = palabras[:max(1, len(palabras) * 3 // 4)] if len(palabras) > 1 else []
+    return " ".join(palabras) + "…" if palabras else ""
+
+
+def _dividir_bloques(texto: str) -> tuple:
+    """Separa el encabezado general de la tool y sus bloques '[i] ...'."""
+    encabezado, bloques = [], []
+    for linea in texto.split("\n"):
+        if _INICIO_BLOQUE.match(linea):
+            bloques.append([linea])
+        elif bloques:
+            bloques[-1].append(linea)
+        else:
+            encabezado.append(linea)
+
+    resultado = []
+    for posicion, lineas in enumerate(bloques):
+        relevancia = _RELEVANCIA.search(lineas[0])
+        # Las líneas "Fuente: url" no se recortan: se conservan con el título
+        fuentes = [linea for linea in lineas[1:] if linea.startswith("Fuente:")]
+        resultado.append({
+            'titulo': lineas[0],
+            'cuerpo': "\n".join(l for l in lineas[1:] if not l.startswith("Fuente:")).strip(),
+            'pie': "\n".join(fuentes),
+            'relevancia': int(relevancia.group(1)) / 100 if relevancia else DECAIMIENTO_POSICION ** posicion,
+        })
+    return "\n".join(encabezado).strip(), resultado
+
+
+def asignar_presupuesto(resultados: List[str], presupuesto: int = PRESUPUESTO_TOKENS_TURNO) -> List[str]:
+    """
+    Reparte el presupuesto del turno entre los resultados de las tools.
+
+    Args:
+        resultados: Texto devuelto por cada tool (en el orden de las tool calls)
+        presupuesto: Tokens totales para todos los resultados (0 = sin límite)
+
+    Returns:
+        list: Resultados recortados, en el mismo orden
+    """
+    if presupuesto <= 0 or sum(contar_tokens(r) for r in resultados) <= presupuesto:
+        return list(resultados)
+
+    # Encabezados y resultados sin bloques (ej. fecha/hora) son cortos: se reservan primero
+    partes, bloques = [], []
+    restante = presupuesto
+    for indice, texto in enumerate(resultados):
+        encabezado, propios = _dividir_bloques(texto)
+        encabezado = recortar_oraciones(encabezado, max(0, restante - SEPARADOR_TOKENS))
+        restante -= (contar_tokens(encabezado) if encabezado else 0) + SEPARADOR_TOKENS
+        partes.append(encabezado)
+        for bloque in propios:
+            bloque['resultado'] = indice
+            bloque['fijos'] = (contar_tokens(bloque['titulo']) + SEPARADOR_TOKENS
+                               + (contar_tokens(bloque['pie']) if bloque['pie'] else 0))
+            bloque['tokens'] = bloque['fijos'] + contar_tokens(bloque['cuerpo'])
+            # Por debajo de esto el bloque sería solo título y fuentes (o nada útil)
+            bloque['minimo'] = min(bloque['tokens'], max(MINIMO_TOKENS_BLOQUE, bloque['fijos'] + MINIMO_TOKENS_CUERPO))
+            bloques.append(bloque)
+
+    # Si a un bloque no le alcanza su parte, se descarta el menos relevante de esos y
+    # se reparte de nuevo entre los demás, hasta que todos los conservados quepan
+    conservados = list(bloques)
+    while conservados:
+        _repartir(conservados, restante)
+        insuficientes = [b for b in conservados if b['asignado'] < b['minimo']]
+        if not insuficientes:
+            break
+        conservados.remove(min(insuficientes, key=lambda b: b['relevancia']))
+
+    cuerpos = [[] for _ in resultados]
+    for bloque in bloques:
+        if not any(bloque is b for b in conservados):
+            continue
+        cuerpo = recortar_oraciones(bloque['cuerpo'], bloque['asignado'] - bloque['fijos'])
+        lineas = [bloque['titulo'], cuerpo, bloque['pie']]
+        cuerpos[bloque['resultado']].append("\n".join(linea for linea in lineas if linea))
+
+    return [
+        "\n\n".join(p for p in [encabezado] + cuerpo if p) + "\n"
+        for encabezado, cuerpo in zip(partes, cuerpos)
+    ]
+
+
+def _repartir(bloques: List[dict], restante: int) -> None:
+    """
+    Reparte restante tokens en proporción a la relevancia (deja 'asignado' en cada bloque).
+    Los bloques que caben enteros toman solo lo que necesitan y el sobrante pasa a los demás.
+    """
+    for b in bloques:
+        b['asignado'] = 0
+    pendientes = list(bloques)
+    while pendientes and restante > 0:
+        total = sum(b['relevancia'] for b in pendientes) or 1.0
+        enteros = [b for b in pendientes if b['tokens'] <= restante * b['relevancia'] / total]
+        if not enteros:
+            for b in pendientes:
+                b['asignado'] = int(restante * b['relevancia'] / total)
+            break
+        for b in enteros:
+            b['asignado'] = b['tokens']
+            restante -= b['tokens']
+            pendientes.remove(b)
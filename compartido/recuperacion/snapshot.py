@@ -0,0 +1,318 @@
+"""
+Snapshot de Embeddings en Disco (compartido con mmap)
+Cuando uvicorn corre con varios workers, cada uno tendría su propia copia de los
+vectores. Con un snapshot en disco todos los workers mapean los MISMOS archivos
+(mmap de solo lectura): el sistema operativo guarda una sola copia en su caché
+de páginas y la memoria residente no crece con el número de workers.
+
+Formato (una carpeta por versión):
+    snapshots/
+        actual -> v-20260115-103000-123456      (symlink: versión activa)
+        v-20260115-103000-123456/
+            manifest.json       n, dimension, fuente, fecha
+            embeddings.f32      matriz (n, d) float32 pre-normalizada
+            textos.bin          contenidos en UTF-8, uno tras otro
+            offsets.i64         n+1 offsets de inicio/fin de cada texto
+            ids.json            ids de cada fila
+            metadatos.json      metadata de cada fila
+
+La publicación es atómica: se escribe una carpeta nueva y luego se reemplaza
+el symlink "actual" con os.replace. Los workers detectan el cambio y reabren.
+
+Uso (generar snapshot):
+    python -m recuperacion.snapshot --fuente supabase --directorio snapshots/
+    python -m recuperacion.snapshot --fuente pinecone --directorio snapshots/
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from recuperacion.cuantizacion import (
+    CUANTIZACION, CUANTIZACION_CANDIDATOS, CUANTIZACION_DIMENSION, IndiceCuantizado,
+)
+from recuperacion.matriz import mascara_filtro, normalizar, seleccionar_top_k
+
+ENLACE_ACTUAL = "actual"
+VERSIONES_A_CONSERVAR = 2
+INTERVALO_REVISION_SEGUNDOS = 5.0
+
+
+# ============================================
+# ESCRITURA (publicar un snapshot nuevo)
+# ============================================
+def escribir_snapshot(directorio: str, ids: Sequence, contenidos: Sequence[str], vectores,
+                      metadatos: Optional[Sequence[dict]] = None, fuente: str = "") -> str:
+    """
+    Escribe una versión nueva del snapshot y la activa de forma atómica.
+
+    Args:
+        directorio: Carpeta raíz de snapshots
+        ids: Identificadores de cada chunk
+        contenidos: Texto de cada chunk
+        vectores: Embeddings (n, d) sin normalizar
+        metadatos: Metadata opcional de cada chunk
+        fuente: Origen de los datos (supabase / pinecone), solo informativo
+
+    Returns:
+        str: Ruta de la versión publicada
+    """
+    os.makedirs(directorio, exist_ok=True)
+    version = "v-" + datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    temporal = os.path.join(directorio, f".tmp-{version}")
+    os.makedirs(temporal)
+
+    matriz = normalizar(vectores) if len(ids) else np.empty((0, 0), dtype=np.float32)
+    np.ascontiguousarray(matriz, dtype=np.float32).tofile(os.path.join(temporal, "embeddings.f32"))
+
+    offsets = np.zeros(len(contenidos) + 1, dtype=np.int64)
+    with open(os.path.join(temporal, "textos.bin"), "wb") as f:
+        for i, contenido in enumerate(contenidos):
+            datos = (contenido or "").encode("utf-8")
+            f.write(datos)
+            offsets[i + 1] = offsets[i] + len(datos)
+    offsets.tofile(os.path.join(temporal, "offsets.i64"))
+
+    with open(os.path.join(temporal, "ids.json"), "w", encoding="utf-8") as f:
+        json.dump(list(ids), f)
+    with open(os.path.join(temporal, "metadatos.json"), "w", encoding="utf-8") as f:
+        json.dump(list(metadatos or [{}] * len(ids)), f, ensure_ascii=False)
+    with open(os.path.join(temporal, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "n": int(matriz.shape[0]),
+            "dimension": int(matriz.shape[1]) if matriz.ndim == 2 else 0,
+            "fuente": fuente,
+            "creado": datetime.now().isoformat(),
+        }, f, indent=2)
+
+    # 1) La carpeta completa aparece de golpe; 2) el symlink cambia de golpe
+    destino = os.path.join(directorio, version)
+    os.rename(temporal, destino)
+    enlace_temporal = os.path.join(directorio, f".{ENLACE_ACTUAL}-{version}")
+    os.symlink(version, enlace_temporal)
+    os.replace(enlace_temporal, os.path.join(directorio, ENLACE_ACTUAL))
+
+    _limpiar_versiones(directorio, version)
+    print(f"✓ Snapshot publicado: {destino} ({matriz.shape[0]} vectores)")
+    return destino
+
+
+def _limpiar_versiones(directorio: str, actual: str) -> None:
+    """
+    Borra versiones antiguas (conserva las últimas VERSIONES_A_CONSERVAR).
+    En Linux un worker que aún mapea una versión borrada sigue leyéndola sin error.
+    """
+    versiones = sorted(n for n in os.listdir(directorio) if n.startswith("v-") and n != actual)
+    for nombre in versiones[:max(0, len(versiones) - (VERSIONES_A_CONSERVAR - 1))]:
+        shutil.rmtree(os.path.join(directorio, nombre), ignore_errors=True)
+
+
+# ============================================
+# LECTURA (workers)
+# ============================================
+class SnapshotEmbeddings:
+    """
+    Snapshot abierto con mmap de solo lectura (cero copias entre procesos).
+    Misma búsqueda que MatrizEmbeddings; revisa cada pocos segundos si se
+    publicó una versión nueva y la reabre sin detener las búsquedas.
+
+    Con cuantizacion ("int8" / "binario") la primera etapa usa códigos en memoria
+    y solo las filas candidatas se leen del mmap para el re-ranking exacto.
+    """
+
+    def __init__(self, directorio: str, intervalo_revision: float = INTERVALO_REVISION_SEGUNDOS,
+                 cuantizacion: str = CUANTIZACION):
+        self.directorio = directorio
+        self.intervalo_revision = intervalo_revision
+        self.cuantizacion = cuantizacion
+        self.version = None
+        self._datos = None
+        self._ultima_revision = 0.0
+        self._lock = threading.Lock()
+        self.recargar_si_cambio(forzar=True)
+
+    def __len__(self) -> int:
+        return len(self._datos["ids"]) if self._datos else 0
+
+    def _abrir(self, version: str) -> dict:
+        carpeta = os.path.join(self.directorio, version)
+        with open(os.path.join(carpeta, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+        with open(os.path.join(carpeta, "ids.json"), encoding="utf-8") as f:
+            ids = json.load(f)
+        with open(os.path.join(carpeta, "metadatos.json"), encoding="utf-8") as f:
+            metadatos = json.load(f)
+
+        n, d = manifest["n"], manifest["dimension"]
+        if n == 0:
+            matriz = np.empty((0, d), dtype=np.float32)
+            textos = b""
+        else:
+            matriz = np.memmap(os.path.join(carpeta, "embeddings.f32"), dtype=np.float32, mode="r", shape=(n, d))
+            textos = np.memmap(os.path.join(carpeta, "textos.bin"), dtype=np.uint8, mode="r")
+        offsets = np.fromfile(os.path.join(carpeta, "offsets.i64"), dtype=np.int64)
+
+        cuantizado = None
+        if self.cuantizacion and n > 0:
+            cuantizado = IndiceCuantizado(matriz, self.cuantizacion, CUANTIZACION_DIMENSION,
+                                          CUANTIZACION_CANDIDATOS)
+
+        return {"matriz": matriz, "textos": textos, "offsets": offsets, "cuantizado": cuantizado,
+                "ids": ids, "metadatos": metadatos, "manifest": manifest}
+
+    def recargar_si_cambio(self, forzar: bool = False) -> bool:
+        """Reabre el snapshot si el symlink 'actual' apunta a otra versión."""
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultima_revision < self.intervalo_revision:
+            return False
+        self._ultima_revision = ahora
+
+        try:
+            version = os.readlink(os.path.join(self.directorio, ENLACE_ACTUAL))
+        except OSError:
+            return False
+        if version == self.version:
+            return False
+
+        datos = self._abrir(version)
+        with self._lock:
+            self._datos, self.version = datos, version
+        print(f"   🔄 Snapshot cargado: {version} ({len(datos['ids'])} vectores)")
+        return True
+
+    def contenido(self, fila: int) -> str:
+        datos = self._datos
+        inicio, fin = datos["offsets"][fila], datos["offsets"][fila + 1]
+        return bytes(datos["textos"][inicio:fin]).decode("utf-8")
+
+    def buscar(self, query_vector, top_k: int = 5, filtro: Optional[dict] = None) -> List[dict]:
+        """Top-k documentos más similares (mismo formato que MatrizEmbeddings.buscar)."""
+        self.recargar_si_cambio()
+        with self._lock:
+            datos = self._datos
+        if not datos or len(datos["ids"]) == 0:
+            return []
+
+        excluir = mascara_filtro(datos["metadatos"], filtro) if filtro else None
+        if datos["cuantizado"] is not None:
+            filas, similitudes = datos["cuantizado"].buscar(query_vector, top_k, excluir)
+            return [
+                {'id': datos["ids"][i], 'content': self.contenido(i), 'similitud': float(s)}
+                for i, s in zip(filas, similitudes)
+            ]
+
+        scores = datos["matriz"] @ normalizar(query_vector)
+        if excluir:
+            scores[excluir] = -np.inf
+
+        return [
+            {'id': datos["ids"][i], 'content': self.contenido(i), 'similitud': float(scores[i])}
+            for i in seleccionar_top_k(scores, top_k) if np.isfinite(scores[i])
+        ]
+
+
+# ============================================
+# FUENTES: leer todos los vectores
+# ============================================
+COLUMNAS_DOCUMENTOS = 'id, content, metadata, embedding'
+
+
+def leer_supabase_lotes(cliente, tabla: str, lote: int = 500,
+                        columnas: str = COLUMNAS_DOCUMENTOS) -> Iterable[List[dict]]:
+    """
+    Recorre la tabla de documentos de Supabase por páginas con keyset (id > último id).
+
+    A diferencia de .range(desde, hasta), cada página usa el índice de la PK y cuesta
+    lo mismo al inicio que al final de la tabla. Solo viajan las columnas pedidas y
+    en memoria hay una página a la vez.
+
+    Args:
+        cliente: Cliente de Supabase (reutilizar el mismo: su sesión HTTP queda keep-alive)
+        tabla: Tabla de documentos
+        lote: Filas por página (no mayor que el max-rows de la API, 1000 por defecto)
+        columnas: Columnas a traer (debe incluir 'id')
+
+    Yields:
+        list: Filas de la página; 'embedding' ya convertido a lista y 'metadata' nunca None
+    """
+    ultimo_id = None
+    while True:
+        consulta = cliente.table(tabla).select(columnas).order('id').limit(lote)
+        if ultimo_id is not None:
+            consulta = consulta.gt('id', ultimo_id)
+        filas = consulta.execute().data or []
+
+        for fila in filas:
+            if isinstance(fila.get('embedding'), str):
+                fila['embedding'] = json.loads(fila['embedding'])
+            if 'metadata' in fila:
+                fila['metadata'] = fila['metadata'] or {}
+        if filas:
+            yield filas
+        if len(filas) < lote:
+            break
+        ultimo_id = filas[-1]['id']
+
+
+def leer_supabase(cliente, tabla: str, lote: int = 500,
+                  columnas: str = COLUMNAS_DOCUMENTOS) -> Iterable[dict]:
+    """Recorre la tabla de documentos de Supabase fila por fila (ver leer_supabase_lotes)."""
+    for filas in leer_supabase_lotes(cliente, tabla, lote, columnas):
+        yield from filas
+
+
+def leer_pinecone(indice, namespace: str = "", lote: int = 100) -> Iterable[dict]:
+    """Recorre un índice de Pinecone (serverless): list() de ids + fetch() por lotes."""
+    for ids in indice.list(namespace=namespace, limit=lote):
+        respuesta = indice.fetch(ids=list(ids), namespace=namespace)
+        for id_, vector in respuesta.vectors.items():
+            metadata = dict(vector.metadata or {})
+            # PineconeVectorStore guarda el texto del chunk en metadata["text"]
+            contenido = metadata.pop("text", "")
+            yield {'id': id_, 'content': contenido, 'metadata': metadata, 'embedding': vector.values}
+
+
+def generar_desde_filas(directorio: str, filas: Iterable[dict], fuente: str) -> str:
+    """Publica un snapshot a partir de filas {'id', 'content', 'metadata', 'embedding'}."""
+    ids, contenidos, metadatos, vectores = [], [], [], []
+    for fila in filas:
+        ids.append(fila['id'])
+        contenidos.append(fila['content'])
+        metadatos.append(fila['metadata'])
+        vectores.append(np.asarray(fila['embedding'], dtype=np.float32))
+    matriz = np.stack(vectores) if vectores else np.empty((0, 0), dtype=np.float32)
+    return escribir_snapshot(directorio, ids, contenidos, matriz, metadatos, fuente)
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv, find_dotenv
+
+    load_dotenv(find_dotenv())
+
+    parser = argparse.ArgumentParser(description="Genera un snapshot de embeddings para los workers")
+    parser.add_argument("--fuente", choices=["supabase", "pinecone"], required=True)
+    parser.add_argument("--directorio", default=os.getenv("SNAPSHOT_DIR", "snapshots"))
+    args = parser.parse_args()
+
+    if args.fuente == "supabase":
+        from supabase import create_client
+        cliente = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_KEY"))
+        filas = leer_supabase(cliente, "documents_langchain_asistente_de_ventas")
+    else:
+        from pinecone import Pinecone
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        indice = pc.Index(os.getenv("PINECONE_INDEX_NAME", "langchain-pinecone-asistente-de-ventas"))
+        # Namespace de la versión activa (recuperacion/versiones.py); "" si no hay versiones
+        from recuperacion.versiones import leer_activo_pinecone
+        filas = leer_pinecone(indice, leer_activo_pinecone(indice) or "")
+
+    generar_desde_filas(args.directorio, filas, args.fuente)
@@ -0,0 +1,451 @@
+"""
+Versiones del Índice (reindexación blue/green sin cortar el servicio)
+Recargar la base de conocimientos sobre el mismo destino que leen las tools
+(vaciarlo y volver a cargar) deja a buscar_datapath sin resultados mientras
+dura la carga. Con versiones la carga nunca toca lo que se está sirviendo:
+
+1. Se construye una versión nueva a un lado: un namespace de Pinecone
+   (v20261018103000) o una tabla de Supabase (<tabla>_v20261018103000)
+2. Se valida: el conteo es el esperado y no menor que VERSIONES_MINIMO_RELATIVO
+   del de la versión activa (una carga a medias no se publica)
+3. Se cambia el puntero en un solo paso atómico:
+   - Pinecone: registro "activo" del namespace _versiones (metadata con el namespace)
+   - Supabase: la tabla de documentos pasa a ser una vista sobre la versión activa
+     (create or replace view + fila en documentos_versiones, en una transacción);
+     la función match_documents y la API la leen igual que antes
+4. Se eliminan las versiones antiguas: se conservan VERSIONES_A_CONSERVAR
+   contando la activa, para volver atrás con "activar"
+
+Las tools revisan el puntero cada VERSIONES_REVISION_SEGUNDOS en un hilo
+aparte (VersionActiva): las búsquedas nunca esperan por la revisión y siguen
+sobre la versión activa mientras se construye la siguiente.
+
+Variables en .env:
+- VERSIONES_REVISION_SEGUNDOS=10    Cada cuánto las tools revisan el puntero (0 = no revisar)
+- VERSIONES_A_CONSERVAR=2           Versiones que se conservan al limpiar (incluida la activa)
+- VERSIONES_MINIMO_RELATIVO=0.5     Conteo mínimo de la versión nueva respecto de la activa
+
+Uso (estado, volver atrás y limpieza; desde cualquier proyecto que instale ../compartido):
+    python -m recuperacion.versiones pinecone estado
+    python -m recuperacion.versiones pinecone activar v20261018103000
+    python -m recuperacion.versiones supabase limpiar --conservar 1
+
+Construir una versión nueva:
+    python -m recuperacion.carga_supabase --pdf Base_de_Conocimientos/ --nueva-version   (Supabase)
+    python -m ingesta.reindexar Base_de_Conocimientos/                                    (RAG-con-Pinecone)
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import argparse
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+VERSIONES_REVISION_SEGUNDOS = float(os.getenv("VERSIONES_REVISION_SEGUNDOS", "10"))
+VERSIONES_A_CONSERVAR = int(os.getenv("VERSIONES_A_CONSERVAR", "2"))
+VERSIONES_MINIMO_RELATIVO = float(os.getenv("VERSIONES_MINIMO_RELATIVO", "0.5"))
+ESPERA_CONTEO_SEGUNDOS = 120            # Pinecone tarda unos segundos en reflejar los upserts
+
+PATRON_VERSION = re.compile(r"^v\d{14}$")
+VERSION_LEGADO = "v00000000000000"      # Tabla original de Supabase al activar la primera versión
+
+NAMESPACE_VERSIONES = "_versiones"
+ID_ACTIVO = "activo"
+TABLA_VERSIONES = "documentos_versiones"
+
+
+def nueva_version() -> str:
+    """Nombre de versión ordenable por fecha (válido como namespace y como sufijo de tabla)."""
+    return datetime.now().strftime("v%Y%m%d%H%M%S")
+
+
+def validar_conteo(version: str, conteo: int, esperados: Optional[int] = None,
+                   conteo_activo: int = 0, minimo_relativo: float = VERSIONES_MINIMO_RELATIVO) -> None:
+    """
+    Verifica que una versión esté completa antes de activarla.
+
+    Args:
+        version: Versión a activar
+        conteo: Vectores/filas de la versión
+        esperados: Los que escribió la carga (None = no se compara)
+        conteo_activo: Los de la versión activa (0 = no se compara)
+        minimo_relativo: Fracción mínima del conteo activo
+
+    Raises:
+        ValueError: Si la versión está vacía, incompleta o es sospechosamente pequeña
+    """
+    if conteo == 0:
+        raise ValueError(f"❌ La versión {version} está vacía: no se activa")
+    if esperados is not None and conteo != esperados:
+        raise ValueError(f"❌ La versión {version} tiene {conteo:,} registros y se cargaron {esperados:,}: no se activa")
+    if conteo_activo and conteo < minimo_relativo * conteo_activo:
+        raise ValueError(
+            f"❌ La versión {version} tiene {conteo:,} registros, menos del {minimo_relativo:.0%} "
+            f"de la activa ({conteo_activo:,}): no se activa (usar --forzar si es intencional)"
+        )
+
+
+# ============================================
+# LECTURA DEL PUNTERO EN LAS TOOLS
+# ============================================
+class VersionActiva:
+    """
+    Versión activa leída del puntero, revisada en segundo plano.
+
+    actual() retorna siempre el último valor conocido sin esperar: cuando pasó
+    el intervalo lanza la revisión en un hilo. Si la lectura falla se conserva
+    la versión anterior. Al cambiar se llama a los suscriptores con la versión
+    nueva (ej. cache_resultados.nueva_version) desde ese mismo hilo.
+
+    Args:
+        leer: Función que lee el puntero (None = sin versiones)
+        intervalo: Segundos entre revisiones (0 = solo la lectura inicial)
+    """
+
+    def __init__(self, leer: Callable[[], Optional[str]], intervalo: float = VERSIONES_REVISION_SEGUNDOS):
+        self._leer = leer
+        self.intervalo = intervalo
+        self.version: Optional[str] = None
+        self._suscriptores: List[Callable[[Optional[str]], None]] = []
+        self._lock = threading.Lock()
+        self._revisando = False
+        self._ultimo_error = None
+        self.version = self._leer_seguro()
+        self._ultima_revision = time.monotonic()
+
+    def suscribir(self, callback: Callable[[Optional[str]], None]) -> None:
+        self._suscriptores.append(callback)
+
+    def _leer_seguro(self) -> Optional[str]:
+        try:
+            version = self._leer()
+            self._ultimo_error = None
+            return version
+        except Exception as e:
+            # Un error de red no cambia de versión; se avisa una vez por error distinto
+            if str(e) != self._ultimo_error:
+                self._ultimo_error = str(e)
+                print(f"   ⚠️  No se pudo leer la versión activa del índice: {e}")
+            return self.version
+
+    def actual(self) -> Optional[str]:
+        if self.intervalo > 0 and time.monotonic() - self._ultima_revision >= self.intervalo:
+            with self._lock:
+                if not self._revisando:
+                    self._revisando = True
+                    threading.Thread(target=self._revisar, name="version-activa", daemon=True).start()
+        return self.version
+
+    def _revisar(self) -> None:
+        try:
+            version = self._leer_seguro()
+            if version != self.version:
+                anterior, self.version = self.version, version
+                print(f"   🔀 Versión del índice: {anterior or '(sin versiones)'} → {version or '(sin versiones)'}")
+                for callback in list(self._suscriptores):
+                    try:
+                        callback(version)
+                    except Exception as e:
+                        print(f"   ⚠️  Error al aplicar la versión {version}: {e}")
+        finally:
+            self._ultima_revision = time.monotonic()
+            self._revisando = False
+
+
+# ============================================
+# PINECONE: UN NAMESPACE POR VERSIÓN
+# ============================================
+def leer_activo_pinecone(indice) -> Optional[str]:
+    """Namespace activo según el puntero (None = nunca se activó una versión: namespace "")."""
+    respuesta = indice.fetch(ids=[ID_ACTIVO], namespace=NAMESPACE_VERSIONES)
+    registro = respuesta.vectors.get(ID_ACTIVO)
+    return (registro.metadata or {}).get("namespace") if registro else None
+
+
+def conteos_pinecone(indice) -> Dict[str, int]:
+    """Vectores por namespace con datos (sin el namespace del puntero)."""
+    estadisticas = indice.describe_index_stats()
+    return {
+        namespace: resumen.vector_count
+        for namespace, resumen in (estadisticas.namespaces or {}).items()
+        if namespace != NAMESPACE_VERSIONES and resumen.vector_count > 0
+    }
+
+
+def esperar_conteo_pinecone(indice, namespace: str, esperados: int,
+                            timeout: float = ESPERA_CONTEO_SEGUNDOS) -> int:
+    """Espera a que describe_index_stats refleje los upserts (consistencia eventual)."""
+    limite = time.monotonic() + timeout
+    while True:
+        conteo = conteos_pinecone(indice).get(namespace, 0)
+        if conteo >= esperados or time.monotonic() >= limite:
+            return conteo
+        time.sleep(2)
+
+
+def activar_pinecone(indice, namespace: str, esperados: Optional[int] = None,
+                     minimo_relativo: float = VERSIONES_MINIMO_RELATIVO, forzar: bool = False) -> dict:
+    """
+    Valida el namespace y mueve el puntero hacia él (un solo upsert).
+
+    Args:
+        indice: pinecone.Index
+        namespace: Versión a activar
+        esperados: Vectores que escribió la carga (None = solo la validación relativa)
+        minimo_relativo: Fracción mínima del conteo de la versión activa
+        forzar: Activar aunque la validación falle
+
+    Returns:
+        dict: {'version', 'anterior', 'vectores'}
+    """
+    conteo = esperar_conteo_pinecone(indice, namespace, esperados) if esperados else \
+        conteos_pinecone(indice).get(namespace, 0)
+    anterior = leer_activo_pinecone(indice)
+    conteo_activo = conteos_pinecone(indice).get(anterior or "", 0)
+    if not forzar:
+        validar_conteo(namespace, conteo, esperados, conteo_activo if namespace != (anterior or "") else 0,
+                       minimo_relativo)
+
+    # El puntero es un vector más: Pinecone exige la dimensión del índice y algún valor distinto de cero
+    dimension = indice.describe_index_stats().dimension
+    indice.upsert(vectors=[{
+        "id": ID_ACTIVO,
+        "values": [1.0] + [0.0] * (dimension - 1),
+        "metadata": {"namespace": namespace, "anterior": anterior or "", "vectores": conteo,
+                     "activada": datetime.now().isoformat(timespec="seconds")},
+    }], namespace=NAMESPACE_VERSIONES)
+    print(f"   🔀 Versión activa: {anterior or '(namespace predeterminado)'} → {namespace} ({conteo:,} vectores)")
+    return {"version": namespace, "anterior": anterior, "vectores": conteo}
+
+
+def limpiar_pinecone(indice, conservar: int = VERSIONES_A_CONSERVAR) -> List[str]:
+    """
+    Elimina los namespaces de versiones antiguas (nunca el activo).
+    Se conservan la activa y las conservar-1 más recientes; el namespace
+    predeterminado ("", carga anterior a las versiones) cuenta como la más antigua.
+    """
+    activo = leer_activo_pinecone(indice)
+    if activo is None:
+        return []               # sin puntero, el namespace predeterminado es el que se sirve
+    candidatas = sorted(
+        (ns for ns in conteos_pinecone(indice) if ns != activo and (ns == "" or PATRON_VERSION.match(ns))),
+        reverse=True,
+    )
+    eliminadas = candidatas[max(conservar - 1, 0):]
+    for namespace in eliminadas:
+        indice.delete(delete_all=True, namespace=namespace)
+        print(f"   🗑  Versión eliminada: {namespace or '(namespace predeterminado)'}")
+    return eliminadas
+
+
+# ============================================
+# SUPABASE: UNA TABLA POR VERSIÓN + VISTA
+# ============================================
+def tabla_version(tabla_base: str, version: str) -> str:
+    return f"{tabla_base}_{version}"
+
+
+def leer_activa_supabase(cliente, tabla_base: str) -> Optional[str]:
+    """Versión activa vía la API de Supabase (tools; None = la tabla aún no tiene versiones)."""
+    try:
+        respuesta = (
+            cliente.table(TABLA_VERSIONES).select("version")
+            .eq("tabla_base", tabla_base).limit(1).execute()
+        )
+    except Exception as e:
+        # La tabla de versiones se crea al activar la primera versión
+        if "PGRST205" in str(e) or "42P01" in str(e):
+            return None
+        raise
+    return respuesta.data[0]["version"] if respuesta.data else None
+
+
+def _asegurar_tabla_versiones(cursor) -> None:
+    from psycopg import sql
+
+    cursor.execute(sql.SQL("""
+        create table if not exists {} (
+            tabla_base  text primary key,
+            version     text not null,
+            tabla       text not null,
+            filas       bigint,
+            activada    timestamptz not null default now()
+        )
+    """).format(sql.Identifier(TABLA_VERSIONES)))
+
+
+def _existe(cursor, relacion: str) -> Optional[str]:
+    """Tipo de relación ('r' tabla, 'v' vista) o None si no existe."""
+    cursor.execute("select c.relkind from pg_class c where c.oid = to_regclass(%s)", (relacion,))
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
+
+
+def _leer_activa_sql(cursor, tabla_base: str, columna: str = "version") -> Optional[str]:
+    from psycopg import sql
+
+    if not _existe(cursor, TABLA_VERSIONES):
+        return None
+    cursor.execute(sql.SQL("select {} from {} where tabla_base = %s").format(
+        sql.Identifier(columna), sql.Identifier(TABLA_VERSIONES)), (tabla_base,))
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
+
+
+def tabla_activa_supabase(conexion, tabla_base: str) -> str:
+    """Tabla física que se está sirviendo (la base si aún no hay versiones)."""
+    with conexion.cursor() as cursor:
+        return _leer_activa_sql(cursor, tabla_base, "tabla") or tabla_base
+
+
+def crear_version_supabase(conexion, tabla_base: str, version: str, dimension: int = 1536) -> str:
+    """Crea la tabla vacía de una versión (mismas columnas que la tabla de documentos)."""
+    from psycopg import sql
+
+    tabla = tabla_version(tabla_base, version)
+    with conexion.transaction():
+        conexion.execute(sql.SQL(
+            "create table {} (id bigserial primary key, content text, metadata jsonb, embedding vector({}))"
+        ).format(sql.Identifier(tabla), sql.Literal(dimension)))
+    return tabla
+
+
+def _contar(cursor, tabla: str) -> int:
+    from psycopg import sql
+
+    cursor.execute(sql.SQL("select count(*) from {}").format(sql.Identifier(tabla)))
+    return cursor.fetchone()[0]
+
+
+def activar_supabase(conexion, tabla_base: str, version: str, esperados: Optional[int] = None,
+                     minimo_relativo: float = VERSIONES_MINIMO_RELATIVO, forzar: bool = False) -> dict:
+    """
+    Valida la tabla de la versión y apunta la vista de documentos hacia ella,
+    todo en una transacción (las consultas ven la versión anterior o la nueva,
+    nunca una tabla vacía).
+
+    La primera vez, la tabla original se renombra a la versión VERSION_LEGADO
+    (conserva sus índices) y en su lugar queda la vista.
+
+    Returns:
+        dict: {'version', 'anterior', 'filas'}
+    """
+    from psycopg import sql
+
+    tabla = tabla_version(tabla_base, version)
+    with conexion.transaction(), conexion.cursor() as cursor:
+        _asegurar_tabla_versiones(cursor)
+        if _existe(cursor, tabla) != "r":
+            raise ValueError(f"❌ No existe la tabla de la versión {version}: {tabla}")
+
+        anterior = _leer_activa_sql(cursor, tabla_base)
+        conteo = _contar(cursor, tabla)
+        tipo_base = _existe(cursor, tabla_base)
+        if not forzar:
+            conteo_activo = _contar(cursor, tabla_base) if tipo_base and version != anterior else 0
+            validar_conteo(version, conteo, esperados, conteo_activo, minimo_relativo)
+
+        if tipo_base == "r":
+            cursor.execute(sql.SQL("alter table {} rename to {}").format(
+                sql.Identifier(tabla_base), sql.Identifier(tabla_version(tabla_base, VERSION_LEGADO))))
+            anterior = anterior or VERSION_LEGADO
+
+        cursor.execute(sql.SQL(
+            "create or replace view {} as select id, content, metadata, embedding from {}"
+        ).format(sql.Identifier(tabla_base), sql.Identifier(tabla)))
+        cursor.execute(sql.SQL("""
+            insert into {} (tabla_base, version, tabla, filas, activada)
+            values (%s, %s, %s, %s, now())
+            on conflict (tabla_base) do update
+            set version = excluded.version, tabla = excluded.tabla,
+                filas = excluded.filas, activada = excluded.activada
+        """).format(sql.Identifier(TABLA_VERSIONES)), (tabla_base, version, tabla, conteo))
+        # La API de Supabase (PostgREST) vuelve a leer el esquema: la vista reemplazó a la tabla
+        cursor.execute("notify pgrst, 'reload schema'")
+
+    print(f"   🔀 Versión activa de '{tabla_base}': {anterior or '(tabla original)'} → {version} ({conteo:,} filas)")
+    return {"version": version, "anterior": anterior, "filas": conteo}
+
+
+def versiones_supabase(conexion, tabla_base: str) -> Dict[str, int]:
+    """Versiones existentes de la tabla: {version: filas}."""
+    with conexion.cursor() as cursor:
+        cursor.execute(
+            "select tablename from pg_tables where schemaname = current_schema() and starts_with(tablename, %s)",
+            (tabla_base + "_v",),
+        )
+        versiones = sorted(
+            nombre[len(tabla_base) + 1:] for (nombre,) in cursor.fetchall()
+            if PATRON_VERSION.match(nombre[len(tabla_base) + 1:])
+        )
+        return {version: _contar(cursor, tabla_version(tabla_base, version)) for version in versiones}
+
+
+def limpiar_supabase(conexion, tabla_base: str, conservar: int = VERSIONES_A_CONSERVAR) -> List[str]:
+    """Elimina las tablas de versiones antiguas (nunca la activa; ver limpiar_pinecone)."""
+    from psycopg import sql
+
+    with conexion.cursor() as cursor:
+        activa = _leer_activa_sql(cursor, tabla_base)
+    if activa is None:
+        return []               # sin versiones, la tabla original es la que se sirve
+
+    candidatas = sorted((v for v in versiones_supabase(conexion, tabla_base) if v != activa), reverse=True)
+    eliminadas = candidatas[max(conservar - 1, 0):]
+    for version in eliminadas:
+        with conexion.transaction():
+            conexion.execute(sql.SQL("drop table if exists {}").format(
+                sql.Identifier(tabla_version(tabla_base, version))))
+        print(f"   🗑  Versión eliminada: {tabla_version(tabla_base, version)}")
+    return eliminadas
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv, find_dotenv
+
+    load_dotenv(find_dotenv())
+
+    parser = argparse.ArgumentParser(description="Versiones del índice (blue/green): estado, activar y limpiar")
+    parser.add_argument("destino", choices=["pinecone", "supabase"])
+    parser.add_argument("accion", choices=["estado", "activar", "limpiar"])
+    parser.add_argument("version", nargs="?", help="Versión a activar (ej. v20261018103000)")
+    parser.add_argument("--tabla", default="documents_langchain_asistente_de_ventas")
+    parser.add_argument("--conservar", type=int, default=VERSIONES_A_CONSERVAR)
+    parser.add_argument("--forzar", action="store_true", help="Activar sin validar el conteo")
+    args = parser.parse_args()
+
+    if args.accion == "activar" and not args.version:
+        parser.error("activar requiere la versión")
+
+    if args.destino == "pinecone":
+        from pinecone import Pinecone
+
+        index_name = os.getenv("PINECONE_INDEX_NAME", "langchain-pinecone-asistente-de-ventas")
+        indice = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(index_name)
+        if args.accion == "activar":
+            activar_pinecone(indice, args.version, forzar=args.forzar)
+        elif args.accion == "limpiar":
+            limpiar_pinecone(indice, args.conservar)
+        activo = leer_activo_pinecone(indice)
+        print(f"📦 Índice '{index_name}' | versión activa: {activo or '(namespace predeterminado)'}")
+        for namespace, conteo in sorted(conteos_pinecone(indice).items()):
+            marca = "▶" if namespace == (activo or "") else " "
+            print(f"   {marca} {namespace or '(predeterminado)':20s} {conteo:>10,} vectores")
+    else:
+        import psycopg
+        from historial import obtener_database_url
+
+        with psycopg.connect(obtener_database_url(), autocommit=True) as conexion:
+            if args.accion == "activar":
+                activar_supabase(conexion, args.tabla, args.version, forzar=args.forzar)
+            elif args.accion == "limpiar":
+                limpiar_supabase(conexion, args.tabla, args.conservar)
+            activa = tabla_activa_supabase(conexion, args.tabla)
+            print(f"📦 Tabla '{args.tabla}' | versión activa: {activa}")
+            for version, conteo in versiones_supabase(conexion, args.tabla).items():
+                marca = "▶" if tabla_version(args.tabla, version) == activa else " "
+                print(f"   {marca} {version:20s} {conteo:>10,} filas")
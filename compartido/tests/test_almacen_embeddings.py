@@ -0,0 +1,99 @@
+"""
+Tests de recuperacion.almacen_embeddings: agregar y reabrir, recorte de una
+escritura interrumpida y EmbeddingsEnDisco sin llamadas repetidas a la API.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from recuperacion.almacen_embeddings import BYTES_CLAVE, AlmacenEmbeddings, EmbeddingsEnDisco, clave_texto
+from recuperacion.local import EmbeddingsLocales
+
+DIMENSION = 8
+MODELO = "text-embedding-ada-002"
+TEXTOS = [f"Chunk {i}: el Diplomado incluye el módulo {i} 📚" for i in range(5)]
+
+
+def _vectores(textos):
+    return EmbeddingsLocales(DIMENSION).embed_documents(textos)
+
+
+def test_agregar_y_reabrir(tmp_path):
+    almacen = AlmacenEmbeddings(str(tmp_path), MODELO)
+    claves = [clave_texto(t) for t in TEXTOS]
+    almacen.guardar(claves[:3], _vectores(TEXTOS[:3]))
+    almacen.guardar(claves[2:], _vectores(TEXTOS[2:]))      # El 2 ya estaba: no se duplica
+    assert len(almacen) == 5
+
+    reabierto = AlmacenEmbeddings(str(tmp_path), MODELO)
+    assert len(reabierto) == 5 and reabierto.dimension == DIMENSION
+    obtenidos = reabierto.obtener(claves + [clave_texto("no indexado")])
+    np.testing.assert_allclose(np.array(obtenidos[:5]), np.array(_vectores(TEXTOS), dtype=np.float32))
+    assert obtenidos[5] is None
+    assert reabierto.bytes_en_disco == 5 * (DIMENSION * 4 + BYTES_CLAVE)
+
+
+def test_cola_incompleta_se_descarta(tmp_path):
+    almacen = AlmacenEmbeddings(str(tmp_path), MODELO)
+    almacen.guardar([clave_texto(t) for t in TEXTOS[:3]], _vectores(TEXTOS[:3]))
+
+    # Corte a mitad de la escritura: medio vector del 4º y ninguna clave; y, aparte, una clave sin vector
+    with open(almacen.ruta_vectores, "ab") as f:
+        f.write(b"\x00" * (DIMENSION * 2))
+    with open(almacen.ruta_claves, "ab") as f:
+        f.write(clave_texto(TEXTOS[3])[:10])
+
+    reabierto = AlmacenEmbeddings(str(tmp_path), MODELO)
+    assert len(reabierto) == 3
+    assert os.path.getsize(reabierto.ruta_vectores) == 3 * DIMENSION * 4
+    assert os.path.getsize(reabierto.ruta_claves) == 3 * BYTES_CLAVE
+    assert reabierto.obtener([clave_texto(TEXTOS[3])]) == [None]
+
+    # Se sigue agregando sobre las filas completas
+    reabierto.guardar([clave_texto(TEXTOS[3])], _vectores(TEXTOS[3:4]))
+    final = AlmacenEmbeddings(str(tmp_path), MODELO)
+    assert len(final) == 4
+    np.testing.assert_allclose(final.obtener([clave_texto(TEXTOS[3])])[0], _vectores(TEXTOS[3:4])[0], rtol=1e-6)
+
+
+def test_vector_sin_clave_no_se_usa(tmp_path):
+    almacen = AlmacenEmbeddings(str(tmp_path), MODELO)
+    almacen.guardar([clave_texto(TEXTOS[0])], _vectores(TEXTOS[:1]))
+    # Vector completo escrito pero el proceso murió antes de escribir su clave
+    with open(almacen.ruta_vectores, "ab") as f:
+        f.write(np.ones(DIMENSION, dtype=np.float32).tobytes())
+
+    reabierto = AlmacenEmbeddings(str(tmp_path), MODELO)
+    assert len(reabierto) == 1
+    assert os.path.getsize(reabierto.ruta_vectores) == DIMENSION * 4
+
+
+def test_dimension_distinta(tmp_path):
+    almacen = AlmacenEmbeddings(str(tmp_path), MODELO)
+    almacen.guardar([clave_texto("a")], [[0.1] * DIMENSION])
+    with pytest.raises(ValueError):
+        almacen.guardar([clave_texto("b")], [[0.1] * (DIMENSION + 1)])
+
+
+def test_embeddings_en_disco_no_repite_llamadas(tmp_path):
+    api = EmbeddingsLocales(DIMENSION)
+    modelo = EmbeddingsEnDisco(api, AlmacenEmbeddings(str(tmp_path), MODELO))
+
+    primera = modelo.embed_documents(TEXTOS + TEXTOS[:2])
+    assert api.llamadas == 1 and api.textos_embebidos == 5
+    assert modelo.textos_faltantes(TEXTOS + ["nuevo"]) == ["nuevo"]
+
+    # Otro proceso (otra ejecución de la ingesta) sobre el mismo almacén: cero llamadas
+    otra_api = EmbeddingsLocales(DIMENSION)
+    otro = EmbeddingsEnDisco(otra_api, AlmacenEmbeddings(str(tmp_path), MODELO))
+    segunda = otro.embed_documents(TEXTOS + TEXTOS[:2])
+    assert otra_api.llamadas == 0
+    np.testing.assert_allclose(np.array(segunda), np.array(primera), rtol=1e-6)
+    assert otro.estadisticas == {"aciertos": 7, "fallos": 0, "llamadas_api": 0}
+
+    # Otro modelo no comparte vectores
+    assert len(AlmacenEmbeddings(str(tmp_path), "text-embedding-3-small")) == 0
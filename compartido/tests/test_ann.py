@@ -0,0 +1,93 @@
+"""
+Tests de recuperacion.ann: recall@k del índice IVF frente a la búsqueda exacta.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import numpy as np
+import pytest
+
+from recuperacion.ann import IndiceIVF
+from recuperacion.matriz import MatrizEmbeddings
+
+DIMENSION = 32
+TOP_K = 10
+
+
+def _corpus(n: int = 4000, temas: int = 40, semilla: int = 0):
+    """Vectores agrupados por tema, como los embeddings de chunks reales."""
+    rng = np.random.default_rng(semilla)
+    centros = rng.standard_normal((temas, DIMENSION))
+    vectores = centros[rng.integers(0, temas, n)] + 0.35 * rng.standard_normal((n, DIMENSION))
+    consultas = centros[rng.integers(0, temas, 50)] + 0.35 * rng.standard_normal((50, DIMENSION))
+    return vectores.astype(np.float32), consultas.astype(np.float32)
+
+
+def _indices(vectores, n_listas: int = 64, n_sondas: int = 8):
+    ids = [f"doc-{i}" for i in range(len(vectores))]
+    textos = [f"texto {i}" for i in range(len(vectores))]
+    exacto = MatrizEmbeddings(DIMENSION)
+    exacto.upsert(ids, textos, vectores)
+    ivf = IndiceIVF(n_listas=n_listas, n_sondas=n_sondas)
+    ivf.upsert(ids, textos, vectores)
+    ivf.entrenar()
+    return exacto, ivf
+
+
+def _recall(exacto, ivf, consultas, n_sondas=None) -> float:
+    aciertos = 0
+    for consulta in consultas:
+        esperado = {d["id"] for d in exacto.buscar(consulta, TOP_K)}
+        aciertos += len(esperado & {d["id"] for d in ivf.buscar(consulta, TOP_K, n_sondas=n_sondas)})
+    return aciertos / (TOP_K * len(consultas))
+
+
+def test_recall_ivf_sobre_el_umbral():
+    vectores, consultas = _corpus()
+    exacto, ivf = _indices(vectores)
+    assert _recall(exacto, ivf, consultas) >= 0.95
+
+
+def test_todas_las_sondas_es_exacto():
+    vectores, consultas = _corpus(n=1000)
+    exacto, ivf = _indices(vectores, n_listas=16)
+    assert _recall(exacto, ivf, consultas, n_sondas=16) == pytest.approx(1.0)
+
+
+def test_mas_sondas_no_bajan_el_recall():
+    vectores, consultas = _corpus()
+    exacto, ivf = _indices(vectores)
+    recalls = [_recall(exacto, ivf, consultas, n_sondas=s) for s in (1, 4, 16)]
+    assert recalls == sorted(recalls)
+
+
+def test_sin_entrenar_busca_exacto_en_pendientes():
+    vectores, consultas = _corpus(n=300)
+    exacto = MatrizEmbeddings(DIMENSION)
+    ivf = IndiceIVF(n_listas=8)
+    ids = [f"doc-{i}" for i in range(len(vectores))]
+    exacto.upsert(ids, ids, vectores)
+    ivf.upsert(ids, ids, vectores)
+    assert not ivf.entrenado
+    assert _recall(exacto, ivf, consultas) == pytest.approx(1.0)
+
+
+def test_guardar_y_cargar_conserva_resultados(tmp_path):
+    vectores, consultas = _corpus(n=1000)
+    _, ivf = _indices(vectores, n_listas=16, n_sondas=4)
+    ruta = str(tmp_path / "ivf")
+    ivf.guardar(ruta)
+    cargado = IndiceIVF.cargar(ruta)
+    for consulta in consultas[:10]:
+        assert [d["id"] for d in cargado.buscar(consulta, TOP_K)] == [d["id"] for d in ivf.buscar(consulta, TOP_K)]
+
+
+def test_guardar_conserva_la_version_de_la_tabla(tmp_path):
+    vectores, _ = _corpus(n=300)
+    _, ivf = _indices(vectores, n_listas=8)
+    ruta = str(tmp_path / "ivf")
+    assert ivf.version is None
+
+    ivf.version = "documents_v20261018103000"
+    ivf.guardar(ruta)
+    assert IndiceIVF.cargar(ruta).version == "documents_v20261018103000"
@@ -0,0 +1,219 @@
+"""
+Tests de recuperacion.cache_resultados: TTL, LRU, singleflight e invalidación
+por nueva_version mientras hay una búsqueda en curso.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from recuperacion import cache_resultados
+from recuperacion.cache_resultados import CacheResultados
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """Reloj manual para cache_resultados (el resto del proceso usa el real)."""
+    ahora = SimpleNamespace(t=1000.0)
+    monkeypatch.setattr(cache_resultados, "time", SimpleNamespace(monotonic=lambda: ahora.t))
+    return ahora
+
+
+def test_expira_tras_el_ttl(reloj):
+    cache = CacheResultados(ttl=10, tamano=8)
+    llamadas = []
+    calcular = lambda: llamadas.append(1) or ["doc"]
+
+    assert cache.obtener("¿Cuánto cuesta?", 5, calcular) == ["doc"]
+    reloj.t += 9
+    assert cache.obtener("cuanto cuesta", 5, calcular) == ["doc"]
+    assert len(llamadas) == 1
+
+    reloj.t += 2
+    assert cache.obtener("cuanto cuesta", 5, calcular) == ["doc"]
+    assert len(llamadas) == 2
+    assert cache.estadisticas["expiradas"] == 1
+
+
+def test_lru_acotado():
+    cache = CacheResultados(ttl=60, tamano=2)
+    for consulta in ("a", "b"):
+        cache.guardar(consulta, 5, [consulta])
+    assert cache.buscar("a", 5) == ["a"]         # "a" pasa a ser la más reciente
+    cache.guardar("c", 5, ["c"])
+    assert cache.buscar("b", 5) is None
+    assert cache.buscar("a", 5) == ["a"] and len(cache) == 2
+
+
+def test_singleflight_una_sola_busqueda():
+    cache = CacheResultados(ttl=60, tamano=8)
+    liberar = threading.Event()
+    llamadas = []
+
+    def calcular():
+        llamadas.append(1)
+        liberar.wait(5)
+        return ["doc"]
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.obtener("precio", 5, calcular)))
+             for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    limite = time.monotonic() + 5
+    while cache.estadisticas["fallos"] + cache.estadisticas["coalescidas"] < 8 and time.monotonic() < limite:
+        time.sleep(0.001)
+    liberar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(llamadas) == 1 and resultados == [["doc"]] * 8
+    assert cache.estadisticas["coalescidas"] == 7
+
+
+def test_nueva_version_durante_una_busqueda_en_curso():
+    cache = CacheResultados(ttl=60, tamano=8)
+    en_curso, liberar = threading.Event(), threading.Event()
+
+    def calcular_viejo():
+        en_curso.set()
+        liberar.wait(5)
+        return ["version-anterior"]
+
+    viejo = []
+    hilo = threading.Thread(target=lambda: viejo.append(cache.obtener("precio", 5, calcular_viejo)))
+    hilo.start()
+    en_curso.wait(5)
+
+    cache.nueva_version("v2")
+    # Una consulta nueva no se une a la búsqueda de la versión anterior
+    assert cache.obtener("precio", 5, lambda: ["version-nueva"]) == ["version-nueva"]
+
+    liberar.set()
+    hilo.join()
+    assert viejo == [["version-anterior"]]
+    # El resultado viejo no pisó al nuevo al terminar
+    assert cache.obtener("precio", 5, lambda: ["recalculado"]) == ["version-nueva"]
+
+
+def test_resultado_en_curso_no_se_guarda_tras_nueva_version():
+    cache = CacheResultados(ttl=60, tamano=8)
+
+    def calcular():
+        cache.nueva_version()
+        return ["obsoleto"]
+
+    assert cache.obtener("precio", 5, calcular) == ["obsoleto"]
+    assert len(cache) == 0
+    assert cache.buscar("precio", 5) is None
+
+
+def test_errores_no_se_guardan():
+    cache = CacheResultados(ttl=60, tamano=8)
+
+    def fallar():
+        raise TimeoutError("índice no responde")
+
+    with pytest.raises(TimeoutError):
+        cache.obtener("precio", 5, fallar)
+    assert cache.obtener("precio", 5, lambda: ["doc"]) == ["doc"]
+
+
+def test_ttl_cero_desactiva():
+    cache = CacheResultados(ttl=0)
+    llamadas = []
+    for _ in range(3):
+        cache.obtener("precio", 5, lambda: llamadas.append(1) or ["doc"])
+    assert len(llamadas) == 3 and len(cache) == 0
+
+
+def test_quien_esperaba_recalcula_si_se_reindexo():
+    cache = CacheResultados(ttl=60, tamano=8)
+    en_curso, liberar = threading.Event(), threading.Event()
+
+    def calcular_viejo():
+        en_curso.set()
+        liberar.wait(5)
+        return ["version-anterior"]
+
+    duenio = threading.Thread(target=lambda: cache.obtener("precio", 5, calcular_viejo))
+    duenio.start()
+    en_curso.wait(5)
+
+    esperados = []
+    espera = threading.Thread(target=lambda: esperados.append(cache.obtener("precio", 5, lambda: ["version-nueva"])))
+    espera.start()
+    limite = time.monotonic() + 5
+    while cache.estadisticas["coalescidas"] < 1 and time.monotonic() < limite:
+        time.sleep(0.001)
+
+    cache.nueva_version("v2")
+    liberar.set()
+    duenio.join()
+    espera.join()
+    # Se había unido a la búsqueda de la versión anterior: no se queda con ese resultado
+    assert esperados == [["version-nueva"]]
+
+
+def test_lote_calcula_solo_los_fallos_y_deduplica():
+    cache = CacheResultados(ttl=60, tamano=8)
+    cache.guardar("precio", 5, ["en-cache"])
+    lotes = []
+
+    def calcular_lote(consultas):
+        lotes.append(list(consultas))
+        return [[c] for c in consultas]
+
+    resultados = cache.obtener_lote(["precio", "horario", "Horario", "docentes"], 5, calcular_lote)
+    assert resultados == [["en-cache"], ["horario"], ["horario"], ["docentes"]]
+    assert lotes == [["horario", "docentes"]]
+    assert cache.obtener("docentes", 5, lambda: ["otra"]) == ["docentes"]
+
+
+def test_lote_y_consulta_individual_comparten_la_busqueda():
+    cache = CacheResultados(ttl=60, tamano=8)
+    en_curso, liberar = threading.Event(), threading.Event()
+    llamadas = []
+
+    def calcular_lote(consultas):
+        llamadas.append(list(consultas))
+        en_curso.set()
+        liberar.wait(5)
+        return [[c] for c in consultas]
+
+    lote = []
+    hilo = threading.Thread(target=lambda: lote.extend(cache.obtener_lote(["precio", "horario"], 5, calcular_lote)))
+    hilo.start()
+    en_curso.wait(5)
+
+    individual = []
+    espera = threading.Thread(target=lambda: individual.append(
+        cache.obtener("precio", 5, lambda: llamadas.append(["individual"]) or ["repetida"])))
+    espera.start()
+    limite = time.monotonic() + 5
+    while cache.estadisticas["coalescidas"] < 1 and time.monotonic() < limite:
+        time.sleep(0.001)
+    # Otro lote con una consulta en curso solo calcula la nueva
+    liberar.set()
+    assert cache.obtener_lote(["horario", "docentes"], 5, calcular_lote) == [["horario"], ["docentes"]]
+
+    hilo.join()
+    espera.join()
+    assert lote == [["precio"], ["horario"]] and individual == [["precio"]]
+    assert llamadas == [["precio", "horario"], ["docentes"]]
+
+
+def test_lote_con_error_despierta_a_quienes_esperaban():
+    cache = CacheResultados(ttl=60, tamano=8)
+
+    def incompleto(consultas):
+        return [["solo-uno"]]
+
+    with pytest.raises(RuntimeError):
+        cache.obtener_lote(["precio", "horario"], 5, incompleto)
+    assert not cache._en_vuelo and len(cache) == 0
+    assert cache.obtener_lote(["precio"], 5, lambda consultas: [["doc"]]) == [["doc"]]
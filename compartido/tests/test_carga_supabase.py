@@ -0,0 +1,177 @@
+"""
+Tests de recuperacion.carga_supabase: formato binario de COPY, la consulta al
+catálogo que encuentra los índices HNSW/GIN y qué sentencias emite la carga
+en la tabla activa y en una versión nueva (cursor falso, sin PostgreSQL).
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import struct
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from recuperacion.carga_supabase import (
+    CABECERA_COPY, FIN_COPY, bloques_copy, cargar_documentos, crear_indices, eliminar_indices,
+    indices_existentes, nombre_indice, vector_binario,
+)
+
+TABLA = "documents_langchain_asistente_de_ventas_v20261018103000"
+
+
+class SQL:
+    """Lo mínimo de psycopg.sql para ver el texto final de cada sentencia."""
+
+    def __init__(self, texto):
+        self.texto = texto
+
+    def format(self, *partes):
+        return SQL(self.texto.format(*(str(p) for p in partes)))
+
+    def join(self, partes):
+        return SQL(self.texto.join(str(p) for p in partes))
+
+    def __str__(self):
+        return self.texto
+
+
+@pytest.fixture(autouse=True)
+def psycopg_falso(monkeypatch):
+    sql = SimpleNamespace(SQL=SQL, Identifier=lambda nombre: SQL(f'"{nombre}"'),
+                          Literal=lambda valor: SQL(repr(valor)))
+    monkeypatch.setitem(sys.modules, "psycopg", SimpleNamespace(sql=sql))
+
+
+class CursorFalso:
+    """Anota las sentencias; la consulta a pg_index devuelve las filas del catálogo dado."""
+
+    def __init__(self, catalogo=()):
+        self.catalogo = list(catalogo)
+        self.sentencias = []
+        self.copiado = bytearray()
+        self._resultado = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, consulta, parametros=()):
+        texto = " ".join(str(consulta).split())
+        self.sentencias.append((texto, tuple(parametros)))
+        self._resultado = self.catalogo if "from pg_index" in texto else []
+
+    def fetchall(self):
+        return list(self._resultado)
+
+    def copy(self, consulta):
+        self.sentencias.append((" ".join(str(consulta).split()), ()))
+        cursor = self
+
+        class Copia:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def write(self, bloque):
+                cursor.copiado += bloque
+
+        return Copia()
+
+    def textos(self):
+        return [texto for texto, _ in self.sentencias]
+
+
+class ConexionFalsa:
+    autocommit = False
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def transaction(self):
+        return self._cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+CATALOGO = [
+    ("hnsw", "embedding", "documents_langchain_asistente_de_ventas_embedding_idx"),
+    ("gin", "metadata", "documents_langchain_asistente_de_ventas_metadata_idx"),
+    ("btree", "content", "indice_propio_content"),
+]
+
+
+def _filas(n=3, dimension=4):
+    return [(f"chunk {i}", {"page": i}, np.full(dimension, i + 0.5, dtype=np.float32)) for i in range(n)]
+
+
+def test_vector_y_flujo_copy():
+    binario = vector_binario([1.0, -2.5])
+    assert binario == struct.pack(">HH", 2, 0) + struct.pack(">ff", 1.0, -2.5)
+
+    estadisticas = {"filas": 0, "bytes": 0}
+    flujo = b"".join(bloques_copy(_filas(), estadisticas))
+    assert flujo.startswith(CABECERA_COPY) and flujo.endswith(FIN_COPY)
+    assert estadisticas == {"filas": 3, "bytes": len(flujo)}
+    # Cada fila: 3 campos, content con su largo y el texto
+    assert flujo[len(CABECERA_COPY):len(CABECERA_COPY) + 6] == struct.pack(">hi", 3, len(b"chunk 0"))
+
+
+def test_consulta_al_catalogo():
+    cursor = CursorFalso(CATALOGO)
+    encontrados = indices_existentes(cursor, TABLA)
+
+    consulta, parametros = cursor.sentencias[0]
+    assert parametros == (TABLA,)
+    assert "x.indrelid = to_regclass(quote_ident(%s))" in consulta
+    assert "x.indnatts = 1 and not x.indisprimary" in consulta
+    assert "a.attnum = x.indkey[0]" in consulta
+    # Por método y columna, no por nombre (la tabla renombrada conserva los nombres originales)
+    assert encontrados == {"embedding_idx": [CATALOGO[0][2]], "metadata_idx": [CATALOGO[1][2]]}
+
+
+def test_eliminar_y_crear_indices():
+    cursor = CursorFalso(CATALOGO)
+    eliminar_indices(cursor, TABLA)
+    assert [t for t in cursor.textos() if t.startswith("drop")] == [
+        f'drop index if exists "{CATALOGO[0][2]}"', f'drop index if exists "{CATALOGO[1][2]}"']
+
+    cursor = CursorFalso([])
+    crear_indices(cursor, TABLA, "1GB")
+    assert ("select set_config('maintenance_work_mem', %s, true)", ("1GB",)) in cursor.sentencias
+    assert [t for t in cursor.textos() if t.startswith("create")] == [
+        f'create index "{nombre_indice(TABLA, "embedding_idx")}" on "{TABLA}" using hnsw ("embedding" vector_cosine_ops)',
+        f'create index "{nombre_indice(TABLA, "metadata_idx")}" on "{TABLA}" using gin ("metadata" jsonb_path_ops)',
+    ]
+    assert len(nombre_indice(TABLA, "embedding_idx")) == 63
+
+
+def test_carga_en_la_tabla_activa_conserva_los_indices():
+    cursor = CursorFalso(CATALOGO)
+    estadisticas = cargar_documentos(ConexionFalsa(cursor), _filas(), "documents_langchain_asistente_de_ventas")
+
+    assert estadisticas["filas"] == 3
+    assert not [t for t in cursor.textos() if "index" in t or "pg_index" in t]
+    assert 'copy "documents_langchain_asistente_de_ventas" (content, metadata, embedding) ' \
+           'from stdin (format binary)' in cursor.textos()
+    assert cursor.copiado.startswith(CABECERA_COPY)
+
+
+def test_version_nueva_construye_los_indices_al_final():
+    cursor = CursorFalso([])
+    cargar_documentos(ConexionFalsa(cursor), _filas(), TABLA, reconstruir_indices=True)
+    textos = cursor.textos()
+    copia = next(i for i, t in enumerate(textos) if t.startswith("copy"))
+    creados = [i for i, t in enumerate(textos) if t.startswith("create index")]
+    assert len(creados) == 2 and min(creados) > copia
+
+
+def test_modo_desconocido():
+    with pytest.raises(ValueError):
+        cargar_documentos(ConexionFalsa(CursorFalso()), [], TABLA, modo="uno-por-uno")
@@ -0,0 +1,119 @@
+"""
+Tests de historial.comprimido: codec activo cacheado por proceso y
+entrenamiento con pocas muestras (sin PostgreSQL: conexión en memoria).
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import json
+
+import pytest
+
+from historial import comprimido
+
+
+class ConexionMemoria:
+    """Lo mínimo de una conexión psycopg para la tabla de diccionarios y chat_history."""
+
+    def __init__(self, mensajes=()):
+        self.diccionarios = []          # [(id, algoritmo, bytes)]
+        self.mensajes = list(mensajes)  # message JSONB como texto
+        self.consultas = 0
+
+    def cursor(self):
+        return CursorMemoria(self)
+
+    def commit(self):
+        pass
+
+
+class CursorMemoria:
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self._filas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, consulta, parametros=()):
+        self.conexion.consultas += 1
+        diccionarios = self.conexion.diccionarios
+        if consulta.startswith("SELECT id FROM"):
+            usables = [d for d in diccionarios if d[1] in parametros[0]]
+            self._filas = [(usables[-1][0],)] if usables else []
+        elif consulta.startswith("SELECT algoritmo, diccionario"):
+            self._filas = [(a, b) for i, a, b in diccionarios if i == parametros[0]]
+        elif consulta.startswith("SELECT message::text"):
+            self._filas = [(m,) for m in self.conexion.mensajes[:parametros[0]]]
+        elif consulta.startswith("INSERT INTO"):
+            nuevo = len(diccionarios) + 1
+            diccionarios.append((nuevo, parametros[0], bytes(parametros[1])))
+            self._filas = [(nuevo,)]
+        else:
+            raise AssertionError(consulta)
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+    def fetchall(self):
+        return self._filas
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    comprimido._diccionarios.clear()
+    comprimido._codecs.clear()
+    comprimido._invalidar_codec_activo()
+    yield
+
+
+def _mensaje(i: int) -> str:
+    return json.dumps({"type": "human", "data": {"content": f"Hola, quiero info del programa {i % 7}",
+                                                 "additional_kwargs": {}, "type": "human"}})
+
+
+def test_codec_activo_sin_viaje_a_la_base_por_turno():
+    conexion = ConexionMemoria()
+    conexion.diccionarios.append((1, "zlib", b"programa"))
+
+    primero = comprimido.PostgresChatMessageHistoryComprimido("t", "s1", sync_connection=conexion)._codec
+    consultas = conexion.consultas
+    for i in range(20):
+        historial = comprimido.PostgresChatMessageHistoryComprimido("t", f"s{i}", sync_connection=conexion)
+        assert historial._codec is primero
+    assert conexion.consultas == consultas
+
+
+def test_codec_activo_recarga_solo_si_cambia_el_id():
+    conexion = ConexionMemoria()
+    conexion.diccionarios.append((1, "zlib", b"programa"))
+    primero = comprimido.codec_activo(conexion, max_antiguedad=0)
+    assert comprimido.codec_activo(conexion, max_antiguedad=0) is primero
+
+    conexion.diccionarios.append((2, "zlib", b"curso"))
+    segundo = comprimido.codec_activo(conexion, max_antiguedad=0)
+    assert segundo.dict_id == 2 and segundo is not primero
+
+
+def test_entrenar_con_pocas_muestras_usa_zlib():
+    conexion = ConexionMemoria([_mensaje(i) for i in range(5)])
+    dict_id = comprimido.entrenar_diccionario(conexion)
+
+    assert conexion.diccionarios[-1][1] == "zlib"
+    codec = comprimido.codec_activo(conexion)
+    assert codec.dict_id == dict_id and codec.algoritmo == "zlib"
+    mensaje = json.loads(_mensaje(3))
+    assert comprimido.CodecMensajes.descomprimir(codec.comprimir(mensaje), codec.diccionario) == mensaje
+
+
+@pytest.mark.skipif(comprimido.zstandard is None, reason="zstandard no instalado")
+def test_entrenar_con_muestras_suficientes_usa_zstd():
+    mensajes = [json.dumps({"type": "ai", "data": {"content": f"Respuesta {i}: el curso {i % 13} dura "
+                                                              f"{i % 9 + 1} semanas y cuesta {i * 7} soles"}})
+                for i in range(2000)]
+    conexion = ConexionMemoria(mensajes)
+    comprimido.entrenar_diccionario(conexion, max_muestras=2000)
+    assert conexion.diccionarios[-1][1] == "zstd"
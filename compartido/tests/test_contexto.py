@@ -0,0 +1,73 @@
+"""
+Tests de recuperacion.contexto: unión de chunks solapados, casi-duplicados,
+k adaptativo y MMR.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import random
+
+from recuperacion.contexto import ensamblar_contexto, k_adaptativo, unir_solapados
+
+PALABRAS = ["python", "datos", "curso", "modulo", "proyecto", "docente", "sesion", "certificado",
+            "empresa", "nube", "modelo", "analitica", "tablero", "consulta", "horario", "pago"]
+
+
+def _texto(palabras: int, semilla: int) -> str:
+    rng = random.Random(semilla)
+    return " ".join(f"{rng.choice(PALABRAS)}{rng.randint(0, 999)}" for _ in range(palabras))
+
+
+def _chunks(texto: str, tamano: int = 500, solape: int = 200) -> list:
+    """Cortes por caracteres como chunk_size=500, chunk_overlap=200 de la ingesta."""
+    paso = tamano - solape
+    return [texto[i:i + tamano] for i in range(0, max(len(texto) - solape, 1), paso)]
+
+
+def test_unir_solapados():
+    assert unir_solapados("abcdefghij" * 5 + "XYZ", "abcdefghij" * 5) == "abcdefghij" * 5 + "XYZ"
+    a, b = "inicio " + "x" * 60, "x" * 60 + " final"
+    assert unir_solapados(a, b) == "inicio " + "x" * 60 + " final"
+    assert unir_solapados(b, a) == "inicio " + "x" * 60 + " final"
+    assert unir_solapados(_texto(30, 1), _texto(30, 2)) is None
+
+
+def test_chunks_contiguos_se_reconstruyen_en_un_bloque():
+    texto = _texto(250, 0)
+    chunks = _chunks(texto)
+    assert len(chunks) >= 4
+    # Llegan por similitud, no en el orden del texto
+    orden = list(range(len(chunks)))
+    random.Random(3).shuffle(orden)
+    docs = sorted(({"content": c, "similitud": 0.9 - 0.005 * o} for c, o in zip(chunks, orden)),
+                  key=lambda d: d["similitud"], reverse=True)
+    assert [d["content"] for d in docs] != chunks
+
+    bloques = ensamblar_contexto(docs, top_k=5)
+    assert len(bloques) == 1
+    assert bloques[0]["content"] == texto
+    assert bloques[0]["similitud"] == 0.9
+
+
+def test_casi_duplicados_se_descartan():
+    base = _texto(80, 5)
+    casi = base.replace(base.split()[40], "cambio")
+    otro = _texto(80, 6)
+    bloques = ensamblar_contexto([{"content": base, "similitud": 0.90}, {"content": casi, "similitud": 0.89},
+                                  {"content": otro, "similitud": 0.88}], top_k=5)
+    assert [b["content"] for b in bloques] == [base, otro]
+
+
+def test_k_adaptativo_corta_en_el_salto():
+    docs = [{"content": str(i), "similitud": s} for i, s in enumerate([0.90, 0.89, 0.88, 0.70, 0.69])]
+    assert [d["content"] for d in k_adaptativo(docs)] == ["0", "1", "2"]
+    # Sin similitudes (modo léxico) no se corta
+    assert k_adaptativo([{"content": "a"}, {"content": "b"}]) == [{"content": "a"}, {"content": "b"}]
+
+
+def test_mmr_respeta_top_k_y_empieza_por_el_mas_relevante():
+    docs = [{"content": _texto(60, 10 + i), "similitud": 0.90 - 0.01 * i} for i in range(6)]
+    bloques = ensamblar_contexto(docs, top_k=3)
+    assert len(bloques) == 3
+    assert bloques[0]["content"] == docs[0]["content"]
+    assert all(not k.startswith("_") for b in bloques for k in b)
@@ -0,0 +1,67 @@
+"""
+Tests de recuperacion.cuantizacion: recall@k de int8 / binario con re-ranking exacto.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import numpy as np
+import pytest
+
+from recuperacion.cuantizacion import IndiceCuantizado
+from recuperacion.matriz import normalizar, seleccionar_top_k
+
+DIMENSION = 64
+TOP_K = 5
+
+
+def _corpus(n: int = 3000, temas: int = 30, semilla: int = 0):
+    rng = np.random.default_rng(semilla)
+    centros = rng.standard_normal((temas, DIMENSION))
+    vectores = centros[rng.integers(0, temas, n)] + 0.5 * rng.standard_normal((n, DIMENSION))
+    consultas = centros[rng.integers(0, temas, 40)] + 0.5 * rng.standard_normal((40, DIMENSION))
+    return normalizar(vectores), consultas.astype(np.float32)
+
+
+def _recall(indice: IndiceCuantizado, vectores, consultas) -> float:
+    aciertos = 0
+    for consulta in consultas:
+        esperado = set(seleccionar_top_k(vectores @ normalizar(consulta), TOP_K).tolist())
+        filas, _ = indice.buscar(consulta, TOP_K)
+        aciertos += len(esperado & set(filas.tolist()))
+    return aciertos / (TOP_K * len(consultas))
+
+
+@pytest.mark.parametrize("modo, dimension_reducida, candidatos, minimo", [
+    ("int8", 0, 50, 0.98),
+    ("int8", 32, 200, 0.95),
+    ("binario", 0, 200, 0.95),
+])
+def test_recall_con_re_ranking(modo, dimension_reducida, candidatos, minimo):
+    vectores, consultas = _corpus()
+    indice = IndiceCuantizado(vectores, modo=modo, dimension_reducida=dimension_reducida,
+                              candidatos=candidatos)
+    assert _recall(indice, vectores, consultas) >= minimo
+
+
+def test_similitudes_re_rankeadas_son_exactas():
+    vectores, consultas = _corpus(n=500)
+    indice = IndiceCuantizado(vectores, modo="binario", candidatos=500)
+    consulta = consultas[0]
+    filas, similitudes = indice.buscar(consulta, TOP_K)
+    exactos = vectores @ normalizar(consulta)
+    assert filas.tolist() == seleccionar_top_k(exactos, TOP_K).tolist()
+    np.testing.assert_allclose(similitudes, exactos[filas], rtol=1e-5)
+
+
+def test_memoria_de_los_codigos():
+    vectores, _ = _corpus(n=1000)
+    assert IndiceCuantizado(vectores, modo="int8").memoria_bytes == vectores.nbytes // 4
+    assert IndiceCuantizado(vectores, modo="binario").memoria_bytes == vectores.nbytes // 32
+
+
+def test_excluir_filas():
+    vectores, consultas = _corpus(n=500)
+    indice = IndiceCuantizado(vectores, modo="int8", candidatos=100)
+    filas, _ = indice.buscar(consultas[0], TOP_K)
+    filtradas, _ = indice.buscar(consultas[0], TOP_K, excluir=filas[:2].tolist())
+    assert not set(filas[:2].tolist()) & set(filtradas.tolist())
@@ -0,0 +1,136 @@
+"""
+Tests de historial.exportar: tope con margen de seguridad, lectura por lotes
+en transacciones cortas y avance de la marca de agua (conexión falsa, sin PostgreSQL).
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import re
+
+from historial import TABLA_HISTORIAL
+from historial.exportar import calcular_tope, guardar_watermark, leer_lotes, leer_watermark
+
+CONSULTA = (f"SELECT id, session_id, message, created_at FROM {TABLA_HISTORIAL} "
+            f"WHERE id > %s AND id <= %s ORDER BY id LIMIT %s")
+
+
+class ConexionFalsa:
+    """
+    Tabla de historial en memoria. Cada fila es (id, created_at en segundos, confirmada):
+    las no confirmadas no se ven, como un INSERT de otra transacción aún abierta.
+    """
+
+    def __init__(self, filas, ahora=1000.0):
+        self.filas = filas
+        self.ahora = ahora
+        self.transacciones = 0
+        self.en_transaccion = False
+        self.sentencias = []
+
+    def transaction(self):
+        return TransaccionFalsa(self)
+
+    def cursor(self):
+        return CursorFalso(self)
+
+
+class TransaccionFalsa:
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def __enter__(self):
+        assert not self.conexion.en_transaccion
+        self.conexion.en_transaccion = True
+        self.conexion.transacciones += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.conexion.en_transaccion = False
+        return False
+
+
+class CursorFalso:
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self._resultado = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=()):
+        conexion = self.conexion
+        # Toda lectura va dentro de una transacción corta
+        assert conexion.en_transaccion
+        conexion.sentencias.append(sql)
+        visibles = [f for f in conexion.filas if f[2]]
+        if "max(id)" in sql:
+            limite = conexion.ahora - params[0]
+            ids = [f[0] for f in visibles if f[1] < limite]
+            self._resultado = [(max(ids) if ids else None,)]
+        elif re.search(r"LIMIT %s", sql):
+            desde, hasta, lote = params
+            seleccion = sorted(f for f in visibles if desde < f[0] <= hasta)[:lote]
+            self._resultado = [(f[0], "s1", {"type": "human", "data": {"content": str(f[0])}}, f[1])
+                               for f in seleccion]
+        else:
+            self._resultado = []
+
+    def fetchone(self):
+        return self._resultado[0] if self._resultado else None
+
+    def fetchall(self):
+        return list(self._resultado)
+
+
+def _exportar(conexion, salida, margen=30, lote=3):
+    """Lo que hace exportar() con la marca de agua, sin escribir Parquet."""
+    desde = leer_watermark(salida, TABLA_HISTORIAL)
+    hasta = calcular_tope(conexion, TABLA_HISTORIAL, margen)
+    ids = [fila[0] for filas in leer_lotes(conexion, CONSULTA, desde, hasta, lote) for fila in filas]
+    if ids:
+        guardar_watermark(salida, TABLA_HISTORIAL, ids[-1])
+    return ids
+
+
+def test_tope_excluye_filas_recientes():
+    conexion = ConexionFalsa([(i, 900.0, True) for i in range(1, 9)] + [(9, 995.0, True), (10, 999.0, True)])
+    assert calcular_tope(conexion, TABLA_HISTORIAL, margen_segundos=30) == 8
+    assert calcular_tope(conexion, TABLA_HISTORIAL, margen_segundos=0) == 10
+    assert calcular_tope(ConexionFalsa([]), TABLA_HISTORIAL) == 0
+
+
+def test_un_lote_por_transaccion():
+    conexion = ConexionFalsa([(i, 900.0, True) for i in range(1, 9)])
+    lotes = list(leer_lotes(conexion, CONSULTA, 0, 8, lote=3))
+    assert [[f[0] for f in filas] for filas in lotes] == [[1, 2, 3], [4, 5, 6], [7, 8]]
+    assert conexion.transacciones == 3
+    assert all(s.startswith("SET TRANSACTION READ ONLY") for s in conexion.sentencias[::4])
+
+
+def test_id_confirmado_tarde_no_queda_bajo_la_marca(tmp_path):
+    salida = str(tmp_path)
+    # El 5 pertenece a una transacción todavía abierta; 6..8 ya se ven pero son recientes
+    filas = [(i, 900.0, True) for i in range(1, 5)] + [(5, 990.0, False)] + [(i, 991.0, True) for i in range(6, 9)]
+    conexion = ConexionFalsa(filas)
+    assert _exportar(conexion, salida) == [1, 2, 3, 4]
+    assert leer_watermark(salida, TABLA_HISTORIAL) == 4
+
+    # La transacción confirma y pasa el margen: la siguiente corrida exporta 5..8
+    filas[4] = (5, 990.0, True)
+    conexion.ahora = 1100.0
+    assert _exportar(conexion, salida) == [5, 6, 7, 8]
+    assert leer_watermark(salida, TABLA_HISTORIAL) == 8
+    assert _exportar(conexion, salida) == []
+
+
+def test_sin_margen_el_id_tardio_se_perderia(tmp_path):
+    # Lo que el margen evita: con 0 s la marca de agua salta el 5
+    salida = str(tmp_path)
+    filas = [(i, 900.0, True) for i in range(1, 5)] + [(5, 990.0, False)] + [(i, 991.0, True) for i in range(6, 9)]
+    conexion = ConexionFalsa(filas)
+    assert _exportar(conexion, salida, margen=0) == [1, 2, 3, 4, 6, 7, 8]
+    filas[4] = (5, 990.0, True)
+    assert 5 not in _exportar(conexion, salida, margen=0)
@@ -0,0 +1,72 @@
+"""
+Tests de recuperacion.lexico: tokenización (números y tildes), BM25 y fusión RRF.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import pytest
+
+from recuperacion.lexico import IndiceBM25, confianza_lexica, fusion_rrf, tokenizar
+
+DOCUMENTOS = {
+    "precio": "El Diplomado en Data Engineering cuesta S/ 1,500 al contado.",
+    "cuotas": "El Diplomado en Machine Learning se paga en 3 cuotas de S/ 600.",
+    "horario": "Las clases del programa de Power BI son sábados de 9 a 13 horas.",
+    "python": "Python para análisis de datos: 40 horas académicas, certificado incluido.",
+}
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("S/ 1,500", ["s", "1500"]),
+    ("S/ 1.500", ["s", "1500"]),
+    ("S/1500", ["s", "1500"]),
+    ("12.345,67 soles", ["1234567", "soles"]),
+    ("¿Cuánto cuesta el Diplomado?", ["diplomado"]),
+    ("Análisis de DATOS", ["analisis", "datos"]),
+    ("", []),
+])
+def test_tokenizar(texto, esperado):
+    assert tokenizar(texto) == esperado
+
+
+def _indice() -> IndiceBM25:
+    indice = IndiceBM25()
+    indice.agregar(list(DOCUMENTOS), list(DOCUMENTOS.values()))
+    return indice
+
+
+@pytest.mark.parametrize("consulta", ["1500", "1,500", "1.500", "S/ 1,500"])
+def test_numeros_con_cualquier_separador_encuentran_el_precio(consulta):
+    resultados = _indice().buscar(consulta, top_k=2)
+    assert resultados[0]["id"] == "precio"
+
+
+def test_cobertura_y_confianza():
+    resultados = _indice().buscar("diplomado data engineering", top_k=3)
+    assert resultados[0]["id"] == "precio" and resultados[0]["cobertura"] == 1.0
+    assert confianza_lexica(resultados)
+    # "diplomado" aparece en dos documentos: sin margen claro no basta el léxico
+    assert not confianza_lexica(_indice().buscar("diplomado", top_k=3))
+
+
+def test_eliminar_y_reemplazar():
+    indice = _indice()
+    indice.eliminar(["precio"])
+    assert all(r["id"] != "precio" for r in indice.buscar("1500"))
+    indice.agregar(["cuotas"], ["Cuotas sin intereses"])
+    assert indice.buscar("600") == []
+    assert indice.buscar("intereses")[0]["id"] == "cuotas"
+    assert len(indice) == 3
+
+
+def test_fusion_rrf_premia_lo_que_aparece_en_ambas_listas():
+    vectorial = [{"content": "a", "similitud": 0.9}, {"content": "b", "similitud": 0.8},
+                 {"content": "c", "similitud": 0.7}]
+    lexica = [{"content": "c", "bm25": 7.0}, {"content": "d", "bm25": 5.0}]
+    fusion = fusion_rrf([lexica, vectorial], top_k=3, k=60)
+
+    # "c" suma en ambas listas; "d" y "b" empatan (1/62) y gana el primero visto
+    assert [d["content"] for d in fusion] == ["c", "a", "d"]
+    assert fusion[0]["rrf"] == pytest.approx(1 / 61 + 1 / 63)
+    # Se conserva el dict con 'similitud' aunque llegue antes por la lista léxica
+    assert fusion[0]["similitud"] == 0.7
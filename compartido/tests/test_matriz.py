@@ -0,0 +1,56 @@
+"""
+Tests de recuperacion.matriz: top-k exacto frente a la búsqueda por fuerza bruta.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import numpy as np
+
+from recuperacion.matriz import MatrizEmbeddings, normalizar, seleccionar_top_k
+
+
+def _matriz(n: int = 500, d: int = 24, semilla: int = 0):
+    rng = np.random.default_rng(semilla)
+    vectores = rng.standard_normal((n, d)).astype(np.float32)
+    matriz = MatrizEmbeddings(d)
+    matriz.upsert([f"doc-{i}" for i in range(n)], [f"texto {i}" for i in range(n)], vectores,
+                  [{"curso": "python" if i % 2 else "sql"} for i in range(n)])
+    return matriz, vectores, rng
+
+
+def test_seleccionar_top_k_ordenado_como_argsort():
+    scores = np.random.default_rng(1).standard_normal(1000).astype(np.float32)
+    for k in (1, 5, 50, 1000, 2000):
+        assert seleccionar_top_k(scores, k).tolist() == np.argsort(-scores)[:k].tolist()
+    assert seleccionar_top_k(scores, 0).size == 0
+
+
+def test_buscar_devuelve_el_top_k_exacto_en_orden():
+    matriz, vectores, rng = _matriz()
+    consulta = rng.standard_normal(vectores.shape[1])
+    scores = normalizar(vectores) @ normalizar(consulta)
+    esperado = [f"doc-{i}" for i in np.argsort(-scores)[:10]]
+
+    resultados = matriz.buscar(consulta, top_k=10)
+    assert [r["id"] for r in resultados] == esperado
+    similitudes = [r["similitud"] for r in resultados]
+    assert similitudes == sorted(similitudes, reverse=True)
+
+
+def test_buscar_con_filtro_solo_devuelve_coincidencias():
+    matriz, vectores, rng = _matriz()
+    consulta = rng.standard_normal(vectores.shape[1])
+    scores = normalizar(vectores) @ normalizar(consulta)
+    pares = [i for i in np.argsort(-scores) if i % 2 == 0][:5]
+
+    resultados = matriz.buscar(consulta, top_k=5, filtro={"curso": "sql"})
+    assert [r["id"] for r in resultados] == [f"doc-{i}" for i in pares]
+
+
+def test_eliminar_mantiene_el_ranking():
+    matriz, vectores, rng = _matriz(n=50)
+    matriz.eliminar(["doc-3", "doc-10"])
+    consulta = rng.standard_normal(vectores.shape[1])
+    scores = normalizar(vectores) @ normalizar(consulta)
+    esperado = [f"doc-{i}" for i in np.argsort(-scores) if i not in (3, 10)][:5]
+    assert [r["id"] for r in matriz.buscar(consulta, top_k=5)] == esperado
@@ -0,0 +1,118 @@
+"""
+Tests de historial.memoria_semantica: embeddings solo cuando la sesión
+supera la ventana de turnos recientes (almacén SQLite temporal) y una sola
+instancia compartida por varios hilos, como en el agente.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from historial.memoria_semantica import AlmacenTurnosPostgres, AlmacenTurnosSQLite, MemoriaSemantica
+from recuperacion.local import EmbeddingsLocales
+
+
+def _conversar(memoria, session_id, turnos):
+    historial = []
+    for i in range(turnos):
+        pregunta, respuesta = f"pregunta {i}", f"respuesta {i}"
+        memoria.registrar_turno(session_id, historial, pregunta, respuesta)
+        historial += [HumanMessage(content=pregunta), AIMessage(content=respuesta)]
+    return historial
+
+
+def test_sesion_corta_no_llama_a_embeddings(tmp_path):
+    embeddings = EmbeddingsLocales(16)
+    memoria = MemoriaSemantica(AlmacenTurnosSQLite(str(tmp_path / "h.sqlite3")), embeddings,
+                               turnos_recientes=3, top_k=2)
+    _conversar(memoria, "s1", 3)
+    assert embeddings.llamadas == 0
+    assert memoria.almacen.cargar("s1") == {}
+
+
+def test_al_superar_la_ventana_se_completan_los_vectores(tmp_path):
+    embeddings = EmbeddingsLocales(16)
+    memoria = MemoriaSemantica(AlmacenTurnosSQLite(str(tmp_path / "h.sqlite3")), embeddings,
+                               turnos_recientes=3, top_k=2)
+    historial = _conversar(memoria, "s1", 4)
+    # El cuarto turno embebe los cuatro en un solo lote
+    assert embeddings.llamadas == 1 and embeddings.textos_embebidos == 4
+    assert sorted(memoria.almacen.cargar("s1")) == [0, 1, 2, 3]
+
+    memoria.registrar_turno("s1", historial, "pregunta 4", "respuesta 4")
+    assert embeddings.llamadas == 2 and embeddings.textos_embebidos == 5
+
+
+def test_instancia_compartida_entre_hilos(tmp_path):
+    # Como memoria_semantica a nivel de módulo en el agente: una instancia, un hilo por conversación
+    memoria = MemoriaSemantica(AlmacenTurnosSQLite(str(tmp_path / "h.sqlite3")), EmbeddingsLocales(16),
+                               turnos_recientes=2, top_k=2)
+
+    def conversacion(n):
+        session_id = f"s{n}"
+        historial = _conversar(memoria, session_id, 6)
+        return session_id, memoria.seleccionar(session_id, historial, "pregunta 1")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        resultados = list(pool.map(conversacion, range(16)))
+
+    for session_id, seleccion in resultados:
+        assert sorted(memoria.almacen.cargar(session_id)) == list(range(6))
+        assert len(seleccion) == 2 * (2 + 2)
+
+
+class ConexionExclusiva:
+    """Conexión psycopg falsa que detecta dos cursores abiertos a la vez."""
+
+    def __init__(self):
+        self.abiertos = 0
+        self.maximo = 0
+        self.filas = []
+
+    def cursor(self):
+        return CursorExclusivo(self)
+
+
+class CursorExclusivo:
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    def __enter__(self):
+        self.conexion.abiertos += 1
+        self.conexion.maximo = max(self.conexion.maximo, self.conexion.abiertos)
+        time.sleep(0.001)
+        return self
+
+    def __exit__(self, *exc):
+        self.conexion.abiertos -= 1
+        return False
+
+    def execute(self, sql, params=None):
+        pass
+
+    def executemany(self, sql, filas):
+        self.conexion.filas.extend(filas)
+
+    def fetchall(self):
+        return []
+
+
+def test_postgres_serializa_el_uso_de_la_conexion(monkeypatch):
+    conexion = ConexionExclusiva()
+    monkeypatch.setitem(sys.modules, "psycopg", SimpleNamespace(connect=lambda *a, **k: conexion))
+    almacen = AlmacenTurnosPostgres("postgresql://falsa")
+    memoria = MemoriaSemantica(almacen, EmbeddingsLocales(16), turnos_recientes=1, top_k=1)
+
+    hilos = [threading.Thread(target=_conversar, args=(memoria, f"s{n}", 3)) for n in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert conexion.maximo == 1
+    assert len(conexion.filas) > 0
@@ -0,0 +1,125 @@
+"""
+Tests de recuperacion.micro_lotes: consultas simultáneas en un solo lote,
+textos repetidos, corte por tamaño, errores del lote y el modo directo (espera 0).
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import threading
+from concurrent.futures import TimeoutError as TimeoutFuturo
+
+import pytest
+
+from recuperacion.micro_lotes import DespachadorEmbeddings
+
+
+class EmbeddingsFalsos:
+    """Anota cada lote recibido; el vector de un texto es [len(texto)]."""
+
+    def __init__(self, error=None, faltantes=0, bloqueo=None):
+        self.lotes = []
+        self.consultas = []
+        self.error = error
+        self.faltantes = faltantes
+        self.bloqueo = bloqueo
+        self._lock = threading.Lock()
+
+    def embed_documents(self, textos):
+        with self._lock:
+            self.lotes.append(list(textos))
+        if self.bloqueo is not None:
+            self.bloqueo.wait(5)
+        if self.error is not None:
+            raise self.error
+        return [[float(len(t))] for t in textos][:len(textos) - self.faltantes]
+
+    def embed_query(self, texto):
+        self.consultas.append(texto)
+        return [float(len(texto))]
+
+
+def _simultaneas(despachador, textos):
+    """Lanza una embed_query por texto a la vez; devuelve {texto: vector o excepción}."""
+    barrera = threading.Barrier(len(textos))
+    resultados = {}
+
+    def consultar(i, texto):
+        barrera.wait()
+        try:
+            resultados[i] = despachador.embed_query(texto)
+        except BaseException as e:
+            resultados[i] = e
+
+    hilos = [threading.Thread(target=consultar, args=(i, t)) for i, t in enumerate(textos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return [resultados[i] for i in range(len(textos))]
+
+
+def test_consultas_simultaneas_van_en_un_lote():
+    api = EmbeddingsFalsos()
+    despachador = DespachadorEmbeddings(api, espera_ms=300, tamano_lote=64)
+    textos = [f"pregunta {'x' * i}" for i in range(8)]
+
+    assert _simultaneas(despachador, textos) == [[float(len(t))] for t in textos]
+    assert len(api.lotes) == 1 and sorted(api.lotes[0]) == sorted(textos)
+    assert despachador.estadisticas == {"consultas": 8, "lotes": 1, "textos_enviados": 8}
+
+
+def test_textos_repetidos_se_envian_una_vez():
+    api = EmbeddingsFalsos()
+    despachador = DespachadorEmbeddings(api, espera_ms=300)
+    textos = ["¿cuánto cuesta?"] * 5 + ["horario"]
+
+    assert _simultaneas(despachador, textos) == [[float(len(t))] for t in textos]
+    assert sorted(api.lotes[0]) == ["horario", "¿cuánto cuesta?"]
+    assert despachador.estadisticas["textos_enviados"] == 2
+
+
+def test_corte_por_tamano_de_lote():
+    api = EmbeddingsFalsos()
+    despachador = DespachadorEmbeddings(api, espera_ms=300, tamano_lote=3)
+    textos = [f"consulta {i}" for i in range(7)]
+
+    assert _simultaneas(despachador, textos) == [[float(len(t))] for t in textos]
+    assert all(len(lote) <= 3 for lote in api.lotes)
+    assert len(api.lotes) >= 3 and sum(len(lote) for lote in api.lotes) == 7
+
+
+def test_error_del_lote_llega_a_cada_consulta():
+    api = EmbeddingsFalsos(error=ConnectionError("rate limit"))
+    despachador = DespachadorEmbeddings(api, espera_ms=100)
+
+    resultados = _simultaneas(despachador, ["a", "b", "c"])
+    assert all(isinstance(r, ConnectionError) for r in resultados)
+    # El despachador sigue sirviendo tras el error
+    api.error = None
+    assert despachador.embed_query("d") == [1.0]
+
+
+def test_respuesta_incompleta_no_deja_consultas_colgadas():
+    api = EmbeddingsFalsos(faltantes=1)
+    despachador = DespachadorEmbeddings(api, espera_ms=100, timeout=5)
+
+    resultados = _simultaneas(despachador, ["uno", "dos", "tres"])
+    assert all(isinstance(r, ValueError) for r in resultados)
+
+
+def test_timeout_si_el_lote_no_responde():
+    liberar = threading.Event()
+    despachador = DespachadorEmbeddings(EmbeddingsFalsos(bloqueo=liberar), espera_ms=1, timeout=0.1)
+    with pytest.raises(TimeoutFuturo):
+        despachador.embed_query("lenta")
+    liberar.set()
+
+
+def test_espera_cero_llama_directo():
+    api = EmbeddingsFalsos()
+    despachador = DespachadorEmbeddings(api, espera_ms=0)
+
+    assert despachador.embed_query("hola") == [4.0]
+    assert api.consultas == ["hola"] and api.lotes == []
+    assert despachador._hilo is None
+    assert despachador.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
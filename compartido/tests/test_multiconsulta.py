@@ -0,0 +1,77 @@
+"""
+Tests de recuperacion.multiconsulta: las versiones síncronas se llaman desde
+dentro de un event loop (webhook async de Chatwoot → chat_con_agente → tools).
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import asyncio
+import threading
+
+from recuperacion.local import EmbeddingsLocales, IndiceLocal
+from recuperacion.multiconsulta import BuscadorMulticonsulta
+
+DIMENSION = 32
+
+
+def _buscador(max_concurrencia: int = 4) -> BuscadorMulticonsulta:
+    embeddings = EmbeddingsLocales(DIMENSION)
+    indice = IndiceLocal(DIMENSION)
+    textos = [f"chunk {i} sobre los programas de DATAPATH" for i in range(200)]
+    indice.upsert([
+        (f"doc-{i}", vector, {"text": texto})
+        for i, (texto, vector) in enumerate(zip(textos, embeddings.embed_documents(textos)))
+    ])
+    return BuscadorMulticonsulta(indice, embeddings, max_concurrencia=max_concurrencia)
+
+
+def test_buscar_lote_dentro_de_un_event_loop():
+    buscador = _buscador()
+    consultas = [f"consulta {i} sobre cursos" for i in range(6)]
+    esperado = [buscador.consultar(buscador.embeddings.embed_query(c), 5) for c in consultas]
+
+    async def handler():
+        # Igual que chat_con_agente: código síncrono con el loop en marcha
+        return buscador.buscar_lote(consultas, 5)
+
+    resultados = asyncio.run(handler())
+    assert [[d["id"] for d in r] for r in resultados] == [[d["id"] for d in r] for r in esperado]
+
+
+def test_buscar_vectores_dentro_de_un_event_loop():
+    buscador = _buscador()
+    vectores = buscador.embeddings.embed_documents(["python", "sql", "power bi"])
+
+    async def handler():
+        return buscador.buscar_vectores(vectores, 3)
+
+    resultados = asyncio.run(handler())
+    assert len(resultados) == 3
+    assert all(len(r) == 3 and r[0]["content"].startswith("chunk") for r in resultados)
+
+
+def test_concurrencia_limitada_al_pool():
+    buscador = _buscador(max_concurrencia=2)
+    en_vuelo, maximo = 0, 0
+    lock = threading.Lock()
+    consultar = buscador.consultar
+
+    def consultar_contando(*args):
+        nonlocal en_vuelo, maximo
+        with lock:
+            en_vuelo += 1
+            maximo = max(maximo, en_vuelo)
+        try:
+            return consultar(*args)
+        finally:
+            with lock:
+                en_vuelo -= 1
+
+    buscador.consultar = consultar_contando
+    buscador.indice.latencia_ms = 5
+    buscador.buscar_vectores(buscador.embeddings.embed_documents([f"q{i}" for i in range(8)]), 3)
+    assert maximo <= 2
+
+
+def test_lote_vacio():
+    assert _buscador().buscar_lote([]) == []
@@ -0,0 +1,109 @@
+"""
+Tests de recuperacion.presupuesto: el total respeta el presupuesto, el reparto
+sigue la relevancia, no se cortan oraciones y un presupuesto mínimo no deja
+bloques con solo título y fuentes.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import re
+
+import pytest
+
+from recuperacion.presupuesto import asignar_presupuesto
+from utilidades.tokens import contar_tokens
+
+ORACIONES = [
+    "El Diplomado en Data Engineering dura seis meses.",
+    "Las clases son en vivo los sábados por la mañana.",
+    "Incluye proyectos con datos reales de empresas.",
+    "Al finalizar se entrega un certificado digital.",
+    "El pago puede hacerse al contado o en cuotas.",
+    "Hay descuentos para grupos corporativos.",
+]
+
+
+def _base_conocimiento(relevancias, oraciones: int = 6) -> str:
+    """Mismo formato que _formatear_resultados de la tool de Supabase."""
+    texto = "Información encontrada:\n\n"
+    for i, relevancia in enumerate(relevancias, 1):
+        cuerpo = " ".join(ORACIONES[(i + j) % len(ORACIONES)] for j in range(oraciones))
+        texto += f"[{i}] (Relevancia: {relevancia:.0%})\n{cuerpo}\n\n"
+    return texto
+
+
+def _internet(titulos: int = 3) -> str:
+    """Mismo formato que Busqueda_internet: título, contenido y línea Fuente."""
+    texto = "Resultados de la búsqueda web:\n\n"
+    for i in range(1, titulos + 1):
+        cuerpo = " ".join(ORACIONES[(i + j) % len(ORACIONES)] for j in range(5))
+        texto += f"[{i}] Noticia {i} sobre cursos de datos (Relevancia: {0.9 - 0.1 * i:.0%})\n{cuerpo}\n"
+        texto += f"Fuente: https://ejemplo.com/noticias/cursos-de-datos/{i}\n\n"
+    return texto
+
+
+def _total(resultados) -> int:
+    return sum(contar_tokens(r) for r in resultados)
+
+
+def _bloques(texto: str) -> dict:
+    """{titulo: cuerpo} de cada bloque '[i] ...' del resultado recortado."""
+    bloques = {}
+    for parte in texto.split("\n\n"):
+        lineas = parte.strip().split("\n")
+        if re.match(r"^\[\d+\]", lineas[0]):
+            bloques[lineas[0]] = "\n".join(l for l in lineas[1:] if not l.startswith("Fuente:"))
+    return bloques
+
+
+@pytest.mark.parametrize("presupuesto", [60, 100, 150, 250, 400])
+def test_total_no_supera_el_presupuesto(presupuesto):
+    resultados = [_base_conocimiento([0.9, 0.8, 0.7, 0.6, 0.5]), _internet(), "Hoy es sábado 18 de octubre."]
+    assert _total(resultados) > presupuesto
+    assert _total(asignar_presupuesto(resultados, presupuesto)) <= presupuesto
+
+
+def test_sin_recorte_si_cabe_o_sin_limite():
+    resultados = [_base_conocimiento([0.9, 0.8]), "Hoy es sábado."]
+    assert asignar_presupuesto(resultados, 10_000) == resultados
+    assert asignar_presupuesto(resultados, 0) == resultados
+
+
+def test_reparto_proporcional_a_la_relevancia():
+    resultado = asignar_presupuesto([_base_conocimiento([0.95, 0.60, 0.30], oraciones=12)], 300)[0]
+    bloques = list(_bloques(resultado).values())
+    tokens = [contar_tokens(cuerpo) for cuerpo in bloques]
+    assert len(tokens) == 3
+    assert tokens[0] > tokens[1] > tokens[2]
+
+
+def test_no_corta_oraciones():
+    resultados = [_base_conocimiento([0.9, 0.7, 0.5]), _internet()]
+    for presupuesto in (120, 200, 300):
+        for texto in asignar_presupuesto(resultados, presupuesto):
+            for titulo, cuerpo in _bloques(texto).items():
+                assert cuerpo, titulo
+                assert not cuerpo.endswith("…")
+                # El cuerpo son oraciones completas del original
+                assert all(oracion in ORACIONES for oracion in re.split(r"(?<=\.)\s+", cuerpo))
+
+
+def test_presupuesto_minimo_descarta_bloques_en_vez_de_dejarlos_sin_cuerpo():
+    # Títulos y fuentes largos: con 80 tokens no caben los tres bloques con cuerpo
+    resultados = [_internet(3)]
+    recortado = asignar_presupuesto(resultados, 80)
+    bloques = _bloques(recortado[0])
+    assert _total(recortado) <= 80
+    assert 0 < len(bloques) < 3
+    assert all(bloques.values())
+    # Se conservan los más relevantes
+    assert next(iter(bloques)).startswith("[1]")
+
+
+def test_presupuesto_diminuto():
+    resultados = [_base_conocimiento([0.9, 0.8]), _internet(2)]
+    for presupuesto in (1, 5, 12):
+        recortado = asignar_presupuesto(resultados, presupuesto)
+        assert len(recortado) == 2
+        assert _total(recortado) <= max(presupuesto, len(resultados))
+        assert all(not _bloques(texto) for texto in recortado)
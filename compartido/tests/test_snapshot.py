@@ -0,0 +1,107 @@
+"""
+Tests de recuperacion.snapshot: publicar, abrir con mmap, buscar igual que
+MatrizEmbeddings y cambiar de versión sin reiniciar el lector.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import os
+
+import numpy as np
+
+from recuperacion import snapshot
+from recuperacion.local import IndiceLocal
+from recuperacion.matriz import MatrizEmbeddings
+from recuperacion.snapshot import (
+    ENLACE_ACTUAL, SnapshotEmbeddings, escribir_snapshot, generar_desde_filas, leer_pinecone,
+)
+
+DIMENSION = 16
+
+
+def _datos(n: int = 200, semilla: int = 0):
+    rng = np.random.default_rng(semilla)
+    ids = [f"doc-{i}" for i in range(n)]
+    contenidos = [f"Diplomado {i}: S/ {i},500 — año académico, más información 📚" for i in range(n)]
+    metadatos = [{"curso": "python" if i % 2 else "sql"} for i in range(n)]
+    return ids, contenidos, rng.standard_normal((n, DIMENSION)).astype(np.float32), metadatos
+
+
+def _versiones(directorio):
+    return sorted(n for n in os.listdir(directorio) if n.startswith("v-"))
+
+
+def test_publicar_y_buscar_como_la_matriz(tmp_path):
+    ids, contenidos, vectores, metadatos = _datos()
+    escribir_snapshot(str(tmp_path), ids, contenidos, vectores, metadatos, fuente="prueba")
+    lector = SnapshotEmbeddings(str(tmp_path), cuantizacion="")
+    matriz = MatrizEmbeddings(DIMENSION)
+    matriz.upsert(ids, contenidos, vectores, metadatos)
+
+    assert len(lector) == 200
+    assert isinstance(lector._datos["matriz"], np.memmap)
+    assert lector.contenido(7) == contenidos[7]
+    consulta = np.random.default_rng(1).standard_normal(DIMENSION)
+    for filtro in (None, {"curso": "sql"}):
+        esperado = matriz.buscar(consulta, top_k=5, filtro=filtro)
+        obtenido = lector.buscar(consulta, top_k=5, filtro=filtro)
+        assert [d["id"] for d in obtenido] == [d["id"] for d in esperado]
+        assert [d["content"] for d in obtenido] == [d["content"] for d in esperado]
+        np.testing.assert_allclose([d["similitud"] for d in obtenido],
+                                   [d["similitud"] for d in esperado], rtol=1e-5)
+
+
+def test_nueva_version_se_detecta_y_se_limpian_las_viejas(tmp_path):
+    directorio = str(tmp_path)
+    ids, contenidos, vectores, _ = _datos(50)
+    escribir_snapshot(directorio, ids, contenidos, vectores)
+    lector = SnapshotEmbeddings(directorio, intervalo_revision=0, cuantizacion="")
+    primera = lector.version
+    assert os.readlink(os.path.join(directorio, ENLACE_ACTUAL)) == primera
+
+    for semilla in (1, 2):
+        ids, contenidos, vectores, _ = _datos(30 + semilla, semilla)
+        escribir_snapshot(directorio, ids, contenidos, vectores)
+
+    # La búsqueda revisa el symlink y reabre la versión nueva
+    assert lector.buscar(vectores[0], top_k=1)[0]["id"] == "doc-0"
+    assert lector.version != primera and len(lector) == 32
+    assert lector.version == os.readlink(os.path.join(directorio, ENLACE_ACTUAL))
+    # Solo quedan VERSIONES_A_CONSERVAR versiones y ninguna carpeta temporal
+    assert len(_versiones(directorio)) == snapshot.VERSIONES_A_CONSERVAR
+    assert lector.version in _versiones(directorio)
+    assert not [n for n in os.listdir(directorio) if n.startswith(".")]
+
+
+def test_intervalo_de_revision(tmp_path):
+    directorio = str(tmp_path)
+    ids, contenidos, vectores, _ = _datos(20)
+    escribir_snapshot(directorio, ids, contenidos, vectores)
+    lector = SnapshotEmbeddings(directorio, intervalo_revision=3600, cuantizacion="")
+    version = lector.version
+    escribir_snapshot(directorio, ids[:10], contenidos[:10], vectores[:10])
+
+    assert not lector.recargar_si_cambio()
+    assert lector.version == version and len(lector) == 20
+    assert lector.recargar_si_cambio(forzar=True) and len(lector) == 10
+
+
+def test_snapshot_vacio_y_sin_publicar(tmp_path):
+    assert SnapshotEmbeddings(str(tmp_path / "nada"), cuantizacion="").buscar(np.ones(DIMENSION)) == []
+    escribir_snapshot(str(tmp_path), [], [], np.empty((0, 0), dtype=np.float32))
+    lector = SnapshotEmbeddings(str(tmp_path), cuantizacion="")
+    assert len(lector) == 0 and lector.buscar(np.ones(DIMENSION)) == []
+
+
+def test_generar_desde_pinecone(tmp_path):
+    ids, contenidos, vectores, metadatos = _datos(120)
+    indice = IndiceLocal(DIMENSION)
+    indice.upsert([{"id": i, "values": v.tolist(), "metadata": {**m, "text": c}}
+                   for i, c, v, m in zip(ids, contenidos, vectores, metadatos)], namespace="v1")
+
+    generar_desde_filas(str(tmp_path), leer_pinecone(indice, "v1", lote=50), "pinecone")
+    lector = SnapshotEmbeddings(str(tmp_path), cuantizacion="")
+    assert len(lector) == 120
+    resultado = lector.buscar(vectores[42], top_k=1, filtro={"curso": "sql"})[0]
+    assert resultado["id"] == "doc-42" and resultado["content"] == contenidos[42]
+    assert lector._datos["metadatos"][lector._datos["ids"].index("doc-42")] == {"curso": "sql"}
@@ -0,0 +1,61 @@
+"""
+Tests de historial.sqlite: ida y vuelta de mensajes en un archivo SQLite (WAL)
+y el backend sqlite seleccionable por HISTORIAL_BACKEND.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import threading
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from historial import BACKENDS, TABLA_HISTORIAL, BackendSQLite
+from historial.sqlite import SQLiteChatMessageHistory, conectar
+
+
+def _historial(ruta, session_id="s1"):
+    SQLiteChatMessageHistory.create_tables(ruta, TABLA_HISTORIAL)
+    return SQLiteChatMessageHistory(TABLA_HISTORIAL, session_id, ruta=ruta)
+
+
+def test_ida_y_vuelta_de_mensajes(tmp_path):
+    ruta = str(tmp_path / "historial.sqlite3")
+    historial = _historial(ruta)
+    historial.add_user_message("¿Cuánto cuesta el Diplomado? S/ 1,500")
+    historial.add_ai_message("Cuesta S/ 1,500 al contado 💳")
+
+    leidos = _historial(ruta).messages
+    assert [type(m) for m in leidos] == [HumanMessage, AIMessage]
+    assert [m.content for m in leidos] == ["¿Cuánto cuesta el Diplomado? S/ 1,500", "Cuesta S/ 1,500 al contado 💳"]
+    assert conectar(ruta).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sesiones_aisladas_y_clear(tmp_path):
+    ruta = str(tmp_path / "historial.sqlite3")
+    uno, dos = _historial(ruta, "s1"), _historial(ruta, "s2")
+    uno.add_messages([HumanMessage(content="hola"), AIMessage(content="hola, ¿en qué te ayudo?")])
+    dos.add_user_message("otra sesión")
+
+    uno.clear()
+    assert uno.messages == []
+    assert [m.content for m in dos.messages] == ["otra sesión"]
+
+
+def test_otro_hilo_lee_lo_escrito(tmp_path):
+    ruta = str(tmp_path / "historial.sqlite3")
+    _historial(ruta).add_user_message("escrito en el hilo principal")
+
+    leidos = []
+    hilo = threading.Thread(target=lambda: leidos.extend(_historial(ruta).messages))
+    hilo.start()
+    hilo.join()
+    assert [m.content for m in leidos] == ["escrito en el hilo principal"]
+
+
+def test_backend_sqlite(tmp_path):
+    assert BACKENDS["sqlite"] is BackendSQLite
+    backend = BackendSQLite(str(tmp_path / "historial.sqlite3"))
+    backend.crear_tablas()
+    backend.obtener("s1").add_user_message("hola")
+    assert [m.content for m in backend.obtener("s1").messages] == ["hola"]
+    assert backend.obtener("s2").messages == []
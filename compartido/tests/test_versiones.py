@@ -0,0 +1,170 @@
+"""
+Tests de recuperacion.versiones: VersionActiva (lectura inicial, revisión en
+segundo plano, errores y suscriptores) y el cambio de versión en Pinecone
+(IndiceLocal) que siguen RecuperadorPinecone y la caché de resultados.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from recuperacion import backends, versiones
+from recuperacion.backends import RecuperadorPinecone, al_cambiar_version
+from recuperacion.cache_resultados import CacheResultados
+from recuperacion.local import IndiceLocal
+from recuperacion.versiones import (
+    VersionActiva, activar_pinecone, leer_activo_pinecone, limpiar_pinecone, validar_conteo,
+)
+
+DIMENSION = 8
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """Reloj manual para versiones (los hilos de revisión son reales)."""
+    ahora = SimpleNamespace(t=1000.0)
+    monkeypatch.setattr(versiones, "time", SimpleNamespace(monotonic=lambda: ahora.t, sleep=time.sleep))
+    return ahora
+
+
+@pytest.fixture(autouse=True)
+def suscriptores(monkeypatch):
+    """Suscriptores de backends.al_cambiar_version solo de este test."""
+    monkeypatch.setattr(backends, "_suscriptores_version", [])
+
+
+def _esperar_revision(version_activa, limite=5.0):
+    fin = time.monotonic() + limite
+    while version_activa._revisando and time.monotonic() < fin:
+        time.sleep(0.001)
+
+
+class PunteroFalso:
+    """Lector del puntero: devuelve el valor actual o lanza el error configurado."""
+
+    def __init__(self, version):
+        self.version = version
+        self.error = None
+        self.lecturas = 0
+
+    def __call__(self):
+        self.lecturas += 1
+        if self.error is not None:
+            raise self.error
+        return self.version
+
+
+def test_lectura_inicial_y_cambio_en_segundo_plano(reloj):
+    puntero = PunteroFalso("v20261001000000")
+    avisos = []
+    activa = VersionActiva(puntero, intervalo=10)
+    activa.suscribir(avisos.append)
+    assert activa.version == "v20261001000000" and puntero.lecturas == 1
+
+    puntero.version = "v20261018000000"
+    reloj.t += 5
+    assert activa.actual() == "v20261001000000" and puntero.lecturas == 1     # Antes del intervalo no se revisa
+
+    reloj.t += 5
+    activa.actual()                             # Lanza la revisión sin esperarla
+    _esperar_revision(activa)
+    assert activa.actual() == "v20261018000000"
+    assert avisos == ["v20261018000000"]
+
+
+def test_error_de_lectura_conserva_la_version(reloj):
+    puntero = PunteroFalso("v20261001000000")
+    avisos = []
+    activa = VersionActiva(puntero, intervalo=1)
+    activa.suscribir(avisos.append)
+
+    puntero.error = ConnectionError("sin red")
+    reloj.t += 2
+    activa.actual()
+    _esperar_revision(activa)
+    assert activa.version == "v20261001000000" and avisos == []
+
+    puntero.error, puntero.version = None, "v20261018000000"
+    reloj.t += 2
+    activa.actual()
+    _esperar_revision(activa)
+    assert activa.version == "v20261018000000" and avisos == ["v20261018000000"]
+
+
+def test_suscriptor_con_error_no_detiene_a_los_demas(reloj):
+    puntero = PunteroFalso(None)
+    avisos = []
+    activa = VersionActiva(puntero, intervalo=1)
+    activa.suscribir(lambda version: 1 / 0)
+    activa.suscribir(avisos.append)
+
+    puntero.version = "v20261018000000"
+    reloj.t += 2
+    activa.actual()
+    _esperar_revision(activa)
+    assert avisos == ["v20261018000000"]
+
+
+def test_intervalo_cero_solo_lectura_inicial(reloj):
+    puntero = PunteroFalso("v20261001000000")
+    activa = VersionActiva(puntero, intervalo=0)
+    puntero.version = "v20261018000000"
+    reloj.t += 3600
+    assert activa.actual() == "v20261001000000" and puntero.lecturas == 1
+
+
+def test_validar_conteo():
+    validar_conteo("v1", 100, esperados=100, conteo_activo=120)
+    for conteo, esperados, activo in ((0, None, 0), (90, 100, 0), (40, None, 100)):
+        with pytest.raises(ValueError):
+            validar_conteo("v1", conteo, esperados, activo)
+
+
+def _cargar(indice, namespace, etiqueta, n=5):
+    rng = np.random.default_rng(len(namespace))
+    indice.upsert([{"id": f"{etiqueta}-{i}", "values": rng.standard_normal(DIMENSION).tolist(),
+                    "metadata": {"text": f"{etiqueta} {i}"}} for i in range(n)], namespace=namespace)
+
+
+def test_recuperador_pinecone_sigue_al_puntero(reloj):
+    indice = IndiceLocal(DIMENSION)
+    _cargar(indice, "", "legado")
+    _cargar(indice, "v20261001000000", "primera")
+    activar_pinecone(indice, "v20261001000000", esperados=5)
+
+    cache = CacheResultados(ttl=60, tamano=8)
+    al_cambiar_version(cache.nueva_version)
+    recuperador = RecuperadorPinecone(indice)
+    assert recuperador.buscar(np.ones(DIMENSION), top_k=1)[0]["content"].startswith("primera")
+    cache.guardar("precio", 5, ["de la primera versión"])
+
+    # Versión nueva: validación, un upsert al puntero y la tool la toma en la siguiente revisión
+    _cargar(indice, "v20261018000000", "segunda")
+    assert activar_pinecone(indice, "v20261018000000", esperados=5)["anterior"] == "v20261001000000"
+    recuperador.version.intervalo = 10
+    reloj.t += 11
+    recuperador.buscar(np.ones(DIMENSION), top_k=1)
+    _esperar_revision(recuperador.version)
+
+    assert recuperador.buscar(np.ones(DIMENSION), top_k=1)[0]["content"].startswith("segunda")
+    assert cache.version == "v20261018000000" and cache.buscar("precio", 5) is None
+
+    # Se conservan la activa y la anterior; el namespace predeterminado es el más antiguo
+    assert limpiar_pinecone(indice, conservar=2) == [""]
+    assert leer_activo_pinecone(indice) == "v20261018000000"
+
+
+def test_activar_rechaza_una_version_incompleta():
+    indice = IndiceLocal(DIMENSION)
+    _cargar(indice, "v20261001000000", "primera", n=10)
+    activar_pinecone(indice, "v20261001000000")
+    _cargar(indice, "v20261018000000", "segunda", n=2)
+
+    with pytest.raises(ValueError):
+        activar_pinecone(indice, "v20261018000000")
+    assert leer_activo_pinecone(indice) == "v20261001000000"
+    assert activar_pinecone(indice, "v20261018000000", forzar=True)["vectores"] == 2
@@ -0,0 +1,10 @@
+"""
+Utilidades Compartidas
+Funciones pequeñas que usan varios paquetes y la ingesta (conteo de tokens).
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+from utilidades.tokens import contar_tokens
+
+__all__ = ["contar_tokens"]
@@ -0,0 +1,21 @@
+"""
+Conteo de Tokens
+contar_tokens con tiktoken (cl100k_base), o una estimación de ~4 caracteres
+por token cuando tiktoken no está instalado.
+
+Autor: Ing. Kevin Inofuente Colque - DataPath
+"""
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    # Sin tiktoken se estima ~4 caracteres por token
+    _encoding = None
+
+
+def contar_tokens(texto: str) -> int:
+    """Cuenta tokens con tiktoken (cl100k_base) o los estima si no está instalado."""
+    if _encoding is not None:
+        return len(_encoding.encode(texto))
+    return max(1, len(texto) // 4)